@@ -21,11 +21,12 @@ import json
 from pathlib import Path
 from typing import Dict, List, Tuple, Any
 from collections import defaultdict
-import fitz  # PyMuPDF
 
 # Add parent to path for imports
 sys.path.insert(0, str(Path(__file__).parent))
 
+from gracian_pipeline.core.pdf_topology import classify_pdf
+
 
 class PDFTopologyAnalyzer:
     def __init__(self):
@@ -56,59 +57,17 @@ class PDFTopologyAnalyzer:
         try:
             # Get file size
             result['size_mb'] = round(os.path.getsize(pdf_path) / (1024 * 1024), 2)
-
-            # Try to open PDF
-            doc = fitz.open(pdf_path)
-
-            # Check if encrypted/locked
-            result['is_encrypted'] = doc.is_encrypted
-            result['is_locked'] = doc.needs_pass
-
-            if result['is_locked']:
-                result['category'] = 'locked'
-                self.results['locked'].append(result)
-                doc.close()
-                return result
-
-            # Count pages and extract text
-            result['pages'] = doc.page_count
-            total_chars = 0
-
-            # Sample pages (if >20 pages, sample every 5th page for speed)
-            if doc.page_count > 20:
-                sample_pages = list(range(0, doc.page_count, 5))[:10]  # Max 10 samples
-            else:
-                sample_pages = range(doc.page_count)
-
-            for page_num in sample_pages:
-                page = doc.load_page(page_num)
-                text = page.get_text("text")
-                total_chars += len(text)
-
-            # Extrapolate to full document
-            if len(sample_pages) < doc.page_count:
-                total_chars = int(total_chars * (doc.page_count / len(sample_pages)))
-
-            result['text_chars'] = total_chars
-            result['avg_chars_per_page'] = total_chars / doc.page_count if doc.page_count > 0 else 0
-
-            # Categorize based on text density
-            if result['avg_chars_per_page'] > 800:  # >800 chars/page = machine-readable
-                result['category'] = 'machine_readable'
-                self.results['machine_readable'].append(result)
-            elif result['avg_chars_per_page'] < 200:  # <200 chars/page = scanned
-                result['category'] = 'scanned'
-                self.results['scanned'].append(result)
-            else:  # 200-800 chars/page = hybrid
-                result['category'] = 'hybrid'
-                self.results['hybrid'].append(result)
-
-            doc.close()
-
-        except Exception as e:
+        except OSError as e:
             result['error'] = str(e)
             result['category'] = 'corrupted'
             self.results['corrupted'].append(result)
+            return result
+
+        # Sampled text density, same classifier and thresholds as mass_scan_pdfs.py
+        topology = classify_pdf(pdf_path)
+        for key in ('is_encrypted', 'is_locked', 'pages', 'text_chars', 'avg_chars_per_page', 'category', 'error'):
+            result[key] = topology[key]
+        self.results[result['category']].append(result)
 
         return result
 
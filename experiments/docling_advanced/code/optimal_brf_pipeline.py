@@ -37,6 +37,8 @@ from docling_core.types.doc import SectionHeaderItem
 # Gracian imports
 from gracian_pipeline.models.brf_schema import BRFAnnualReport
 from gracian_pipeline.core.vision_qc import call_grok_vision, call_openai_vision
+from gracian_pipeline.core.pdf_topology import TopologyStore, default_store, get_topology
+from gracian_pipeline.core.pdf_topology import sample_pages as topology_sample_pages
 
 # Local imports
 from note_semantic_router import NoteSemanticRouter
@@ -112,13 +114,6 @@ class CacheManager:
                     created_at INTEGER
                 )
             """)
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS topology_cache (
-                    pdf_hash TEXT PRIMARY KEY,
-                    topology_json TEXT,
-                    created_at INTEGER
-                )
-            """)
             conn.commit()
 
     def get_structure(self, pdf_hash: str) -> Optional[StructureDetectionResult]:
@@ -155,28 +150,6 @@ class CacheManager:
             )
             conn.commit()
 
-    def get_topology(self, pdf_hash: str) -> Optional[PDFTopology]:
-        """Get cached topology analysis"""
-        with sqlite3.connect(self.db_path) as conn:
-            row = conn.execute(
-                "SELECT topology_json FROM topology_cache WHERE pdf_hash = ?",
-                (pdf_hash,)
-            ).fetchone()
-
-            if row:
-                topology_data = json.loads(row[0])
-                return PDFTopology(**topology_data)
-        return None
-
-    def put_topology(self, topology: PDFTopology, pdf_hash: str):
-        """Cache topology analysis"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute(
-                "INSERT OR REPLACE INTO topology_cache (pdf_hash, topology_json, created_at) VALUES (?, ?, ?)",
-                (pdf_hash, json.dumps(asdict(topology)), int(time.time()))
-            )
-            conn.commit()
-
 
 class OptimalBRFPipeline:
     """
@@ -202,6 +175,8 @@ class OptimalBRFPipeline:
 
         # Initialize components
         self.cache = CacheManager(cache_dir) if enable_caching else None
+        # Topology records: the shared TOPOLOGY_DB if configured, else next to the pipeline cache
+        self.topology_store = (default_store() or TopologyStore(str(self.cache.db_path))) if enable_caching else None
         self.note_router = NoteSemanticRouter(
             config_path="config/note_keywords.yaml",
             cache_path="results/routing_cache.db",
@@ -251,55 +226,23 @@ class OptimalBRFPipeline:
         with open(pdf_path, 'rb') as f:
             return hashlib.sha256(f.read()).hexdigest()
 
-    def analyze_topology(self, pdf_path: str, sample_pages: int = 3) -> PDFTopology:
+    def analyze_topology(self, pdf_path: str) -> PDFTopology:
         """
         STAGE 1: Adaptive PDF topology detection
 
-        Samples pages and classifies as:
+        Shared classifier (gracian_pipeline.core.pdf_topology); looked up in the
+        mass-scan checkpoint DB / topology store first:
         - machine_readable: >800 chars/page (48.4% of corpus)
         - scanned: <200 chars/page (49.3% of corpus)
         - hybrid: 200-800 chars/page (2.3% of corpus)
         """
         start_time = time.time()
 
-        # Try to get from cache first
         pdf_hash = self.compute_pdf_hash(pdf_path)
-        if self.cache:
-            cached = self.cache.get_topology(pdf_hash)
-            if cached:
-                print(f"   ✅ Topology cached (0.1s, $0)")
-                return cached
-
-        import fitz  # PyMuPDF
-        doc = fitz.open(pdf_path)
-        total_pages = len(doc)
-
-        # Sample evenly distributed pages
-        if total_pages <= sample_pages:
-            pages_to_sample = list(range(total_pages))
-        else:
-            step = total_pages // sample_pages
-            pages_to_sample = [i * step for i in range(sample_pages)]
-
-        # Extract text and count characters
-        char_counts = []
-        for page_num in pages_to_sample:
-            page = doc[page_num]
-            text = page.get_text()
-            char_counts.append(len(text))
-
-        doc.close()
-
-        avg_chars = sum(char_counts) / len(char_counts) if char_counts else 0
-
-        # Classify
-        if avg_chars > 800:
-            classification = "machine_readable"
-        elif avg_chars < 200:
-            classification = "scanned"
-        else:
-            classification = "hybrid"
-
+        record = get_topology(pdf_path, store=self.topology_store, content_hash=pdf_hash)
+        total_pages = record.get("pages") or 0
+        avg_chars = record.get("avg_chars_per_page") or 0.0
+        classification = record["category"]
         elapsed = time.time() - start_time
 
         topology = PDFTopology(
@@ -307,14 +250,12 @@ class OptimalBRFPipeline:
             total_pages=total_pages,
             avg_chars_per_page=avg_chars,
             classification=classification,
-            sample_pages=pages_to_sample,
+            sample_pages=topology_sample_pages(total_pages),
             analysis_time=elapsed
         )
 
-        # Cache result
-        if self.cache:
-            self.cache.put_topology(topology, pdf_hash)
-
+        if record["source"] != "computed":
+            print(f"   ✅ Topology cached ({record['source']}, {elapsed:.1f}s, $0)")
         print(f"   ✅ Topology: {classification} ({avg_chars:.0f} chars/page, {elapsed:.1f}s)")
         return topology
 
@@ -0,0 +1,153 @@
+"""
+Aho–Corasick multi-pattern matcher for sectionizer anchors.
+
+The automaton is built once per anchor set and walks each page's text a single
+time, reporting every (agent, anchor, offset) occurrence, including
+overlapping anchors and anchors shared between agents. Offsets let callers
+weight hits by position.
+
+Backends: `pyahocorasick` (C) when installed, otherwise a plain `str.find`
+scan. The pure-Python automaton is only used when
+ANCHOR_MATCHER_BACKEND=python (parity tests, benchmarks).
+
+Environment:
+  ANCHOR_MATCHER_BACKEND=auto|scan|python   (default auto: pyahocorasick, else scan)
+"""
+
+from __future__ import annotations
+
+import os
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+
+class AnchorHit(NamedTuple):
+    agent_id: str
+    anchor: str
+    offset: int  # start offset in the scanned (normalized) text
+
+
+class AnchorAutomaton:
+    """Compiled automaton over {agent_id: [anchor, ...]}."""
+
+    def __init__(self, anchors_by_agent: Dict[str, Iterable[str]], backend: Optional[str] = None):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[str, str]]] = [[]]
+        self.anchors_by_agent: Dict[str, List[str]] = {}
+        for agent_id, anchors in anchors_by_agent.items():
+            self.anchors_by_agent[agent_id] = [a for a in anchors if a]
+        requested = (backend or os.getenv("ANCHOR_MATCHER_BACKEND", "auto")).lower()
+        self._native = self._build_native() if requested == "auto" else None
+        if self._native is not None:
+            self.backend = "pyahocorasick"
+        elif requested == "python":
+            self.backend = "python"
+            for agent_id, anchors in self.anchors_by_agent.items():
+                for a in anchors:
+                    self._add(agent_id, a)
+            self._link()
+        else:
+            self.backend = "scan"
+
+    def _build_native(self):
+        try:
+            import ahocorasick  # type: ignore  # pyahocorasick (optional)
+        except Exception:
+            return None
+        native = ahocorasick.Automaton()
+        outputs: Dict[str, List[Tuple[str, str]]] = {}
+        for agent_id, anchors in self.anchors_by_agent.items():
+            for a in anchors:
+                pairs = outputs.setdefault(a, [])
+                if (agent_id, a) not in pairs:
+                    pairs.append((agent_id, a))
+        for a, pairs in outputs.items():
+            native.add_word(a, pairs)
+        native.make_automaton()
+        return native
+
+    def _add(self, agent_id: str, anchor: str):
+        node = 0
+        for ch in anchor:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        if (agent_id, anchor) not in self._out[node]:
+            self._out[node].append((agent_id, anchor))
+
+    def _link(self):
+        # BFS over the trie: failure links point at the longest proper suffix
+        # that is also a prefix; outputs are merged along them.
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                target = self._goto[f].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    @property
+    def size(self) -> int:
+        """Automaton states (0 for the scan backend)."""
+        if self._native is not None:
+            return self._native.get_stats()["nodes_count"]
+        return len(self._goto) if self.backend == "python" else 0
+
+    def scan(self, text: str) -> List[AnchorHit]:
+        """Every anchor occurrence in `text`, ordered by end position."""
+        hits: List[AnchorHit] = []
+        if self._native is not None:
+            if not text:
+                return hits
+            for end, pairs in self._native.iter(text):
+                for agent_id, anchor in pairs:
+                    hits.append(AnchorHit(agent_id, anchor, end - len(anchor) + 1))
+            return hits
+        if self.backend == "scan":
+            for agent_id, anchors in self.anchors_by_agent.items():
+                for a in anchors:
+                    j = text.find(a)
+                    while j != -1:
+                        hits.append(AnchorHit(agent_id, a, j))
+                        j = text.find(a, j + 1)
+            hits.sort(key=lambda h: h.offset + len(h.anchor))
+            return hits
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                for agent_id, anchor in out[node]:
+                    hits.append(AnchorHit(agent_id, anchor, i - len(anchor) + 1))
+        return hits
+
+    def agents_in(self, text: str) -> Set[str]:
+        if self.backend == "scan":
+            return {agent_id for agent_id, anchors in self.anchors_by_agent.items() if any(a in text for a in anchors)}
+        return {h.agent_id for h in self.scan(text)}
+
+
+_automata: Dict[int, Tuple[Dict[str, Tuple[str, ...]], AnchorAutomaton]] = {}
+
+
+def get_automaton(anchors_by_agent: Dict[str, Iterable[str]]) -> AnchorAutomaton:
+    """Automaton for an anchor table, rebuilt only when the table changes."""
+    snapshot = {k: tuple(v) for k, v in anchors_by_agent.items()}
+    cached: Optional[Tuple[Dict[str, Tuple[str, ...]], AnchorAutomaton]] = _automata.get(id(anchors_by_agent))
+    if cached is not None and cached[0] == snapshot:
+        return cached[1]
+    automaton = AnchorAutomaton(snapshot)
+    _automata[id(anchors_by_agent)] = (snapshot, automaton)
+    return automaton
@@ -7,12 +7,12 @@ Tries detailed table first, falls back to summary if not found.
 Solves: Current extraction gets summary totals instead of detailed breakdown by room type.
 """
 
-import os
 import json
 from typing import Dict, List, Optional, Any
 
-# OpenAI for LLM extraction
-from openai import OpenAI
+# OpenAI for LLM extraction (shared pooled client)
+from .llm_clients import get_client
+from .response_cache import cached_chat_completion
 
 
 class ApartmentBreakdownExtractor:
@@ -22,7 +22,7 @@ class ApartmentBreakdownExtractor:
     """
 
     def __init__(self):
-        self.openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.openai_client = get_client("openai")
 
     def extract_apartment_breakdown(self, markdown: str, tables: List[Dict], pdf_path: str = None) -> Dict[str, Any]:
         """
@@ -215,7 +215,9 @@ If you cannot find apartment distribution data, return: {"_not_found": true}
 """
 
             print(f"    → Calling GPT-4o Vision on page {target_page + 1}...")
-            response = self.openai_client.chat.completions.create(
+            content = cached_chat_completion(
+                self.openai_client,
+                namespace="apartment_breakdown",
                 model="gpt-4o",
                 messages=[
                     {
@@ -237,7 +239,6 @@ If you cannot find apartment distribution data, return: {"_not_found": true}
                 response_format={"type": "json_object"}
             )
 
-            content = response.choices[0].message.content
             result = json.loads(content)
             print(f"    → GPT-4o returned: {result}")
 
@@ -339,7 +340,9 @@ DOCUMENT:
             Parsed JSON response
         """
         try:
-            response = self.openai_client.chat.completions.create(
+            content = cached_chat_completion(
+                self.openai_client,
+                namespace="apartment_breakdown",
                 model="gpt-4o",
                 messages=[
                     {
@@ -357,7 +360,6 @@ DOCUMENT:
             )
 
             # Parse response
-            content = response.choices[0].message.content
             return json.loads(content)
 
         except Exception as e:
@@ -3,8 +3,9 @@ import json
 import re
 from typing import Dict, Any, Tuple
 from .vertex import vertex_generate_text
-from openai import OpenAI
-import time
+from .llm_clients import get_client, http_session
+from .response_cache import UnparsedResponse, cached_completion
+from .rate_limiter import call_with_limits, estimate_tokens
 
 
 def _num(s: str) -> Tuple[bool, float | None]:
@@ -129,7 +130,6 @@ def score_output(agent_id: str, data: Dict[str, Any]) -> float:
 
 
 def call_gemini_text(prompt: str, content: str) -> str:
-    import requests, os, time
     use_vertex = os.getenv("GEMINI_VIA_VERTEX", "true").lower() == "true"
     sa = os.getenv("VERTEX_SA_JSON")
     project = os.getenv("VERTEX_PROJECT")
@@ -144,93 +144,98 @@ def call_gemini_text(prompt: str, content: str) -> str:
     model = os.getenv("GEMINI_MODEL", "gemini-2.5-pro")
     url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent?key={api_key}"
     payload = {"contents": [{"role": "user", "parts": [{"text": prompt}, {"text": content}]}]}
-    last_err = None
-    for attempt in range(3):
+
+    def _once() -> str:
+        r = http_session().post(url, json=payload, timeout=90)
+        r.raise_for_status()
+        out = r.json()
         try:
-            r = requests.post(url, json=payload, timeout=90)
-            r.raise_for_status()
-            out = r.json()
-            try:
-                return out["candidates"][0]["content"]["parts"][0]["text"]
-            except Exception:
-                return str(out)
-        except Exception as e:
-            last_err = e
-            time.sleep(1.5 * (attempt + 1))
-    raise RuntimeError(f"Gemini text call failed after retries: {last_err}")
+            return out["candidates"][0]["content"]["parts"][0]["text"]
+        except Exception:
+            return UnparsedResponse(out)
+
+    return call_with_limits("gemini", _once, tokens=estimate_tokens(prompt, content), label="Gemini text")
 
 
 def call_openai_text(prompt: str, content: str) -> str:
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    client = get_client("openai")
     model = os.getenv("OPENAI_MODEL", "gpt-4o")
-    last_err = None
     # Prefer Responses API for GPT-5; fallback to Chat Completions
     use_responses = os.getenv("OPENAI_RESPONSES", "true").lower() == "true"
-    if use_responses:
-        for attempt in range(3):
-            try:
-                kwargs = {
-                    "model": model,
-                    "input": [
-                        {
-                            "role": "user",
-                            "content": [
-                                {"type": "input_text", "text": prompt},
-                                {"type": "input_text", "text": content},
-                            ],
-                        }
+    json_mode = os.getenv("OPENAI_JSON_MODE", "false").lower() == "true"
+
+    tokens = estimate_tokens(prompt, content, max_output=1200)
+
+    def _responses_once() -> str:
+        kwargs = {
+            "model": model,
+            "input": [
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "input_text", "text": prompt},
+                        {"type": "input_text", "text": content},
                     ],
-                    "max_output_tokens": 1200,
                 }
-                if os.getenv("OPENAI_JSON_MODE", "false").lower() == "true":
-                    kwargs["response_format"] = {"type": "json_object"}
-                resp = client.responses.create(**kwargs)
-                # New SDK returns output_text
-                if getattr(resp, "output_text", None):
-                    return resp.output_text
-                # Fallback parse
-                try:
-                    return resp.choices[0].message.content[0].text  # type: ignore
-                except Exception:
-                    return str(resp)
-            except Exception as e:
-                last_err = e
-                time.sleep(1.5 * (attempt + 1))
-    for attempt in range(3):
+            ],
+            "max_output_tokens": 1200,
+        }
+        if json_mode:
+            kwargs["response_format"] = {"type": "json_object"}
+        resp = client.responses.create(**kwargs)
+        # New SDK returns output_text
+        if getattr(resp, "output_text", None):
+            return resp.output_text
+        # Fallback parse
         try:
-            resp = client.chat.completions.create(
-                model=model,
-                messages=[
-                    {"role": "system", "content": prompt},
-                    {"role": "user", "content": content},
-                ],
-                max_completion_tokens=1200,
-            )
-            return resp.choices[0].message.content
-        except Exception as e:
-            last_err = e
-            time.sleep(1.5 * (attempt + 1))
-    raise RuntimeError(f"OpenAI text call failed after retries: {last_err}")
+            return resp.choices[0].message.content[0].text  # type: ignore
+        except Exception:
+            return UnparsedResponse(resp)
+
+    def _chat_once() -> str:
+        resp = client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": prompt},
+                {"role": "user", "content": content},
+            ],
+            max_completion_tokens=1200,
+        )
+        return resp.choices[0].message.content
+
+    def _call() -> str:
+        if use_responses:
+            try:
+                return call_with_limits("openai", _responses_once, tokens=tokens, label="OpenAI Responses text")
+            except Exception:
+                pass  # fall back to Chat Completions
+        return call_with_limits("openai", _chat_once, tokens=tokens, label="OpenAI text")
+
+    params = {"responses": use_responses, "json_mode": json_mode}
+    return cached_completion("openai_text", model, json.dumps([prompt, content]), (), _call, params=params)
 
 
 def call_qwen_openrouter_text(prompt: str, content: str) -> str:
-    from openai import OpenAI
     api_key = os.getenv("OPENROUTER_API_KEY")
     if not api_key:
         raise RuntimeError("OPENROUTER_API_KEY not set")
     model = os.getenv("OPENROUTER_QWEN_MODEL")
     if not model:
         raise RuntimeError("OPENROUTER_QWEN_MODEL not set")
-    client = OpenAI(api_key=api_key, base_url="https://openrouter.ai/api/v1")
-    resp = client.chat.completions.create(
-        model=model,
-        messages=[
-            {"role": "system", "content": prompt},
-            {"role": "user", "content": content},
-        ],
-        max_tokens=1200,
-    )
-    return resp.choices[0].message.content
+    client = get_client("openrouter", api_key=api_key)
+
+    def _once() -> str:
+        resp = client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": prompt},
+                {"role": "user", "content": content},
+            ],
+            max_tokens=1200,
+        )
+        return resp.choices[0].message.content
+
+    return call_with_limits("openrouter", _once, tokens=estimate_tokens(prompt, content, max_output=1200), label="Qwen text")
 
 
 def jury_rank(agent_id: str, prompt: str, content: str, cand: Dict[str, str]) -> Dict[str, Any]:
@@ -240,28 +245,26 @@ def jury_rank(agent_id: str, prompt: str, content: str, cand: Dict[str, str]) ->
       - If openrouter: uses OPENROUTER_API_KEY and JURY_MODEL_OPENROUTER (default 'openai/gpt-5')
       - If xai: uses XAI_API_KEY and JURY_MODEL (default XAI_MODEL)
     """
-    from openai import OpenAI
-
     provider = os.getenv("JURY_PROVIDER", "openai").lower()
     if provider == "openai":
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise RuntimeError("OPENAI_API_KEY not set for jury")
         model = os.getenv("JURY_MODEL_OPENAI", os.getenv("OPENAI_MODEL", "gpt-5"))
-        client = OpenAI(api_key=api_key)
+        client = get_client("openai", api_key=api_key)
         use_responses = os.getenv("OPENAI_RESPONSES", "true").lower() == "true"
     elif provider == "openrouter":
         api_key = os.getenv("OPENROUTER_API_KEY")
         if not api_key:
             raise RuntimeError("OPENROUTER_API_KEY not set for jury")
         model = os.getenv("JURY_MODEL_OPENROUTER", "openai/gpt-5")
-        client = OpenAI(api_key=api_key, base_url="https://openrouter.ai/api/v1")
+        client = get_client("openrouter", api_key=api_key)
     else:
         api_key = os.getenv("XAI_API_KEY")
         if not api_key:
             raise RuntimeError("XAI_API_KEY not set for xAI jury")
         model = os.getenv("JURY_MODEL", os.getenv("XAI_MODEL", "grok-4-fast-reasoning-latest"))
-        client = OpenAI(api_key=api_key, base_url="https://api.x.ai/v1")
+        client = get_client("xai", api_key=api_key)
 
     inst = (
         "You are the jury. Given a BRF agent task and 3 JSON outputs, choose the best one. "
@@ -272,22 +275,22 @@ def jury_rank(agent_id: str, prompt: str, content: str, cand: Dict[str, str]) ->
         f"Agent: {agent_id}\n\nTask: {prompt}\n\nDocument excerpt (may be truncated):\n{content[:3000]}\n\n"
         f"Candidates:\nGrok: {cand.get('grok','')}\n\nGemini: {cand.get('gemini','')}\n\nQwen: {cand.get('qwen','')}\n"
     )
-    if provider == "openai" and use_responses:
-        resp = client.responses.create(
-            model=model,
-            input=[
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "input_text", "text": inst},
-                        {"type": "input_text", "text": user},
-                    ],
-                }
-            ],
-            max_output_tokens=400,
-        )
-        txt = getattr(resp, "output_text", None) or str(resp)
-    else:
+    def _once() -> str:
+        if provider == "openai" and use_responses:
+            resp = client.responses.create(
+                model=model,
+                input=[
+                    {
+                        "role": "user",
+                        "content": [
+                            {"type": "input_text", "text": inst},
+                            {"type": "input_text", "text": user},
+                        ],
+                    }
+                ],
+                max_output_tokens=400,
+            )
+            return getattr(resp, "output_text", None) or UnparsedResponse(resp)
         resp = client.chat.completions.create(
             model=model,
             messages=[
@@ -296,7 +299,9 @@ def jury_rank(agent_id: str, prompt: str, content: str, cand: Dict[str, str]) ->
             ],
             max_completion_tokens=400,
         )
-        txt = resp.choices[0].message.content
+        return resp.choices[0].message.content
+
+    txt = call_with_limits(provider, _once, tokens=estimate_tokens(inst, user, max_output=400), label="Jury")
     try:
         return json.loads(txt)
     except Exception:
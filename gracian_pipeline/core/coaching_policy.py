@@ -0,0 +1,165 @@
+"""
+Coaching policy for orchestrate_pdf: when to stop coaching an agent.
+
+- per-document budget (DocumentBudget): LLM calls, estimated tokens and wall
+  time since the document started. Every request made through
+  rate_limiter.call_with_limits inside `usage_scope(budget)` is charged to it;
+  cached answers are free. Once a limit is hit no new rounds, coaching calls or
+  global page picks are started; the async engine also treats the time limit
+  as a deadline and cancels the requests still in flight.
+- plateau: stop an agent whose best score has not improved for `patience` rounds.
+- numeric QC: stop (and skip coaching) once every numeric check passes and
+  every numeric field is verified.
+- target score / coach approval / max rounds.
+
+The reason an agent stopped is recorded in its `_qc` entry (`stop_reason`),
+and the document budget in `_qc._orchestrator.budget`. Pass a subclass as
+`orchestrate_pdf(..., policy=...)` to change the rules.
+
+Environment:
+  ORCH_DOC_MAX_CALLS=int        LLM requests per document, 0 = unlimited (default 0)
+  ORCH_DOC_MAX_TOKENS=int       estimated tokens per document, 0 = unlimited (default 0)
+  ORCH_DOC_MAX_SECONDS=float    wall time per document, 0 = unlimited (default 0)
+  ORCH_PATIENCE=int             rounds without improvement before stopping, 0 = off (default 2)
+  ORCH_SKIP_VALIDATED=bool      stop agents fully validated by numeric_qc (default true)
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from .schema import get_types
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)) or str(default))
+    except Exception:
+        return default
+
+
+class DocumentBudget:
+    """LLM calls, tokens and wall time spent on one document (thread-safe)."""
+
+    def __init__(self, max_calls: int = 0, max_tokens: int = 0, max_seconds: float = 0.0):
+        self.max_calls = max_calls
+        self.max_tokens = max_tokens
+        self.max_seconds = max_seconds
+        self.started = time.monotonic()
+        self.calls = 0
+        self.tokens = 0
+        self.llm_seconds = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "DocumentBudget":
+        return cls(
+            max_calls=int(_env_float("ORCH_DOC_MAX_CALLS", 0)),
+            max_tokens=int(_env_float("ORCH_DOC_MAX_TOKENS", 0)),
+            max_seconds=_env_float("ORCH_DOC_MAX_SECONDS", 0),
+        )
+
+    def charge(self, tokens: float = 0, seconds: float = 0.0):
+        with self._lock:
+            self.calls += 1
+            self.tokens += int(tokens)
+            self.llm_seconds += seconds
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def exhausted(self) -> Optional[str]:
+        """Name of the first limit reached, or None."""
+        with self._lock:
+            if self.max_calls and self.calls >= self.max_calls:
+                return "budget_calls"
+            if self.max_tokens and self.tokens >= self.max_tokens:
+                return "budget_tokens"
+        if self.max_seconds and self.elapsed() >= self.max_seconds:
+            return "budget_time"
+        return None
+
+    def snapshot(self) -> Dict[str, Any]:
+        exhausted = self.exhausted()
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "tokens": self.tokens,
+                "llm_seconds": round(self.llm_seconds, 1),
+                "elapsed_s": round(self.elapsed(), 1),
+                "limits": {"calls": self.max_calls, "tokens": self.max_tokens, "seconds": self.max_seconds},
+                "exhausted": exhausted,
+            }
+
+
+def numeric_fully_validated(agent_id: str, qc: Dict[str, Any], verified: Dict[str, Any]) -> bool:
+    """True when numeric_qc ran real checks that all passed and every numeric field was verified."""
+    checks = (qc or {}).get("checks") or {}
+    if not qc.get("passed") or not checks:
+        return False
+    if not all((c.get("ok") if isinstance(c, dict) else bool(c)) for c in checks.values()):
+        return False
+    numeric = [k for k, t in get_types(agent_id).items() if "num" in str(t)]
+    return all(bool((verified or {}).get(k, {}).get("verified")) for k in numeric)
+
+
+class CoachingPolicy:
+    """Decides after each step whether an agent keeps coaching; returns a stop reason or None."""
+
+    def __init__(self, max_rounds: int, target: float = 95.0, coach_accept: float = 85.0, patience: int = 2,
+                 skip_validated: bool = True, budget: Optional[DocumentBudget] = None):
+        self.max_rounds = max_rounds
+        self.target = target
+        self.coach_accept = coach_accept
+        self.patience = patience
+        self.skip_validated = skip_validated
+        self.budget = budget or DocumentBudget()
+        self._lock = threading.Lock()
+        self.stop_reasons: Dict[str, int] = {}
+
+    @classmethod
+    def from_env(cls, max_rounds: int, budget: Optional[DocumentBudget] = None) -> "CoachingPolicy":
+        return cls(
+            max_rounds=max_rounds,
+            target=_env_float("ORCHESTRATOR_TARGET_SCORE", 95.0),
+            coach_accept=_env_float("COACH_ACCEPT_SCORE", 85.0),
+            patience=int(_env_float("ORCH_PATIENCE", 2)),
+            skip_validated=os.getenv("ORCH_SKIP_VALIDATED", "true").lower() == "true",
+            budget=budget or DocumentBudget.from_env(),
+        )
+
+    def before_call(self) -> Optional[str]:
+        """Checked before starting a round or a coaching request."""
+        return self.budget.exhausted()
+
+    def after_round(self, agent_id: str, rounds: List[Dict[str, Any]]) -> Optional[str]:
+        """Checked after an extraction round has been scored and logged in `rounds`."""
+        last = rounds[-1]
+        if last["score"] >= self.target:
+            return "target_reached"
+        if self.skip_validated and numeric_fully_validated(agent_id, last.get("numeric_qc") or {}, last.get("verified_fields") or {}):
+            return "numeric_qc_validated"
+        scores = [r["score"] for r in rounds]
+        if self.patience and len(scores) > self.patience and max(scores[-self.patience:]) <= max(scores[:-self.patience]):
+            return "plateau"
+        if len(rounds) >= self.max_rounds:
+            return "max_rounds"
+        return self.budget.exhausted()
+
+    def accept_advice(self, advice: Dict[str, Any], score: float) -> Optional[str]:
+        if advice.get("ok") and score >= self.coach_accept:
+            return "coach_ok"
+        return None
+
+    def skip_global_pick(self, stop_reason: Optional[str]) -> Optional[str]:
+        """Reason to skip the last-resort global page pick, or None to run it."""
+        if stop_reason == "numeric_qc_validated":
+            return stop_reason
+        return self.budget.exhausted()
+
+    def record(self, stop_reason: str):
+        with self._lock:
+            self.stop_reasons[stop_reason] = self.stop_reasons.get(stop_reason, 0) + 1
@@ -0,0 +1,92 @@
+"""
+Directory walking for corpus scans, with a directory-mtime cache.
+
+`walk_pdfs()` walks the tree with os.scandir and reuses the cached listing of
+every directory whose mtime is unchanged (adding, removing or renaming an
+entry changes it). Only the PDF files themselves are stat'ed: a file replaced
+in place keeps its directory's mtime but not its own size/mtime.
+
+Files come back sorted by path so scans are reproducible. Symlinked
+directories are not followed.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+# dirpath -> (mtime_ns, subdirectory names, file names)
+DirCache = Dict[str, Tuple[int, List[str], List[str]]]
+
+
+@dataclass
+class CorpusWalk:
+    """PDF files under a root with their size and mtime, plus the refreshed directory cache."""
+
+    files: List[Tuple[str, int, int]] = field(default_factory=list)  # (path, size, mtime_ns)
+    dirs: DirCache = field(default_factory=dict)
+    listed: int = 0   # directories read with scandir
+    cached: int = 0   # directories whose cached listing was reused
+
+    def paths(self) -> List[str]:
+        return [p for p, _, _ in self.files]
+
+
+def _list_dir(path: str, suffix: str) -> Tuple[List[str], List[str]]:
+    subdirs: List[str] = []
+    files: List[str] = []
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.name)
+                elif entry.name.endswith(suffix) and entry.is_file():
+                    files.append(entry.name)
+            except OSError:
+                continue
+    return sorted(subdirs), sorted(files)
+
+
+def walk_pdfs(root: str, cache: Optional[DirCache] = None, suffix: str = ".pdf") -> CorpusWalk:
+    """All `suffix` files under `root`; directories unchanged since `cache` are not listed again."""
+    cache = cache or {}
+    walk = CorpusWalk()
+    stack = [root]
+    while stack:
+        path = stack.pop()
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            continue
+        hit = cache.get(path)
+        if hit is not None and hit[0] == mtime:
+            _, subdirs, names = hit
+            walk.cached += 1
+        else:
+            try:
+                subdirs, names = _list_dir(path, suffix)
+            except OSError:
+                continue
+            walk.listed += 1
+        walk.dirs[path] = (mtime, list(subdirs), list(names))
+        for name in names:
+            full = os.path.join(path, name)
+            try:
+                st = os.stat(full)
+            except OSError:
+                continue  # removed since the listing was cached
+            walk.files.append((full, st.st_size, st.st_mtime_ns))
+        stack.extend(os.path.join(path, d) for d in reversed(subdirs))
+    walk.files.sort()
+    return walk
+
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    """sha256 of a file's content, read in chunks."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
@@ -9,13 +9,14 @@ Key improvements:
 4. Improved error handling and logging
 """
 
-import os
 import json
 import re
 from pathlib import Path
 from typing import Dict, Any, List, Optional
 from docling.document_converter import DocumentConverter
 
+from .docling_cache import convert_cached
+
 
 class DoclingAdapter:
     """Enhanced adapter with optimized table parsing.
@@ -36,12 +37,11 @@ class DoclingAdapter:
         return len(text_only) > char_threshold
 
     def extract_with_docling(self, pdf_path: str) -> Dict[str, Any]:
-        """Extract PDF using Docling."""
-        result = self.converter.convert(pdf_path)
-        doc = result.document
+        """Extract PDF using Docling (served from the conversion cache when warm)."""
+        artifact = convert_cached(pdf_path, self.converter)
 
-        markdown = doc.export_to_markdown()
-        json_export = doc.export_to_dict()
+        markdown = artifact.markdown
+        json_export = artifact.export_dict() or {'tables': artifact.tables}
 
         # Determine if text or scanned
         is_text = self.is_machine_readable(markdown)
@@ -121,8 +121,9 @@ class DoclingAdapter:
 
         This replaces the 3 separate calls (governance, financial, property) with one optimized call.
         """
-        from openai import OpenAI
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        from .llm_clients import get_client
+        from .response_cache import cached_chat_completion
+        client = get_client("openai")
 
         # Format tables
         tables_text = self.format_tables_for_llm(tables)
@@ -181,16 +182,17 @@ CRITICAL RULES:
 6. Return ONLY the JSON object, nothing else"""
 
         try:
-            response = client.chat.completions.create(
+            content = cached_chat_completion(
+                client,
+                namespace="docling_adapter",
                 model="gpt-4o",
                 messages=[
                     {"role": "system", "content": "You are a Swedish BRF document parser. Return ONLY valid JSON with numeric values as integers."},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0,
-            )
+            ).strip()
 
-            content = response.choices[0].message.content.strip()
 
             # Handle markdown-fenced JSON
             if content.startswith("```"):
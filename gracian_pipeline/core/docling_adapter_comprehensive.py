@@ -6,7 +6,6 @@ Extends docling_adapter.py to extract ALL 13 agents (59 fields total) to capture
 every fact from Swedish BRF documents.
 """
 
-import os
 import json
 import re
 from pathlib import Path
@@ -14,6 +13,8 @@ from typing import Dict, Any, List
 
 from docling.document_converter import DocumentConverter
 
+from .docling_cache import convert_cached
+
 class ComprehensiveDoclingAdapter:
     """
     Comprehensive Docling adapter extracting all 13 BRF agents.
@@ -44,18 +45,12 @@ class ComprehensiveDoclingAdapter:
         return len(markdown) > char_threshold
 
     def extract_with_docling(self, pdf_path: str) -> Dict[str, Any]:
-        """Extract PDF using Docling."""
-        result = self.converter.convert(pdf_path)
-        doc = result.document
-
-        markdown = doc.export_to_markdown()
-        tables = []
+        """Extract PDF using Docling (served from the conversion cache when warm)."""
+        artifact = convert_cached(pdf_path, self.converter)
 
-        # Extract tables - use Pydantic model_dump() instead of export_to_dict()
-        for item, level in doc.iterate_items():
-            if item.label == "table":
-                # Docling TableItem has data attribute with table structure
-                tables.append(item.model_dump())
+        markdown = artifact.markdown
+        # Tables as Pydantic model_dump() (Docling TableItem with table structure)
+        tables = artifact.tables
 
         return {
             'markdown': markdown,
@@ -110,8 +105,9 @@ class ComprehensiveDoclingAdapter:
 
         This captures every fact from the document except boilerplate (signatures, auditor stamps).
         """
-        from openai import OpenAI
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        from .llm_clients import get_client
+        from .response_cache import cached_chat_completion
+        client = get_client("openai")
 
         # Format tables
         tables_text = self.format_tables_for_llm(tables)
@@ -254,16 +250,17 @@ CRITICAL RULES:
 16. Return ONLY the JSON object, nothing else"""
 
         try:
-            response = client.chat.completions.create(
+            content = cached_chat_completion(
+                client,
+                namespace="docling_adapter",
                 model="gpt-4o",
                 messages=[
                     {"role": "system", "content": "You are a Swedish BRF document parser. Return ONLY valid JSON with all 13 agents. Extract every fact except boilerplate text."},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0,
-            )
+            ).strip()
 
-            content = response.choices[0].message.content.strip()
 
             # Handle markdown-fenced JSON
             if content.startswith("```"):
@@ -15,8 +15,10 @@ from pathlib import Path
 from typing import Dict, Any, List
 
 from docling.document_converter import DocumentConverter
-from openai import OpenAI
-
+from .docling_artifact import DoclingArtifact
+from .docling_cache import convert_cached
+from .llm_clients import get_client
+from .response_cache import cached_chat_completion
 from .schema_comprehensive import (
     get_comprehensive_types,
     schema_comprehensive_prompt_block,
@@ -37,21 +39,25 @@ class UltraComprehensiveDoclingAdapter:
 
     def __init__(self):
         self.converter = DocumentConverter()
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.client = get_client("openai")
 
     def is_machine_readable(self, markdown: str, char_threshold: int = 5000) -> bool:
         """Determine if PDF is machine-readable based on extracted text."""
         return len(markdown.strip()) >= char_threshold
 
-    def extract_with_docling(self, pdf_path: str) -> Dict[str, Any]:
-        """Extract PDF using Docling."""
-        result = self.converter.convert(pdf_path)
-        markdown = result.document.export_to_markdown()
+    def convert(self, pdf_path: str) -> DoclingArtifact:
+        """Run Docling once (or load it from the conversion cache) and return the
+        artifact shared with downstream passes."""
+        return convert_cached(pdf_path, self.converter)
+
+    def extract_with_docling(self, pdf_path: str, artifact: DoclingArtifact = None) -> Dict[str, Any]:
+        """Extract PDF using Docling (reuses `artifact` when pass 1 already converted)."""
+        if artifact is None:
+            artifact = self.convert(pdf_path)
+        markdown = artifact.markdown
 
-        # Get tables using model_dump() (new Docling API)
-        tables = []
-        for item in result.document.tables:
-            tables.append(item.model_dump())
+        # Tables as model_dump() (new Docling API)
+        tables = artifact.tables
 
         is_readable = self.is_machine_readable(markdown)
 
@@ -218,7 +224,9 @@ RETURN FORMAT:
 IMPORTANT: Return ONLY valid JSON. Extract EVERYTHING visible in the document."""
 
         # Call GPT-4o with extended context
-        response = self.client.chat.completions.create(
+        content = cached_chat_completion(
+            self.client,
+            namespace="docling_adapter",
             model="gpt-4o",
             messages=[
                 {"role": "system", "content": "You are an expert at extracting structured data from Swedish BRF documents. Extract EVERY piece of information available, not just summary fields."},
@@ -226,10 +234,7 @@ IMPORTANT: Return ONLY valid JSON. Extract EVERYTHING visible in the document.""
             ],
             temperature=0,
             max_tokens=8000  # Increased for comprehensive extraction
-        )
-
-        # Parse response
-        content = response.choices[0].message.content.strip()
+        ).strip()
 
         # Remove markdown fences if present
         if content.startswith("```"):
@@ -270,17 +275,19 @@ IMPORTANT: Return ONLY valid JSON. Extract EVERYTHING visible in the document.""
 
         return result
 
-    def extract_brf_data_ultra(self, pdf_path: str) -> Dict[str, Any]:
+    def extract_brf_data_ultra(self, pdf_path: str, artifact: DoclingArtifact = None) -> Dict[str, Any]:
         """
         Main entry point for ultra-comprehensive BRF extraction.
 
+        Pass a pre-built `artifact` (see `convert`) to avoid a second Docling run.
+
         Returns dictionary with:
         - All 13 agent results (with comprehensive details)
         - Metadata (char_count, table_count, etc.)
         - Coverage metrics
         """
         # Extract with Docling
-        docling_result = self.extract_with_docling(pdf_path)
+        docling_result = self.extract_with_docling(pdf_path, artifact=artifact)
 
         if docling_result['status'] == 'scanned':
             return {
@@ -63,9 +63,12 @@ class RobustUltraComprehensiveExtractor:
         print(f"{'='*60}\n")
 
         # PASS 1: Base ultra-comprehensive extraction
+        # The Docling conversion made here is the only one for this document;
+        # every later pass slices the same artifact in memory.
         print("Pass 1: Base ultra-comprehensive extraction...")
         pass1_start = time.time()
-        base_result = self.base_extractor.extract_brf_data_ultra(pdf_path)
+        artifact = self.base_extractor.convert(pdf_path)
+        base_result = self.base_extractor.extract_brf_data_ultra(pdf_path, artifact=artifact)
         pass1_time = time.time() - pass1_start
         print(f"  ✓ Complete in {pass1_time:.1f}s")
 
@@ -79,7 +82,8 @@ class RobustUltraComprehensiveExtractor:
                 print("  → Extracting hierarchical financial details (Notes 4, 8, 9)...")
                 financial_details = self.financial_extractor.extract_all_notes(
                     pdf_path,
-                    notes=["note_4", "note_8", "note_9"]
+                    notes=["note_4", "note_8", "note_9"],
+                    artifact=artifact
                 )
 
                 # Note 4: Operating costs breakdown
@@ -0,0 +1,126 @@
+"""
+Per-document Docling conversion artifact.
+
+Captures everything downstream extractors need from one
+`DocumentConverter.convert()` (full markdown, per-page markdown, table
+model_dumps and their page provenance). It is produced once in pass 1 and
+sliced in memory by the hierarchical note extractors.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+@dataclass
+class DoclingArtifact:
+    """Conversion output for one PDF, shared by every pass of an extraction."""
+    pdf_path: str
+    markdown: str
+    tables: List[Dict[str, Any]]                 # table model_dumps (JSON mode), document order
+    table_pages: List[List[int]]                 # 0-based pages each table appears on
+    page_markdown: Dict[int, str] = field(default_factory=dict)  # 0-based page -> markdown
+    page_count: int = 0
+    document: Any = None                         # live DoclingDocument (None when loaded from cache)
+    document_dict: Optional[Dict[str, Any]] = field(default=None, repr=False)  # export_to_dict() from cache
+
+    @property
+    def char_count(self) -> int:
+        return len(self.markdown)
+
+    def export_dict(self) -> Optional[Dict[str, Any]]:
+        """Docling JSON export, from the live document or the cached copy."""
+        if self.document is not None:
+            return self.document.export_to_dict()
+        return self.document_dict
+
+    def markdown_for_pages(self, page_indices: Iterable[int]) -> str:
+        """Markdown for the given 0-based pages; falls back to the full document
+        when Docling gave no per-page provenance for any of them."""
+        parts = [self.page_markdown.get(i, "") for i in sorted(set(page_indices))]
+        sliced = "\n\n".join(p for p in parts if p.strip())
+        return sliced or self.markdown
+
+    def table_indices_for_pages(self, page_indices: Iterable[int]) -> List[Tuple[int, int]]:
+        """Return (table_index, first_matching_page) for tables on any of the pages."""
+        wanted = set(page_indices)
+        hits: List[Tuple[int, int]] = []
+        for ti, pages in enumerate(self.table_pages):
+            for p in pages:
+                if p in wanted:
+                    hits.append((ti, p))
+                    break
+        return hits
+
+    def tables_for_pages(self, page_indices: Iterable[int]) -> List[Dict[str, Any]]:
+        """Table model_dumps located on the given 0-based pages."""
+        return [self.tables[ti] for ti, _ in self.table_indices_for_pages(page_indices)]
+
+
+def table_text(table: Dict[str, Any]) -> str:
+    """Render a table model_dump as pipe-separated rows (same grid logic as the adapters)."""
+    if not table or 'data' not in table:
+        return ""
+    cells = (table.get('data') or {}).get('table_cells', [])
+    if not cells:
+        return ""
+    max_row = max((cell.get('end_row_offset_idx', 0) for cell in cells), default=0)
+    max_col = max((cell.get('end_col_offset_idx', 0) for cell in cells), default=0)
+    grid = [['' for _ in range(max_col + 1)] for _ in range(max_row + 1)]
+    for cell in cells:
+        row = cell.get('start_row_offset_idx', 0)
+        col = cell.get('start_col_offset_idx', 0)
+        text = (cell.get('text') or '').strip()
+        if text and row < len(grid) and col < len(grid[row]):
+            grid[row][col] = text
+    lines = []
+    for row in grid:
+        line = ' | '.join(row)
+        if line.replace('|', '').strip():
+            lines.append(line)
+    return '\n'.join(lines)
+
+
+def _prov_pages(item: Any) -> List[int]:
+    pages: List[int] = []
+    for prov in getattr(item, 'prov', None) or []:
+        page_no = getattr(prov, 'page_no', None)
+        if isinstance(page_no, int) and page_no >= 1 and (page_no - 1) not in pages:
+            pages.append(page_no - 1)
+    return pages
+
+
+def artifact_from_document(pdf_path: str, document: Any) -> DoclingArtifact:
+    """Build an artifact from an already converted DoclingDocument."""
+    markdown = document.export_to_markdown()
+
+    tables: List[Dict[str, Any]] = []
+    table_pages: List[List[int]] = []
+    for item in document.tables:
+        tables.append(item.model_dump(mode='json'))
+        table_pages.append(_prov_pages(item))
+
+    page_nos = sorted(getattr(document, 'pages', {}) or {})
+    page_markdown: Dict[int, str] = {}
+    for page_no in page_nos:
+        try:
+            page_markdown[page_no - 1] = document.export_to_markdown(page_no=page_no)
+        except TypeError:
+            # Older docling-core without page filtering: keep only the full markdown
+            page_markdown = {}
+            break
+
+    return DoclingArtifact(
+        pdf_path=str(pdf_path),
+        markdown=markdown,
+        tables=tables,
+        table_pages=table_pages,
+        page_markdown=page_markdown,
+        page_count=len(page_nos),
+        document=document,
+    )
+
+
+def convert_document(pdf_path: str, converter: Optional[Any] = None) -> DoclingArtifact:
+    """Run Docling once on `pdf_path` (via the on-disk cache) and return the shared artifact."""
+    from .docling_cache import convert_cached
+    return convert_cached(pdf_path, converter)
@@ -0,0 +1,279 @@
+"""
+Content-addressed on-disk cache of Docling conversions.
+
+Entries are keyed by SHA-256 of the PDF bytes + docling/docling-core versions +
+pipeline options (a converter left unset hashes like a default
+`DocumentConverter()`). Each entry stores the conversion output
+the adapters consume (markdown, per-page markdown, table model_dumps, page
+provenance and the document dict) as gzip JSON; a small SQLite index tracks
+sizes and last access for size-bounded LRU eviction.
+
+Environment:
+  DOCLING_CACHE=true|false        enable/disable (default true)
+  DOCLING_CACHE_DIR=path          cache root (default data/cache/docling)
+  DOCLING_CACHE_MAX_MB=int        size bound before LRU eviction (default 4096)
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from .docling_artifact import DoclingArtifact, artifact_from_document
+
+CACHE_FORMAT_VERSION = 1
+
+_file_hash_memo: Dict[Tuple[str, int, int], str] = {}
+_memo_lock = threading.Lock()
+
+
+def file_sha256(pdf_path: str) -> str:
+    """Streaming SHA-256 of a file, memoized per (path, size, mtime)."""
+    st = os.stat(pdf_path)
+    memo_key = (os.path.abspath(pdf_path), st.st_size, int(st.st_mtime_ns))
+    with _memo_lock:
+        if memo_key in _file_hash_memo:
+            return _file_hash_memo[memo_key]
+    h = hashlib.sha256()
+    with open(pdf_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+    with _memo_lock:
+        _file_hash_memo[memo_key] = digest
+    return digest
+
+
+@lru_cache(maxsize=None)
+def docling_version() -> str:
+    """Installed docling and docling-core versions; either can change the conversion output."""
+    from importlib.metadata import version
+
+    parts = []
+    for dist in ("docling", "docling-core"):
+        try:
+            parts.append(f"{dist}={version(dist)}")
+        except Exception:
+            parts.append(f"{dist}=unknown")
+    return ";".join(parts)
+
+
+@lru_cache(maxsize=None)
+def _default_options_fingerprint() -> str:
+    try:
+        from docling.document_converter import DocumentConverter
+        converter = DocumentConverter()
+    except Exception:
+        return "default"  # docling not installed: nothing converts with default options here
+    return options_fingerprint(converter)
+
+
+def options_fingerprint(converter: Any = None) -> str:
+    """Stable description of a converter's pipeline options; None fingerprints a default DocumentConverter()."""
+    if converter is None:
+        return _default_options_fingerprint()
+    try:
+        parts = []
+        for fmt, opt in sorted((getattr(converter, "format_to_options", None) or {}).items(), key=lambda kv: str(kv[0])):
+            pipeline_cls = getattr(getattr(opt, "pipeline_cls", None), "__name__", "")
+            pipeline_options = getattr(opt, "pipeline_options", None)
+            if hasattr(pipeline_options, "model_dump_json"):
+                dumped = pipeline_options.model_dump_json()
+            else:
+                dumped = repr(pipeline_options)
+            parts.append(f"{fmt}:{pipeline_cls}:{dumped}")
+        return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()[:16] if parts else "default"
+    except Exception:
+        return "default"
+
+
+class DoclingCache:
+    """Size-bounded LRU store of Docling conversion artifacts."""
+
+    def __init__(self, cache_dir: str = "data/cache/docling", max_bytes: int = 4096 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.objects_dir = self.cache_dir / "objects"
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.cache_dir / "index.db"
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(str(self.db_path), timeout=30)
+
+    def _init_db(self):
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    cache_key TEXT PRIMARY KEY,
+                    pdf_path TEXT,
+                    size_bytes INTEGER,
+                    created_at INTEGER,
+                    last_access INTEGER
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_access ON entries(last_access)")
+
+    def key_for(self, pdf_path: str, options: Optional[str] = None) -> str:
+        """Cache key for a file converted with `options` (default: a default DocumentConverter)."""
+        options = options if options is not None else options_fingerprint()
+        material = f"{file_sha256(pdf_path)}|{docling_version()}|options={options}|v{CACHE_FORMAT_VERSION}"
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _object_path(self, key: str) -> Path:
+        return self.objects_dir / key[:2] / f"{key}.json.gz"
+
+    def get(self, key: str) -> Optional[DoclingArtifact]:
+        path = self._object_path(key)
+        try:
+            with gzip.open(str(path), "rt", encoding="utf-8") as f:
+                payload = json.load(f)
+        except (OSError, ValueError):
+            return None
+        with self._lock, self._connect() as conn:
+            conn.execute("UPDATE entries SET last_access = ? WHERE cache_key = ?", (int(time.time()), key))
+        return DoclingArtifact(
+            pdf_path=payload.get("pdf_path", ""),
+            markdown=payload.get("markdown", ""),
+            tables=payload.get("tables", []),
+            table_pages=payload.get("table_pages", []),
+            page_markdown={int(k): v for k, v in (payload.get("page_markdown") or {}).items()},
+            page_count=payload.get("page_count", 0),
+            document_dict=payload.get("document"),
+        )
+
+    def find(self, pdf_path: str) -> Optional[DoclingArtifact]:
+        """Most recently used conversion of this file, whatever converter options produced it.
+
+        For consumers that only read the artifact (e.g. table bounding boxes
+        for vision crops) and must never trigger a conversion themselves.
+        Entries older than the file are ignored.
+        """
+        try:
+            hit = self.get(self.key_for(pdf_path))
+            if hit is not None:
+                return hit
+            mtime = int(os.stat(pdf_path).st_mtime)
+        except OSError:
+            return None
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT cache_key FROM entries WHERE pdf_path IN (?, ?) AND created_at >= ? ORDER BY last_access DESC",
+                (str(pdf_path), os.path.abspath(pdf_path), mtime),
+            ).fetchall()
+        for (key,) in rows:
+            hit = self.get(key)
+            if hit is not None:
+                return hit
+        return None
+
+    def put(self, key: str, artifact: DoclingArtifact):
+        payload = {
+            "format": CACHE_FORMAT_VERSION,
+            "pdf_path": artifact.pdf_path,
+            "markdown": artifact.markdown,
+            "tables": artifact.tables,
+            "table_pages": artifact.table_pages,
+            "page_markdown": {str(k): v for k, v in artifact.page_markdown.items()},
+            "page_count": artifact.page_count,
+            "document": artifact.export_dict(),
+        }
+        path = self._object_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".tmp{os.getpid()}.{threading.get_ident()}")
+        with gzip.open(str(tmp), "wt", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False)
+        os.replace(str(tmp), str(path))
+        now = int(time.time())
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (cache_key, pdf_path, size_bytes, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, artifact.pdf_path, path.stat().st_size, now, now)
+            )
+        self.evict()
+
+    def total_bytes(self) -> int:
+        with self._connect() as conn:
+            return int(conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM entries").fetchone()[0])
+
+    def evict(self, max_bytes: Optional[int] = None) -> int:
+        """Drop least-recently-used entries until the cache fits; returns entries removed."""
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        removed = 0
+        with self._lock, self._connect() as conn:
+            total = int(conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM entries").fetchone()[0])
+            if total <= limit:
+                return 0
+            for key, size in conn.execute("SELECT cache_key, size_bytes FROM entries ORDER BY last_access ASC").fetchall():
+                if total <= limit:
+                    break
+                try:
+                    self._object_path(key).unlink()
+                except FileNotFoundError:
+                    pass
+                conn.execute("DELETE FROM entries WHERE cache_key = ?", (key,))
+                total -= size or 0
+                removed += 1
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._connect() as conn:
+            count, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM entries").fetchone()
+        return {"entries": count, "bytes": size, "max_bytes": self.max_bytes, "dir": str(self.cache_dir)}
+
+
+_default_cache: Optional[DoclingCache] = None
+_default_lock = threading.Lock()
+
+
+def get_docling_cache() -> Optional[DoclingCache]:
+    """Process-wide cache configured from env; None when DOCLING_CACHE=false."""
+    global _default_cache
+    if os.getenv("DOCLING_CACHE", "true").lower() != "true":
+        return None
+    with _default_lock:
+        if _default_cache is None:
+            try:
+                max_mb = int(os.getenv("DOCLING_CACHE_MAX_MB", "4096") or "4096")
+            except Exception:
+                max_mb = 4096
+            _default_cache = DoclingCache(
+                os.getenv("DOCLING_CACHE_DIR", "data/cache/docling"),
+                max_bytes=max_mb * 1024 * 1024,
+            )
+        return _default_cache
+
+
+def convert_cached(pdf_path: str, converter: Any = None, cache: Optional[DoclingCache] = None) -> DoclingArtifact:
+    """Docling conversion through the on-disk cache (converts and stores on miss)."""
+    cache = cache if cache is not None else get_docling_cache()
+    key = None
+    if cache is not None:
+        try:
+            key = cache.key_for(pdf_path, options_fingerprint(converter))
+            hit = cache.get(key)
+            if hit is not None:
+                hit.pdf_path = str(pdf_path)
+                return hit
+        except Exception as e:
+            print(f"[docling-cache] lookup failed for {pdf_path}: {e}")
+            key = None
+
+    if converter is None:
+        from docling.document_converter import DocumentConverter
+        converter = DocumentConverter()
+    artifact = artifact_from_document(pdf_path, converter.convert(pdf_path).document)
+
+    if cache is not None and key is not None:
+        try:
+            cache.put(key, artifact)
+        except Exception as e:
+            print(f"[docling-cache] store failed for {pdf_path}: {e}")
+    return artifact
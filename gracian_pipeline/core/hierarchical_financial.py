@@ -7,16 +7,17 @@ Handles Note 4, 8, 9, 10 with full line-item preservation.
 Solves: Current extraction only gets 4 summary totals instead of 50+ line items from Note 4.
 """
 
-import os
+import re
 import json
 from typing import Dict, List, Tuple, Any, Optional
 from pathlib import Path
 
-# Docling imports
-from docling.document_converter import DocumentConverter
+# Docling conversion artifact (shared with pass 1)
+from .docling_artifact import DoclingArtifact, convert_document, table_text
 
 # OpenAI for LLM extraction
-from openai import OpenAI
+from .llm_clients import get_client
+from .response_cache import cached_chat_completion
 
 
 class HierarchicalFinancialExtractor:
@@ -26,7 +27,7 @@ class HierarchicalFinancialExtractor:
     """
 
     def __init__(self):
-        self.openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.openai_client = get_client("openai")
 
         self.note_patterns = {
             "note_4": {
@@ -70,7 +71,12 @@ class HierarchicalFinancialExtractor:
             }
         }
 
-    def extract_note_4_detailed(self, pdf_path: str, note_pages: List[int]) -> Dict[str, Any]:
+    def extract_note_4_detailed(
+        self,
+        pdf_path: str,
+        note_pages: List[int],
+        artifact: Optional[DoclingArtifact] = None
+    ) -> Dict[str, Any]:
         """
         Extract complete Note 4 with all 50+ line items.
 
@@ -83,13 +89,14 @@ class HierarchicalFinancialExtractor:
         Args:
             pdf_path: Path to PDF document
             note_pages: List of page indices containing Note 4 (0-based)
+            artifact: Shared Docling conversion (converted on demand if None)
 
         Returns:
             Dictionary with hierarchical breakdown and validation metadata
         """
 
         # Stage 1: Extract markdown for just note pages
-        note_markdown, note_tables = self.extract_note_section(pdf_path, note_pages)
+        note_markdown, note_tables = self.extract_note_section(pdf_path, note_pages, artifact=artifact, note_id="note_4")
 
         # Stage 2: Use specialized prompt for hierarchical structure
         prompt = self.build_hierarchical_prompt(
@@ -115,7 +122,12 @@ class HierarchicalFinancialExtractor:
 
         return validated
 
-    def extract_note_8_detailed(self, pdf_path: str, note_pages: List[int]) -> Dict[str, Any]:
+    def extract_note_8_detailed(
+        self,
+        pdf_path: str,
+        note_pages: List[int],
+        artifact: Optional[DoclingArtifact] = None
+    ) -> Dict[str, Any]:
         """
         Extract Note 8 (BYGGNADER - Building Details).
 
@@ -129,11 +141,12 @@ class HierarchicalFinancialExtractor:
         Args:
             pdf_path: Path to PDF document
             note_pages: List of page indices containing Note 8 (0-based)
+            artifact: Shared Docling conversion (converted on demand if None)
 
         Returns:
             Dictionary with building details and validation metadata
         """
-        note_markdown, note_tables = self.extract_note_section(pdf_path, note_pages)
+        note_markdown, note_tables = self.extract_note_section(pdf_path, note_pages, artifact=artifact, note_id="note_8")
 
         pattern = self.note_patterns["note_8"]
 
@@ -189,7 +202,12 @@ INSTRUCTIONS:
         result["_validation"] = validation
         return result
 
-    def extract_note_9_detailed(self, pdf_path: str, note_pages: List[int]) -> Dict[str, Any]:
+    def extract_note_9_detailed(
+        self,
+        pdf_path: str,
+        note_pages: List[int],
+        artifact: Optional[DoclingArtifact] = None
+    ) -> Dict[str, Any]:
         """
         Extract Note 9 (ÖVRIGA FORDRINGAR - Other Receivables).
 
@@ -203,11 +221,12 @@ INSTRUCTIONS:
         Args:
             pdf_path: Path to PDF document
             note_pages: List of page indices containing Note 9 (0-based)
+            artifact: Shared Docling conversion (converted on demand if None)
 
         Returns:
             Dictionary with receivables details and validation metadata
         """
-        note_markdown, note_tables = self.extract_note_section(pdf_path, note_pages)
+        note_markdown, note_tables = self.extract_note_section(pdf_path, note_pages, artifact=artifact, note_id="note_9")
 
         pattern = self.note_patterns["note_9"]
 
@@ -388,40 +407,93 @@ REMEMBER: Extract EVERY line item, not summaries. This is for detailed financial
 
         return extraction
 
-    def extract_note_section(self, pdf_path: str, page_indices: List[int]) -> Tuple[str, List[Dict]]:
+    def note_heading(self, note_id: str) -> "re.Pattern":
+        """Heading of a note, e.g. "Not 4 Driftkostnader" or "## DRIFTKOSTNADER".
+
+        Matched by name: note numbers differ between reports.
+        """
+        name = re.escape(self.note_patterns[note_id]["name"])
+        number = r"not\s*\d{1,2}\b[\s.:\-–]*"
+        return re.compile(rf"(?:^(?P<markdown>#+)\s*(?:{number})?|\b{number}){name}", re.IGNORECASE | re.MULTILINE)
+
+    def locate_note_pages(
+        self,
+        note_id: str,
+        artifact: DoclingArtifact,
+        pdf_path: Optional[str] = None,
+        span: int = 3
+    ) -> Optional[List[int]]:
+        """
+        0-based pages of a note: the page with its heading and the next `span - 1`.
+
+        Reads the artifact's per-page markdown, or the sectionizer's PageIndex
+        page text when Docling gave no page provenance. Markdown headings win
+        over plain mentions (table of contents, cross references).
+
+        Returns:
+            Page indices, or None when no page carries the note heading
+        """
+        pages = dict(artifact.page_markdown)
+        page_count = artifact.page_count
+        if not pages and pdf_path:
+            try:
+                from .sectionizer import PageIndex
+                index = PageIndex.build(pdf_path)
+                pages = dict(enumerate(index.page_texts))
+                page_count = index.page_count
+            except Exception as e:
+                print(f"Warning: no page text for {note_id} lookup: {e}")
+        heading = self.note_heading(note_id)
+        hits = []
+        for p, text in pages.items():
+            m = heading.search(text)
+            if m:
+                hits.append((m.group("markdown") is None, p))
+        if not hits:
+            return None
+        start = min(hits)[1]
+        page_count = page_count or max(pages) + 1
+        return list(range(start, min(start + span, page_count)))
+
+    def extract_note_section(
+        self,
+        pdf_path: str,
+        page_indices: List[int],
+        artifact: Optional[DoclingArtifact] = None,
+        note_id: Optional[str] = None
+    ) -> Tuple[str, List[Dict]]:
         """
         Extract markdown + tables for specific pages only.
         Increases context focus on target section.
 
+        Pure in-memory slice of the shared Docling artifact; only converts the
+        PDF when called standalone without one. With `note_id`, a slice that
+        does not contain the note heading is replaced by the full document.
+
         Args:
             pdf_path: Path to PDF document
             page_indices: 0-based page indices to extract
+            artifact: Docling conversion produced in pass 1
+            note_id: Note expected on these pages (e.g. "note_4")
 
         Returns:
             Tuple of (filtered_markdown, filtered_tables)
         """
-        converter = DocumentConverter()
-        result = converter.convert(pdf_path)
-
-        # Get full markdown
-        full_markdown = result.document.export_to_markdown()
-
-        # Filter to just target pages (simplified - in production use more robust page filtering)
-        # For now, we'll use the full markdown since docling doesn't provide easy page-level filtering
-        filtered_markdown = full_markdown
-
-        # Filter tables to just target pages
-        filtered_tables = []
-        for table in result.document.tables:
-            # Docling tables have page numbers (convert to 0-based if needed)
-            if hasattr(table, 'prov') and table.prov:
-                for prov_item in table.prov:
-                    if hasattr(prov_item, 'page_no') and (prov_item.page_no - 1) in page_indices:
-                        filtered_tables.append({
-                            "data": table.export_to_dataframe() if hasattr(table, 'export_to_dataframe') else {},
-                            "page": prov_item.page_no - 1
-                        })
-                        break
+        if artifact is None:
+            artifact = convert_document(pdf_path)
+
+        # Per-page markdown (falls back to full markdown without page provenance)
+        filtered_markdown = artifact.markdown_for_pages(page_indices)
+        table_hits = artifact.table_indices_for_pages(page_indices)
+
+        if note_id is not None and not self.note_heading(note_id).search(filtered_markdown):
+            print(f"Warning: {note_id} heading not on pages {page_indices}; using the full document")
+            filtered_markdown = artifact.markdown
+            table_hits = [(ti, pages[0] if pages else None) for ti, pages in enumerate(artifact.table_pages)]
+
+        # Filter tables to just target pages. Always rendered from the model_dump so
+        # a cached conversion yields the same prompt as a fresh one.
+        filtered_tables = [{"data": table_text(artifact.tables[ti]), "page": page} for ti, page in table_hits]
 
         return filtered_markdown, filtered_tables
 
@@ -466,7 +538,9 @@ REMEMBER: Extract EVERY line item, not summaries. This is for detailed financial
             Parsed JSON response
         """
         try:
-            response = self.openai_client.chat.completions.create(
+            content = cached_chat_completion(
+                self.openai_client,
+                namespace="hierarchical_financial",
                 model="gpt-4o",
                 messages=[
                     {
@@ -484,20 +558,25 @@ REMEMBER: Extract EVERY line item, not summaries. This is for detailed financial
             )
 
             # Parse response
-            content = response.choices[0].message.content
             return json.loads(content)
 
         except Exception as e:
             print(f"Error in GPT-4o extraction: {e}")
             return {}
 
-    def extract_all_notes(self, pdf_path: str, notes: List[str] = None) -> Dict[str, Dict[str, Any]]:
+    def extract_all_notes(
+        self,
+        pdf_path: str,
+        notes: List[str] = None,
+        artifact: Optional[DoclingArtifact] = None
+    ) -> Dict[str, Dict[str, Any]]:
         """
         Extract multiple financial notes from a document.
 
         Args:
             pdf_path: Path to PDF document
             notes: List of note IDs to extract (default: ["note_4"])
+            artifact: Shared Docling conversion; converted once here if None
 
         Returns:
             Dictionary mapping note_id -> extracted data
@@ -505,6 +584,10 @@ REMEMBER: Extract EVERY line item, not summaries. This is for detailed financial
         if notes is None:
             notes = ["note_4"]
 
+        # One conversion for all notes
+        if artifact is None:
+            artifact = convert_document(pdf_path)
+
         results = {}
 
         for note_id in notes:
@@ -514,27 +597,23 @@ REMEMBER: Extract EVERY line item, not summaries. This is for detailed financial
 
             print(f"Extracting {note_id}: {self.note_patterns[note_id]['name']}...")
 
-            # Determine page ranges (heuristic - in production use sectionizer)
-            if note_id == "note_4":
-                page_range = [6, 7, 8]  # Typical Note 4 pages (0-based)
-            elif note_id == "note_8":
-                page_range = [7, 8, 9]  # Typical Note 8 pages
-            elif note_id == "note_9":
-                page_range = [9, 10, 11]  # Typical Note 9 pages
-            else:
-                page_range = [6, 7, 8, 9, 10, 11]  # Wide range as fallback
+            # Pages from the note heading; the whole document when it is not found
+            page_range = self.locate_note_pages(note_id, artifact, pdf_path)
+            if page_range is None:
+                print(f"Warning: {note_id} heading not found; using the full document")
+                page_range = list(range(artifact.page_count))
 
             try:
                 # Call appropriate extraction method based on note type
                 if note_id == "note_4":
-                    extracted = self.extract_note_4_detailed(pdf_path, page_range)
+                    extracted = self.extract_note_4_detailed(pdf_path, page_range, artifact=artifact)
                 elif note_id == "note_8":
-                    extracted = self.extract_note_8_detailed(pdf_path, page_range)
+                    extracted = self.extract_note_8_detailed(pdf_path, page_range, artifact=artifact)
                 elif note_id == "note_9":
-                    extracted = self.extract_note_9_detailed(pdf_path, page_range)
+                    extracted = self.extract_note_9_detailed(pdf_path, page_range, artifact=artifact)
                 else:
                     # Fallback to Note 4 method for unknown notes
-                    extracted = self.extract_note_4_detailed(pdf_path, page_range)
+                    extracted = self.extract_note_4_detailed(pdf_path, page_range, artifact=artifact)
 
                 results[note_id] = extracted
             except Exception as e:
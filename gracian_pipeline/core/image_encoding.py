@@ -0,0 +1,259 @@
+"""
+Per-page image encoding for vision payloads.
+
+Before a page is base64-encoded, `encode_images()` picks per page, from its
+content:
+
+- crop: whitespace margins are cut (with a small pad),
+- colour depth: grayscale unless the page has real colour (charts, photos),
+- format: lossless PNG first for sparse text pages; JPEG (or WebP) first for
+  dense or colour pages,
+- DPI: if the page is still over the purpose's bytes-per-page target, it is
+  downscaled (never below `min_scale` of the render DPI) and the lossy
+  quality lowered (never below `min_quality`).
+
+Agents whose schema is mostly numeric get a higher target and floor. A page
+that would not get smaller is sent unchanged. Callers get the bytes
+before/after per call, and `payload_scope(stats)` accumulates them per
+document for `_qc`.
+
+Without Pillow, or with IMAGE_ENCODING=false, images pass through unchanged.
+
+Environment:
+  IMAGE_ENCODING=true|false       enable/disable (default true)
+  IMAGE_LOSSY_FORMAT=jpeg|webp    lossy format (default jpeg; every provider accepts it)
+  IMAGE_TARGET_KB_<PURPOSE>=int   bytes-per-page target, e.g. IMAGE_TARGET_KB_QC=300
+"""
+
+from __future__ import annotations
+
+import base64
+import contextvars
+import io
+import math
+import os
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+INK_LEVEL = 232          # gray values below this count as content
+COLOUR_DELTA = 48        # channel spread above this counts as a coloured pixel
+COLOUR_SHARE = 0.01      # share of coloured pixels that keeps a page in RGB
+DENSE_INK = 0.12         # ink share above which lossy is tried before PNG
+CROP_PAD = 0.015         # padding around the content box, as a share of the page side
+
+
+@dataclass(frozen=True)
+class EncodingProfile:
+    target_kb: int
+    min_scale: float
+    min_quality: int
+    crop: bool = True
+
+
+PROFILES: Dict[str, EncodingProfile] = {
+    "qc": EncodingProfile(target_kb=300, min_scale=0.7, min_quality=70),
+    "coach": EncodingProfile(target_kb=200, min_scale=0.6, min_quality=60),
+    "sectionizer": EncodingProfile(target_kb=120, min_scale=0.6, min_quality=55),
+    "global_pick": EncodingProfile(target_kb=100, min_scale=0.6, min_quality=55),
+    "thumbnail": EncodingProfile(target_kb=12, min_scale=1.0, min_quality=40),
+    "roi": EncodingProfile(target_kb=250, min_scale=0.8, min_quality=75),
+}
+
+
+def _numeric_agent(agent_id: str) -> bool:
+    """True if at least half of the agent's fields are numeric ("a+b" = any of several batched agents)."""
+    from .schema import get_types
+
+    for aid in agent_id.split("+"):
+        try:
+            types = get_types(aid)
+        except Exception:
+            continue
+        if types and 2 * sum(1 for t in types.values() if "num" in str(t)) >= len(types):
+            return True
+    return False
+
+
+def profile_for(purpose: str, agent_id: Optional[str] = None) -> EncodingProfile:
+    """Encoding profile for a purpose (PROFILES key), adjusted for the env target and the agent's schema."""
+    profile = PROFILES.get(purpose, PROFILES["qc"])
+    try:
+        target = int(os.getenv(f"IMAGE_TARGET_KB_{purpose.upper()}", "") or profile.target_kb)
+    except Exception:
+        target = profile.target_kb
+    profile = replace(profile, target_kb=target)
+    if agent_id and _numeric_agent(agent_id):
+        # Digits in dense tables are the first thing lost to downscaling or JPEG artifacts
+        profile = replace(profile, target_kb=int(profile.target_kb * 1.5),
+                          min_scale=max(profile.min_scale, 0.85), min_quality=max(profile.min_quality, 80))
+    return profile
+
+
+def image_mime(data: bytes) -> str:
+    if data[:3] == b"\xff\xd8\xff":
+        return "image/jpeg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return "image/png"
+
+
+def image_data_url(data: bytes) -> str:
+    return f"data:{image_mime(data)};base64,{base64.b64encode(data).decode('utf-8')}"
+
+
+def _save(img, fmt: str, quality: Optional[int] = None) -> bytes:
+    buf = io.BytesIO()
+    if fmt == "PNG":
+        img.save(buf, "PNG", optimize=True)
+    elif fmt == "WEBP":
+        img.save(buf, "WEBP", quality=quality, method=4)
+    else:
+        img.save(buf, "JPEG", quality=quality, optimize=True)
+    return buf.getvalue()
+
+
+@lru_cache(maxsize=64)
+def _encode(data: bytes, profile: EncodingProfile, lossy: str) -> Tuple[bytes, Tuple[Tuple[str, Any], ...]]:
+    """(encoded image, stats items); the same page is re-sent across rounds, so results are memoized."""
+    from PIL import Image, ImageChops
+
+    img = Image.open(io.BytesIO(data))
+    img.load()
+    rgb = img.convert("RGB")
+    gray = rgb.convert("L")
+    ink = gray.point(lambda v: 255 if v < INK_LEVEL else 0)
+    box = ink.getbbox()
+    if box is None:
+        # Blank page: smallest legible grayscale PNG
+        w, h = gray.size
+        small = gray.resize((max(1, int(w * profile.min_scale)), max(1, int(h * profile.min_scale))))
+        return _save(small, "PNG"), (("format", "png"), ("mode", "L"), ("scale", profile.min_scale), ("density", 0.0))
+
+    cropped = False
+    if profile.crop:
+        w, h = gray.size
+        pad = int(CROP_PAD * min(w, h))
+        box = (max(0, box[0] - pad), max(0, box[1] - pad), min(w, box[2] + pad), min(h, box[3] + pad))
+        if box != (0, 0, w, h):
+            rgb, gray, ink = rgb.crop(box), gray.crop(box), ink.crop(box)
+            cropped = True
+    pixels = float(gray.width * gray.height)
+    density = ink.histogram()[255] / pixels
+    r, g, b = rgb.split()
+    spread = ImageChops.lighter(ImageChops.difference(r, g), ImageChops.difference(g, b))
+    colour = spread.point(lambda v: 255 if v > COLOUR_DELTA else 0).histogram()[255] / pixels > COLOUR_SHARE
+    base = rgb if colour else gray
+
+    target = profile.target_kb * 1024
+    q_hi, q_mid = 85, max(profile.min_quality, 70)
+    lossless_first = density < DENSE_INK and not colour
+    best: Optional[Tuple[bytes, str, float]] = None
+
+    def _try(scale: float, quality: Optional[int]) -> bool:
+        nonlocal best
+        im = base if scale >= 1.0 else base.resize(
+            (max(1, round(base.width * scale)), max(1, round(base.height * scale))), Image.LANCZOS)
+        blob = _save(im, "PNG") if quality is None else _save(im, lossy, quality)
+        if best is None or len(blob) < len(best[0]):
+            best = (blob, "png" if quality is None else lossy.lower(), scale)
+        return len(blob) <= target
+
+    attempts: List[Tuple[float, Optional[int]]] = ([(1.0, None)] if lossless_first else []) + [(1.0, q_hi), (1.0, q_mid)]
+    if not any(_try(s, q) for s, q in attempts):
+        # Lossy size scales roughly with pixel count: estimate the DPI that fits, then the floor
+        scale = max(profile.min_scale, min(0.95, math.sqrt(target / len(best[0])) * 0.95))
+        if not _try(scale, q_mid) and scale > profile.min_scale:
+            _try(profile.min_scale, profile.min_quality)
+    blob, fmt, scale = best
+    return blob, (("format", fmt), ("mode", base.mode), ("scale", round(scale, 2)),
+                  ("density", round(density, 3)), ("cropped", cropped))
+
+
+def encode_image(data: bytes, purpose: str = "qc", agent_id: Optional[str] = None) -> Tuple[bytes, Dict[str, Any]]:
+    """Encode one rendered page for a vision request; returns (image, stats)."""
+    stats: Dict[str, Any] = {"before": len(data)}
+    out = data
+    if os.getenv("IMAGE_ENCODING", "true").lower() == "true":
+        lossy = "WEBP" if os.getenv("IMAGE_LOSSY_FORMAT", "jpeg").lower() == "webp" else "JPEG"
+        try:
+            blob, items = _encode(data, profile_for(purpose, agent_id), lossy)
+            if len(blob) < len(data):
+                out = blob
+                stats.update(items)
+        except Exception as e:  # Pillow missing or not a decodable image: send the original
+            stats["error"] = type(e).__name__
+    stats["after"] = len(out)
+    return out, stats
+
+
+class PayloadStats:
+    """Image bytes before/after encoding, per purpose (thread-safe)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.by_purpose: Dict[str, Dict[str, int]] = {}
+
+    def add(self, purpose: str, images: int, before: int, after: int):
+        with self._lock:
+            entry = self.by_purpose.setdefault(purpose, {"images": 0, "before_bytes": 0, "after_bytes": 0})
+            entry["images"] += images
+            entry["before_bytes"] += before
+            entry["after_bytes"] += after
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            by_purpose = {k: dict(v) for k, v in self.by_purpose.items()}
+        total = {key: sum(v[key] for v in by_purpose.values()) for key in ("images", "before_bytes", "after_bytes")}
+        return dict(_with_saving(total), by_purpose={k: _with_saving(v) for k, v in by_purpose.items()})
+
+
+def _with_saving(entry: Dict[str, int]) -> Dict[str, Any]:
+    before = entry.get("before_bytes", 0)
+    saved = round(100.0 * (before - entry.get("after_bytes", 0)) / before, 1) if before else 0.0
+    return dict(entry, saved_pct=saved)
+
+
+_payload_stats: contextvars.ContextVar[Optional[PayloadStats]] = contextvars.ContextVar("image_payload_stats", default=None)
+
+
+@contextmanager
+def payload_scope(stats: PayloadStats):
+    """Accumulate the images sent in this context (and contexts copied from it) into `stats`."""
+    token = _payload_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _payload_stats.reset(token)
+
+
+def record_payload(purpose: str, images: int, before: int, after: int):
+    """Count images sent for `purpose` in the current payload_scope, if any."""
+    scope = _payload_stats.get()
+    if scope is not None and images:
+        scope.add(purpose, images, before, after)
+
+
+def sum_payloads(*payloads: Dict[str, Any]) -> Dict[str, Any]:
+    """Combine the stats returned by several encode_images calls of one request."""
+    total = {key: sum(p.get(key, 0) for p in payloads) for key in ("images", "before_bytes", "after_bytes")}
+    return _with_saving(total)
+
+
+def encode_images(images: List[bytes], purpose: str = "qc", agent_id: Optional[str] = None,
+                  record: bool = True) -> Tuple[List[bytes], Dict[str, Any]]:
+    """Encode the page images of one request; returns (images, {images, before_bytes, after_bytes, saved_pct}).
+    `record=False` leaves the payload_scope totals alone (pages already counted for this request).
+    """
+    out: List[bytes] = []
+    before = after = 0
+    for data in images:
+        enc, st = encode_image(data, purpose, agent_id)
+        out.append(enc)
+        before += st["before"]
+        after += st["after"]
+    if record:
+        record_payload(purpose, len(images), before, after)
+    return out, _with_saving({"images": len(images), "before_bytes": before, "after_bytes": after})
@@ -0,0 +1,222 @@
+"""
+Shared, long-lived LLM clients.
+
+One thread-safe client per (provider, base_url, api key) on a tuned httpx
+connection pool; Gemini/Vertex REST calls share one pooled `requests.Session`.
+`get_async_client()` / `async_http_client()` return `AsyncOpenAI` /
+`httpx.AsyncClient` on the same pool settings, kept per running event loop and
+closed with `aclose_async_clients()` before that loop ends.
+
+SDK retries are disabled (`max_retries=0`); retries belong to the rate limiter
+(LLM_MAX_ATTEMPTS). Base URLs can be overridden per provider
+(OPENAI_BASE_URL, XAI_BASE_URL, OPENROUTER_BASE_URL).
+
+Environment:
+  LLM_HTTP_MAX_CONNECTIONS=int     pool size per client (default 64)
+  LLM_HTTP_MAX_KEEPALIVE=int       idle keep-alive connections kept (default 32)
+  LLM_HTTP_KEEPALIVE_S=float       idle connection expiry (default 60)
+  LLM_HTTP_TIMEOUT_S=float         read timeout (default 120; connect 10)
+"""
+
+from __future__ import annotations
+
+import atexit
+import hashlib
+import os
+import threading
+import weakref
+from typing import Any, Dict, Optional, Tuple
+
+# provider -> (base url env override, default base url, api key env)
+PROVIDERS: Dict[str, Tuple[str, Optional[str], str]] = {
+    "openai": ("OPENAI_BASE_URL", None, "OPENAI_API_KEY"),
+    "xai": ("XAI_BASE_URL", "https://api.x.ai/v1", "XAI_API_KEY"),
+    "openrouter": ("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1", "OPENROUTER_API_KEY"),
+}
+
+_clients: Dict[Tuple[str, str, str], Any] = {}
+_http_clients: Dict[Tuple[str, str, str], Any] = {}
+_session: Any = None
+# event loop -> {registry key: client}; entries vanish with their loop
+_async_clients: "weakref.WeakKeyDictionary[Any, Dict[Tuple[str, ...], Any]]" = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)) or str(default))
+    except Exception:
+        return default
+
+
+def provider_base_url(provider: str) -> Optional[str]:
+    """Base URL for a provider, honouring the <PROVIDER>_BASE_URL override."""
+    env_name, default, _ = PROVIDERS[provider]
+    return os.getenv(env_name) or default
+
+
+def provider_api_key(provider: str) -> Optional[str]:
+    return os.getenv(PROVIDERS[provider][2])
+
+
+def provider_for_base_url(base_url: Optional[str]) -> str:
+    """Best-effort provider name for an explicit base URL (used for registry keys and limits)."""
+    if not base_url:
+        return "openai"
+    for name in PROVIDERS:
+        if provider_base_url(name) == base_url or (PROVIDERS[name][1] or "") == base_url:
+            return name
+    if "x.ai" in base_url:
+        return "xai"
+    if "openrouter" in base_url:
+        return "openrouter"
+    return "openai"
+
+
+def _build_http_client(asynchronous: bool = False):
+    import httpx
+
+    limits = httpx.Limits(
+        max_connections=int(_env_float("LLM_HTTP_MAX_CONNECTIONS", 64)),
+        max_keepalive_connections=int(_env_float("LLM_HTTP_MAX_KEEPALIVE", 32)),
+        keepalive_expiry=_env_float("LLM_HTTP_KEEPALIVE_S", 60.0),
+    )
+    timeout = httpx.Timeout(_env_float("LLM_HTTP_TIMEOUT_S", 120.0), connect=10.0)
+    if asynchronous:
+        return httpx.AsyncClient(limits=limits, timeout=timeout)
+    return httpx.Client(limits=limits, timeout=timeout)
+
+
+def _client_key(provider: str, api_key: Optional[str], base_url: Optional[str]) -> Tuple[str, str, str]:
+    if provider not in PROVIDERS:
+        raise ValueError(f"Unknown LLM provider: {provider}")
+    api_key = api_key if api_key is not None else provider_api_key(provider)
+    base_url = base_url or provider_base_url(provider)
+    return provider, base_url or "", hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+
+
+def get_client(provider: str = "openai", api_key: Optional[str] = None, base_url: Optional[str] = None):
+    """Shared OpenAI-compatible client for (provider, base_url, api_key).
+
+    `api_key`/`base_url` default to the provider's environment settings.
+    """
+    from openai import OpenAI
+
+    key = _client_key(provider, api_key, base_url)
+    api_key = api_key if api_key is not None else provider_api_key(provider)
+    base_url = base_url or provider_base_url(provider)
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            http_client = _build_http_client()
+            kwargs: Dict[str, Any] = {"api_key": api_key, "http_client": http_client, "max_retries": 0}
+            if base_url:
+                kwargs["base_url"] = base_url
+            client = OpenAI(**kwargs)
+            _clients[key] = client
+            _http_clients[key] = http_client
+        return client
+
+
+def get_client_for_base_url(base_url: Optional[str], api_key: Optional[str]):
+    """Shared client for call sites that already resolved an explicit endpoint."""
+    return get_client(provider_for_base_url(base_url), api_key=api_key, base_url=base_url)
+
+
+def _loop_clients() -> Dict[Tuple[str, ...], Any]:
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    with _lock:
+        clients = _async_clients.get(loop)
+        if clients is None:
+            clients = _async_clients[loop] = {}
+        return clients
+
+
+def get_async_client(provider: str = "openai", api_key: Optional[str] = None, base_url: Optional[str] = None):
+    """Shared `AsyncOpenAI` client for (provider, base_url, api_key) on the running event loop."""
+    from openai import AsyncOpenAI
+
+    key = _client_key(provider, api_key, base_url)
+    api_key = api_key if api_key is not None else provider_api_key(provider)
+    base_url = base_url or provider_base_url(provider)
+    clients = _loop_clients()
+    client = clients.get(key)
+    if client is None:
+        kwargs: Dict[str, Any] = {"api_key": api_key, "http_client": _build_http_client(asynchronous=True),
+                                  "max_retries": 0}
+        if base_url:
+            kwargs["base_url"] = base_url
+        client = clients[key] = AsyncOpenAI(**kwargs)
+    return client
+
+
+def get_async_client_for_base_url(base_url: Optional[str], api_key: Optional[str]):
+    return get_async_client(provider_for_base_url(base_url), api_key=api_key, base_url=base_url)
+
+
+def async_http_client():
+    """Shared pooled `httpx.AsyncClient` for REST providers (Gemini) on the running event loop."""
+    clients = _loop_clients()
+    client = clients.get(("rest",))
+    if client is None:
+        client = clients[("rest",)] = _build_http_client(asynchronous=True)
+    return client
+
+
+async def aclose_async_clients():
+    """Close the running loop's async clients (call before the loop ends)."""
+    import asyncio
+    import httpx
+
+    with _lock:
+        clients = _async_clients.pop(asyncio.get_running_loop(), {})
+    for c in clients.values():
+        try:
+            await (c.aclose() if isinstance(c, httpx.AsyncClient) else c.close())
+        except Exception:
+            pass
+
+
+def http_session():
+    """Shared pooled requests.Session for REST providers (Gemini, Vertex)."""
+    global _session
+    with _lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            size = int(_env_float("LLM_HTTP_MAX_CONNECTIONS", 64))
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def client_count() -> int:
+    with _lock:
+        return len(_clients)
+
+
+@atexit.register
+def close_all():
+    """Close pooled connections (also used by tests to reset the registry)."""
+    global _session
+    with _lock:
+        http_clients = list(_http_clients.values())
+        _clients.clear()
+        _http_clients.clear()
+        session, _session = _session, None
+    for c in http_clients:
+        try:
+            c.close()
+        except Exception:
+            pass
+    if session is not None:
+        try:
+            session.close()
+        except Exception:
+            pass
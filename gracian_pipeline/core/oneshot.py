@@ -10,18 +10,12 @@ from .schema import get_types, schema_prompt_block
 from .enforce import enforce
 from .qc import numeric_qc
 from .bench import score_output
-from .sectionizer import sectionize_pdf
+from .sectionizer import sectionize_pdf, get_page_index
 
 
 def _sample_pages(pdf_path: str, max_pages: int) -> Tuple[List[int], List[bytes]]:
     """Select up to max_pages spanning the document; return (indices, images)."""
-    try:
-        import fitz  # type: ignore
-        doc = fitz.open(pdf_path)
-        n = doc.page_count
-        doc.close()
-    except Exception:
-        n = 0
+    n = get_page_index(pdf_path).page_count
     if n <= 0:
         return [], []
     if max_pages >= n:
@@ -80,7 +74,7 @@ def oneshot_extract(pdf_path: str, agents: Dict[str, str]) -> Dict[str, Any]:
     # Persist sectionizer map for audit
     try:
         from pathlib import Path
-        outdir = Path("data")/"raw_pdfs"/"outputs"/"sections"
+        outdir = Path(os.getenv("SECTIONS_OUT_DIR", "data/raw_pdfs/outputs/sections"))
         outdir.mkdir(parents=True, exist_ok=True)
         with open(str(outdir/(Path(pdf_path).stem + ".oneshot.sections.json")), "w") as f:
             json.dump(out.get("sectionizer", {}), f, indent=2, ensure_ascii=False)
@@ -1,19 +1,39 @@
+"""
+Orchestrated extraction: sectionize, extract per agent, coach page choices.
+
+The engine is asyncio-native (`orchestrate_pdf_async`): sectionizer coaching,
+per-agent extraction rounds, coaching and the global page pick are awaitable
+tasks on async provider clients, gathered so that a failure or a
+cancellation (e.g. the ORCH_DOC_MAX_SECONDS deadline) tears down every
+request the document still has in flight. Waiting on a provider does not
+hold a thread, so one process can drive many documents at once
+(`orchestrate_pdfs_async`); the shared provider limiters bound the requests.
+`orchestrate_pdf` is the synchronous wrapper around the same engine.
+"""
+
 from __future__ import annotations
 
+import asyncio
 import os
 import json as _json
 import hashlib
 import threading
-from typing import Dict, Any, List, Tuple
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
 
-from .vision_sectionizer import vision_sectionize, render_all_pages
-from .vision_qc import json_guard, render_pdf_pages_subset, call_openai_responses_vision
+from .vision_sectionizer import vision_sectionize
+from .vision_qc import json_guard, render_pdf_pages_subset, acall_openai_responses_vision, _gather
+from .llm_clients import aclose_async_clients
 from .schema import get_types, schema_prompt_block
 from .qc import numeric_qc
 from .enforce import enforce
 from .bench import score_output
-from .sectionizer import select_pages_for_agent
+from .sectionizer import select_pages_for_agent, get_page_index
+from .render_cache import render_cache_stats
+from .rate_limiter import usage_scope
+from .coaching_policy import CoachingPolicy
+from .page_relevance import CoachingPayload, build_coaching_payload
+from .image_encoding import PayloadStats, encode_images, payload_scope
 
 
 def _score_threshold(agent_id: str) -> float:
@@ -29,17 +49,15 @@ def _distinct_ints(seq: List[int]) -> List[int]:
     return sorted({int(x) for x in seq if isinstance(x, int) and x >= 0})
 
 
-def _coach_sectionizer_once(pdf_path: str, outline: Dict[str, Any]) -> Dict[str, Any]:
+async def _coach_sectionizer_once(pdf_path: str, outline: Dict[str, Any]) -> Dict[str, Any]:
     """Ask GPT-5 (Responses) to review sectionizer output and propose corrected pages_by_agent.
-    Sends all page images with labels so the model can reason globally.
-    Returns a dict {pages_by_agent: {agent:[indices]}, notes: str, added_agents: []}
+    Sends the locally most relevant pages at SECTIONIZER_DPI and thumbnails of the rest, within
+    COACH_PAYLOAD_MAX_MB (see page_relevance.py), so the model can still reason globally.
+    Returns a dict {pages_by_agent: {agent:[indices]}, notes: str, added_agents: [], payload: {...}}
     """
-    # Render all pages (PNG) – capped via env if needed
-    max_pages_cap = int(os.getenv("ORCH_MAX_PAGES", "0") or "0")
-    images = render_all_pages(pdf_path, dpi=int(os.getenv("SECTIONIZER_DPI", "170")))
-    if max_pages_cap and len(images) > max_pages_cap:
-        images = images[:max_pages_cap]
-    page_labels = [f"Page {i+1}/{len(images)}" for i in range(len(images))]
+    index = await asyncio.to_thread(get_page_index, pdf_path)
+    payload = await asyncio.to_thread(
+        build_coaching_payload, pdf_path, index, outline, int(os.getenv("SECTIONIZER_DPI", "170")))
 
     prompt = (
         "You are Orchestrator for a Swedish BRF document.\n"
@@ -60,21 +78,35 @@ def _coach_sectionizer_once(pdf_path: str, outline: Dict[str, Any]) -> Dict[str,
         prompt
         + "\nCurrent outline JSON (may be imperfect):\n"
         + outline_text
+        + _payload_note(payload)
         + "\nPlease correct pages_by_agent based on the images."
     )
-    raw = call_openai_responses_vision(prompt_full, images, page_labels=page_labels)
+    raw = await acall_openai_responses_vision(prompt_full, payload.images, page_labels=payload.labels)
     coached = json_guard(raw, default={"pages_by_agent": outline.get("pages_by_agent", {}), "added_agents": [], "notes": ""})
     # Normalize pages_by_agent indices
     pmap = coached.get("pages_by_agent", {}) or {}
     norm = {a: _distinct_ints(v if isinstance(v, list) else []) for a, v in pmap.items()}
     coached["pages_by_agent"] = norm
+    coached["payload"] = payload.summary()
     return coached
 
 
-def _coach_agent_once(pdf_path: str, agent_id: str, pages: List[int], last_json: Dict[str, Any]) -> Dict[str, Any]:
-    """Ask GPT-5 to refine the page list for a specific agent by looking at the images for those pages ±1 around.
-    Returns dict {ok: bool, revised_pages: [ints], hints: ''}
-    """
+def _payload_note(payload: CoachingPayload) -> str:
+    # Tell the model which images are low resolution and which pages it has not seen
+    note = ""
+    if payload.thumb_pages:
+        note += "\nImages labelled (thumbnail) are low-resolution previews: use them for layout and headings only."
+    if payload.omitted_pages:
+        omitted = ", ".join(str(p + 1) for p in payload.omitted_pages)
+        note += f"\nPages not shown (1-based): {omitted}. Keep their current assignment unless neighbouring pages contradict it."
+    return note
+
+
+def _render_encoded(pdf_path: str, pages: List[int], dpi: int, purpose: str, agent_id: Optional[str] = None) -> List[bytes]:
+    return encode_images(render_pdf_pages_subset(pdf_path, pages, dpi), purpose, agent_id)[0]
+
+
+def _coach_window(pages: List[int]) -> List[int]:
     # Expand small window around suggested pages to give the model local context
     extra = int(os.getenv("ORCH_AGENT_PAGE_PAD", "1") or "1")
     window: List[int] = []
@@ -82,10 +114,72 @@ def _coach_agent_once(pdf_path: str, agent_id: str, pages: List[int], last_json:
         for d in range(-extra, extra + 1):
             window.append(p + d)
     window = _distinct_ints(window)
-    if not window:
-        window = [0, 1, 2]
+    return window or [0, 1, 2]
+
+
+def group_agents_by_pages(pages_by_agent: Dict[str, List[int]], max_pages: int = 10, max_agents: int = 4) -> List[List[str]]:
+    """Greedily group agents whose page lists overlap, keeping each group's shared page window <= max_pages.
+    Agents without pages get their own group.
+    """
+    groups: List[Tuple[List[str], set]] = []
+    order = sorted(pages_by_agent, key=lambda a: (min(pages_by_agent[a]) if pages_by_agent[a] else -1, a))
+    for aid in order:
+        pages = set(pages_by_agent[aid] or [])
+        for members, union in groups:
+            if pages and pages & union and len(members) < max_agents and len(union | pages) <= max_pages:
+                members.append(aid)
+                union |= pages
+                break
+        else:
+            groups.append(([aid], set(pages)))
+    return [members for members, _ in groups]
+
+
+async def _coach_agents_once(pdf_path: str, agents: Dict[str, Tuple[List[int], Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+    """Coach several agents with overlapping pages in one request over their shared (padded) window.
+    agents: {agent_id: (pages, last_json)}. Returns {agent_id: {ok, revised_pages, hints}}.
+    """
+    if len(agents) == 1:
+        aid, (pages, last_json) = next(iter(agents.items()))
+        return {aid: await _coach_agent_once(pdf_path, aid, pages, last_json)}
+    window = _coach_window([p for pages, _ in agents.values() for p in pages])
+    dpi = int(os.getenv("QC_PAGE_RENDER_DPI", "220"))
+    imgs = await asyncio.to_thread(_render_encoded, pdf_path, window, dpi, "coach", "+".join(agents))
+    plabels = [f"Page {i+1}" for i in window]
+    sections = []
+    for aid, (pages, last_json) in agents.items():
+        sections.append(
+            f"### Agent: {aid}\nExpected keys: {list(get_types(aid).keys())}.\n"
+            f"Current 0-based pages: {list(pages)}\nLast JSON:{_json.dumps(last_json, ensure_ascii=False)}"
+        )
+    prompt = (
+        "You are Orchestrator. Coach several agents to pick the right pages for extraction.\n"
+        "Given page images and each agent's last JSON, decide for every agent whether its pages are correct.\n"
+        f"Return STRICT minified JSON with top-level keys exactly {list(agents.keys())}, each "
+        "{ok: true|false, revised_pages: [zero_based_indices], hints: ''}.\n"
+        "If an agent's pages are wrong or incomplete, propose a better 0-based list limited to <=6 pages.\n\n"
+        + "\n\n".join(sections)
+    )
+    raw = await acall_openai_responses_vision(prompt, imgs, page_labels=plabels)
+    parsed = json_guard(raw, default={})
+    out: Dict[str, Dict[str, Any]] = {}
+    for aid, (pages, _) in agents.items():
+        advice = parsed.get(aid) if isinstance(parsed.get(aid), dict) else {}
+        revised = advice.get("revised_pages", pages)
+        advice["revised_pages"] = _distinct_ints(revised if isinstance(revised, list) else pages)[:6]
+        advice["ok"] = bool(advice.get("ok", False))
+        advice.setdefault("hints", "")
+        out[aid] = advice
+    return out
+
+
+async def _coach_agent_once(pdf_path: str, agent_id: str, pages: List[int], last_json: Dict[str, Any]) -> Dict[str, Any]:
+    """Ask GPT-5 to refine the page list for a specific agent by looking at the images for those pages ±1 around.
+    Returns dict {ok: bool, revised_pages: [ints], hints: ''}
+    """
+    window = _coach_window(pages)
     dpi = int(os.getenv("QC_PAGE_RENDER_DPI", "220"))
-    imgs = render_pdf_pages_subset(pdf_path, window, dpi=dpi)
+    imgs = await asyncio.to_thread(_render_encoded, pdf_path, window, dpi, "coach", agent_id)
     plabels = [f"Page {i+1}" for i in window]
 
     schema = get_types(agent_id)
@@ -99,34 +193,28 @@ def _coach_agent_once(pdf_path: str, agent_id: str, pages: List[int], last_json:
     )
     last_json_text = _json.dumps(last_json, ensure_ascii=False)
     # Include the last JSON as leading text before images
-    raw = call_openai_responses_vision(prompt + "\nLast JSON:" + last_json_text, imgs, page_labels=plabels)
+    raw = await acall_openai_responses_vision(prompt + "\nLast JSON:" + last_json_text, imgs, page_labels=plabels)
     out = json_guard(raw, default={"ok": False, "revised_pages": pages, "hints": ""})
     out["revised_pages"] = _distinct_ints(out.get("revised_pages", pages))[:6]
     out["ok"] = bool(out.get("ok", False))
     return out
 
 
-def _global_pick_pages_for_agent(pdf_path: str, agent_id: str) -> List[int]:
+async def _global_pick_pages_for_agent(pdf_path: str, agent_id: str) -> List[int]:
     """As a last resort, sample pages across the whole document and ask GPT-5 to pick the best <=6 pages for this agent."""
-    try:
-        import fitz  # type: ignore
-        doc = fitz.open(pdf_path)
-        n = doc.page_count
-        doc.close()
-    except Exception:
-        n = 0
+    n = (await asyncio.to_thread(get_page_index, pdf_path)).page_count
     if n <= 0:
         return []
     max_samples = int(os.getenv("ORCH_GLOBAL_SAMPLE_PAGES", "18") or "18")
     stride = max(1, n // max(1, max_samples))
     sample_idxs = list(range(0, n, stride))[:max_samples]
-    imgs = render_pdf_pages_subset(pdf_path, sample_idxs, dpi=int(os.getenv("SECTIONIZER_DPI", "150")))
+    imgs = await asyncio.to_thread(_render_encoded, pdf_path, sample_idxs, int(os.getenv("SECTIONIZER_DPI", "150")), "global_pick")
     labels = [f"Page {i+1}/{n}" for i in sample_idxs]
     prompt = (
         "You are Orchestrator. Given sampled page images across the report, choose up to 6 0-based page indices "
         f"most relevant for agent '{agent_id}'. Return STRICT minified JSON: {{pages:[ints]}}."
     )
-    raw = call_openai_responses_vision(prompt, imgs, page_labels=labels)
+    raw = await acall_openai_responses_vision(prompt, imgs, page_labels=labels)
     out = json_guard(raw, default={"pages": []})
     pages = out.get("pages", [])
     try:
@@ -138,27 +226,56 @@ def _global_pick_pages_for_agent(pdf_path: str, agent_id: str) -> List[int]:
     return sorted(set(keep))[:6]
 
 
-def orchestrate_pdf(pdf_path: str, agents: Dict[str, str], max_rounds: int = 5) -> Dict[str, Any]:
-    """High-level loop: sectionize, extract per agent, coach iteratively until acceptance or rounds exhausted.
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)) or str(default))
+    except Exception:
+        return default
+
+
+async def _gather_limited(fn: Callable[[Any], Awaitable[Any]], work: Iterable[Any], sem: Optional[asyncio.Semaphore]) -> List[Any]:
+    """fn over work as sibling tasks (at most `sem` at once); a failure or cancellation cancels the rest."""
+    async def _one(item):
+        if sem is None:
+            return await fn(item)
+        async with sem:
+            return await fn(item)
+
+    return await _gather(*(_one(item) for item in work))
+
+
+async def orchestrate_pdf_async(pdf_path: str, agents: Dict[str, str], max_rounds: int = 5,
+                                policy: Optional[CoachingPolicy] = None) -> Dict[str, Any]:
+    """High-level loop: sectionize, extract per agent, coach iteratively until the coaching policy stops each agent.
     Returns results dict like the standard pipeline.
     """
+    # The document budget (wall time) starts before sectionizing
+    policy = policy or CoachingPolicy.from_env(max_rounds)
     # Optionally limit number of agents for quick validation runs
-    try:
-        limit = int(os.getenv("ORCHESTRATOR_MAX_AGENTS", "0") or "0")
-    except Exception:
-        limit = 0
+    limit = _env_int("ORCHESTRATOR_MAX_AGENTS", 0)
     agent_items = list(agents.items())[: limit or None]
+    # Agents in flight per document; 0 = all (the provider limiters bound the requests)
+    concurrency = _env_int("ORCHESTRATOR_CONCURRENCY", 0)
+    sem = asyncio.Semaphore(concurrency) if concurrency > 0 else None
 
     # 1) Initial outline via vision sectionizer (full doc)
     verbose = os.getenv("VERBOSE_ORCHESTRATOR", "true").lower() == "true"
     if verbose:
         print(f"[orchestrator] agents={list(agents.keys())}")
-        print(f"[orchestrator] concurrency={os.getenv('ORCHESTRATOR_CONCURRENCY','2')} chunksize={os.getenv('VISION_PAGES_PER_CALL','10')}")
-    outline = vision_sectionize(pdf_path)
+        print(f"[orchestrator] concurrency={concurrency or 'all'} chunksize={os.getenv('VISION_PAGES_PER_CALL','10')}")
+
+    # Image bytes sent for this document, before/after image_encoding
+    image_payload = PayloadStats()
+    with payload_scope(image_payload):
+        outline = await asyncio.to_thread(vision_sectionize, pdf_path)
 
     # 2) Coach sectionizer once (optional)
+    added_agents: List[str] = []
+    coaching_payload: Dict[str, Any] = {}
     try:
-        coached = _coach_sectionizer_once(pdf_path, outline)
+        with payload_scope(image_payload):
+            coached = await _coach_sectionizer_once(pdf_path, outline)
+        coaching_payload = coached.get("payload") or {}
         if isinstance(coached, dict) and coached.get("pages_by_agent"):
             outline["pages_by_agent"] = coached["pages_by_agent"]
         added_agents = coached.get("added_agents") or []
@@ -169,9 +286,8 @@ def orchestrate_pdf(pdf_path: str, agents: Dict[str, str], max_rounds: int = 5)
                     outline["pages_by_agent"][a] = []
         # Persist orchestrated section map for auditability
         try:
-            import json as _json
             from pathlib import Path as _Path
-            out_dir = _Path("data")/"raw_pdfs"/"outputs"/"sections"
+            out_dir = _Path(os.getenv("SECTIONS_OUT_DIR", "data/raw_pdfs/outputs/sections"))
             out_dir.mkdir(parents=True, exist_ok=True)
             fname = _Path(pdf_path).stem + ".orchestrated.sections.json"
             with open(str(out_dir/fname), "w") as f:
@@ -182,8 +298,13 @@ def orchestrate_pdf(pdf_path: str, agents: Dict[str, str], max_rounds: int = 5)
         pass
 
     pages_map: Dict[str, List[int]] = outline.get("pages_by_agent", {})
+    page_index = await asyncio.to_thread(get_page_index, pdf_path)
     results: Dict[str, Any] = {}
-    qc_meta: Dict[str, Any] = {"_orchestrator": {"pages_by_agent": pages_map, "added_agents": (locals().get("added_agents") or [])}}
+    qc_meta: Dict[str, Any] = {"_orchestrator": {"pages_by_agent": pages_map, "added_agents": added_agents}}
+    if coaching_payload:
+        qc_meta["_orchestrator"]["coaching_payload"] = coaching_payload
+    # Agent states live here (not in their tasks) so a cancelled document still reports its best results
+    states: Dict[str, Dict[str, Any]] = {}
 
     # History logging (simple JSONL file)
     _hist_lock = threading.Lock()
@@ -206,129 +327,324 @@ def orchestrate_pdf(pdf_path: str, agents: Dict[str, str], max_rounds: int = 5)
         except Exception:
             pass
 
-    from .vision_qc import vision_qc_agent
+    from .vision_qc import avision_qc_agent, avision_qc_agents
 
-    # 3) For each agent, loop up to max_rounds with coaching
-    def _process_single(agent_id: str, base_prompt: str) -> Tuple[str, Dict[str, Any], Dict[str, Any]]:
-        full_prompt = f"{base_prompt}\n\n{schema_prompt_block(agent_id)}"
+    async def _seed_pages(agent_id: str) -> List[int]:
         cur_pages = pages_map.get(agent_id, [])
         # Seed empty page lists using text sectionizer first, then global pick
         if not cur_pages:
             try:
-                cur_pages = select_pages_for_agent(pdf_path, agent_id) or []
+                cur_pages = await asyncio.to_thread(select_pages_for_agent, pdf_path, agent_id, index=page_index) or []
             except Exception:
                 cur_pages = []
             if not cur_pages:
                 try:
-                    cur_pages = _global_pick_pages_for_agent(pdf_path, agent_id) or []
+                    cur_pages = await _global_pick_pages_for_agent(pdf_path, agent_id) or []
                 except Exception:
                     cur_pages = []
-        best_json: Dict[str, Any] = {}
-        best_score = -1.0
-        meta_store: Dict[str, Any] = {}
-        coach_accept = float(os.getenv("COACH_ACCEPT_SCORE", "85") or "85")
-        phash = _hash_str(full_prompt)
+        return cur_pages
+
+    def _new_state(agent_id: str, base_prompt: str) -> Dict[str, Any]:
+        full_prompt = f"{base_prompt}\n\n{schema_prompt_block(agent_id)}"
+        st = {"prompt": full_prompt, "phash": _hash_str(full_prompt), "pages": [],
+              "best_json": {}, "best_score": -1.0, "meta": {}, "done": False, "finished": False}
+        states[agent_id] = st
+        return st
+
+    def _record_round(agent_id: str, st: Dict[str, Any], vis_json: Dict[str, Any], vis_meta: Dict[str, Any],
+                      round_no: int, **extra: Any) -> Tuple[float, Dict[str, Any]]:
+        """QC + enforce + score one extraction, keep the best, log the round. Returns (score, enforced)."""
+        qc_first = numeric_qc(agent_id, vis_json)
+        vis_meta["numeric_qc_first"] = qc_first
+        enforced, verified, dropped = enforce(agent_id, vis_json)
+        sc = score_output(agent_id, enforced)
+        print(f"[orchestrator] {agent_id} round {round_no} score={sc:.1f}")
+        if sc > st["best_score"]:
+            st["best_score"] = sc
+            st["best_json"] = enforced
+        st["meta"].setdefault("rounds", []).append({
+            "round": round_no,
+            "pages": list(st["pages"]),
+            "score": sc,
+            "numeric_qc": qc_first,
+            "verified_fields": verified,
+            "dropped_fields": dropped,
+            "image_payload": vis_meta.get("image_payload", {}),
+            **({"roi": vis_meta["roi"]} if vis_meta.get("roi") else {}),
+            **extra,
+        })
+        _append_history({
+            "pdf": pdf_path,
+            "agent": agent_id,
+            "round": round_no,
+            "pages": list(st["pages"]),
+            "score": sc,
+            "prompt_hash": st["phash"],
+            **extra,
+        })
+        return sc, enforced
+
+    def _coaching_failed(st: Dict[str, Any], round_no: int, error: Exception):
+        st["meta"].setdefault("coaching_errors", []).append({"round": round_no, "error": str(error)})
+        if st["pages"]:
+            pad = 1
+            exp = []
+            for p in st["pages"]:
+                exp.extend([p - pad, p, p + pad])
+            st["pages"] = _distinct_ints(exp)[:6]
+
+    def _stopped(agent_id: str, st: Dict[str, Any], stop: Optional[str]):
+        st["finished"] = True
+        st["meta"]["stop_reason"] = stop or "max_rounds"
+        policy.record(st["meta"]["stop_reason"])
+        if verbose and stop not in (None, "target_reached", "max_rounds"):
+            print(f"[orchestrator] {agent_id} stopped: {stop} (best={st['best_score']:.1f})")
+
+    async def _finish(agent_id: str, st: Dict[str, Any], stop: Optional[str]):
+        """Record why the agent stopped, then run the global page pick if it is still under target."""
+        _stopped(agent_id, st, stop)
+        if st["best_score"] >= _score_threshold(agent_id):
+            return
+        skip = policy.skip_global_pick(stop)
+        if skip:
+            st["meta"]["global_pick_skipped"] = skip
+            return
+        try:
+            global_pages = await _global_pick_pages_for_agent(pdf_path, agent_id)
+            if global_pages:
+                print(f"[orchestrator] {agent_id} global page pick -> {global_pages}")
+                vis_json, vis_meta = await avision_qc_agent(str(pdf_path), agent_id, st["prompt"], page_indices=global_pages)
+                qc_first = numeric_qc(agent_id, vis_json)
+                enforced, verified, dropped = enforce(agent_id, vis_json)
+                sc = score_output(agent_id, enforced)
+                st["meta"].setdefault("rounds", []).append({
+                    "round": max_rounds + 1,
+                    "pages": list(global_pages),
+                    "score": sc,
+                    "numeric_qc": qc_first,
+                    "verified_fields": verified,
+                    "dropped_fields": dropped,
+                    "global_pick": True,
+                })
+                if sc > st["best_score"]:
+                    st["best_score"] = sc
+                    st["best_json"] = enforced
+        except Exception as e:
+            st["meta"].setdefault("coaching_errors", []).append({"round": max_rounds + 1, "error": str(e)})
+
+    # 3a) Per-agent mode: each agent loops up to max_rounds with its own coaching
+    async def _process_single(agent_id: str, base_prompt: str):
+        st = _new_state(agent_id, base_prompt)
+        st["pages"] = await _seed_pages(agent_id)
+        stop: Optional[str] = None
         for round_idx in range(max_rounds):
-            print(f"[orchestrator] {agent_id} round {round_idx+1}/{max_rounds} pages={cur_pages}")
+            stop = policy.before_call()
+            if stop:
+                break
+            print(f"[orchestrator] {agent_id} round {round_idx+1}/{max_rounds} pages={st['pages']}")
             try:
-                vis_json, vis_meta = vision_qc_agent(str(pdf_path), agent_id, full_prompt, page_indices=cur_pages)
+                vis_json, vis_meta = await avision_qc_agent(str(pdf_path), agent_id, st["prompt"], page_indices=st["pages"])
             except Exception as e:
                 vis_json, vis_meta = {}, {"error": str(e)}
-            qc_first = numeric_qc(agent_id, vis_json)
-            vis_meta["numeric_qc_first"] = qc_first
-            enforced, verified, dropped = enforce(agent_id, vis_json)
-            sc = score_output(agent_id, enforced)
-            print(f"[orchestrator] {agent_id} round {round_idx+1} score={sc:.1f}")
-            if sc > best_score:
-                best_score = sc
-                best_json = enforced
-            meta_store.setdefault("rounds", []).append({
-                "round": round_idx + 1,
-                "pages": list(cur_pages),
-                "score": sc,
-                "numeric_qc": qc_first,
-                "verified_fields": verified,
-                "dropped_fields": dropped,
-            })
-            _append_history({
-                "pdf": pdf_path,
-                "agent": agent_id,
-                "round": round_idx + 1,
-                "pages": list(cur_pages),
-                "score": sc,
-                "prompt_hash": phash,
-            })
-            if sc >= _score_threshold(agent_id):
+            sc, enforced = _record_round(agent_id, st, vis_json, vis_meta, round_idx + 1)
+            stop = policy.after_round(agent_id, st["meta"]["rounds"])
+            if stop:
                 break
             try:
-                advice = _coach_agent_once(pdf_path, agent_id, cur_pages, enforced)
-                cur_pages = advice.get("revised_pages", cur_pages) or cur_pages
-                meta_store.setdefault("coaching", []).append({
+                advice = await _coach_agent_once(pdf_path, agent_id, st["pages"], enforced)
+                st["pages"] = advice.get("revised_pages", st["pages"]) or st["pages"]
+                st["meta"].setdefault("coaching", []).append({
                     "round": round_idx + 1,
                     "advice": advice,
                 })
                 # If coach signals OK and score is decent, accept early
-                if advice.get("ok") and sc >= coach_accept:
+                stop = policy.accept_advice(advice, sc)
+                if stop:
                     if verbose:
                         print(f"[orchestrator] {agent_id} coach-ok accepted at round {round_idx+1} (score={sc:.1f})")
                     break
             except Exception as e:
-                meta_store.setdefault("coaching_errors", []).append({"round": round_idx + 1, "error": str(e)})
-                if cur_pages:
-                    pad = 1
-                    exp = []
-                    for p in cur_pages:
-                        exp.extend([p - pad, p, p + pad])
-                    cur_pages = _distinct_ints(exp)[:6]
-        if best_score < _score_threshold(agent_id):
+                _coaching_failed(st, round_idx + 1, e)
+        await _finish(agent_id, st, stop)
+
+    async def _process_agent(item: Tuple[str, str]):
+        agent_id, base_prompt = item
+        try:
+            await _process_single(agent_id, base_prompt)
+        except Exception as e:
+            states[agent_id] = {"best_json": {}, "meta": {"error": str(e)}, "finished": True}
+
+    # 3b) Grouped mode: rounds are synchronous across agents; agents whose pages overlap share one
+    # multi-agent vision request (images sent once) and one coaching request per round
+    async def _process_grouped(items: List[Tuple[str, str]]):
+        max_group_pages = _env_int("ORCH_GROUP_MAX_PAGES", _env_int("VISION_PAGES_PER_CALL", 10))
+        max_group_agents = _env_int("ORCH_GROUP_MAX_AGENTS", 4)
+        for aid, prompt in items:
+            _new_state(aid, prompt)
+
+        async def _seed(aid: str):
+            states[aid]["pages"] = await _seed_pages(aid)
+
+        await _gather_limited(_seed, [aid for aid, _ in items], sem)
+        group_stats = {"vision_requests": 0, "coach_requests": 0, "agent_rounds": 0}
+        qc_meta["_orchestrator"]["grouping"] = group_stats
+
+        async def _extract(group: List[str]):
+            pages = sorted({p for a in group for p in states[a]["pages"]})
             try:
-                global_pages = _global_pick_pages_for_agent(pdf_path, agent_id)
-                if global_pages:
-                    print(f"[orchestrator] {agent_id} global page pick -> {global_pages}")
-                    vis_json, vis_meta = vision_qc_agent(str(pdf_path), agent_id, full_prompt, page_indices=global_pages)
-                    qc_first = numeric_qc(agent_id, vis_json)
-                    enforced, verified, dropped = enforce(agent_id, vis_json)
-                    sc = score_output(agent_id, enforced)
-                    meta_store.setdefault("rounds", []).append({
-                        "round": max_rounds + 1,
-                        "pages": list(global_pages),
-                        "score": sc,
-                        "numeric_qc": qc_first,
-                        "verified_fields": verified,
-                        "dropped_fields": dropped,
-                        "global_pick": True,
-                    })
-                    if sc > best_score:
-                        best_score = sc
-                        best_json = enforced
+                return group, pages, await avision_qc_agents(str(pdf_path), {a: states[a]["prompt"] for a in group}, page_indices=pages)
             except Exception as e:
-                meta_store.setdefault("coaching_errors", []).append({"round": max_rounds + 1, "error": str(e)})
-        return agent_id, best_json, meta_store
+                return group, pages, {a: ({}, {"error": str(e)}) for a in group}
 
-    # Concurrency control
-    try:
-        concurrency = int(os.getenv("ORCHESTRATOR_CONCURRENCY", "2") or "2")
-    except Exception:
-        concurrency = 2
-
-    if concurrency <= 1 or len(agent_items) <= 1:
-        for aid, prompt in agent_items:
-            a, r, m = _process_single(aid, prompt)
-            results[a] = r
-            qc_meta[a] = m
-    else:
-        with ThreadPoolExecutor(max_workers=concurrency) as ex:
-            futs = {ex.submit(_process_single, aid, prompt): aid for aid, prompt in agent_items}
-            for fut in as_completed(futs):
+        for round_idx in range(max_rounds):
+            active = [aid for aid, _ in items if not states[aid]["done"]]
+            if not active:
+                break
+            exhausted = policy.before_call()
+            if exhausted:
+                for aid in active:
+                    states[aid]["done"], states[aid]["stop"] = True, exhausted
+                break
+            groups = group_agents_by_pages({a: states[a]["pages"] for a in active}, max_pages=max_group_pages, max_agents=max_group_agents)
+            print(f"[orchestrator] round {round_idx+1}/{max_rounds}: {len(active)} agent(s) in {len(groups)} request(s) {groups}")
+            group_stats["vision_requests"] += len(groups)
+            group_stats["agent_rounds"] += len(active)
+            to_coach: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+            for group, req_pages, per_agent in await _gather_limited(_extract, groups, sem):
+                extra = {"group": group, "request_pages": req_pages} if len(group) > 1 else {}
+                for aid in group:
+                    vis_json, vis_meta = per_agent.get(aid, ({}, {}))
+                    sc, enforced = _record_round(aid, states[aid], vis_json, vis_meta, round_idx + 1, **extra)
+                    stop = policy.after_round(aid, states[aid]["meta"]["rounds"])
+                    if stop:
+                        states[aid]["done"], states[aid]["stop"] = True, stop
+                    else:
+                        to_coach[aid] = (sc, enforced)
+            if not to_coach:
+                continue
+            exhausted = policy.before_call()
+            if exhausted:
+                for aid in to_coach:
+                    states[aid]["done"], states[aid]["stop"] = True, exhausted
+                break
+            coach_groups = group_agents_by_pages({a: states[a]["pages"] for a in to_coach}, max_pages=max_group_pages, max_agents=max_group_agents)
+            group_stats["coach_requests"] += len(coach_groups)
+
+            async def _coach(group: List[str]):
                 try:
-                    a, r, m = fut.result()
-                    results[a] = r
-                    qc_meta[a] = m
+                    return group, await _coach_agents_once(pdf_path, {a: (states[a]["pages"], to_coach[a][1]) for a in group})
                 except Exception as e:
-                    a = futs[fut]
-                    results[a] = {}
-                    qc_meta[a] = {"error": str(e)}
+                    return group, e
+
+            for group, advice_map in await _gather_limited(_coach, coach_groups, sem):
+                for aid in group:
+                    st = states[aid]
+                    if isinstance(advice_map, Exception):
+                        _coaching_failed(st, round_idx + 1, advice_map)
+                        continue
+                    advice = advice_map.get(aid, {})
+                    st["pages"] = advice.get("revised_pages", st["pages"]) or st["pages"]
+                    st["meta"].setdefault("coaching", []).append({"round": round_idx + 1, "advice": advice})
+                    stop = policy.accept_advice(advice, to_coach[aid][0])
+                    if stop:
+                        st["done"], st["stop"] = True, stop
+                        if verbose:
+                            print(f"[orchestrator] {aid} coach-ok accepted at round {round_idx+1} (score={to_coach[aid][0]:.1f})")
+
+        await _gather_limited(lambda aid: _finish(aid, states[aid], states[aid].get("stop")), [aid for aid, _ in items], sem)
+        if verbose:
+            print(f"[orchestrator] grouped rounds: {group_stats}")
+
+    # ORCH_DOC_MAX_SECONDS is a deadline: requests still in flight when it passes are cancelled
+    timeout = None
+    if policy.budget.max_seconds:
+        timeout = max(0.0, policy.budget.max_seconds - policy.budget.elapsed())
+    with usage_scope(policy.budget), payload_scope(image_payload):
+        if os.getenv("ORCH_GROUP_AGENTS", "false").lower() == "true" and len(agent_items) > 1:
+            work = _process_grouped(agent_items)
+        else:
+            work = _gather_limited(_process_agent, agent_items, sem)
+        try:
+            await asyncio.wait_for(work, timeout)
+        except asyncio.TimeoutError:
+            if verbose:
+                print(f"[orchestrator] document deadline ({policy.budget.max_seconds}s) reached; cancelled in-flight requests")
+            for aid, _ in agent_items:
+                st = states.get(aid) or _new_state(aid, agents[aid])
+                if not st["finished"]:
+                    _stopped(aid, st, "budget_time")
+
+    for aid, _ in agent_items:
+        st = states[aid]
+        results[aid] = st["best_json"]
+        qc_meta[aid] = st["meta"]
+
+    qc_meta["_orchestrator"]["budget"] = dict(policy.budget.snapshot(), stop_reasons=dict(policy.stop_reasons))
+    qc_meta["_orchestrator"]["image_payload"] = image_payload.snapshot()
+    if verbose:
+        print(f"[orchestrator] budget: {qc_meta['_orchestrator']['budget']}")
+        print(f"[orchestrator] image payload: {qc_meta['_orchestrator']['image_payload']['before_bytes']} -> "
+              f"{qc_meta['_orchestrator']['image_payload']['after_bytes']} bytes")
+
+    render_stats = render_cache_stats(pdf_path)
+    if render_stats:
+        qc_meta["_orchestrator"]["render_cache"] = render_stats
+        if verbose:
+            print(f"[orchestrator] render cache: rendered={render_stats.get('rendered')} hits={render_stats.get('hits')} "
+                  f"disk_hits={render_stats.get('disk_hits')} spilled={render_stats.get('spilled')}")
 
     if qc_meta:
         results["_qc"] = qc_meta
     return results
+
+
+async def orchestrate_pdfs_async(pdf_paths: Iterable[str], agents: Dict[str, str], max_rounds: int = 5,
+                                 max_documents: Optional[int] = None,
+                                 on_result: Optional[Callable[[str, Optional[Dict[str, Any]], Optional[Exception]], None]] = None
+                                 ) -> Dict[str, Any]:
+    """Orchestrate many documents on one event loop, at most `max_documents` (ORCH_ASYNC_DOCUMENTS) at a time.
+    `on_result(pdf_path, results, error)` is called as each document finishes; returns {pdf_path: results}
+    (documents that failed are left out).
+    """
+    max_documents = max_documents or _env_int("ORCH_ASYNC_DOCUMENTS", 8)
+    docs_sem = asyncio.Semaphore(max(1, max_documents))
+    out: Dict[str, Any] = {}
+
+    async def _one(pdf_path: str):
+        async with docs_sem:
+            try:
+                res, err = await orchestrate_pdf_async(pdf_path, agents, max_rounds=max_rounds), None
+                out[pdf_path] = res
+            except Exception as e:
+                res, err = None, e
+                print(f"[orchestrator] {pdf_path} failed: {e}")
+        if on_result is not None:
+            on_result(pdf_path, res, err)
+
+    await _gather_limited(_one, list(pdf_paths), None)
+    return out
+
+
+async def _closing_clients(coro: Awaitable[Any]) -> Any:
+    try:
+        return await coro
+    finally:
+        await aclose_async_clients()
+
+
+def run_async(coro: Awaitable[Any]) -> Any:
+    """Run a coroutine to completion from sync code on a private event loop (in a helper thread if
+    this thread already runs one), closing that loop's async clients afterwards.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(_closing_clients(coro))
+    with ThreadPoolExecutor(max_workers=1) as ex:
+        return ex.submit(asyncio.run, _closing_clients(coro)).result()
+
+
+def orchestrate_pdf(pdf_path: str, agents: Dict[str, str], max_rounds: int = 5,
+                    policy: Optional[CoachingPolicy] = None) -> Dict[str, Any]:
+    """Synchronous entry point: runs `orchestrate_pdf_async` to completion."""
+    return run_async(orchestrate_pdf_async(pdf_path, agents, max_rounds=max_rounds, policy=policy))
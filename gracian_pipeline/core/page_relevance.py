@@ -0,0 +1,211 @@
+"""
+Local page-relevance prefilter for sectionizer coaching.
+
+Ranks pages without any LLM call and builds a payload that stays under a fixed
+byte budget whatever the document length. Signals:
+
+- text layer: anchor hits per agent (PageIndex), with a bonus near the top of
+  the page,
+- ToC / bookmark titles that map to an agent,
+- the outline being coached: pages assigned to each agent and the first page
+  of every level-1 section,
+- pages without a text layer: compressed size of a low-DPI thumbnail.
+
+Candidates are picked round-robin over agents and sent at SECTIONIZER_DPI;
+every other page is sent as a COACH_THUMB_DPI thumbnail. Thumbnails of the
+least relevant pages are dropped first when the budget is tight. The budget
+counts bytes after image_encoding.
+
+Environment:
+  COACH_PAYLOAD_MAX_MB=float      image bytes per coaching request (default 6)
+  COACH_MAX_FULL_PAGES=int        pages sent at full DPI (default 16)
+  COACH_THUMB_DPI=int             thumbnail DPI for the other pages (default 36)
+  COACH_THUMB_SHARE=float         budget share thumbnails may use (default 0.35)
+  ORCH_MAX_PAGES=int              optional cap on images per request, 0 = off (default 0)
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from .image_encoding import encode_image, record_payload
+from .render_cache import iter_render_pages
+from .sectionizer import AGENT_ANCHORS, PageIndex, get_automaton, _normalize_text
+
+# Scores for one agent on one page
+ANCHOR_HIT = 1.0
+HEADING_HIT = 2.0        # anchor within the first HEADING_CHARS of the page text
+TOC_ENTRY = 3.0
+OUTLINE_PAGE = 2.0
+SECTION_START = 1.5      # first page of a level-1 outline section (any agent)
+HEADING_CHARS = 200
+MIN_TEXT_CHARS = 50      # below this a page is treated as a scan
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)) or str(default))
+    except Exception:
+        return default
+
+
+@dataclass
+class CoachingPayload:
+    """Images for one coaching request, in page order, with labels and what was left out."""
+
+    pages: List[int] = field(default_factory=list)
+    images: List[bytes] = field(default_factory=list)
+    labels: List[str] = field(default_factory=list)
+    full_pages: List[int] = field(default_factory=list)
+    thumb_pages: List[int] = field(default_factory=list)
+    omitted_pages: List[int] = field(default_factory=list)
+    page_count: int = 0
+    budget_bytes: int = 0
+    before_bytes: int = 0  # the same images before image_encoding
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(len(b) for b in self.images)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "page_count": self.page_count,
+            "full_pages": list(self.full_pages),
+            "thumbnails": len(self.thumb_pages),
+            "omitted": len(self.omitted_pages),
+            "bytes": self.total_bytes,
+            "before_bytes": self.before_bytes,
+            "budget_bytes": self.budget_bytes,
+        }
+
+
+def agent_page_scores(index: PageIndex, outline: Optional[Dict[str, Any]] = None) -> Dict[str, Dict[int, float]]:
+    """agent_id -> {page: relevance} from anchors, headings, ToC and the outline being coached."""
+    scores: Dict[str, Dict[int, float]] = {a: {} for a in AGENT_ANCHORS}
+
+    def _add(agent_id: str, page: int, value: float):
+        if 0 <= page < index.page_count:
+            per_agent = scores.setdefault(agent_id, {})
+            per_agent[page] = per_agent.get(page, 0.0) + value
+
+    for page, hits in index.anchor_hits.items():
+        for h in hits:
+            _add(h.agent_id, page, HEADING_HIT if h.offset < HEADING_CHARS else ANCHOR_HIT)
+    automaton = get_automaton(AGENT_ANCHORS)
+    for entry in index.toc:
+        try:
+            _, title, page1 = entry[:3]
+        except Exception:
+            continue
+        for agent_id in automaton.agents_in(_normalize_text(title or "")):
+            _add(agent_id, max(0, (page1 or 1) - 1), TOC_ENTRY)
+    for agent_id, pages in ((outline or {}).get("pages_by_agent") or {}).items():
+        for p in pages or []:
+            if isinstance(p, int):
+                _add(agent_id, p, OUTLINE_PAGE)
+    return scores
+
+
+def section_starts(outline: Optional[Dict[str, Any]], page_count: int) -> List[int]:
+    """0-based first pages of the outline's level-1 sections."""
+    starts = set()
+    for sec in (outline or {}).get("level_1") or []:
+        try:
+            p = int(sec.get("start_page", 0)) - 1
+        except Exception:
+            continue
+        if 0 <= p < page_count:
+            starts.add(p)
+    return sorted(starts)
+
+
+def rank_pages(index: PageIndex, outline: Optional[Dict[str, Any]] = None,
+               thumbnails: Optional[Dict[int, bytes]] = None, per_agent: int = 3) -> List[int]:
+    """All pages, most relevant first: each agent's top `per_agent` pages round-robin, then by overall score."""
+    n = index.page_count
+    scores = agent_page_scores(index, outline)
+    overall = [0.0] * n
+    for pages in scores.values():
+        for p, s in pages.items():
+            overall[p] = max(overall[p], s)
+    for p in section_starts(outline, n):
+        overall[p] += SECTION_START
+    # Scanned pages have no text signal; dense content (tables, text) compresses worse than blank or photo pages
+    scanned = [p for p in range(n) if len(index.page_texts[p].strip()) < MIN_TEXT_CHARS and (thumbnails or {}).get(p)]
+    if scanned:
+        largest = max(len(thumbnails[p]) for p in scanned)
+        for p in scanned:
+            overall[p] += ANCHOR_HIT * len(thumbnails[p]) / largest
+
+    ranked = [sorted(pages, key=lambda p: (-pages[p], -overall[p], p))[:per_agent]
+              for _, pages in sorted(scores.items()) if pages]
+    order: List[int] = []
+    seen = set()
+    for depth in range(per_agent):
+        for r in ranked:
+            if depth < len(r) and r[depth] not in seen:
+                seen.add(r[depth])
+                order.append(r[depth])
+    return order + sorted((p for p in range(n) if p not in seen), key=lambda p: (-overall[p], p))
+
+
+def build_coaching_payload(pdf_path: str, index: PageIndex, outline: Optional[Dict[str, Any]] = None,
+                           full_dpi: int = 170, budget_bytes: Optional[int] = None) -> CoachingPayload:
+    """Pick full-DPI candidate pages and thumbnails for the rest within `budget_bytes` of images."""
+    n = index.page_count
+    budget = int(budget_bytes if budget_bytes is not None else _env_float("COACH_PAYLOAD_MAX_MB", 6) * 1024 * 1024)
+    max_full = int(_env_float("COACH_MAX_FULL_PAGES", 16))
+    thumb_dpi = int(_env_float("COACH_THUMB_DPI", 36))
+    thumb_share = min(1.0, max(0.0, _env_float("COACH_THUMB_SHARE", 0.35)))
+    max_images = int(_env_float("ORCH_MAX_PAGES", 0))
+    payload = CoachingPayload(page_count=n, budget_bytes=budget)
+    if n <= 0:
+        return payload
+
+    thumbs = dict(iter_render_pages(pdf_path, range(n), thumb_dpi))
+    order = rank_pages(index, outline, thumbs)
+
+    # Thumbnails: keep the most relevant ones within their share of the budget (and the image cap)
+    kept_thumbs: Dict[int, bytes] = {}
+    used = 0
+    for p in order:
+        if p not in thumbs or (max_images and len(kept_thumbs) >= max_images):
+            continue
+        data, _ = encode_image(thumbs[p], "thumbnail")
+        if used + len(data) > budget * thumb_share:
+            continue
+        kept_thumbs[p] = data
+        used += len(data)
+
+    # Full-DPI candidates in relevance order, each replacing its thumbnail while the budget allows
+    full: Dict[int, bytes] = {}
+    rendered = dict(iter_render_pages(pdf_path, order[:max_full], full_dpi))
+    for p in order[:max_full]:
+        if p not in rendered:
+            continue
+        data, _ = encode_image(rendered[p], "sectionizer")
+        extra = len(data) - len(kept_thumbs.get(p, b""))
+        if used + extra > budget or (max_images and p not in kept_thumbs and len(kept_thumbs) + len(full) >= max_images):
+            continue
+        full[p] = data
+        kept_thumbs.pop(p, None)
+        used += extra
+
+    for p in range(n):
+        if p in full:
+            payload.full_pages.append(p)
+            payload.images.append(full[p])
+            payload.labels.append(f"Page {p+1}/{n}")
+        elif p in kept_thumbs:
+            payload.thumb_pages.append(p)
+            payload.images.append(kept_thumbs[p])
+            payload.labels.append(f"Page {p+1}/{n} (thumbnail)")
+        else:
+            payload.omitted_pages.append(p)
+            continue
+        payload.pages.append(p)
+    payload.before_bytes = sum(len(rendered[p]) for p in full) + sum(len(thumbs[p]) for p in kept_thumbs)
+    record_payload("sectionizer_coach", len(payload.images), payload.before_bytes, payload.total_bytes)
+    return payload
@@ -0,0 +1,306 @@
+"""
+PDF topology classification: machine_readable / hybrid / scanned.
+
+The one implementation shared by mass_scan_pdfs.py, analyze_pdf_topology.py,
+run_gracian.process_pdf and the experimental OptimalBRFPipeline, with one set
+of thresholds and a persistent store so a document is classified once.
+
+The reference method (`text_topology`) extracts the text of up to 10 sampled
+pages and buckets the average characters per page (>800 machine-readable,
+<200 scanned). For scanned reports most of that work is unnecessary: a page
+without font resources cannot yield any text, which PyMuPDF can tell from the
+page's resource dictionaries (`get_page_fonts` includes fonts of nested form
+XObjects) without interpreting its content stream.
+
+`fast_topology` therefore:
+
+1. reads the font and image resources of each sampled page, plus the
+   document producer — no text extraction;
+2. decides `scanned` outright when no sampled page carries a font
+   (every page contributes exactly 0 characters);
+3. otherwise falls back to text sampling, but only on the pages that have
+   fonts (the others are known to be 0), and stops as soon as the characters
+   seen so far already make the document machine-readable.
+
+Both steps give the same category as `text_topology`; `avg_chars_per_page`
+is a lower bound when the early exit in step 3 fires. Image coverage and the
+producer are recorded as signals (`full_page_image_pages`, `scanner_producer`)
+for reporting: an image is taken as full-page when its aspect ratio matches
+the page and its resolution is scan-like, read from the image resource rather
+than from the content stream.
+
+`get_topology(pdf_path)` looks a document up before classifying it:
+
+1. the mass-scan checkpoint DB (`scanned_files`), by path + size + mtime;
+2. the same DB by sha256 — rows scanned with --content-hash, and the
+   `pdf_topology` table, where documents classified outside a mass scan
+   are stored;
+3. otherwise `classify_pdf` (fast path) and the result goes into
+   `pdf_topology`.
+
+Environment:
+  TOPOLOGY_DB=path    store / mass-scan checkpoint DB, e.g. scan_progress.db (default unset = no store)
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from .corpus_walk import file_digest
+
+MACHINE_READABLE_CHARS = 800  # avg chars/page above which a document is machine-readable
+SCANNED_CHARS = 200           # avg chars/page below which it is scanned
+
+_SCANNER_PRODUCERS = re.compile(
+    r"scan|canon|ricoh|xerox|konica|kyocera|sharp|epson|brother|lexmark|toshiba|fujitsu|kofax|"
+    r"paperport|hp digital sending|image ?capture|naps2", re.IGNORECASE)
+
+
+def sample_pages(page_count: int) -> List[int]:
+    """Pages read for the character estimate: all of them up to 20, else every 5th page (max 10)."""
+    if page_count > 20:
+        return list(range(0, page_count, 5))[:10]
+    return list(range(page_count))
+
+
+def estimate_chars(sampled_chars: int, sampled: int, page_count: int) -> int:
+    """Extrapolate characters on the sampled pages to the whole document."""
+    if 0 < sampled < page_count:
+        return int(sampled_chars * (page_count / sampled))
+    return sampled_chars
+
+
+def categorize(avg_chars_per_page: float) -> str:
+    if avg_chars_per_page > MACHINE_READABLE_CHARS:
+        return "machine_readable"
+    if avg_chars_per_page < SCANNED_CHARS:
+        return "scanned"
+    return "hybrid"
+
+
+def _topology(page_count: int, sampled_chars: int, sampled: int) -> Dict[str, Any]:
+    total = estimate_chars(sampled_chars, sampled, page_count)
+    avg = total / page_count if page_count > 0 else 0
+    return {"text_chars": total, "avg_chars_per_page": avg, "category": categorize(avg)}
+
+
+def text_topology(doc) -> Dict[str, Any]:
+    """Reference method: text of every sampled page."""
+    pages = sample_pages(doc.page_count)
+    chars = sum(len(doc.load_page(p).get_text("text")) for p in pages)
+    out = _topology(doc.page_count, chars, len(pages))
+    out.update(classified_by="text", pages_read=len(pages))
+    return out
+
+
+def _full_page_image(image: tuple, width_pt: float, height_pt: float) -> bool:
+    """Image resource shaped like the page (±5% aspect) at ≥100 dpi."""
+    px_w, px_h = image[2], image[3]
+    if not (px_w and px_h and width_pt and height_pt):
+        return False
+    for w, h in ((px_w, px_h), (px_h, px_w)):  # scanners sometimes store the page rotated
+        if abs((w / h) / (width_pt / height_pt) - 1) <= 0.05 and w / (width_pt / 72) >= 100:
+            return True
+    return False
+
+
+def page_signals(doc, pages: List[int]) -> Dict[str, Any]:
+    """Font / image resources of `pages` and the producer; no content stream is interpreted."""
+    font_pages: List[int] = []
+    image_pages = 0
+    full_page = 0
+    for p in pages:
+        if doc.get_page_fonts(p):
+            font_pages.append(p)
+        images = doc.get_page_images(p)
+        if images:
+            image_pages += 1
+            box = doc.page_cropbox(p)
+            if any(_full_page_image(img, box.width, box.height) for img in images):
+                full_page += 1
+    producer = ((doc.metadata or {}).get("producer") or "").strip()
+    return {
+        "font_pages": font_pages,
+        "image_pages": image_pages,
+        "full_page_image_pages": full_page,
+        "producer": producer,
+        "scanner_producer": bool(_SCANNER_PRODUCERS.search(producer)),
+    }
+
+
+def fast_topology(doc) -> Dict[str, Any]:
+    """Same category as `text_topology`, reading text only from pages whose resources hold fonts."""
+    pages = sample_pages(doc.page_count)
+    signals = page_signals(doc, pages)
+    font_pages = signals.pop("font_pages")
+    signals["font_pages"] = len(font_pages)
+    if not font_pages:
+        out = _topology(doc.page_count, 0, len(pages))
+        out.update(classified_by="resources", pages_read=0, signals=signals)
+        return out
+    chars = 0
+    read = 0
+    for p in font_pages:
+        chars += len(doc.load_page(p).get_text("text"))
+        read += 1
+        if read < len(font_pages) and _topology(doc.page_count, chars, len(pages))["category"] == "machine_readable":
+            break  # remaining pages can only add characters
+    out = _topology(doc.page_count, chars, len(pages))
+    out.update(classified_by="text" if read == len(font_pages) else "text_early_exit", pages_read=read, signals=signals)
+    return out
+
+
+def classify_pdf(pdf_path: str, fast: bool = False) -> Dict[str, Any]:
+    """Topology of one file; locked and unreadable files get the `locked` / `corrupted` categories."""
+    record: Dict[str, Any] = {
+        "pages": 0,
+        "text_chars": 0,
+        "avg_chars_per_page": 0,
+        "is_encrypted": False,
+        "is_locked": False,
+        "category": "unknown",
+        "error": None,
+    }
+    try:
+        import fitz  # PyMuPDF
+
+        doc = fitz.open(pdf_path)
+        try:
+            record["is_encrypted"] = doc.is_encrypted
+            record["is_locked"] = doc.needs_pass
+            if record["is_locked"]:
+                record["category"] = "locked"
+                return record
+            record["pages"] = doc.page_count
+            record.update(fast_topology(doc) if fast else text_topology(doc))
+        finally:
+            doc.close()
+    except Exception as e:
+        record["error"] = str(e)
+        record["category"] = "corrupted"
+    return record
+
+
+_FIELDS = ("category", "pages", "text_chars", "avg_chars_per_page")
+
+
+class TopologyStore:
+    """Topology records keyed by file sha256, next to the mass-scan checkpoint rows."""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.getenv("TOPOLOGY_DB", "")
+        if not self.db_path:
+            raise ValueError("TopologyStore needs a db_path or TOPOLOGY_DB")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS pdf_topology (
+                content_hash TEXT PRIMARY KEY,
+                category TEXT,
+                pages INTEGER,
+                text_chars INTEGER,
+                avg_chars_per_page REAL,
+                classified_by TEXT,
+                created_at INTEGER
+            )
+        """)
+        self._conn.commit()
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(scanned_files)")}
+        self._scan_rows = "file_size" in columns  # checkpoint DB with per-file fingerprints
+
+    def _row(self, sql: str, args: tuple) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(sql, args).fetchone()
+        if row is None:
+            return None
+        return {"category": row[0], "pages": row[1], "avg_chars_per_page": row[2]}
+
+    def by_fingerprint(self, pdf_path: str, size: int, mtime_ns: int) -> Optional[Dict[str, Any]]:
+        """Mass-scan row for this file, if it has not changed since it was scanned."""
+        if not self._scan_rows:
+            return None
+        for path in dict.fromkeys((pdf_path, os.path.abspath(pdf_path))):
+            hit = self._row("SELECT category, pages, avg_chars_per_page FROM scanned_files "
+                            "WHERE filepath = ? AND file_size = ? AND file_mtime_ns = ?", (path, size, mtime_ns))
+            if hit is not None:
+                return hit
+        return None
+
+    def get(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        hit = self._row("SELECT category, pages, avg_chars_per_page FROM pdf_topology WHERE content_hash = ?",
+                        (content_hash,))
+        if hit is None and self._scan_rows:
+            hit = self._row("SELECT category, pages, avg_chars_per_page FROM scanned_files WHERE content_hash = ?",
+                            (content_hash,))
+        return hit
+
+    def put(self, content_hash: str, record: Dict[str, Any]):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pdf_topology "
+                "(content_hash, category, pages, text_chars, avg_chars_per_page, classified_by, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (content_hash, *(record.get(k) for k in _FIELDS), record.get("classified_by"), int(time.time())))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_default_store: Optional[TopologyStore] = None
+_default_lock = threading.Lock()
+
+
+def default_store() -> Optional[TopologyStore]:
+    """Process-wide store on TOPOLOGY_DB (None when TOPOLOGY_DB is unset or unusable)."""
+    global _default_store
+    db_path = os.getenv("TOPOLOGY_DB", "")
+    if not db_path:
+        return None
+    with _default_lock:
+        if _default_store is None or _default_store.db_path != db_path:
+            try:
+                _default_store = TopologyStore(db_path)
+            except sqlite3.Error as e:
+                print(f"[topology] store unavailable ({db_path}): {e}")
+                return None
+        return _default_store
+
+
+def get_topology(pdf_path: str, store: Optional[TopologyStore] = None, content_hash: Optional[str] = None,
+                 fast: bool = True) -> Dict[str, Any]:
+    """Stored topology for the file if known, else classify it and store the result.
+
+    `source` in the returned record is `scan_db` (path + size + mtime match),
+    `store` (sha256 match) or `computed`.
+    """
+    if store is not None:
+        try:
+            st = os.stat(pdf_path)
+            hit = store.by_fingerprint(pdf_path, st.st_size, st.st_mtime_ns)
+        except (OSError, sqlite3.Error):
+            hit = None
+        if hit is not None:
+            return dict(hit, source="scan_db")
+        try:
+            content_hash = content_hash or file_digest(pdf_path)
+            hit = store.get(content_hash)
+        except (OSError, sqlite3.Error):
+            hit = None
+        if hit is not None:
+            return dict(hit, source="store", content_hash=content_hash)
+    record = classify_pdf(pdf_path, fast=fast)
+    record["source"] = "computed"
+    if store is not None and content_hash and record["error"] is None:
+        try:
+            store.put(content_hash, record)
+            record["content_hash"] = content_hash
+        except sqlite3.Error as e:
+            print(f"[topology] could not store {os.path.basename(pdf_path)}: {e}")
+    return record
@@ -4,7 +4,6 @@ Ultra-comprehensive Pydantic-based extraction system.
 Extracts EVERY fact from BRF annual reports using structured Pydantic models.
 """
 
-import os
 import json
 import hashlib
 from pathlib import Path
@@ -38,7 +37,7 @@ from gracian_pipeline.models import (
 )
 
 from gracian_pipeline.core.docling_adapter_ultra_v2 import RobustUltraComprehensiveExtractor
-from openai import OpenAI
+from gracian_pipeline.core.llm_clients import get_client
 
 
 class UltraComprehensivePydanticExtractor:
@@ -54,7 +53,7 @@ class UltraComprehensivePydanticExtractor:
 
     def __init__(self):
         self.base_extractor = RobustUltraComprehensiveExtractor()
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.client = get_client("openai")
 
     def extract_brf_comprehensive(
         self,
@@ -0,0 +1,219 @@
+"""
+Multi-process page rasterization engine.
+
+Rasterizing a 150–200 page scanned report serially with PyMuPDF takes tens of
+seconds before the first vision call can start. The engine splits the wanted
+pages into contiguous chunks and renders them in a process pool where every
+worker keeps the PDF open between chunks. Results stream back in page order
+as soon as each chunk completes, so callers can send the first vision batch
+while later pages are still rendering.
+
+Small requests (fewer than RASTER_PARALLEL_MIN_PAGES pages) are rendered in
+the calling process, where pool dispatch would cost more than it saves.
+
+Environment:
+  RASTER_WORKERS=int               worker processes (default min(4, cpu count); 1 disables the pool)
+  RASTER_CHUNK_PAGES=int           pages per worker task (default 4)
+  RASTER_PARALLEL_MIN_PAGES=int    smallest request sent to the pool (default 8)
+  RASTER_MP_START=spawn|fork|...   multiprocessing start method (default spawn)
+"""
+
+from __future__ import annotations
+
+import atexit
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+
+# Worker-process state: open documents keyed by (path, mtime), a few at a time
+_worker_docs: "OrderedDict[Tuple[str, int], Any]" = OrderedDict()
+_WORKER_MAX_OPEN_DOCS = 4
+
+
+def _worker_document(pdf_path: str):
+    import fitz  # PyMuPDF
+
+    try:
+        mtime = int(os.stat(pdf_path).st_mtime_ns)
+    except OSError:
+        mtime = 0
+    key = (os.path.abspath(pdf_path), mtime)
+    doc = _worker_docs.get(key)
+    if doc is None:
+        doc = fitz.open(pdf_path)
+        _worker_docs[key] = doc
+        while len(_worker_docs) > _WORKER_MAX_OPEN_DOCS:
+            _, old = _worker_docs.popitem(last=False)
+            try:
+                old.close()
+            except Exception:
+                pass
+    else:
+        _worker_docs.move_to_end(key)
+    return doc
+
+
+def _render_chunk(pdf_path: str, page_indices: List[int], dpi: int, fmt: str = "png") -> List[Tuple[int, bytes]]:
+    """Render pages with this process's open copy of the document."""
+    import fitz  # PyMuPDF
+
+    doc = _worker_document(pdf_path)
+    zoom = dpi / 72.0
+    mat = fitz.Matrix(zoom, zoom)
+    out: List[Tuple[int, bytes]] = []
+    for idx in page_indices:
+        pix = doc.load_page(idx).get_pixmap(matrix=mat, alpha=False)
+        out.append((idx, pix.tobytes(fmt)))
+    return out
+
+
+_local_lock = threading.Lock()
+
+
+def with_page(pdf_path: str, page_index: int, fn: Callable[[Any], Any]) -> Any:
+    """Run fn(page) on this process's open copy of the document.
+
+    Calls are serialized: a PyMuPDF document must not be used from two
+    threads at once, and the small clip renders and text lookups made here
+    are cheap next to a vision request.
+    """
+    with _local_lock:
+        return fn(_worker_document(pdf_path).load_page(page_index))
+
+
+def render_clip(pdf_path: str, page_index: int, clip: Tuple[float, float, float, float], dpi: int, fmt: str = "png") -> bytes:
+    """Render a rectangle of one page (PDF points, top-left origin) at `dpi`."""
+    import fitz  # PyMuPDF
+
+    def _render(page) -> bytes:
+        zoom = dpi / 72.0
+        rect = fitz.Rect(*clip) & page.rect
+        return page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=rect, alpha=False).tobytes(fmt)
+
+    return with_page(pdf_path, page_index, _render)
+
+
+def _iter_serial(pdf_path: str, page_indices: List[int], dpi: int, fmt: str) -> Iterator[Tuple[int, bytes]]:
+    import fitz  # PyMuPDF
+
+    doc = fitz.open(pdf_path)
+    try:
+        zoom = dpi / 72.0
+        mat = fitz.Matrix(zoom, zoom)
+        for idx in page_indices:
+            pix = doc.load_page(idx).get_pixmap(matrix=mat, alpha=False)
+            yield idx, pix.tobytes(fmt)
+    finally:
+        doc.close()
+
+
+def _chunks(pages: List[int], size: int) -> List[List[int]]:
+    """Split sorted pages into runs of at most `size` consecutive indices."""
+    out: List[List[int]] = []
+    cur: List[int] = []
+    for p in pages:
+        if cur and (p != cur[-1] + 1 or len(cur) >= size):
+            out.append(cur)
+            cur = []
+        cur.append(p)
+    if cur:
+        out.append(cur)
+    return out
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)) or str(default))
+    except Exception:
+        return default
+
+
+class RasterEngine:
+    """Process pool of PyMuPDF workers; lazily started, shared by the process."""
+
+    def __init__(self, workers: Optional[int] = None, chunk_pages: Optional[int] = None, min_parallel_pages: Optional[int] = None):
+        self.workers = workers if workers is not None else _env_int("RASTER_WORKERS", min(4, os.cpu_count() or 1))
+        self.chunk_pages = max(1, chunk_pages if chunk_pages is not None else _env_int("RASTER_CHUNK_PAGES", 4))
+        self.min_parallel_pages = min_parallel_pages if min_parallel_pages is not None else _env_int("RASTER_PARALLEL_MIN_PAGES", 8)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> Optional[ProcessPoolExecutor]:
+        with self._lock:
+            if self._pool is None:
+                import multiprocessing
+                ctx = multiprocessing.get_context(os.getenv("RASTER_MP_START", "spawn"))
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx)
+            return self._pool
+
+    def iter_pages(self, pdf_path: str, page_indices: Iterable[int], dpi: int, fmt: str = "png") -> Iterator[Tuple[int, bytes]]:
+        """Yield (page_index, image bytes) in ascending page order.
+
+        All chunks are submitted before the first result is yielded, so the
+        pool keeps rendering while the caller consumes earlier pages.
+        """
+        pages = sorted(set(page_indices))
+        if not pages:
+            return iter(())
+        if self.workers <= 1 or len(pages) < self.min_parallel_pages:
+            return _iter_serial(pdf_path, pages, dpi, fmt)
+        try:
+            pool = self._get_pool()
+            futures = [(chunk, pool.submit(_render_chunk, pdf_path, chunk, dpi, fmt)) for chunk in _chunks(pages, self.chunk_pages)]
+        except Exception as e:
+            print(f"[raster] pool unavailable ({e}); rendering serially")
+            self.shutdown()
+            return _iter_serial(pdf_path, pages, dpi, fmt)
+        return self._collect(pdf_path, futures, dpi, fmt)
+
+    def _collect(self, pdf_path: str, futures: List[Tuple[List[int], Future]], dpi: int, fmt: str) -> Iterator[Tuple[int, bytes]]:
+        pending = list(futures)
+        try:
+            while pending:
+                chunk, fut = pending.pop(0)
+                try:
+                    rendered = fut.result()
+                except Exception as e:
+                    # Broken pool or worker error: finish this chunk and the rest in-process
+                    print(f"[raster] worker failed on pages {chunk[0]}-{chunk[-1]} ({e}); rendering serially")
+                    for _, other in pending:
+                        other.cancel()
+                    rest = chunk + [p for c, _ in pending for p in c]
+                    pending = []
+                    yield from _iter_serial(pdf_path, rest, dpi, fmt)
+                    return
+                yield from rendered
+        finally:
+            for _, fut in pending:
+                fut.cancel()
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+_engine: Optional[RasterEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_raster_engine() -> RasterEngine:
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = RasterEngine()
+        return _engine
+
+
+def iter_rasterized(pdf_path: str, page_indices: Iterable[int], dpi: int, fmt: str = "png") -> Iterator[Tuple[int, bytes]]:
+    """Stream (page_index, image) pairs in page order through the shared engine."""
+    return get_raster_engine().iter_pages(pdf_path, page_indices, dpi, fmt)
+
+
+@atexit.register
+def _shutdown_engine():
+    if _engine is not None:
+        _engine.shutdown()
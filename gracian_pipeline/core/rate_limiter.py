@@ -0,0 +1,360 @@
+"""
+Process-wide rate limiting and adaptive concurrency per LLM provider.
+
+Every vision/text call goes through `call_with_limits(provider, fn, tokens)`,
+so orchestrator agent threads, sectionizer batches and adapter calls share one
+budget per provider instead of pacing themselves with fixed sleeps:
+
+- a requests/min and a tokens/min token bucket (tokens are estimated up front
+  with `estimate_tokens()`; requests reserve capacity and wait out any debt),
+- an in-flight limit adjusted AIMD-style: +1/limit per success up to
+  <PROVIDER>_MAX_CONCURRENCY, halved on every 429,
+- 429/5xx responses, connection errors and timeouts retried with
+  exponential backoff and full jitter; a Retry-After (or retry-after-ms)
+  header pauses the whole provider for that long. Other 4xx responses and
+  any other exception (bugs, bad configuration, unparseable output) fail
+  immediately, and the caller always gets the original exception.
+- every request made inside `usage_scope(meter)` is charged to the meter
+  (estimated tokens and latency), e.g. a per-document coaching budget.
+
+`acall_with_limits(provider, afn, tokens)` is the asyncio twin: it shares the
+same limiter, so coroutines and threads draw from one budget, but waits for a
+slot, bucket capacity and backoff without blocking the event loop.
+
+Environment (PROVIDER = OPENAI | XAI | OPENROUTER | GEMINI):
+  <PROVIDER>_RPM=int               requests per minute, 0 = unlimited
+  <PROVIDER>_TPM=int               estimated tokens per minute, 0 = unlimited
+  <PROVIDER>_MAX_CONCURRENCY=int   ceiling for the adaptive in-flight limit (default 8)
+  LLM_MAX_ATTEMPTS=int             attempts per call (default 5)
+  LLM_BACKOFF_BASE_S=float         first backoff window (default 1.0)
+  LLM_BACKOFF_MAX_S=float          backoff cap (default 60)
+  LLM_IMAGE_TOKENS=int             token estimate per image (default 1000)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import itertools
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# provider -> (default rpm, default tpm)
+DEFAULT_LIMITS: Dict[str, tuple] = {
+    "openai": (500, 0),
+    "xai": (480, 0),
+    "openrouter": (200, 0),
+    "gemini": (150, 0),
+}
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)) or str(default))
+    except Exception:
+        return default
+
+
+class TokenBucket:
+    """Continuous-refill bucket; `reserve(n)` takes n now and returns how long to wait."""
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+
+    def reserve(self, n: float) -> float:
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= n
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class ProviderLimiter:
+    """Shared request/token budget and adaptive in-flight limit for one provider."""
+
+    def __init__(self, name: str, rpm: float = 0, tpm: float = 0, max_concurrency: int = 8, min_concurrency: int = 1):
+        self.name = name
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.limit = float(self.max_concurrency)
+        self.inflight = 0
+        self.paused_until = 0.0
+        self._cond = threading.Condition()
+        self._async_waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self.stats: Dict[str, int] = {"calls": 0, "throttled": 0, "retries": 0, "failures": 0}
+
+    def _slot_wait(self) -> Optional[float]:
+        """None when a slot is free now, else seconds until the pause ends (0 = until a release). Caller holds _cond."""
+        wait = self.paused_until - time.monotonic()
+        if wait <= 0 and self.inflight < int(self.limit):
+            return None
+        return max(0.0, wait)
+
+    def _take_slot(self, tokens: float) -> float:
+        """Claim a slot and reserve bucket capacity; returns the delay owed. Caller holds _cond."""
+        self.inflight += 1
+        self.stats["calls"] += 1
+        return max(self.requests.reserve(1), self.tokens.reserve(tokens))
+
+    def acquire(self, tokens: float = 0):
+        """Block until an in-flight slot is free and the buckets allow this request."""
+        with self._cond:
+            while True:
+                wait = self._slot_wait()
+                if wait is None:
+                    break
+                self._cond.wait(timeout=wait or None)
+            delay = self._take_slot(tokens)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self, tokens: float = 0):
+        """`acquire` for coroutines: parks on a future woken by `release` instead of blocking a thread."""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                wait = self._slot_wait()
+                if wait is None:
+                    delay = self._take_slot(tokens)
+                    break
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            try:
+                await asyncio.wait_for(waiter, timeout=wait or None)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                with self._cond:
+                    if (loop, waiter) in self._async_waiters:
+                        self._async_waiters.remove((loop, waiter))
+        if delay > 0:
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                self.cancel()
+                raise
+
+    def _wake_async_waiters(self):
+        """Wake coroutines parked in acquire_async (they re-check the slot themselves). Caller holds _cond."""
+        waiters, self._async_waiters = self._async_waiters, []
+        for loop, waiter in waiters:
+            try:
+                loop.call_soon_threadsafe(_resolve, waiter)
+            except RuntimeError:
+                pass  # loop already closed
+
+    def release(self, ok: bool = True, throttled: bool = False, retry_after: Optional[float] = None):
+        with self._cond:
+            self.inflight -= 1
+            if throttled:
+                self.stats["throttled"] += 1
+                self.limit = max(float(self.min_concurrency), self.limit / 2.0)
+                if retry_after:
+                    self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+            elif ok:
+                self.limit = min(float(self.max_concurrency), self.limit + 1.0 / self.limit)
+            else:
+                self.stats["failures"] += 1
+            self._cond.notify_all()
+            self._wake_async_waiters()
+
+    def cancel(self):
+        """Give back a slot whose request was cancelled; neither a success nor a failure."""
+        with self._cond:
+            self.inflight -= 1
+            self._cond.notify_all()
+            self._wake_async_waiters()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._cond:
+            return dict(self.stats, limit=round(self.limit, 2), inflight=self.inflight)
+
+
+def _resolve(waiter: asyncio.Future):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+_limiters: Dict[str, ProviderLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(provider: str) -> ProviderLimiter:
+    """Process-wide limiter for a provider, configured from env on first use."""
+    with _limiters_lock:
+        limiter = _limiters.get(provider)
+        if limiter is None:
+            rpm, tpm = DEFAULT_LIMITS.get(provider, (0, 0))
+            prefix = provider.upper()
+            limiter = ProviderLimiter(
+                provider,
+                rpm=_env_float(f"{prefix}_RPM", rpm),
+                tpm=_env_float(f"{prefix}_TPM", tpm),
+                max_concurrency=int(_env_float(f"{prefix}_MAX_CONCURRENCY", 8)),
+            )
+            _limiters[provider] = limiter
+        return limiter
+
+
+def limiter_stats() -> Dict[str, Dict[str, Any]]:
+    with _limiters_lock:
+        limiters = dict(_limiters)
+    return {name: lim.snapshot() for name, lim in limiters.items()}
+
+
+def estimate_tokens(*texts: str, images: int = 0, max_output: int = 0) -> int:
+    """Rough request size for the tokens/min bucket (~4 chars per token)."""
+    per_image = int(_env_float("LLM_IMAGE_TOKENS", 1000))
+    return sum(len(t or "") for t in texts) // 4 + images * per_image + max_output
+
+
+def _status_code(e: BaseException) -> Optional[int]:
+    code = getattr(e, "status_code", None)
+    if code is None:
+        code = getattr(getattr(e, "response", None), "status_code", None)
+    try:
+        return int(code) if code is not None else None
+    except Exception:
+        return None
+
+
+def retry_after_seconds(e: BaseException) -> Optional[float]:
+    """Retry-After / retry-after-ms from an SDK or requests error, if present."""
+    headers = getattr(getattr(e, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        ms = headers.get("retry-after-ms")
+        if ms:
+            return float(ms) / 1000.0
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except Exception:
+        return None
+
+
+def is_rate_limited(e: BaseException) -> bool:
+    return _status_code(e) == 429 or type(e).__name__ == "RateLimitError"
+
+
+# Transport failures of the SDKs we call, matched by class name so none of them
+# has to be importable: openai, httpx, requests, google-api-core.
+_TRANSIENT_ERRORS = {
+    "APIConnectionError", "APITimeoutError",               # openai
+    "TransportError", "TimeoutException",                  # httpx
+    "ConnectionError", "Timeout",                          # requests
+    "ServiceUnavailable", "DeadlineExceeded", "TooManyRequests", "InternalServerError",  # google-api-core
+}
+
+
+def is_retryable(e: BaseException) -> bool:
+    """429/5xx/408 responses, connection errors and timeouts; nothing else."""
+    code = _status_code(e)
+    if code is not None:
+        return code in (408, 429) or code >= 500
+    if isinstance(e, (ConnectionError, TimeoutError, asyncio.TimeoutError)):
+        return True
+    return any(cls.__name__ in _TRANSIENT_ERRORS for cls in type(e).__mro__)
+
+
+_usage_meter: contextvars.ContextVar[Optional[Any]] = contextvars.ContextVar("llm_usage_meter", default=None)
+
+
+@contextmanager
+def usage_scope(meter: Any):
+    """Charge requests made in this context (and contexts copied from it) to `meter.charge(tokens, seconds)`."""
+    token = _usage_meter.set(meter)
+    try:
+        yield meter
+    finally:
+        _usage_meter.reset(token)
+
+
+def call_with_limits(provider: str, fn: Callable[[], T], tokens: float = 0, label: Optional[str] = None,
+                     max_attempts: Optional[int] = None) -> T:
+    """Run `fn` under the provider's limiter, retrying transient failures with jittered backoff."""
+    limiter = get_limiter(provider)
+    attempts = max_attempts or max(1, int(_env_float("LLM_MAX_ATTEMPTS", 5)))
+    base = _env_float("LLM_BACKOFF_BASE_S", 1.0)
+    cap = _env_float("LLM_BACKOFF_MAX_S", 60.0)
+    for attempt in itertools.count():  # every attempt returns or raises
+        limiter.acquire(tokens)
+        meter = _usage_meter.get()
+        started = time.monotonic()
+        try:
+            out = fn()
+        except Exception as e:
+            if meter is not None:
+                meter.charge(tokens=tokens, seconds=time.monotonic() - started)
+            throttled = is_rate_limited(e)
+            retry_after = retry_after_seconds(e) if throttled else None
+            limiter.release(ok=False, throttled=throttled, retry_after=retry_after)
+            if not is_retryable(e):
+                raise
+            if attempt == attempts - 1:
+                print(f"[rate_limit] {label or provider}: giving up after {attempts} attempts: {e}")
+                raise
+            with limiter._cond:
+                limiter.stats["retries"] += 1
+            time.sleep(max(retry_after or 0.0, random.uniform(0, min(cap, base * (2 ** attempt)))))
+            continue
+        limiter.release(ok=True)
+        if meter is not None:
+            meter.charge(tokens=tokens, seconds=time.monotonic() - started)
+        return out
+
+
+async def acall_with_limits(provider: str, afn: Callable[[], Awaitable[T]], tokens: float = 0, label: Optional[str] = None,
+                            max_attempts: Optional[int] = None) -> T:
+    """`call_with_limits` for coroutines: awaits `afn()` under the same limiter, retries and usage metering."""
+    limiter = get_limiter(provider)
+    attempts = max_attempts or max(1, int(_env_float("LLM_MAX_ATTEMPTS", 5)))
+    base = _env_float("LLM_BACKOFF_BASE_S", 1.0)
+    cap = _env_float("LLM_BACKOFF_MAX_S", 60.0)
+    for attempt in itertools.count():  # every attempt returns or raises
+        await limiter.acquire_async(tokens)
+        meter = _usage_meter.get()
+        started = time.monotonic()
+        try:
+            out = await afn()
+        except asyncio.CancelledError:
+            limiter.cancel()
+            raise
+        except Exception as e:
+            if meter is not None:
+                meter.charge(tokens=tokens, seconds=time.monotonic() - started)
+            throttled = is_rate_limited(e)
+            retry_after = retry_after_seconds(e) if throttled else None
+            limiter.release(ok=False, throttled=throttled, retry_after=retry_after)
+            if not is_retryable(e):
+                raise
+            if attempt == attempts - 1:
+                print(f"[rate_limit] {label or provider}: giving up after {attempts} attempts: {e}")
+                raise
+            with limiter._cond:
+                limiter.stats["retries"] += 1
+            await asyncio.sleep(max(retry_after or 0.0, random.uniform(0, min(cap, base * (2 ** attempt)))))
+            continue
+        limiter.release(ok=True)
+        if meter is not None:
+            meter.charge(tokens=tokens, seconds=time.monotonic() - started)
+        return out
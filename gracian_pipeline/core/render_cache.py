@@ -0,0 +1,264 @@
+"""
+Per-document cache of rasterized PDF pages.
+
+The sectionizer, sectionizer coaching, agent coaching, global page pick and
+vision QC all rasterize overlapping page sets of the same PDF, often at the
+same DPI. Every render in the pipeline goes through `render_pages()`, which
+keys images by (page index, DPI, format) so a page is rasterized at most once
+per DPI while its document stays registered. Misses are rasterized by the
+multi-process engine in core/rasterizer.py and can be consumed as a stream
+(`iter_render_pages()`), in page order, while later pages still render.
+
+Memory is bounded (RENDER_CACHE_MAX_MB); least-recently-used images spill to
+a per-document temp directory instead of being dropped, and are promoted back
+on the next hit. Spill directories are removed when a document is evicted
+from the registry (RENDER_CACHE_DOCS) or at interpreter exit.
+
+Environment:
+  RENDER_CACHE=true|false         enable/disable (default true)
+  RENDER_CACHE_MAX_MB=int         in-memory budget per document (default 256)
+  RENDER_CACHE_DOCS=int           documents kept registered (default 4)
+  RENDER_CACHE_SPILL_DIR=path     parent for spill dirs (default system temp)
+"""
+
+from __future__ import annotations
+
+import atexit
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+RenderKey = Tuple[int, int, str]  # (page_index, dpi, fmt)
+
+
+def _rasterize(pdf_path: str, page_indices: List[int], dpi: int, fmt: str = "png") -> Iterator[Tuple[int, bytes]]:
+    """Stream (page, image) for in-range pages in page order via the raster engine."""
+    from .rasterizer import iter_rasterized
+    return iter_rasterized(pdf_path, page_indices, dpi, fmt)
+
+
+def _page_count(pdf_path: str) -> int:
+    import fitz  # PyMuPDF
+
+    doc = fitz.open(pdf_path)
+    try:
+        return doc.page_count
+    finally:
+        doc.close()
+
+
+class PageRenderCache:
+    """Rendered page images for one PDF, memory-bounded with spill-to-disk."""
+
+    def __init__(self, pdf_path: str, max_bytes: int = 256 * 1024 * 1024, spill_root: Optional[str] = None):
+        self.pdf_path = pdf_path
+        self.max_bytes = max_bytes
+        self._spill_root = spill_root
+        self._spill_dir: Optional[str] = None
+        self._mem: "OrderedDict[RenderKey, bytes]" = OrderedDict()
+        self._mem_bytes = 0
+        self._spilled: Dict[RenderKey, str] = {}
+        self._inflight: Dict[RenderKey, threading.Event] = {}
+        self._lock = threading.RLock()
+        self._page_count: Optional[int] = None
+        self.stats: Dict[str, int] = {"hits": 0, "disk_hits": 0, "rendered": 0, "spilled": 0}
+
+    @property
+    def page_count(self) -> int:
+        with self._lock:
+            if self._page_count is None:
+                self._page_count = _page_count(self.pdf_path)
+            return self._page_count
+
+    def _spill_path(self, key: RenderKey) -> str:
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.mkdtemp(prefix="gracian_render_", dir=self._spill_root)
+        page, dpi, fmt = key
+        return os.path.join(self._spill_dir, f"p{page:05d}_d{dpi}.{fmt}")
+
+    def _store(self, key: RenderKey, data: bytes):
+        self._mem[key] = data
+        self._mem.move_to_end(key)
+        self._mem_bytes += len(data)
+        while self._mem_bytes > self.max_bytes and len(self._mem) > 1:
+            old_key, old = self._mem.popitem(last=False)
+            self._mem_bytes -= len(old)
+            if old_key not in self._spilled:
+                path = self._spill_path(old_key)
+                with open(path, "wb") as f:
+                    f.write(old)
+                self._spilled[old_key] = path
+                self.stats["spilled"] += 1
+
+    def _lookup(self, key: RenderKey) -> Optional[bytes]:
+        data = self._mem.get(key)
+        if data is not None:
+            self._mem.move_to_end(key)
+            self.stats["hits"] += 1
+            return data
+        path = self._spilled.get(key)
+        if path is not None:
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+            except OSError:
+                self._spilled.pop(key, None)
+                return None
+            self.stats["disk_hits"] += 1
+            self._store(key, data)
+            return data
+        return None
+
+    def iter_render(self, page_indices: Iterable[int], dpi: int, fmt: str = "png") -> Iterator[Tuple[int, bytes]]:
+        """Yield (page, image) for the in-range pages in page order, rasterizing only misses.
+
+        Misses are claimed before rendering starts, so a concurrent request for
+        the same page waits for this render instead of rasterizing it again.
+        """
+        n = self.page_count
+        wanted = [i for i in sorted(set(page_indices)) if 0 <= i < n]
+        ready: Dict[int, bytes] = {}
+        waiting: Dict[int, threading.Event] = {}
+        mine: List[int] = []
+        with self._lock:
+            for i in wanted:
+                key = (i, dpi, fmt)
+                data = self._lookup(key)
+                if data is not None:
+                    ready[i] = data
+                elif key in self._inflight:
+                    waiting[i] = self._inflight[key]
+                else:
+                    self._inflight[key] = threading.Event()
+                    mine.append(i)
+        stream = _rasterize(self.pdf_path, mine, dpi, fmt) if mine else iter(())
+        done: set = set()
+        try:
+            for i in wanted:
+                if i in ready:
+                    yield i, ready.pop(i)
+                elif i in waiting:
+                    waiting[i].wait()
+                    with self._lock:
+                        data = self._lookup((i, dpi, fmt))
+                    if data is None:
+                        # The other render failed; do it here
+                        data = dict(_rasterize(self.pdf_path, [i], dpi, fmt))[i]
+                        with self._lock:
+                            self.stats["rendered"] += 1
+                            self._store((i, dpi, fmt), data)
+                    yield i, data
+                else:
+                    _, data = next(stream)  # engine yields exactly `mine`, in page order
+                    with self._lock:
+                        self.stats["rendered"] += 1
+                        self._store((i, dpi, fmt), data)
+                        ev = self._inflight.pop((i, dpi, fmt), None)
+                    done.add(i)
+                    if ev is not None:
+                        ev.set()
+                    yield i, data
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+            with self._lock:
+                for i in mine:
+                    if i not in done:
+                        ev = self._inflight.pop((i, dpi, fmt), None)
+                        if ev is not None:
+                            ev.set()
+
+    def render(self, page_indices: Iterable[int], dpi: int, fmt: str = "png") -> Dict[int, bytes]:
+        """Images for the in-range pages of `page_indices`, rasterizing only misses."""
+        return dict(self.iter_render(page_indices, dpi, fmt))
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.stats, mem_bytes=self._mem_bytes, mem_entries=len(self._mem), spilled_entries=len(self._spilled))
+
+    def close(self):
+        with self._lock:
+            self._mem.clear()
+            self._mem_bytes = 0
+            self._spilled.clear()
+            if self._spill_dir:
+                shutil.rmtree(self._spill_dir, ignore_errors=True)
+                self._spill_dir = None
+
+
+_registry: "OrderedDict[Tuple[str, int, int], PageRenderCache]" = OrderedDict()
+_registry_lock = threading.Lock()
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)) or str(default))
+    except Exception:
+        return default
+
+
+def get_render_cache(pdf_path: str) -> PageRenderCache:
+    """Registered cache for a PDF (by path, size and mtime); LRU over RENDER_CACHE_DOCS documents."""
+    st = os.stat(pdf_path)
+    key = (os.path.abspath(pdf_path), st.st_size, int(st.st_mtime_ns))
+    evicted: List[PageRenderCache] = []
+    with _registry_lock:
+        cache = _registry.get(key)
+        if cache is not None:
+            _registry.move_to_end(key)
+            return cache
+        cache = PageRenderCache(
+            pdf_path,
+            max_bytes=_env_int("RENDER_CACHE_MAX_MB", 256) * 1024 * 1024,
+            spill_root=os.getenv("RENDER_CACHE_SPILL_DIR") or None,
+        )
+        _registry[key] = cache
+        while len(_registry) > max(1, _env_int("RENDER_CACHE_DOCS", 4)):
+            evicted.append(_registry.popitem(last=False)[1])
+    for old in evicted:
+        old.close()
+    return cache
+
+
+def render_cache_stats(pdf_path: str) -> Dict[str, Any]:
+    """Counters for a registered document ({} if it has no cache)."""
+    try:
+        st = os.stat(pdf_path)
+    except OSError:
+        return {}
+    with _registry_lock:
+        cache = _registry.get((os.path.abspath(pdf_path), st.st_size, int(st.st_mtime_ns)))
+    return cache.snapshot() if cache is not None else {}
+
+
+def render_pages(pdf_path: str, page_indices: Iterable[int], dpi: int, fmt: str = "png") -> List[bytes]:
+    """Images for the in-range pages (sorted, deduplicated) through the render cache."""
+    return [data for _, data in iter_render_pages(pdf_path, page_indices, dpi, fmt)]
+
+
+def iter_render_pages(pdf_path: str, page_indices: Iterable[int], dpi: int, fmt: str = "png") -> Iterator[Tuple[int, bytes]]:
+    """Stream (page, image) in page order; later pages keep rendering while earlier ones are consumed."""
+    if os.getenv("RENDER_CACHE", "true").lower() != "true":
+        n = _page_count(pdf_path)
+        return _rasterize(pdf_path, [i for i in sorted(set(page_indices)) if 0 <= i < n], dpi, fmt)
+    return get_render_cache(pdf_path).iter_render(page_indices, dpi, fmt)
+
+
+def pdf_page_count(pdf_path: str) -> int:
+    """Page count via the registered cache (no extra open once known)."""
+    if os.getenv("RENDER_CACHE", "true").lower() != "true":
+        return _page_count(pdf_path)
+    return get_render_cache(pdf_path).page_count
+
+
+@atexit.register
+def _close_all():
+    with _registry_lock:
+        caches = list(_registry.values())
+        _registry.clear()
+    for c in caches:
+        c.close()
@@ -0,0 +1,294 @@
+"""
+Persistent cache of LLM responses.
+
+Every vision/text call goes through `cached_completion()` (or `cached_chat_completion()` for raw Chat
+Completions kwargs), which keys the answer on the model, the prompt, a SHA-256
+digest of each image and the request parameters that change the output, and
+serves repeats from a SQLite store. Only successful, non-empty answers are
+stored; failures are never cached, nor is an `UnparsedResponse` (the raw
+payload returned when no answer text could be extracted).
+
+Entries expire after LLM_CACHE_TTL_S and the store is kept under
+LLM_CACHE_MAX_MB by least-recently-used eviction. LLM_CACHE_BYPASS=true (or
+`bypass=True` per call) skips lookups but still records fresh answers, which
+is the way to refresh stale entries after a prompt-independent model change.
+`acached_completion()` / `acached_chat_completion()` are the asyncio
+equivalents; they share keys and the store with the sync wrappers.
+
+Environment:
+  LLM_CACHE=true|false            enable/disable (default true)
+  LLM_CACHE_PATH=path             SQLite file (default data/cache/llm_responses.db)
+  LLM_CACHE_TTL_S=int             entry lifetime in seconds, 0 = never expire (default 30 days)
+  LLM_CACHE_MAX_MB=int            size bound before LRU eviction (default 512)
+  LLM_CACHE_BYPASS=true|false     ignore cached answers, still store new ones (default false)
+"""
+
+import base64
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .llm_clients import provider_for_base_url
+from .rate_limiter import acall_with_limits, call_with_limits, estimate_tokens
+
+CACHE_FORMAT_VERSION = 1
+
+
+class UnparsedResponse(str):
+    """Raw provider payload returned when no answer text could be extracted; never cached."""
+
+
+def image_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def response_key(namespace: str, model: str, prompt: str, images: Iterable[bytes] = (), params: Optional[Dict[str, Any]] = None) -> str:
+    """Cache key over model + prompt + per-image digests + output-relevant params."""
+    material = {
+        "v": CACHE_FORMAT_VERSION,
+        "ns": namespace,
+        "model": model,
+        "prompt": hashlib.sha256(prompt.encode("utf-8")).hexdigest(),
+        "images": [image_digest(d) for d in images],
+        "params": params or {},
+    }
+    return hashlib.sha256(json.dumps(material, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """SQLite store of LLM responses with TTL and size-bounded LRU eviction."""
+
+    def __init__(self, db_path: str = "data/cache/llm_responses.db", ttl_s: int = 30 * 86400, max_bytes: int = 512 * 1024 * 1024):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_s = ttl_s
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.counters: Dict[str, int] = {"hits": 0, "misses": 0, "stores": 0, "expired": 0}
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(str(self.db_path), timeout=30)
+
+    def _init_db(self):
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    cache_key TEXT PRIMARY KEY,
+                    namespace TEXT,
+                    model TEXT,
+                    response TEXT,
+                    size_bytes INTEGER,
+                    created_at INTEGER,
+                    last_access INTEGER
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_access ON responses(last_access)")
+
+    def get(self, key: str) -> Optional[str]:
+        now = int(time.time())
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT response, created_at FROM responses WHERE cache_key = ?", (key,)).fetchone()
+            if row is None:
+                self.counters["misses"] += 1
+                return None
+            response, created_at = row
+            if self.ttl_s > 0 and now - int(created_at or 0) > self.ttl_s:
+                conn.execute("DELETE FROM responses WHERE cache_key = ?", (key,))
+                self.counters["expired"] += 1
+                self.counters["misses"] += 1
+                return None
+            conn.execute("UPDATE responses SET last_access = ? WHERE cache_key = ?", (now, key))
+            self.counters["hits"] += 1
+            return response
+
+    def put(self, key: str, response: str, namespace: str = "", model: str = ""):
+        now = int(time.time())
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (cache_key, namespace, model, response, size_bytes, created_at, last_access) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, namespace, model, response, len(response.encode("utf-8")), now, now)
+            )
+            self.counters["stores"] += 1
+        self.evict()
+
+    def purge_expired(self) -> int:
+        if self.ttl_s <= 0:
+            return 0
+        with self._lock, self._connect() as conn:
+            cur = conn.execute("DELETE FROM responses WHERE created_at < ?", (int(time.time()) - self.ttl_s,))
+            return cur.rowcount or 0
+
+    def evict(self, max_bytes: Optional[int] = None) -> int:
+        """Drop least-recently-used entries until the store fits; returns entries removed."""
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        removed = 0
+        with self._lock, self._connect() as conn:
+            total = int(conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM responses").fetchone()[0])
+            if total <= limit:
+                return 0
+            for key, size in conn.execute("SELECT cache_key, size_bytes FROM responses ORDER BY last_access ASC").fetchall():
+                if total <= limit:
+                    break
+                conn.execute("DELETE FROM responses WHERE cache_key = ?", (key,))
+                total -= size or 0
+                removed += 1
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._connect() as conn:
+            count, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM responses").fetchone()
+        return dict(self.counters, entries=count, bytes=size, max_bytes=self.max_bytes, path=str(self.db_path))
+
+
+_default_cache: Optional[ResponseCache] = None
+_default_lock = threading.Lock()
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)) or str(default))
+    except Exception:
+        return default
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Process-wide cache configured from env; None when LLM_CACHE=false."""
+    global _default_cache
+    if os.getenv("LLM_CACHE", "true").lower() != "true":
+        return None
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache(
+                os.getenv("LLM_CACHE_PATH", "data/cache/llm_responses.db"),
+                ttl_s=_env_int("LLM_CACHE_TTL_S", 30 * 86400),
+                max_bytes=_env_int("LLM_CACHE_MAX_MB", 512) * 1024 * 1024,
+            )
+        return _default_cache
+
+
+def _lookup(cache: ResponseCache, namespace: str, model: str, prompt: str, images: Iterable[bytes],
+            params: Optional[Dict[str, Any]], bypass: bool) -> Tuple[Optional[str], Optional[str]]:
+    """(key, cached answer); key is None when the request could not be keyed."""
+    bypass = bypass or os.getenv("LLM_CACHE_BYPASS", "false").lower() == "true"
+    key = None
+    try:
+        key = response_key(namespace, model, prompt, images, params)
+        if not bypass:
+            return key, cache.get(key)
+    except Exception as e:
+        print(f"[llm-cache] lookup failed: {e}")
+    return key, None
+
+
+def _store(cache: ResponseCache, key: Optional[str], out: Any, namespace: str, model: str):
+    if key is not None and isinstance(out, str) and not isinstance(out, UnparsedResponse) and out.strip():
+        try:
+            cache.put(key, out, namespace=namespace, model=model)
+        except Exception as e:
+            print(f"[llm-cache] store failed: {e}")
+
+
+def cached_completion(namespace: str, model: str, prompt: str, images: Iterable[bytes], call: Callable[[], str],
+                      params: Optional[Dict[str, Any]] = None, bypass: bool = False) -> str:
+    """Return the cached answer for this request, or run `call()` and store its result."""
+    cache = get_response_cache()
+    if cache is None:
+        return call()
+    key, hit = _lookup(cache, namespace, model, prompt, list(images), params, bypass)
+    if hit is not None:
+        return hit
+    out = call()
+    _store(cache, key, out, namespace, model)
+    return out
+
+
+async def acached_completion(namespace: str, model: str, prompt: str, images: Iterable[bytes],
+                             call: Callable[[], Awaitable[str]], params: Optional[Dict[str, Any]] = None,
+                             bypass: bool = False) -> str:
+    """`cached_completion` for coroutines; SQLite reads/writes run off the event loop."""
+    import asyncio
+
+    cache = get_response_cache()
+    if cache is None:
+        return await call()
+    key, hit = await asyncio.to_thread(_lookup, cache, namespace, model, prompt, list(images), params, bypass)
+    if hit is not None:
+        return hit
+    out = await call()
+    await asyncio.to_thread(_store, cache, key, out, namespace, model)
+    return out
+
+
+def _split_messages(messages: Any):
+    """Messages with inline data-URL images replaced by digests, plus the decoded images."""
+    images = []
+    normalized = []
+    for msg in messages or []:
+        content = msg.get("content")
+        if isinstance(content, list):
+            parts = []
+            for part in content:
+                image_url = part.get("image_url") if isinstance(part, dict) and part.get("type") == "image_url" else None
+                url = (image_url or {}).get("url")
+                if isinstance(url, str) and url.startswith("data:") and "," in url:
+                    images.append(base64.b64decode(url.split(",", 1)[1]))
+                    # keep options such as "detail"; the bytes are keyed by digest
+                    opts = {k: v for k, v in image_url.items() if k != "url"}
+                    parts.append({"type": "image_url", "image": len(images) - 1, **opts})
+                else:
+                    parts.append(part)
+            msg = dict(msg, content=parts)
+        normalized.append(msg)
+    return normalized, images
+
+
+def _chat_request(client: Any, namespace: str, kwargs: Dict[str, Any]) -> Tuple[str, List[bytes], Dict[str, Any], Dict[str, Any]]:
+    """(cache prompt, images, cache params, limiter kwargs) for a Chat Completions request."""
+    messages, images = _split_messages(kwargs.get("messages"))
+    params = {k: v for k, v in kwargs.items() if k not in ("model", "messages")}
+    params["base_url"] = str(getattr(client, "base_url", "") or "")
+    prompt = json.dumps(messages, sort_keys=True, ensure_ascii=False, default=str)
+    max_out = kwargs.get("max_tokens") or kwargs.get("max_completion_tokens") or 0
+    limits = {
+        "provider": provider_for_base_url(params["base_url"].rstrip("/") or None),
+        "tokens": estimate_tokens(prompt, images=len(images), max_output=int(max_out)),
+        "label": f"{namespace} ({kwargs.get('model', '')})",
+    }
+    return prompt, images, params, limits
+
+
+def cached_chat_completion(client: Any, namespace: str = "chat", bypass: bool = False, **kwargs) -> str:
+    """`client.chat.completions.create(**kwargs)` message text, through the response cache.
+
+    Misses go through the provider's rate limiter (with its retries).
+    """
+    prompt, images, params, limits = _chat_request(client, namespace, kwargs)
+
+    def _once() -> str:
+        resp = client.chat.completions.create(**kwargs)
+        return resp.choices[0].message.content or ""
+
+    def _call() -> str:
+        return call_with_limits(fn=_once, **limits)
+
+    return cached_completion(namespace, str(kwargs.get("model", "")), prompt, images, _call, params=params, bypass=bypass)
+
+
+async def acached_chat_completion(client: Any, namespace: str = "chat", bypass: bool = False, **kwargs) -> str:
+    """`cached_chat_completion` for an `AsyncOpenAI` client."""
+    prompt, images, params, limits = _chat_request(client, namespace, kwargs)
+
+    async def _once() -> str:
+        resp = await client.chat.completions.create(**kwargs)
+        return resp.choices[0].message.content or ""
+
+    async def _call() -> str:
+        return await acall_with_limits(afn=_once, **limits)
+
+    return await acached_completion(namespace, str(kwargs.get("model", "")), prompt, images, _call, params=params, bypass=bypass)
@@ -0,0 +1,328 @@
+"""
+Streaming result sinks for corpus runs.
+
+Sinks take one record at a time:
+
+  jsonl     append-only `<name>.jsonl`, one {"key", "written_at", "data"} line
+            per document. Lines are flushed as they are written and fsynced
+            every RESULT_SINK_FSYNC_EVERY records / RESULT_SINK_FSYNC_S seconds.
+            A torn last line after a crash is skipped by readers.
+  parquet   flattened per-field table (doc, agent, field, value, number) written
+            as row groups of RESULT_PARQUET_ROWS rows into `<name>_fields/part-*.parquet`
+            (optional, needs pyarrow) so analytics can query extracted fields
+            without loading raw agent outputs.
+
+Re-running a document appends a newer record; `compact()` keeps the latest
+record per key (JSONL rewritten atomically, Parquet parts merged into one).
+
+Environment:
+  RESULT_SINKS=jsonl[,parquet]     (default jsonl)
+  RESULT_SINK_FSYNC_EVERY=int      records between fsyncs (default 100)
+  RESULT_SINK_FSYNC_S=float        max seconds between fsyncs (default 5)
+  RESULT_PARQUET_ROWS=int          buffered field rows per row group (default 50000)
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)) or str(default))
+    except Exception:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)) or str(default))
+    except Exception:
+        return default
+
+
+def _walk(prefix: str, value: Any) -> Iterator[Tuple[str, Any]]:
+    if isinstance(value, dict) and value:
+        for k, v in value.items():
+            yield from _walk(f"{prefix}.{k}" if prefix else str(k), v)
+    else:
+        yield prefix, value
+
+
+def flatten_fields(doc: str, results: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """One row per extracted field: nested dicts become dotted field names, lists stay JSON."""
+    rows: List[Dict[str, Any]] = []
+    for agent_id, data in (results or {}).items():
+        if agent_id.startswith("_") or not isinstance(data, dict):
+            continue
+        for field, value in _walk("", data):
+            number = float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+            rows.append({
+                "doc": doc,
+                "agent": agent_id,
+                "field": field,
+                "value": json.dumps(value, ensure_ascii=False),
+                "number": number,
+            })
+    return rows
+
+
+def iter_jsonl(path: Path) -> Iterator[Dict[str, Any]]:
+    """Records from a JSONL sink file, skipping a torn or corrupt line."""
+    if not Path(path).exists():
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+class ResultSink:
+    """Append one record per key; subclasses decide the on-disk format."""
+
+    def write(self, key: str, record: Dict[str, Any]):
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+    def compact(self, drop_keys: Optional[Set[str]] = None) -> Dict[str, int]:
+        return {}
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class JsonlSink(ResultSink):
+    def __init__(self, path: str, reset: bool = False, fsync_every: Optional[int] = None,
+                 fsync_interval_s: Optional[float] = None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.fsync_every = max(1, fsync_every or _env_int("RESULT_SINK_FSYNC_EVERY", 100))
+        self.fsync_interval_s = fsync_interval_s if fsync_interval_s is not None else _env_float("RESULT_SINK_FSYNC_S", 5.0)
+        self._lock = threading.Lock()
+        self._f = open(self.path, "w" if reset else "a", encoding="utf-8")
+        if not reset and self._f.tell() > 0:
+            with open(self.path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    self._f.write("\n")  # terminate a line torn by a crash so the next record stays readable
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self.fsyncs = 0
+
+    def write(self, key: str, record: Dict[str, Any]):
+        line = json.dumps({"key": key, "written_at": time.time(), "data": record}, ensure_ascii=False)
+        with self._lock:
+            self._f.write(line + "\n")
+            self._f.flush()
+            self._unsynced += 1
+            if self._unsynced >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval_s:
+                self._sync()
+
+    def _sync(self):
+        os.fsync(self._f.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self.fsyncs += 1
+
+    def flush(self):
+        with self._lock:
+            if not self._f.closed:
+                self._f.flush()
+                if self._unsynced:
+                    self._sync()
+
+    def compact(self, drop_keys: Optional[Set[str]] = None) -> Dict[str, int]:
+        """Rewrite the file keeping only the latest record per key (none for keys in drop_keys)."""
+        with self._lock:
+            was_open = not self._f.closed
+            if was_open:
+                self._f.flush()
+            latest: Dict[str, int] = {}
+            lines = 0
+            with open(self.path, "rb") as f:
+                offset = 0
+                for raw in f:
+                    try:
+                        latest[json.loads(raw)["key"]] = offset
+                        lines += 1
+                    except (ValueError, KeyError, TypeError):
+                        pass
+                    offset += len(raw)
+            removed = 0
+            for key in drop_keys or ():
+                if latest.pop(key, None) is not None:
+                    removed += 1
+            keep = set(latest.values())
+            tmp = self.path.with_name(f".{self.path.name}.compact")
+            with open(self.path, "rb") as src, open(tmp, "wb") as dst:
+                offset = 0
+                for raw in src:
+                    if offset in keep:
+                        dst.write(raw if raw.endswith(b"\n") else raw + b"\n")
+                    offset += len(raw)
+                dst.flush()
+                os.fsync(dst.fileno())
+            self._f.close()
+            os.replace(tmp, self.path)
+            if was_open:
+                self._f = open(self.path, "a", encoding="utf-8")
+            self._unsynced = 0
+        stats = {"kept": len(latest), "dropped": lines - len(latest) - removed}
+        if drop_keys:
+            stats["removed"] = removed
+        return stats
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._f.close()
+
+
+class ParquetFieldSink(ResultSink):
+    """Flattened per-field rows in Parquet row groups; one part file per sink session."""
+
+    def __init__(self, directory: str, reset: bool = False, batch_rows: Optional[int] = None):
+        import pyarrow as pa  # optional dependency
+
+        self.dir = Path(directory)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        if reset:
+            for part in self.dir.glob("part-*.parquet"):
+                part.unlink()
+        self.schema = pa.schema([
+            ("doc", pa.string()),
+            ("agent", pa.string()),
+            ("field", pa.string()),
+            ("value", pa.string()),
+            ("number", pa.float64()),
+        ])
+        self.batch_rows = max(1, batch_rows or _env_int("RESULT_PARQUET_ROWS", 50000))
+        self._lock = threading.Lock()
+        self._rows: List[Dict[str, Any]] = []
+        self._writer = None
+        self.part_path = self._new_part_path()
+        self.row_groups = 0
+
+    def _new_part_path(self) -> Path:
+        return self.dir / f"part-{time.time_ns():020d}-{os.getpid()}.parquet"
+
+    def parts(self) -> List[Path]:
+        return sorted(self.dir.glob("part-*.parquet"))
+
+    def write(self, key: str, record: Dict[str, Any]):
+        with self._lock:
+            self._rows.extend(flatten_fields(key, record))
+            if len(self._rows) >= self.batch_rows:
+                self._write_rows()
+
+    def _write_rows(self):
+        if not self._rows:
+            return
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(str(self.part_path), self.schema)
+        self._writer.write_table(pa.Table.from_pylist(self._rows, schema=self.schema))
+        self._rows = []
+        self.row_groups += 1
+
+    def flush(self):
+        with self._lock:
+            self._write_rows()
+
+    def close(self):
+        with self._lock:
+            self._write_rows()
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+                self.part_path = self._new_part_path()
+
+    def compact(self, drop_keys: Optional[Set[str]] = None) -> Dict[str, int]:
+        """Merge all parts into one, keeping each document's rows from its newest part."""
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+
+        self.close()
+        parts = self.parts()
+        if len(parts) < 2 and not drop_keys:
+            return {"parts": len(parts), "dropped": 0}
+        newest: Dict[str, int] = {}
+        for i, part in enumerate(parts):
+            for doc in pq.read_table(str(part), columns=["doc"]).column("doc").unique().to_pylist():
+                newest[doc] = i
+        for doc in drop_keys or ():
+            newest.pop(doc, None)
+        out = self._new_part_path()
+        tmp = out.with_name(f".{out.name}.compact")
+        dropped = 0
+        with pq.ParquetWriter(str(tmp), self.schema) as writer:
+            for i, part in enumerate(parts):
+                pf = pq.ParquetFile(str(part))
+                keep = pa.array([d for d, j in newest.items() if j == i], type=pa.string())
+                for g in range(pf.num_row_groups):
+                    table = pf.read_row_group(g)
+                    kept = table.filter(pc.is_in(table.column("doc"), value_set=keep))
+                    dropped += table.num_rows - kept.num_rows
+                    if kept.num_rows:
+                        writer.write_table(kept)
+        os.replace(tmp, out)
+        for part in parts:
+            part.unlink()
+        return {"parts": len(parts), "dropped": dropped}
+
+
+class MultiSink(ResultSink):
+    def __init__(self, sinks: List[ResultSink]):
+        self.sinks = sinks
+
+    def write(self, key: str, record: Dict[str, Any]):
+        for sink in self.sinks:
+            sink.write(key, record)
+
+    def flush(self):
+        for sink in self.sinks:
+            sink.flush()
+
+    def compact(self, drop_keys: Optional[Set[str]] = None) -> Dict[str, int]:
+        stats: Dict[str, int] = {}
+        for sink in self.sinks:
+            for k, v in sink.compact(drop_keys).items():
+                stats[f"{type(sink).__name__}.{k}"] = v
+        return stats
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+
+def open_result_sink(out_dir: str, name: str = "results", kinds: Optional[str] = None, reset: bool = False) -> MultiSink:
+    """Sinks selected by RESULT_SINKS under out_dir; Parquet is skipped when pyarrow is missing."""
+    kinds = kinds if kinds is not None else os.getenv("RESULT_SINKS", "jsonl")
+    wanted = {k.strip().lower() for k in kinds.split(",") if k.strip()}
+    sinks: List[ResultSink] = []
+    if "jsonl" in wanted:
+        sinks.append(JsonlSink(str(Path(out_dir) / f"{name}.jsonl"), reset=reset))
+    if "parquet" in wanted:
+        try:
+            sinks.append(ParquetFieldSink(str(Path(out_dir) / f"{name}_fields"), reset=reset))
+        except ImportError:
+            print("[sink] pyarrow not installed; skipping the Parquet field table")
+    return MultiSink(sinks)
@@ -0,0 +1,167 @@
+"""
+Run manifest for resumable corpus extraction.
+
+A small SQLite database with one row per document: status (pending / running /
+done / failed), attempts, timings, the per-document output file and the last
+error. Each finished document is written atomically (temp file + fsync +
+rename) to its own JSON file; `--resume` skips documents already done and
+retries failed or interrupted ones. Combined outputs are rebuilt by streaming
+over the per-document files.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+
+def write_json_atomic(path: Path, obj: Any, indent: Optional[int] = 2):
+    """Write JSON via temp file + fsync + rename so readers never see a partial file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp{os.getpid()}.{threading.get_ident()}")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, indent=indent, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def write_json_object_stream(path: Path, items: Iterable[Tuple[str, Any]]):
+    """Write {key: value, ...} from an iterator, holding one value in memory at a time."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp{os.getpid()}")
+    count = 0
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write("{")
+        for key, value in items:
+            f.write(",\n  " if count else "\n  ")
+            f.write(f"{json.dumps(key, ensure_ascii=False)}: {json.dumps(value, ensure_ascii=False)}")
+            count += 1
+        f.write("\n}\n" if count else "}\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return count
+
+
+class RunManifest:
+    """Per-document status, timings and output paths for a corpus run."""
+
+    def __init__(self, run_dir: str):
+        self.run_dir = Path(run_dir)
+        self.docs_dir = self.run_dir / "documents"
+        self.docs_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.run_dir / "run_manifest.db"
+        self._lock = threading.Lock()
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(str(self.db_path), timeout=30)
+
+    def _init_db(self):
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS documents (
+                    pdf_path TEXT PRIMARY KEY,
+                    status TEXT,
+                    attempts INTEGER DEFAULT 0,
+                    started_at REAL,
+                    finished_at REAL,
+                    elapsed_s REAL,
+                    output_path TEXT,
+                    error TEXT,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS runs (
+                    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    completed_at TIMESTAMP,
+                    total_docs INTEGER,
+                    resumed INTEGER,
+                    done INTEGER,
+                    failed INTEGER
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_documents_status ON documents(status)")
+
+    def output_path_for(self, pdf_path: str) -> Path:
+        digest = hashlib.sha1(pdf_path.encode("utf-8")).hexdigest()[:10]
+        return self.docs_dir / f"{Path(pdf_path).stem}.{digest}.json"
+
+    def start_run(self, pdf_paths: List[str], resume: bool = False) -> int:
+        """Register documents and open a run record; a fresh (non-resume) run forgets earlier documents."""
+        with self._lock, self._connect() as conn:
+            if not resume:
+                conn.execute("DELETE FROM documents")
+            conn.executemany("INSERT OR IGNORE INTO documents (pdf_path, status) VALUES (?, 'pending')", [(p,) for p in pdf_paths])
+            cur = conn.execute("INSERT INTO runs (total_docs, resumed) VALUES (?, ?)", (len(pdf_paths), int(resume)))
+            return int(cur.lastrowid)
+
+    def finish_run(self, run_id: int, done: int, failed: int):
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "UPDATE runs SET completed_at = CURRENT_TIMESTAMP, done = ?, failed = ? WHERE run_id = ?",
+                (done, failed, run_id),
+            )
+
+    def completed(self) -> Set[str]:
+        """Documents whose result file exists (done and not deleted since)."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT pdf_path, output_path FROM documents WHERE status = 'done'").fetchall()
+        return {p for p, out in rows if out and os.path.exists(out)}
+
+    def mark_running(self, pdf_path: str):
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "UPDATE documents SET status = 'running', attempts = attempts + 1, started_at = ?, error = NULL, "
+                "updated_at = CURRENT_TIMESTAMP WHERE pdf_path = ?",
+                (time.time(), pdf_path),
+            )
+
+    def mark_done(self, pdf_path: str, results: Dict[str, Any], elapsed_s: float) -> Path:
+        """Write the document's results atomically, then record it as done."""
+        out = self.output_path_for(pdf_path)
+        write_json_atomic(out, {"pdf_path": pdf_path, "results": results})
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "UPDATE documents SET status = 'done', finished_at = ?, elapsed_s = ?, output_path = ?, error = NULL, "
+                "updated_at = CURRENT_TIMESTAMP WHERE pdf_path = ?",
+                (time.time(), elapsed_s, str(out), pdf_path),
+            )
+        return out
+
+    def mark_failed(self, pdf_path: str, error: str, elapsed_s: float):
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "UPDATE documents SET status = 'failed', finished_at = ?, elapsed_s = ?, error = ?, "
+                "updated_at = CURRENT_TIMESTAMP WHERE pdf_path = ?",
+                (time.time(), elapsed_s, error[:2000], pdf_path),
+            )
+
+    def status_counts(self) -> Dict[str, int]:
+        with self._connect() as conn:
+            return {status: n for status, n in conn.execute("SELECT status, COUNT(*) FROM documents GROUP BY status")}
+
+    def iter_results(self, include_failed: bool = True) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """(pdf_path, results) per document, loading one result file at a time."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT pdf_path, status, output_path, error FROM documents WHERE status IN ('done', 'failed') ORDER BY pdf_path"
+            ).fetchall()
+        for pdf_path, status, output_path, error in rows:
+            if status == "done":
+                try:
+                    with open(output_path, "r", encoding="utf-8") as f:
+                        yield pdf_path, json.load(f).get("results", {})
+                except (OSError, ValueError) as e:
+                    print(f"[manifest] unreadable result for {pdf_path}: {e}")
+            elif include_failed:
+                yield pdf_path, {"_error": error or "failed"}
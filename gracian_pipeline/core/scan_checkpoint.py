@@ -0,0 +1,248 @@
+"""
+Checkpoint store for the mass PDF scanner.
+
+Keeps the set of scanned paths in memory, one SQLite connection in WAL mode,
+and pending result rows that are written in one transaction every
+`batch_files` files or `batch_seconds` seconds, whichever comes first. After a
+crash only the last uncommitted batch is scanned again.
+
+Each row carries the file's fingerprint (size, mtime_ns and an optional
+sha256) so an incremental scan can tell a replaced report from an unchanged
+one, and the `scan_dirs` table keeps the directory listings used by
+`corpus_walk.walk_pdfs()`. Older databases are migrated in place. Pass
+`before_commit` (e.g. the JSONL sink's flush) so a committed checkpoint row
+never gets ahead of the per-file result it stands for.
+
+Environment:
+  SCAN_COMMIT_FILES=int        files per checkpoint transaction (default 500)
+  SCAN_COMMIT_SECONDS=float    longest time between transactions (default 5)
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, KeysView, List, NamedTuple, Optional, Tuple
+
+from .corpus_walk import DirCache
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)) or str(default))
+    except Exception:
+        return default
+
+
+class Fingerprint(NamedTuple):
+    size: Optional[int]
+    mtime_ns: Optional[int]
+    content_hash: Optional[str] = None
+
+    def same_stat(self, size: int, mtime_ns: int) -> bool:
+        return self.size == size and self.mtime_ns == mtime_ns
+
+
+class FileState(NamedTuple):
+    category: Optional[str]
+    fingerprint: Fingerprint
+
+
+_FINGERPRINT_COLUMNS = (("file_size", "INTEGER"), ("file_mtime_ns", "INTEGER"), ("content_hash", "TEXT"))
+
+
+class CheckpointStore:
+    """scanned_files / scan_sessions tables behind one connection, with batched writes."""
+
+    def __init__(self, db_path: str, batch_files: Optional[int] = None, batch_seconds: Optional[float] = None,
+                 before_commit: Optional[Callable[[], None]] = None):
+        self.db_path = db_path
+        self.batch_files = max(1, batch_files if batch_files is not None else int(_env_float("SCAN_COMMIT_FILES", 500)))
+        self.batch_seconds = batch_seconds if batch_seconds is not None else _env_float("SCAN_COMMIT_SECONDS", 5.0)
+        self.before_commit = before_commit
+        self.commits = 0
+        self._pending: List[Tuple[Any, ...]] = []
+        self._touched: Dict[str, Fingerprint] = {}
+        self._last_commit = time.monotonic()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._init_db()
+        self.files: Dict[str, FileState] = {
+            row[0]: FileState(row[1], Fingerprint(*row[2:]))
+            for row in self._conn.execute(
+                "SELECT filepath, category, file_size, file_mtime_ns, content_hash FROM scanned_files")
+        }
+
+    @property
+    def scanned(self) -> KeysView[str]:
+        return self.files.keys()
+
+    def _init_db(self):
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS scanned_files (
+                filepath TEXT PRIMARY KEY,
+                category TEXT,
+                size_mb REAL,
+                pages INTEGER,
+                avg_chars_per_page REAL,
+                scanned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                file_size INTEGER,
+                file_mtime_ns INTEGER,
+                content_hash TEXT
+            )
+        """)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(scanned_files)")}
+        for name, kind in _FINGERPRINT_COLUMNS:
+            if name not in columns:
+                self._conn.execute(f"ALTER TABLE scanned_files ADD COLUMN {name} {kind}")
+        # Topology lookups by content hash (pdf_topology.TopologyStore)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_scanned_files_hash ON scanned_files (content_hash)")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS scan_sessions (
+                session_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                completed_at TIMESTAMP,
+                total_files INTEGER,
+                document_type TEXT
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS scan_dirs (
+                dirpath TEXT PRIMARY KEY,
+                mtime_ns INTEGER,
+                entries TEXT
+            )
+        """)
+        self._conn.commit()
+
+    def __contains__(self, filepath: str) -> bool:
+        return filepath in self.files
+
+    def fingerprint(self, filepath: str) -> Optional[Fingerprint]:
+        state = self.files.get(filepath)
+        return state.fingerprint if state is not None else None
+
+    def add(self, filepath: str, result: Dict[str, Any], fingerprint: Optional[Fingerprint] = None):
+        """Record a file's result; written with the next batch."""
+        fp = fingerprint or Fingerprint(None, None)
+        with self._lock:
+            self.files[filepath] = FileState(result['category'], fp)
+            self._touched.pop(filepath, None)
+            self._pending.append((filepath, result['category'], result['size_mb'], result['pages'],
+                                  result['avg_chars_per_page'], fp.size, fp.mtime_ns, fp.content_hash))
+        self._maybe_flush()
+
+    def touch(self, filepath: str, fingerprint: Fingerprint):
+        """Update the fingerprint of a scanned file whose result still holds (e.g. same content hash)."""
+        with self._lock:
+            state = self.files.get(filepath)
+            if state is None:
+                return
+            self.files[filepath] = FileState(state.category, fingerprint)
+            self._touched[filepath] = fingerprint
+        self._maybe_flush()
+
+    def purge(self, paths: Iterable[str]) -> int:
+        """Remove files (e.g. deleted from the corpus); committed immediately."""
+        self.flush()
+        with self._lock:
+            gone = [p for p in paths if self.files.pop(p, None) is not None]
+            if gone:
+                with self._conn:
+                    self._conn.executemany("DELETE FROM scanned_files WHERE filepath = ?", [(p,) for p in gone])
+                self.commits += 1
+        return len(gone)
+
+    def _maybe_flush(self):
+        with self._lock:
+            due = (len(self._pending) + len(self._touched) >= self.batch_files
+                   or time.monotonic() - self._last_commit >= self.batch_seconds)
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Write pending rows in one transaction."""
+        with self._lock:
+            rows, self._pending = self._pending, []
+            touched, self._touched = self._touched, {}
+            self._last_commit = time.monotonic()
+            if not rows and not touched:
+                return
+            if self.before_commit is not None:
+                self.before_commit()
+            with self._conn:
+                self._conn.executemany("""
+                    INSERT OR REPLACE INTO scanned_files
+                    (filepath, category, size_mb, pages, avg_chars_per_page, file_size, file_mtime_ns, content_hash)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """, rows)
+                self._conn.executemany(
+                    "UPDATE scanned_files SET file_size = ?, file_mtime_ns = ?, content_hash = ? WHERE filepath = ?",
+                    [(fp.size, fp.mtime_ns, fp.content_hash, p) for p, fp in touched.items()])
+            self.commits += 1
+
+    def start_session(self, total_files: int, document_type: str) -> int:
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                "INSERT INTO scan_sessions (total_files, document_type) VALUES (?, ?)", (total_files, document_type))
+            return int(cur.lastrowid)
+
+    def finish_session(self, session_id: int):
+        self.flush()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE scan_sessions SET completed_at = CURRENT_TIMESTAMP WHERE session_id = ?", (session_id,))
+
+    def paths_under(self, root: str) -> List[str]:
+        """Scanned paths inside the directory `root`."""
+        prefix = os.path.join(root, "")
+        with self._lock:
+            return [p for p in self.files if p.startswith(prefix)]
+
+    def dir_cache(self, root: str) -> DirCache:
+        """Cached directory listings at and below `root`."""
+        prefix = os.path.join(root, "")
+        with self._lock:
+            rows = self._conn.execute("SELECT dirpath, mtime_ns, entries FROM scan_dirs").fetchall()
+        cache: DirCache = {}
+        for dirpath, mtime_ns, entries in rows:
+            if dirpath == root or dirpath.startswith(prefix):
+                listing = json.loads(entries)
+                cache[dirpath] = (mtime_ns, listing["dirs"], listing["files"])
+        return cache
+
+    def save_dir_cache(self, root: str, dirs: DirCache):
+        """Replace the cached listings at and below `root` (directories gone from `dirs` are dropped)."""
+        prefix = os.path.join(root, "")
+        with self._lock, self._conn:
+            stale = [(d,) for (d,) in self._conn.execute("SELECT dirpath FROM scan_dirs")
+                     if (d == root or d.startswith(prefix)) and d not in dirs]
+            self._conn.executemany("DELETE FROM scan_dirs WHERE dirpath = ?", stale)
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO scan_dirs (dirpath, mtime_ns, entries) VALUES (?, ?, ?)",
+                [(d, mtime, json.dumps({"dirs": subdirs, "files": names}, ensure_ascii=False))
+                 for d, (mtime, subdirs, names) in dirs.items()])
+
+    def category_counts(self) -> Dict[str, int]:
+        """Committed files per category."""
+        with self._lock:
+            return {row[0]: row[1] for row in self._conn.execute(
+                "SELECT category, COUNT(*) FROM scanned_files GROUP BY category")}
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            with self._lock:
+                self._conn.close()
+
+    def __enter__(self) -> "CheckpointStore":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,171 @@
+"""
+Corpus-level document scheduler.
+
+Puts every discovered PDF on a priority work queue and runs N documents
+concurrently in worker threads. All documents draw on the per-provider budgets
+in core/rate_limiter.py.
+
+Priority:
+  pages     largest documents first
+  topology  scanned, then hybrid, then machine-readable, largest first within a class
+  fifo      discovery order
+
+The first SIGINT/SIGTERM stops handing out new documents and lets in-flight
+ones finish; a second one interrupts immediately.
+
+Environment:
+  RUN_WORKERS=int                 concurrent documents (default 1)
+  RUN_PRIORITY=pages|topology|fifo   (default pages)
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import queue
+import signal
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+TOPOLOGY_ORDER = {"scanned": 0, "hybrid": 1, "machine_readable": 2}
+
+
+@dataclass(order=True)
+class DocumentJob:
+    sort_key: tuple
+    seq: int
+    pdf_path: str = field(compare=False)
+    pages: int = field(default=0, compare=False)
+    topology: str = field(default="unknown", compare=False)
+
+
+def load_topology(path: Optional[str]) -> Dict[str, Dict[str, Any]]:
+    """filename -> topology record from an analyze_pdf_topology.py report ({} if unavailable)."""
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception as e:
+        print(f"[scheduler] could not read topology file {path}: {e}")
+        return {}
+    out: Dict[str, Dict[str, Any]] = {}
+    for category, items in (data.get("results") or {}).items():
+        for item in items or []:
+            name = item.get("filename") or Path(item.get("path", "")).name
+            if name:
+                out[name] = dict(item, category=item.get("category", category))
+    return out
+
+
+def _page_count(pdf_path: str) -> int:
+    try:
+        import fitz  # PyMuPDF
+
+        doc = fitz.open(pdf_path)
+        try:
+            return doc.page_count
+        finally:
+            doc.close()
+    except Exception:
+        return 0
+
+
+def plan_jobs(pdfs: Iterable[str], priority: str = "pages", topology: Optional[Dict[str, Dict[str, Any]]] = None) -> List[DocumentJob]:
+    """Jobs for every PDF, sorted by the scheduling priority."""
+    topology = topology or {}
+    jobs: List[DocumentJob] = []
+    for seq, pdf in enumerate(pdfs):
+        pdf = str(pdf)
+        topo = topology.get(Path(pdf).name, {})
+        category = topo.get("category", "unknown")
+        pages = 0
+        if priority in ("pages", "topology"):
+            pages = int(topo.get("pages") or 0) or _page_count(pdf)
+        if priority == "pages":
+            key = (-pages, seq)
+        elif priority == "topology":
+            key = (TOPOLOGY_ORDER.get(category, 1), -pages, seq)
+        else:
+            key = (seq,)
+        jobs.append(DocumentJob(sort_key=key, seq=seq, pdf_path=pdf, pages=pages, topology=category))
+    jobs.sort()
+    return jobs
+
+
+class BatchScheduler:
+    """Runs `worker(job)` over a priority queue of documents with N concurrent workers."""
+
+    def __init__(self, worker: Callable[[DocumentJob], Any], workers: int = 1,
+                 on_result: Optional[Callable[[DocumentJob, Any, Optional[BaseException], float], None]] = None):
+        self.worker = worker
+        self.workers = max(1, workers)
+        self.on_result = on_result
+        self.stop = threading.Event()
+        self.stats: Dict[str, int] = {"done": 0, "failed": 0, "skipped": 0}
+        self._lock = threading.Lock()
+
+    def request_stop(self):
+        self.stop.set()
+
+    def _install_signals(self):
+        if threading.current_thread() is not threading.main_thread():
+            return {}
+        previous = {}
+
+        def _handler(signum, frame):
+            if self.stop.is_set():
+                raise KeyboardInterrupt
+            print("\n[scheduler] stop requested: finishing in-flight documents (repeat to abort)")
+            self.stop.set()
+
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                previous[sig] = signal.signal(sig, _handler)
+            except (ValueError, OSError):
+                pass
+        return previous
+
+    def _run_worker(self, work: "queue.PriorityQueue[DocumentJob]", total: int):
+        while not self.stop.is_set():
+            try:
+                job = work.get_nowait()
+            except queue.Empty:
+                return
+            t0 = time.time()
+            result, error = None, None
+            try:
+                result = self.worker(job)
+            except Exception as e:
+                error = e
+                print(f"[scheduler] {job.pdf_path} failed: {e}")
+            elapsed = time.time() - t0
+            with self._lock:
+                self.stats["failed" if error else "done"] += 1
+                finished = self.stats["done"] + self.stats["failed"]
+            print(f"[scheduler] {finished}/{total} {Path(job.pdf_path).name} in {elapsed:.1f}s ({'failed' if error else 'ok'})")
+            if self.on_result is not None:
+                with self._lock:
+                    self.on_result(job, result, error, elapsed)
+
+    def run(self, jobs: List[DocumentJob]) -> Dict[str, int]:
+        work: "queue.PriorityQueue[DocumentJob]" = queue.PriorityQueue()
+        for job in jobs:
+            work.put(job)
+        previous = self._install_signals()
+        threads = [threading.Thread(target=self._run_worker, args=(work, len(jobs)), name=f"doc-worker-{i}", daemon=True)
+                   for i in range(min(self.workers, max(1, len(jobs))))]
+        try:
+            for t in threads:
+                t.start()
+            while any(t.is_alive() for t in threads):
+                for t in threads:
+                    t.join(timeout=0.5)
+        finally:
+            for sig, handler in previous.items():
+                signal.signal(sig, handler)
+        self.stats["skipped"] = work.qsize()
+        return dict(self.stats)
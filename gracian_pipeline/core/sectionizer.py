@@ -1,7 +1,12 @@
 from __future__ import annotations
 
+import os
 import re
-from typing import Dict, List, Tuple, Set
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple, Set
+
+from .anchor_matcher import AnchorHit, get_automaton
 
 
 # Anchor keywords per agent (Swedish + common variants)
@@ -46,28 +51,147 @@ def _normalize_text(t: str) -> str:
     return re.sub(r"\s+", " ", t.lower()).strip()
 
 
-def _scan_pages_for_anchors(pdf_path: str) -> Dict[int, Set[str]]:
-    """Return mapping page_index -> matched agent_ids (by text anchors)."""
-    import fitz  # PyMuPDF
+class PageIndex:
+    """Per-PDF text/anchor index, built with a single pass over the document.
 
-    page_hits: Dict[int, Set[str]] = {}
-    doc = fitz.open(pdf_path)
-    try:
-        for i, page in enumerate(doc):
-            txt = _normalize_text(page.get_text("text") or "")
-            hits: Set[str] = set()
+    Holds raw and normalized page text, the ToC, per-page agent hits and an
+    inverted anchor -> pages index, so sectionizing and per-agent page
+    selection are dictionary lookups instead of re-reading the PDF.
+    """
+
+    def __init__(self, pdf_path: str, page_texts: List[str], toc: Optional[List[Tuple[int, str, int]]] = None):
+        self.pdf_path = pdf_path
+        self.page_texts = page_texts
+        self.page_count = len(page_texts)
+        self.normalized = [_normalize_text(t) for t in page_texts]
+        self.toc = toc or []
+        self.anchor_pages: Dict[str, List[int]] = {}
+        self.page_hits: Dict[int, Set[str]] = {}
+        self.anchor_hits: Dict[int, List[AnchorHit]] = {}  # page -> hits with offsets into normalized text
+        automaton = get_automaton(AGENT_ANCHORS)
+        for i, txt in enumerate(self.normalized):
             if not txt:
                 continue
-            for agent_id, anchors in AGENT_ANCHORS.items():
-                for a in anchors:
-                    if a in txt:
-                        hits.add(agent_id)
-                        break
-            if hits:
-                page_hits[i] = hits
-    finally:
-        doc.close()
-    return page_hits
+            hits = automaton.scan(txt)
+            if not hits:
+                continue
+            self.anchor_hits[i] = hits
+            self.page_hits[i] = {h.agent_id for h in hits}
+            for h in hits:
+                pages = self.anchor_pages.setdefault(h.anchor, [])
+                if not pages or pages[-1] != i:
+                    pages.append(i)
+        self._pages_by_agent: Optional[Dict[str, List[int]]] = None
+
+    @classmethod
+    def build(cls, pdf_path: str) -> "PageIndex":
+        """Open the PDF once and read every page's text plus the ToC."""
+        import fitz  # PyMuPDF
+
+        doc = fitz.open(pdf_path)
+        try:
+            try:
+                toc = doc.get_toc(simple=True)  # list of (level, title, page)
+            except Exception:
+                toc = []
+            texts = [page.get_text("text") or "" for page in doc]
+        finally:
+            doc.close()
+        return cls(pdf_path, texts, toc)
+
+    def pages_by_agent(self) -> Dict[str, List[int]]:
+        """ToC + anchor sectionization expanded ±1 page; computed once."""
+        if self._pages_by_agent is None:
+            pages_for_agent: Dict[str, Set[int]] = {k: set() for k in AGENT_ANCHORS}
+            # 1) ToC/bookmark titles mapped to agents by anchor keywords
+            automaton = get_automaton(AGENT_ANCHORS)
+            for entry in self.toc:
+                try:
+                    level, title, page1 = entry[:3]
+                except Exception:
+                    continue
+                page_idx = max(0, (page1 or 1) - 1)
+                for agent_id in automaton.agents_in(_normalize_text(title or "")):
+                    pages_for_agent[agent_id].add(page_idx)
+            # 2) Anchor hits per page
+            for idx, agents in self.page_hits.items():
+                for agent_id in agents:
+                    pages_for_agent[agent_id].add(idx)
+            # 3) Expand a bit around hits (±1 page) to capture spreads
+            n = self.page_count
+            for agent_id, s in pages_for_agent.items():
+                expanded: Set[int] = set()
+                for p in s:
+                    expanded.add(p)
+                    if p - 1 >= 0:
+                        expanded.add(p - 1)
+                    if n and p + 1 < n:
+                        expanded.add(p + 1)
+                pages_for_agent[agent_id] = expanded or s
+            self._pages_by_agent = {k: sorted(v) for k, v in pages_for_agent.items() if v}
+        return self._pages_by_agent
+
+    def pages_for_agent(self, agent_id: str) -> List[int]:
+        return list(self.pages_by_agent().get(agent_id, []))
+
+    def pages_for_anchor(self, anchor: str) -> List[int]:
+        return list(self.anchor_pages.get(anchor, []))
+
+    def first_hit_offset(self, page_idx: int, agent_id: str) -> Optional[int]:
+        """Earliest anchor offset for `agent_id` on a page (small = near the heading)."""
+        offsets = [h.offset for h in self.anchor_hits.get(page_idx, []) if h.agent_id == agent_id]
+        return min(offsets) if offsets else None
+
+    def pages_containing(self, terms: Iterable[str]) -> List[int]:
+        """Pages whose lowercased raw text contains any of `terms`."""
+        terms = [t.lower() for t in terms]
+        return [i for i, txt in enumerate(self.page_texts) if any(t in txt.lower() for t in terms)]
+
+    def text_for_pages(self, page_indices: Iterable[int]) -> str:
+        parts = [self.page_texts[i] for i in page_indices if 0 <= i < self.page_count]
+        return "\n\n".join(parts)
+
+    def full_text(self) -> str:
+        return "\n\n".join(self.page_texts)
+
+    def low_text_pages(self, min_chars: int = 500) -> int:
+        return sum(1 for t in self.page_texts if len(t) < min_chars)
+
+
+_index_cache: "OrderedDict[Tuple[str, int, int], PageIndex]" = OrderedDict()
+_index_lock = threading.Lock()
+
+
+def get_page_index(pdf_path: str) -> PageIndex:
+    """Memoized PageIndex per (path, size, mtime); an empty index if the PDF can't be read."""
+    try:
+        st = os.stat(pdf_path)
+        key = (os.path.abspath(pdf_path), st.st_size, int(st.st_mtime_ns))
+    except OSError:
+        return PageIndex(pdf_path, [])
+    with _index_lock:
+        idx = _index_cache.get(key)
+        if idx is not None:
+            _index_cache.move_to_end(key)
+            return idx
+    try:
+        idx = PageIndex.build(pdf_path)
+    except Exception:
+        return PageIndex(pdf_path, [])
+    try:
+        max_docs = int(os.getenv("PAGE_INDEX_CACHE_DOCS", "8") or "8")
+    except Exception:
+        max_docs = 8
+    with _index_lock:
+        _index_cache[key] = idx
+        while len(_index_cache) > max(1, max_docs):
+            _index_cache.popitem(last=False)
+    return idx
+
+
+def _scan_pages_for_anchors(pdf_path: str) -> Dict[int, Set[str]]:
+    """Return mapping page_index -> matched agent_ids (by text anchors)."""
+    return {i: set(hits) for i, hits in get_page_index(pdf_path).page_hits.items()}
 
 
 def _group_consecutive(pages: List[int]) -> List[Tuple[int, int]]:
@@ -88,63 +212,15 @@ def _group_consecutive(pages: List[int]) -> List[Tuple[int, int]]:
     return ranges
 
 
-def sectionize_pdf(pdf_path: str) -> Dict[str, List[int]]:
+def sectionize_pdf(pdf_path: str, index: Optional[PageIndex] = None) -> Dict[str, List[int]]:
     """Best-effort sectionization using ToC if present, else anchor scan.
     Returns mapping agent_id -> list of page indices likely relevant.
     """
-    pages_for_agent: Dict[str, Set[int]] = {k: set() for k in AGENT_ANCHORS}
-
-    # 1) Try TOC/bookmarks first
-    try:
-        import fitz
-        doc = fitz.open(pdf_path)
-        toc = doc.get_toc(simple=True)  # list of (level, title, page)
-        if toc:
-            # Map toc titles to agents by anchor keywords
-            for level, title, page1 in toc:
-                t = _normalize_text(title)
-                page_idx = max(0, (page1 or 1) - 1)
-                for agent_id, anchors in AGENT_ANCHORS.items():
-                    for a in anchors:
-                        if a in t:
-                            pages_for_agent[agent_id].add(page_idx)
-                            break
-        doc.close()
-    except Exception:
-        pass
+    index = index or get_page_index(pdf_path)
+    return {k: list(v) for k, v in index.pages_by_agent().items()}
 
-    # 2) Anchor scan per page (adds to pages_for_agent)
-    try:
-        per_page = _scan_pages_for_anchors(pdf_path)
-        for idx, agents in per_page.items():
-            for agent_id in agents:
-                pages_for_agent[agent_id].add(idx)
-    except Exception:
-        pass
 
-    # 3) Expand a bit around hits (±1 page) to capture spreads
-    try:
-        import fitz
-        doc = fitz.open(pdf_path)
-        n = doc.page_count
-        doc.close()
-    except Exception:
-        n = 0
-    for agent_id, s in pages_for_agent.items():
-        expanded: Set[int] = set()
-        for p in s:
-            expanded.add(p)
-            if p - 1 >= 0:
-                expanded.add(p - 1)
-            if n and p + 1 < n:
-                expanded.add(p + 1)
-        pages_for_agent[agent_id] = expanded or s
-
-    # Final: dedupe and sort
-    return {k: sorted(v) for k, v in pages_for_agent.items() if v}
-
-
-def select_pages_for_agent(pdf_path: str, agent_id: str) -> List[int]:
+def select_pages_for_agent(pdf_path: str, agent_id: str, index: Optional[PageIndex] = None) -> List[int]:
     """Helper to get page indices for a single agent."""
-    mp = sectionize_pdf(pdf_path)
-    return mp.get(agent_id, [])
+    index = index or get_page_index(pdf_path)
+    return index.pages_for_agent(agent_id)
@@ -0,0 +1,199 @@
+"""
+Table regions of interest for vision extraction.
+
+With VISION_ROI=true, `vision_qc_agent` sends a page that has a table region
+as two images instead of one full render at QC_PAGE_RENDER_DPI:
+
+- a ROI_CONTEXT_DPI thumbnail of the whole page, so the model still sees
+  where the table sits and which section it belongs to,
+- a ROI_DPI crop of the table region, so small digits are read at a higher
+  resolution than the full page could afford.
+
+Table boxes come from the cached Docling conversion of the document (only
+looked up, never converted here) and otherwise from PyMuPDF's table finder.
+When a page has several tables, those whose text (or the heading just above
+them) matches the agent's anchors are kept; otherwise all of them. The region
+is their union, padded and extended upwards to include the heading. Pages
+without tables, or whose region covers most of the page anyway, are sent as
+full renders.
+
+Environment:
+  VISION_ROI=true|false           enable region crops (default false)
+  ROI_DPI=int                     DPI of the region crop (default 300)
+  ROI_CONTEXT_DPI=int             DPI of the full-page context thumbnail (default 50)
+  ROI_MAX_AREA=float              page share above which the full page is sent (default 0.6)
+  ROI_PYMUPDF_TABLES=true|false   fall back to PyMuPDF table detection (default true)
+"""
+
+from __future__ import annotations
+
+import os
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from .docling_cache import get_docling_cache
+from .rasterizer import render_clip, with_page
+from .render_cache import pdf_page_count
+from .sectionizer import AGENT_ANCHORS, get_automaton, _normalize_text
+
+PAD_PT = 8.0          # padding around the region, in PDF points
+HEADING_PT = 60.0     # space above a table searched for (and kept as) its heading
+
+Box = Tuple[float, float, float, float]
+
+
+class Region(NamedTuple):
+    """Table region on a 0-based page, in PDF points with a top-left origin."""
+
+    page: int
+    x0: float
+    y0: float
+    x1: float
+    y1: float
+    page_width: float
+    page_height: float
+    source: str  # "docling" | "pymupdf"
+
+    @property
+    def box(self) -> Box:
+        return (self.x0, self.y0, self.x1, self.y1)
+
+    @property
+    def area_share(self) -> float:
+        return (self.x1 - self.x0) * (self.y1 - self.y0) / max(1.0, self.page_width * self.page_height)
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)) or str(default))
+    except Exception:
+        return default
+
+
+def roi_enabled() -> bool:
+    return os.getenv("VISION_ROI", "false").lower() == "true"
+
+
+def roi_dpi() -> int:
+    return int(_env_float("ROI_DPI", 300))
+
+
+def context_dpi() -> int:
+    return int(_env_float("ROI_CONTEXT_DPI", 50))
+
+
+def docling_table_boxes(tables: List[Dict[str, Any]]) -> Dict[int, List[Tuple[float, float, float, float, str]]]:
+    """0-based page -> [(l, t, r, b, coord_origin)] from Docling table model_dumps."""
+    boxes: Dict[int, List[Tuple[float, float, float, float, str]]] = {}
+    for table in tables or []:
+        for prov in table.get("prov") or []:
+            bbox = prov.get("bbox") or {}
+            try:
+                page = int(prov["page_no"]) - 1
+                box = (float(bbox["l"]), float(bbox["t"]), float(bbox["r"]), float(bbox["b"]))
+            except (KeyError, TypeError, ValueError):
+                continue
+            boxes.setdefault(page, []).append(box + (str(bbox.get("coord_origin", "BOTTOMLEFT")).upper(),))
+    return boxes
+
+
+def _to_top_left(box: Tuple[float, float, float, float, str], page_height: float) -> Box:
+    l, t, r, b, origin = box
+    if origin.endswith("BOTTOMLEFT"):
+        t, b = page_height - t, page_height - b
+    return (min(l, r), min(t, b), max(l, r), max(t, b))
+
+
+def _union(boxes: Iterable[Box]) -> Box:
+    boxes = list(boxes)
+    return (min(b[0] for b in boxes), min(b[1] for b in boxes), max(b[2] for b in boxes), max(b[3] for b in boxes))
+
+
+def select_region(page: int, tables: List[Tuple[Box, str]], page_size: Tuple[float, float],
+                  agent_ids: Iterable[str] = (), source: str = "pymupdf", max_area: Optional[float] = None) -> Optional[Region]:
+    """Region for an agent from the page's (table box, table + heading text); None means send the full page."""
+    if not tables:
+        return None
+    width, height = page_size
+    wanted = set(agent_ids)
+    automaton = get_automaton(AGENT_ANCHORS)
+    matched = [box for box, text in tables if wanted & automaton.agents_in(_normalize_text(text))]
+    x0, y0, x1, y1 = _union(matched or [box for box, _ in tables])
+    region = Region(page, max(0.0, x0 - PAD_PT), max(0.0, y0 - PAD_PT - HEADING_PT),
+                    min(width, x1 + PAD_PT), min(height, y1 + PAD_PT), width, height, source)
+    limit = _env_float("ROI_MAX_AREA", 0.6) if max_area is None else max_area
+    if region.x1 <= region.x0 or region.y1 <= region.y0 or region.area_share > limit:
+        return None
+    return region
+
+
+def _page_tables(page: Any, docling_boxes: List[Tuple[float, float, float, float, str]], use_pymupdf: bool) -> Tuple[List[Tuple[Box, str]], Tuple[float, float], str]:
+    """(table boxes with their text and heading, page size, source) for an open PyMuPDF page."""
+    width, height = float(page.rect.width), float(page.rect.height)
+    boxes = [_to_top_left(b, height) for b in docling_boxes]
+    source = "docling"
+    if not boxes and use_pymupdf and hasattr(page, "find_tables"):
+        source = "pymupdf"
+        try:
+            boxes = [tuple(t.bbox) for t in page.find_tables().tables]
+        except Exception:
+            boxes = []
+    tables = []
+    for x0, y0, x1, y1 in boxes:
+        text = page.get_text("text", clip=(x0, max(0.0, y0 - HEADING_PT), x1, y1)) or ""
+        tables.append(((x0, y0, x1, y1), text))
+    return tables, (width, height), source
+
+
+@lru_cache(maxsize=256)
+def _region(pdf_path: str, mtime: int, page: int, agents: Tuple[str, ...]) -> Optional[Region]:
+    # Keyed by mtime so a rewritten file is looked up again
+    boxes: Dict[int, List[Tuple[float, float, float, float, str]]] = {}
+    cache = get_docling_cache()
+    if cache is not None:
+        artifact = _cached_artifact(cache, pdf_path, mtime)
+        if artifact is not None:
+            boxes = docling_table_boxes(artifact.tables)
+    use_pymupdf = os.getenv("ROI_PYMUPDF_TABLES", "true").lower() == "true"
+    tables, size, source = with_page(pdf_path, page, lambda p: _page_tables(p, boxes.get(page, []), use_pymupdf))
+    return select_region(page, tables, size, agents, source)
+
+
+@lru_cache(maxsize=8)
+def _cached_artifact(cache: Any, pdf_path: str, mtime: int):
+    try:
+        return cache.find(pdf_path)
+    except Exception as e:
+        print(f"[roi] docling cache lookup failed for {pdf_path}: {e}")
+        return None
+
+
+def table_regions(pdf_path: str, pages: Iterable[int], agent_id: Optional[str] = None) -> Dict[int, Region]:
+    """page -> table region for the pages that have one ("a+b" agent ids match any of the agents)."""
+    try:
+        mtime = int(os.stat(pdf_path).st_mtime_ns)
+        n = pdf_page_count(str(pdf_path))
+    except Exception:
+        return {}
+    agents = tuple(sorted(a for a in (agent_id or "").split("+") if a))
+    regions: Dict[int, Region] = {}
+    for p in sorted(p for p in set(pages) if 0 <= p < n):
+        try:
+            region = _region(str(pdf_path), mtime, p, agents)
+        except Exception as e:  # PyMuPDF missing or a broken page
+            print(f"[roi] no region for page {p + 1} of {pdf_path}: {e}")
+            continue
+        if region is not None:
+            regions[p] = region
+    return regions
+
+
+@lru_cache(maxsize=32)
+def render_region(pdf_path: str, region: Region, dpi: int) -> bytes:
+    """PNG of the region at `dpi` (memoized: coaching rounds resend the same crops)."""
+    return render_clip(pdf_path, region.page, region.box, dpi)
+
+
+def pixel_count(width_pt: float, height_pt: float, dpi: int) -> int:
+    zoom = dpi / 72.0
+    return int(round(width_pt * zoom) * round(height_pt * zoom))
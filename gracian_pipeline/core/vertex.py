@@ -7,7 +7,10 @@ from typing import List, Dict, Any
 
 from google.oauth2 import service_account
 from google.auth.transport.requests import Request
-import requests
+
+from .image_encoding import image_mime
+from .llm_clients import http_session
+from .rate_limiter import call_with_limits, estimate_tokens
 
 
 def _load_sa_credentials(path: str):
@@ -22,6 +25,16 @@ def _vertex_endpoint(model: str, project: str, location: str) -> str:
     return f"https://{location}-aiplatform.googleapis.com/v1/projects/{project}/locations/{location}/publishers/google/models/{model}:generateContent"
 
 
+def _post(url: str, headers: Dict[str, str], payload: Dict[str, Any], timeout: int) -> str:
+    r = http_session().post(url, headers=headers, json=payload, timeout=timeout)
+    r.raise_for_status()
+    out = r.json()
+    try:
+        return out["candidates"][0]["content"]["parts"][0]["text"]
+    except Exception:
+        return json.dumps(out)
+
+
 def vertex_generate_text(sa_path: str, project: str, location: str, model: str, prompt: str, content: str, timeout: int = 90) -> str:
     creds = _load_sa_credentials(sa_path)
     url = _vertex_endpoint(model, project, location)
@@ -37,13 +50,7 @@ def vertex_generate_text(sa_path: str, project: str, location: str, model: str,
             }
         ]
     }
-    r = requests.post(url, headers=headers, json=payload, timeout=timeout)
-    r.raise_for_status()
-    out = r.json()
-    try:
-        return out["candidates"][0]["content"]["parts"][0]["text"]
-    except Exception:
-        return json.dumps(out)
+    return call_with_limits("gemini", lambda: _post(url, headers, payload, timeout), tokens=estimate_tokens(prompt, content), label="Vertex text")
 
 
 def vertex_generate_vision(sa_path: str, project: str, location: str, model: str, prompt: str, images_png: List[bytes], timeout: int = 90) -> str:
@@ -52,13 +59,8 @@ def vertex_generate_vision(sa_path: str, project: str, location: str, model: str
     headers = {"Authorization": f"Bearer {creds.token}", "Content-Type": "application/json"}
     parts: List[Dict[str, Any]] = [{"text": prompt}]
     for data in images_png:
-        parts.append({"inlineData": {"mimeType": "image/png", "data": base64.b64encode(data).decode("utf-8")}})
+        parts.append({"inlineData": {"mimeType": image_mime(data), "data": base64.b64encode(data).decode("utf-8")}})
     payload = {"contents": [{"role": "user", "parts": parts}]}
-    r = requests.post(url, headers=headers, json=payload, timeout=timeout)
-    r.raise_for_status()
-    out = r.json()
-    try:
-        return out["candidates"][0]["content"]["parts"][0]["text"]
-    except Exception:
-        return json.dumps(out)
+    tokens = estimate_tokens(prompt, images=len(images_png))
+    return call_with_limits("gemini", lambda: _post(url, headers, payload, timeout), tokens=tokens, label="Vertex vision")
 
@@ -1,57 +1,28 @@
+import asyncio
 import base64
 import io
 import os
 from typing import List, Dict, Any, Tuple
 from .vertex import vertex_generate_vision
-from openai import OpenAI
+from .llm_clients import get_client, http_session, get_async_client, async_http_client
 from .bench import score_output
-import time
-
-
-def _b64_png(data: bytes) -> str:
-    return base64.b64encode(data).decode("utf-8")
+from .render_cache import render_pages, pdf_page_count
+from .response_cache import UnparsedResponse, cached_chat_completion, cached_completion, acached_chat_completion, acached_completion
+from .rate_limiter import call_with_limits, acall_with_limits, estimate_tokens
+from .image_encoding import encode_images, image_data_url, image_mime, sum_payloads
+from .table_regions import context_dpi, pixel_count, render_region, roi_dpi, roi_enabled, table_regions
 
 
 def render_pdf_pages(pdf_path: str, max_pages: int = 2, dpi: int = 200) -> List[bytes]:
-    """Render first N pages of a PDF to PNG bytes using PyMuPDF (fitz)."""
-    import fitz  # PyMuPDF
-
-    doc = fitz.open(pdf_path)
-    images: List[bytes] = []
-    try:
-        for i, page in enumerate(doc):
-            if i >= max_pages:
-                break
-            # scale factor for DPI: 72 dpi base, so zoom = dpi/72
-            zoom = dpi / 72.0
-            mat = fitz.Matrix(zoom, zoom)
-            pix = page.get_pixmap(matrix=mat, alpha=False)
-            images.append(pix.tobytes("png"))
-    finally:
-        doc.close()
-    return images
+    """Render first N pages of a PDF to PNG bytes using PyMuPDF (fitz), via the render cache."""
+    return render_pages(pdf_path, range(max(0, max_pages)), dpi)
 
 
 def render_pdf_pages_subset(pdf_path: str, page_indices: List[int], dpi: int = 200) -> List[bytes]:
-    """Render specific pages (0-based indices) to PNG bytes using PyMuPDF.
+    """Render specific pages (0-based indices) to PNG bytes using PyMuPDF, via the render cache.
     Pages out of bounds are ignored.
     """
-    import fitz  # PyMuPDF
-
-    doc = fitz.open(pdf_path)
-    images: List[bytes] = []
-    try:
-        for idx in sorted(set(page_indices)):
-            if idx < 0 or idx >= doc.page_count:
-                continue
-            zoom = dpi / 72.0
-            mat = fitz.Matrix(zoom, zoom)
-            page = doc.load_page(idx)
-            pix = page.get_pixmap(matrix=mat, alpha=False)
-            images.append(pix.tobytes("png"))
-    finally:
-        doc.close()
-    return images
+    return render_pages(pdf_path, page_indices, dpi)
 
 
 def json_guard(text: str, default: Dict[str, Any] | None = None) -> Dict[str, Any]:
@@ -85,42 +56,39 @@ def json_guard(text: str, default: Dict[str, Any] | None = None) -> Dict[str, An
     return {} if default is None else default
 
 
-def call_grok_vision(prompt: str, images_png: List[bytes]) -> str:
-    """Call xAI Grok (OpenAI-compatible) with image(s) and prompt; return text content."""
-    from openai import OpenAI
-
-    client = OpenAI(
-        api_key=os.getenv("XAI_API_KEY"),
-        base_url="https://api.x.ai/v1",
-    )
-    model = os.getenv("XAI_MODEL", "grok-4-fast-reasoning-latest")
-
-    # Build message with embedded data URLs
-    user_parts = [{"type": "text", "text": prompt}]
+def _chat_image_parts(prompt: str, images_png: List[bytes]) -> List[Dict[str, Any]]:
+    user_parts: List[Dict[str, Any]] = [{"type": "text", "text": prompt}]
     for data in images_png:
-        b64 = _b64_png(data)
         user_parts.append(
             {
                 "type": "image_url",
-                "image_url": {"url": f"data:image/png;base64,{b64}"},
+                "image_url": {"url": image_data_url(data)},
             }
         )
+    return user_parts
 
-    resp = client.chat.completions.create(
-        model=model,
-        messages=[
+
+def _extraction_chat_kwargs(model: str, prompt: str, images_png: List[bytes]) -> Dict[str, Any]:
+    """Chat Completions request used by the Grok and Qwen extraction calls."""
+    return {
+        "model": model,
+        "messages": [
             {"role": "system", "content": "You extract data from BRF tables. Return minified JSON only."},
-            {"role": "user", "content": user_parts},
+            {"role": "user", "content": _chat_image_parts(prompt, images_png)},
         ],
-        max_tokens=1200,
-    )
-    return resp.choices[0].message.content
+        "max_tokens": 1200,
+    }
 
 
-def call_gemini_vision(prompt: str, images_png: List[bytes]) -> str:
-    """Call Gemini 2.5 Pro via REST with inline images; return text content. Retries on transient errors."""
-    import requests, time
+def call_grok_vision(prompt: str, images_png: List[bytes]) -> str:
+    """Call xAI Grok (OpenAI-compatible) with image(s) and prompt; return text content."""
+    client = get_client("xai")
+    model = os.getenv("XAI_MODEL", "grok-4-fast-reasoning-latest")
+    return cached_chat_completion(client, namespace="grok_vision", **_extraction_chat_kwargs(model, prompt, images_png))
+
 
+def _gemini_request(prompt: str, images_png: List[bytes]) -> Tuple[str, str, Dict[str, Any]]:
+    """(model, url, payload) for a Gemini generateContent call with inline images."""
     api_key = os.getenv("GEMINI_API_KEY")
     if not api_key:
         raise RuntimeError("GEMINI_API_KEY not set")
@@ -133,65 +101,55 @@ def call_gemini_vision(prompt: str, images_png: List[bytes]) -> str:
         parts.append(
             {
                 "inline_data": {
-                    "mime_type": "image/png",
-                    "data": _b64_png(data),
+                    "mime_type": image_mime(data),
+                    "data": base64.b64encode(data).decode("utf-8"),
                 }
             }
         )
 
-    payload = {"contents": [{"role": "user", "parts": parts}]}
-    last_err = None
-    for attempt in range(3):
-        try:
-            r = requests.post(url, json=payload, timeout=90)
-            r.raise_for_status()
-            out = r.json()
-            try:
-                return out["candidates"][0]["content"]["parts"][0]["text"]
-            except Exception:
-                return str(out)
-        except Exception as e:
-            last_err = e
-            time.sleep(1.5 * (attempt + 1))
-    raise RuntimeError(f"Gemini vision call failed after retries: {last_err}")
+    return model, url, {"contents": [{"role": "user", "parts": parts}]}
 
 
-def call_qwen_openrouter_vision(prompt: str, images_png: List[bytes]) -> str:
-    """Call Qwen vision via OpenRouter (OpenAI-compatible chat)."""
-    from openai import OpenAI
+def _gemini_text(out: Dict[str, Any]) -> str:
+    try:
+        return out["candidates"][0]["content"]["parts"][0]["text"]
+    except Exception:
+        return UnparsedResponse(out)
+
+
+def call_gemini_vision(prompt: str, images_png: List[bytes]) -> str:
+    """Call Gemini 2.5 Pro via REST with inline images; return text content. Retries on transient errors."""
+    model, url, payload = _gemini_request(prompt, images_png)
+
+    def _once() -> str:
+        r = http_session().post(url, json=payload, timeout=90)
+        r.raise_for_status()
+        return _gemini_text(r.json())
+
+    def _call() -> str:
+        tokens = estimate_tokens(prompt, images=len(images_png))
+        return call_with_limits("gemini", _once, tokens=tokens, label="Gemini vision")
+
+    return cached_completion("gemini_vision", model, prompt, images_png, _call)
 
+
+def _qwen_settings() -> Tuple[str, str]:
+    """(api key, model) for Qwen via OpenRouter; both must be configured explicitly."""
     api_key = os.getenv("OPENROUTER_API_KEY")
     if not api_key:
         raise RuntimeError("OPENROUTER_API_KEY not set")
-
-    client = OpenAI(
-        api_key=api_key,
-        base_url="https://openrouter.ai/api/v1",
-    )
     model = os.getenv("OPENROUTER_QWEN_MODEL")
     if not model:
         # Demand explicit model slug to avoid mismatches
         raise RuntimeError("OPENROUTER_QWEN_MODEL not set (e.g., qwen/qwen-3-vl-235b-instruct)")
+    return api_key, model
 
-    user_parts = [{"type": "text", "text": prompt}]
-    for data in images_png:
-        b64 = _b64_png(data)
-        user_parts.append(
-            {
-                "type": "image_url",
-                "image_url": {"url": f"data:image/png;base64,{b64}"},
-            }
-        )
 
-    resp = client.chat.completions.create(
-        model=model,
-        messages=[
-            {"role": "system", "content": "You extract data from BRF tables. Return minified JSON only."},
-            {"role": "user", "content": user_parts},
-        ],
-        max_tokens=1200,
-    )
-    return resp.choices[0].message.content
+def call_qwen_openrouter_vision(prompt: str, images_png: List[bytes]) -> str:
+    """Call Qwen vision via OpenRouter (OpenAI-compatible chat)."""
+    api_key, model = _qwen_settings()
+    client = get_client("openrouter", api_key=api_key)
+    return cached_chat_completion(client, namespace="qwen_vision", **_extraction_chat_kwargs(model, prompt, images_png))
 
 
 def has_signal(d: Dict[str, Any]) -> bool:
@@ -205,9 +163,7 @@ def has_signal(d: Dict[str, Any]) -> bool:
             return True
     return False
 
-def call_openai_vision(prompt: str, images_png: List[bytes], page_labels: List[str] | None = None) -> str:
-    """Call OpenAI Chat Completions with vision (image_url parts). Retries on transient errors."""
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+def _openai_chat_kwargs(prompt: str, images_png: List[bytes], page_labels: List[str] | None = None) -> Dict[str, Any]:
     model = os.getenv("OPENAI_MODEL", "gpt-4o")
     user_parts = [{"type": "text", "text": prompt}]
     # Optionally interleave a short label before each image to help page referencing
@@ -216,32 +172,30 @@ def call_openai_vision(prompt: str, images_png: List[bytes], page_labels: List[s
         if inject_labels:
             label = page_labels[idx] if page_labels and idx < len(page_labels) else f"Image {idx+1}/{len(images_png)}"
             user_parts.append({"type": "text", "text": label})
-        b64 = _b64_png(data)
-        user_parts.append({"type": "image_url", "image_url": {"url": f"data:image/png;base64,{b64}"}})
-    last_err = None
+        user_parts.append({"type": "image_url", "image_url": {"url": image_data_url(data)}})
     use_json_mode = os.getenv("OPENAI_JSON_MODE", "true").lower() == "true"
-    for attempt in range(3):
-        try:
-            kwargs = {
-                "model": model,
-                "messages": [
-                    {"role": "system", "content": "You extract BRF data. Return strict minified JSON only."},
-                    {"role": "user", "content": user_parts},
-                ],
-                "max_completion_tokens": 1200,
-            }
-            if use_json_mode:
-                kwargs["response_format"] = {"type": "json_object"}
-            resp = client.chat.completions.create(**kwargs)
-            return resp.choices[0].message.content
-        except Exception as e:
-            last_err = e
-            time.sleep(1.5 * (attempt + 1))
-    raise RuntimeError(f"OpenAI vision call failed after retries: {last_err}")
+    kwargs = {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": "You extract BRF data. Return strict minified JSON only."},
+            {"role": "user", "content": user_parts},
+        ],
+        "max_completion_tokens": 1200,
+    }
+    if use_json_mode:
+        kwargs["response_format"] = {"type": "json_object"}
+    return kwargs
 
 
-def call_openai_responses_vision(prompt: str, images_png: List[bytes], page_labels: List[str] | None = None) -> str:
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+def call_openai_vision(prompt: str, images_png: List[bytes], page_labels: List[str] | None = None) -> str:
+    """Call OpenAI Chat Completions with vision (image_url parts). Retries on transient errors."""
+    # Retries and rate limits are handled by the provider limiter
+    return cached_chat_completion(get_client("openai"), namespace="openai_vision",
+                                  **_openai_chat_kwargs(prompt, images_png, page_labels))
+
+
+def _responses_request(prompt: str, images_png: List[bytes], page_labels: List[str] | None = None) -> Tuple[str, Dict[str, Any], Dict[str, Any], int]:
+    """(model, request kwargs, cache params, token estimate) for an OpenAI Responses vision call."""
     model = os.getenv("OPENAI_MODEL", "gpt-5")
     user_parts = [{"type": "input_text", "text": prompt}]
     # Optionally interleave a short label before each image to help page referencing
@@ -250,118 +204,247 @@ def call_openai_responses_vision(prompt: str, images_png: List[bytes], page_labe
         if inject_labels:
             label = page_labels[idx] if page_labels and idx < len(page_labels) else f"Image {idx+1}/{len(images_png)}"
             user_parts.append({"type": "input_text", "text": label})
-        b64 = _b64_png(data)
-        user_parts.append({"type": "input_image", "image_url": f"data:image/png;base64,{b64}"})
-    last_err = None
+        user_parts.append({"type": "input_image", "image_url": image_data_url(data)})
     use_json_mode = os.getenv("OPENAI_JSON_MODE", "false").lower() == "true"
     try:
         max_out = int(os.getenv("OPENAI_MAX_OUTPUT_TOKENS", "3000") or "3000")
     except Exception:
         max_out = 3000
-    for attempt in range(3):
-        try:
-            kwargs = {
-                "model": model,
-                "input": [{"role": "user", "content": user_parts}],
-                "max_output_tokens": max_out,
-            }
-            if use_json_mode:
-                kwargs["response_format"] = {"type": "json_object"}
-            resp = client.responses.create(**kwargs)
-            if getattr(resp, "output_text", None):
-                return resp.output_text
-            try:
-                return resp.choices[0].message.content[0].text  # type: ignore
-            except Exception:
-                return str(resp)
-        except Exception as e:
-            last_err = e
-            time.sleep(1.5 * (attempt + 1))
-    raise RuntimeError(f"OpenAI Responses vision failed after retries: {last_err}")
 
-def vision_qc_agent(pdf_path: str, agent_id: str, prompt: str, page_indices: List[int] | None = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
-    """Run Grok (+ optional Gemini, Qwen via OpenRouter) on first pages, JSON-guard, and pick a result.
-    Returns (best_result, qc_meta)
-    """
+    kwargs = {
+        "model": model,
+        "input": [{"role": "user", "content": user_parts}],
+        "max_output_tokens": max_out,
+    }
+    if use_json_mode:
+        kwargs["response_format"] = {"type": "json_object"}
+    # Labels are text parts of the request, so they are part of the key
+    labels = [p["text"] for p in user_parts[1:] if p["type"] == "input_text"]
+    params = {"labels": labels, "json_mode": use_json_mode, "max_output_tokens": max_out}
+    tokens = estimate_tokens(prompt, *labels, images=len(images_png), max_output=max_out)
+    return model, kwargs, params, tokens
+
+
+def _responses_text(resp: Any) -> str:
+    if getattr(resp, "output_text", None):
+        return resp.output_text
     try:
-        max_pages = int(os.getenv("VISION_MAX_PAGES", "2"))
+        return resp.choices[0].message.content[0].text  # type: ignore
     except Exception:
-        max_pages = 2
-    dpi = int(os.getenv("QC_PAGE_RENDER_DPI", "220"))
-    used_indices: List[int] | None = None
+        return UnparsedResponse(resp)
+
+
+def call_openai_responses_vision(prompt: str, images_png: List[bytes], page_labels: List[str] | None = None) -> str:
+    client = get_client("openai")
+    model, kwargs, params, tokens = _responses_request(prompt, images_png, page_labels)
+
+    def _once() -> str:
+        return _responses_text(client.responses.create(**kwargs))
+
+    def _call() -> str:
+        return call_with_limits("openai", _once, tokens=tokens, label="OpenAI Responses vision")
+
+    return cached_completion("openai_responses_vision", model, prompt, images_png, _call, params=params)
+
+
+def vision_page_plan(page_indices: List[int] | None, max_pages: int | None = None) -> List[int]:
+    """Page indices `vision_qc_agent` sends for `page_indices` (VISION_MAX_PAGES / EXACT_PAGE_LIST)."""
+    if max_pages is None:
+        try:
+            max_pages = int(os.getenv("VISION_MAX_PAGES", "2"))
+        except Exception:
+            max_pages = 2
     if page_indices:
         exact = os.getenv("EXACT_PAGE_LIST", "true").lower() == "true"
-        use = page_indices if exact else page_indices[:max_pages]
-        used_indices = list(use)
-        images = render_pdf_pages_subset(str(pdf_path), use, dpi=dpi)
-    else:
-        # default to first N pages (0-based indices 0..max_pages-1)
-        used_indices = list(range(max_pages))
-        images = render_pdf_pages(str(pdf_path), max_pages=max_pages, dpi=dpi)
-    qc_meta: Dict[str, Any] = {"model": "multi", "grok_ok": False, "gemini_ok": False, "qwen_ok": False, "disagreement": False}
+        return list(page_indices if exact else page_indices[:max_pages])
+    # default to first N pages (0-based indices 0..max_pages-1)
+    return list(range(max_pages))
+
+
+def _vision_inputs(pdf_path: str, page_indices: List[int] | None, agent_id: str | None = None,
+                   max_pages: int | None = None) -> Tuple[List[int], List[bytes], List[str] | None, int, Dict[str, Any]]:
+    """(used page indices, encoded images, page labels, dpi, qc_meta entries) for an extraction call."""
+    dpi = int(os.getenv("QC_PAGE_RENDER_DPI", "220"))
+    use = vision_page_plan(page_indices, max_pages)
+    images, labels, meta = _page_images(pdf_path, use, dpi, agent_id, first_pages=not page_indices)
+    return use, images, labels, dpi, meta
+
 
+def _page_images(pdf_path: str, pages: List[int], dpi: int, agent_id: str | None = None, record: bool = True,
+                 first_pages: bool = False) -> Tuple[List[bytes], List[str] | None, Dict[str, Any]]:
+    """Encoded images, page labels and qc_meta entries for `pages`.
+
+    With VISION_ROI=true a page with a table region is sent as a low-DPI
+    context thumbnail followed by a high-DPI crop of the region.
+    """
+    regions = table_regions(str(pdf_path), pages, agent_id) if roi_enabled() else {}
+    if not regions:
+        if first_pages:
+            rendered = render_pdf_pages(str(pdf_path), max_pages=len(pages), dpi=dpi)
+        else:
+            rendered = render_pdf_pages_subset(str(pdf_path), pages, dpi=dpi)
+        images, payload = encode_images(rendered, "qc", agent_id, record=record)
+        return images, _page_labels(pdf_path, pages[:len(images)]), {"image_payload": payload}
+
+    wanted = sorted(p for p in set(pages) if p >= 0)
+    rest = [p for p in wanted if p not in regions]
+    # Renders come back in page order without out-of-range pages, which sort last
+    full = dict(zip(rest, render_pdf_pages_subset(str(pdf_path), rest, dpi=dpi)))
+    context = dict(zip(sorted(regions), render_pdf_pages_subset(str(pdf_path), sorted(regions), dpi=context_dpi())))
+    crop_dpi = roi_dpi()
+    base = _page_labels(pdf_path, wanted) or []
+    label_of = dict(zip(wanted, base))
+    images: List[bytes] = []
+    labels: List[str] = []
+    payloads = []
+    roi_pages = []
+    pixels_before = pixels_after = 0
+    for p in sorted(set(full) | set(context)):
+        label = label_of.get(p, f"Page {p+1}")
+        if p in full:
+            enc, st = encode_images([full[p]], "qc", agent_id, record=record)
+            images += enc
+            labels.append(label)
+            payloads.append(st)
+            continue
+        r = regions[p]
+        crop = render_region(str(pdf_path), r, crop_dpi)
+        enc_ctx, st_ctx = encode_images([context[p]], "thumbnail", record=record)
+        enc_crop, st_crop = encode_images([crop], "roi", agent_id, record=record)
+        images += enc_ctx + enc_crop
+        labels += [f"{label} (context)", f"{label} (table region)"]
+        payloads += [st_ctx, st_crop]
+        roi_pages.append({"page": p, "box": [round(v, 1) for v in r.box], "source": r.source})
+        pixels_before += pixel_count(r.page_width, r.page_height, dpi)
+        pixels_after += pixel_count(r.page_width, r.page_height, context_dpi()) + pixel_count(r.x1 - r.x0, r.y1 - r.y0, crop_dpi)
+    meta = {
+        "image_payload": sum_payloads(*payloads),
+        "roi": {"pages": roi_pages, "dpi": crop_dpi, "context_dpi": context_dpi(),
+                "pixels_before": pixels_before, "pixels_after": pixels_after},
+    }
+    return images, (labels if base else None), meta
+
+
+def _chunk_images(pdf_path: str, pages: List[int], dpi: int, agent_id: str) -> Tuple[List[bytes], List[str] | None]:
+    # These pages were already counted in the request's image payload by _vision_inputs
+    images, labels, _ = _page_images(pdf_path, pages, dpi, agent_id, record=False)
+    return images, labels
+
+
+def _final_prompt(prompt: str) -> str:
     # Encourage strict JSON
-    final_prompt = (
+    return (
         f"{prompt}\n\nYou are given images from the BRF report. "
         f"Extract ONLY the JSON specified above. Return STRICT minified JSON without comments or extra text."
     )
 
-    grok_raw = ""
-    gem_raw = ""
-    grok = {}
-    gem = {}
+
+def _new_qc_meta(inputs_meta: Dict[str, Any]) -> Dict[str, Any]:
+    return dict({"model": "multi", "grok_ok": False, "gemini_ok": False, "qwen_ok": False, "disagreement": False},
+                **inputs_meta)
+
+
+def _roi_prompt(prompt: str, inputs_meta: Dict[str, Any]) -> str:
+    if not inputs_meta.get("roi"):
+        return prompt
+    return (
+        f"{prompt}\n\nSome pages are given as two images: a low-resolution view of the whole page (context) "
+        f"followed by a high-resolution crop of its table region. Read figures from the crop; use the context "
+        f"only to see which section and year columns the table belongs to."
+    )
+
+
+def _page_labels(pdf_path: str, indices: List[int]) -> List[str] | None:
+    """'Page i/N' labels for better evidence referencing (PASS_PAGE_LABELS)."""
+    if os.getenv("PASS_PAGE_LABELS", "true").lower() != "true":
+        return None
+    try:
+        total = max(pdf_page_count(str(pdf_path)), 1)
+    except Exception:
+        total = None
+    return [(f"Page {i+1}/{total}" if total else f"Page {i+1}") for i in indices]
+
+
+def _openai_chunks(used_indices: List[int]) -> List[List[int]] | None:
+    """Page chunks for the OpenAI-only path when the page list exceeds VISION_PAGES_PER_CALL."""
+    chunk_size = int(os.getenv("VISION_PAGES_PER_CALL", "10") or "10")
+    if len(used_indices) <= chunk_size:
+        return None
+    return [used_indices[i:i+chunk_size] for i in range(0, len(used_indices), chunk_size)]
+
+
+def _use_vertex() -> bool:
+    use_vertex = os.getenv("GEMINI_VIA_VERTEX", "true").lower() == "true"
+    return bool(use_vertex and os.getenv("VERTEX_SA_JSON") and os.getenv("VERTEX_PROJECT"))
+
+
+def _vertex_vision(prompt: str, images: List[bytes]) -> str:
+    sa = os.getenv("VERTEX_SA_JSON")
+    project = os.getenv("VERTEX_PROJECT")
+    location = os.getenv("VERTEX_LOCATION", "us-central1")
+    model = os.getenv("VERTEX_MODEL", "gemini-1.5-pro-001")
+    return vertex_generate_vision(sa, project, location, model, prompt, images)
+
+
+def _select_best(qc_meta: Dict[str, Any], candidates: List[Tuple[str, Dict[str, Any], str]]) -> Dict[str, Any]:
+    """First candidate with signal (candidates are in preference order); flags disagreement between them."""
+    best = next((d for _, d, _ in candidates if has_signal(d)), {})
+    # Disagreement if any two with signal differ
+    with_signal = [(n, d, r) for n, d, r in candidates if has_signal(d)]
+    if len(with_signal) >= 2:
+        for i in range(len(with_signal)):
+            for j in range(i + 1, len(with_signal)):
+                if with_signal[i][1] != with_signal[j][1]:
+                    qc_meta["disagreement"] = True
+                    qc_meta[with_signal[i][0] + "_raw"] = (with_signal[i][2] or "")[:500]
+                    qc_meta[with_signal[j][0] + "_raw"] = (with_signal[j][2] or "")[:500]
+                    break
+    return best
+
+
+def _record_provider(qc_meta: Dict[str, Any], name: str, raw: str) -> Dict[str, Any]:
+    parsed = json_guard(raw)
+    qc_meta[f"{name}_ok"] = has_signal(parsed)
+    qc_meta[f"{name}_out"] = parsed
+    return parsed
+
+
+def vision_qc_agent(pdf_path: str, agent_id: str, prompt: str, page_indices: List[int] | None = None,
+                    max_pages: int | None = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Run Grok (+ optional Gemini, Qwen via OpenRouter) on first pages, JSON-guard, and pick a result.
+    `max_pages` overrides VISION_MAX_PAGES for this call.
+    Returns (best_result, qc_meta)
+    """
+    used_indices, images, labels, dpi, inputs_meta = _vision_inputs(pdf_path, page_indices, agent_id, max_pages)
+    qc_meta = _new_qc_meta(inputs_meta)
+    final_prompt = _roi_prompt(_final_prompt(prompt), inputs_meta)
 
     # Gemini-only fast path (optionally via Vertex)
     if os.getenv("GEMINI_ONLY", "false").lower() == "true":
         try:
-            use_vertex = os.getenv("GEMINI_VIA_VERTEX", "true").lower() == "true"
-            if use_vertex and os.getenv("VERTEX_SA_JSON") and os.getenv("VERTEX_PROJECT"):
-                sa = os.getenv("VERTEX_SA_JSON")
-                project = os.getenv("VERTEX_PROJECT")
-                location = os.getenv("VERTEX_LOCATION", "us-central1")
-                model = os.getenv("VERTEX_MODEL", "gemini-1.5-pro-001")
-                txt = vertex_generate_vision(sa, project, location, model, final_prompt, images)
-            else:
-                txt = call_gemini_vision(final_prompt, images)
-            gem = json_guard(txt)
-            qc_meta["gemini_ok"] = has_signal(gem)
-            qc_meta["gemini_out"] = gem
-            return gem, qc_meta
+            txt = _vertex_vision(final_prompt, images) if _use_vertex() else call_gemini_vision(final_prompt, images)
+            return _record_provider(qc_meta, "gemini", txt), qc_meta
         except Exception as e:
             qc_meta["gemini_error"] = str(e)
             return {}, qc_meta
 
     # OpenAI-only fast path (supports chunking large page lists)
     if os.getenv("OPENAI_ONLY", "false").lower() == "true":
+        use_responses = os.getenv("OPENAI_RESPONSES", "true").lower() == "true"
+        call = call_openai_responses_vision if use_responses else call_openai_vision
         try:
             # If we have many pages, split into chunks and choose best-scoring chunk
-            chunk_size = int(os.getenv("VISION_PAGES_PER_CALL", "10") or "10")
-            verbose = os.getenv("VERBOSE_VISION", "false").lower() == "true"
-            if used_indices is not None and len(used_indices) > chunk_size:
-                try:
-                    import fitz  # type: ignore
-                    doc = fitz.open(str(pdf_path))
-                    total = max(doc.page_count, 1)
-                    doc.close()
-                except Exception:
-                    total = None
-                chunks: List[List[int]] = [used_indices[i:i+chunk_size] for i in range(0, len(used_indices), chunk_size)]
+            chunks = _openai_chunks(used_indices)
+            if chunks:
+                verbose = os.getenv("VERBOSE_VISION", "false").lower() == "true"
                 best_js: Dict[str, Any] = {}
                 best_score = -1.0
                 chunk_meta: List[Dict[str, Any]] = []
-                use_responses = os.getenv("OPENAI_RESPONSES", "true").lower() == "true"
                 for ch in chunks:
-                    imgs = render_pdf_pages_subset(str(pdf_path), ch, dpi=dpi)
-                    page_labels: List[str] | None = None
-                    if os.getenv("PASS_PAGE_LABELS", "true").lower() == "true":
-                        page_labels = [(f"Page {i+1}/{total}" if total else f"Page {i+1}") for i in ch]
+                    imgs, ch_labels = _chunk_images(pdf_path, ch, dpi, agent_id)
                     if verbose:
                         print(f"[vision] {agent_id}: chunk {len(ch)} pages -> {ch}")
-                    if use_responses:
-                        txt = call_openai_responses_vision(final_prompt, imgs, page_labels)
-                    else:
-                        txt = call_openai_vision(final_prompt, imgs, page_labels)
-                    js = json_guard(txt)
+                    js = json_guard(call(final_prompt, imgs, ch_labels))
                     sc = score_output(agent_id, js)
                     chunk_meta.append({"pages": ch, "score": sc})
                     if sc > best_score:
@@ -371,102 +454,216 @@ def vision_qc_agent(pdf_path: str, agent_id: str, prompt: str, page_indices: Lis
                 qc_meta["openai_out"] = best_js
                 qc_meta["openai_chunks"] = chunk_meta
                 return best_js, qc_meta
-            else:
-                # Single call path (few pages)
-                if os.getenv("OPENAI_RESPONSES", "true").lower() == "true":
-                    # Build optional page labels for better evidence referencing
-                    page_labels: List[str] | None = None
-                    if os.getenv("PASS_PAGE_LABELS", "true").lower() == "true":
-                        try:
-                            import fitz  # type: ignore
-                            doc = fitz.open(str(pdf_path))
-                            total = max(doc.page_count, 1)
-                            doc.close()
-                        except Exception:
-                            total = None
-                        if used_indices is not None:
-                            page_labels = [
-                                (f"Page {i+1}/{total}" if total else f"Page {i+1}") for i in used_indices[:len(images)]
-                            ]
-                    txt = call_openai_responses_vision(final_prompt, images, page_labels)
-                else:
-                    page_labels: List[str] | None = None
-                    if os.getenv("PASS_PAGE_LABELS", "true").lower() == "true":
-                        try:
-                            import fitz  # type: ignore
-                            doc = fitz.open(str(pdf_path))
-                            total = max(doc.page_count, 1)
-                            doc.close()
-                        except Exception:
-                            total = None
-                        if used_indices is not None:
-                            page_labels = [
-                                (f"Page {i+1}/{total}" if total else f"Page {i+1}") for i in used_indices[:len(images)]
-                            ]
-                    txt = call_openai_vision(final_prompt, images, page_labels)
-                js = json_guard(txt)
-                qc_meta["openai_ok"] = has_signal(js)
-                qc_meta["openai_out"] = js
-                return js, qc_meta
+            # Single call path (few pages)
+            txt = call(final_prompt, images, labels)
+            return _record_provider(qc_meta, "openai", txt), qc_meta
         except Exception as e:
             qc_meta["openai_error"] = str(e)
             return {}, qc_meta
 
-    # Grok first
-    try:
-        grok_raw = call_grok_vision(final_prompt, images)
-        grok = json_guard(grok_raw)
-        qc_meta["grok_ok"] = has_signal(grok)
-        qc_meta["grok_out"] = grok
-    except Exception as e:
-        qc_meta["grok_error"] = str(e)
-
-    # Optionally Gemini (default enabled)
+    # Grok first, then optionally Gemini (default enabled) and Qwen via OpenRouter
     use_gemini = os.getenv("DUAL_VISION_QC", "true").lower() == "true"
     use_qwen = os.getenv("QWEN_VISION_QC", "true").lower() == "true" and bool(os.getenv("OPENROUTER_API_KEY"))
-    if use_gemini:
+    providers = [("grok", call_grok_vision, True), ("gemini", call_gemini_vision, use_gemini),
+                 ("qwen", call_qwen_openrouter_vision, use_qwen)]
+    candidates: List[Tuple[str, Dict[str, Any], str]] = []
+    for name, call, enabled in providers:
+        if not enabled:
+            continue
         try:
-            gem_raw = call_gemini_vision(final_prompt, images)
-            gem = json_guard(gem_raw)
-            qc_meta["gemini_ok"] = has_signal(gem)
-            qc_meta["gemini_out"] = gem
+            raw = call(final_prompt, images)
+            candidates.append((name, _record_provider(qc_meta, name, raw), raw))
         except Exception as e:
-            qc_meta["gemini_error"] = str(e)
+            qc_meta[f"{name}_error"] = str(e)
+
+    # Select winner: prefer Grok; else Gemini; else Qwen; else empty
+    return _select_best(qc_meta, candidates), qc_meta
+
+
+def multi_agent_prompt(prompts: Dict[str, str]) -> str:
+    """Combined prompt for several agents reading the same page images."""
+    ids = list(prompts.keys())
+    sections = "\n\n".join(f"### Agent: {aid}\n{p}" for aid, p in prompts.items())
+    return (
+        "Several extraction agents share the SAME page images below; answer for all of them in one pass.\n"
+        f"Return ONE STRICT minified JSON object whose top-level keys are exactly {ids}; "
+        "each value is that agent's JSON object as specified in its section.\n\n"
+        f"{sections}"
+    )
+
+
+def vision_qc_agents(pdf_path: str, prompts: Dict[str, str], page_indices: List[int] | None = None) -> Dict[str, Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """Run one vision request for several agents over shared pages and split the answer per agent.
+    Returns {agent_id: (best_result, qc_meta)} like vision_qc_agent for each agent.
+    """
+    if len(prompts) == 1:
+        aid, prompt = next(iter(prompts.items()))
+        return {aid: vision_qc_agent(pdf_path, aid, prompt, page_indices=page_indices)}
+    _, meta = vision_qc_agent(pdf_path, "+".join(prompts), multi_agent_prompt(prompts), page_indices=page_indices)
+    return _split_agents(prompts, meta)
+
+
+def _split_agents(prompts: Dict[str, str], meta: Dict[str, Any]) -> Dict[str, Tuple[Dict[str, Any], Dict[str, Any]]]:
+    outputs = {k: v for k, v in meta.items() if k.endswith("_out") and isinstance(v, dict)}
+    shared = {k: v for k, v in meta.items() if not k.endswith(("_out", "_raw", "_ok"))}
+    out: Dict[str, Tuple[Dict[str, Any], Dict[str, Any]]] = {}
+    for aid in prompts:
+        agent_meta: Dict[str, Any] = dict(shared, batched_with=[a for a in prompts if a != aid])
+        best: Dict[str, Any] = {}
+        # Same preference as vision_qc_agent (Grok, then Gemini, then Qwen), decided per agent
+        for key in ("grok_out", "gemini_out", "qwen_out", "openai_out"):
+            if key not in outputs:
+                continue
+            part = outputs[key].get(aid)
+            part = part if isinstance(part, dict) else {}
+            agent_meta[key] = part
+            agent_meta[key.replace("_out", "_ok")] = has_signal(part)
+            if not best and has_signal(part):
+                best = part
+        out[aid] = (best, agent_meta)
+    return out
+
+
+# --- asyncio variants -------------------------------------------------------
+# Same requests, cache keys and provider limits as the sync calls above, on
+# AsyncOpenAI / httpx.AsyncClient; rendering runs in worker threads so the
+# event loop only waits on I/O.
+
+async def _gather(*coros):
+    """Run coroutines concurrently; the first failure (or a cancellation) cancels the rest, waits for
+    them to unwind and is re-raised as is. asyncio.gather alone would leave the siblings running.
+    """
+    tasks = [asyncio.ensure_future(c) for c in coros]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+async def acall_grok_vision(prompt: str, images_png: List[bytes]) -> str:
+    model = os.getenv("XAI_MODEL", "grok-4-fast-reasoning-latest")
+    return await acached_chat_completion(get_async_client("xai"), namespace="grok_vision",
+                                         **_extraction_chat_kwargs(model, prompt, images_png))
+
+
+async def acall_gemini_vision(prompt: str, images_png: List[bytes]) -> str:
+    model, url, payload = _gemini_request(prompt, images_png)
+
+    async def _once() -> str:
+        r = await async_http_client().post(url, json=payload, timeout=90)
+        r.raise_for_status()
+        return _gemini_text(r.json())
+
+    async def _call() -> str:
+        tokens = estimate_tokens(prompt, images=len(images_png))
+        return await acall_with_limits("gemini", _once, tokens=tokens, label="Gemini vision")
+
+    return await acached_completion("gemini_vision", model, prompt, images_png, _call)
+
+
+async def acall_qwen_openrouter_vision(prompt: str, images_png: List[bytes]) -> str:
+    api_key, model = _qwen_settings()
+    return await acached_chat_completion(get_async_client("openrouter", api_key=api_key), namespace="qwen_vision",
+                                         **_extraction_chat_kwargs(model, prompt, images_png))
+
+
+async def acall_openai_vision(prompt: str, images_png: List[bytes], page_labels: List[str] | None = None) -> str:
+    return await acached_chat_completion(get_async_client("openai"), namespace="openai_vision",
+                                         **_openai_chat_kwargs(prompt, images_png, page_labels))
 
-    # Qwen via OpenRouter
-    qwen_raw = ""
-    qwen = {}
-    if use_qwen:
+
+async def acall_openai_responses_vision(prompt: str, images_png: List[bytes], page_labels: List[str] | None = None) -> str:
+    client = get_async_client("openai")
+    model, kwargs, params, tokens = _responses_request(prompt, images_png, page_labels)
+
+    async def _once() -> str:
+        return _responses_text(await client.responses.create(**kwargs))
+
+    async def _call() -> str:
+        return await acall_with_limits("openai", _once, tokens=tokens, label="OpenAI Responses vision")
+
+    return await acached_completion("openai_responses_vision", model, prompt, images_png, _call, params=params)
+
+
+async def avision_qc_agent(pdf_path: str, agent_id: str, prompt: str, page_indices: List[int] | None = None,
+                           max_pages: int | None = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """`vision_qc_agent` for coroutines: providers (and OpenAI-only chunks) are queried concurrently."""
+    used_indices, images, labels, dpi, inputs_meta = await asyncio.to_thread(_vision_inputs, pdf_path, page_indices, agent_id, max_pages)
+    qc_meta = _new_qc_meta(inputs_meta)
+    final_prompt = _roi_prompt(_final_prompt(prompt), inputs_meta)
+
+    if os.getenv("GEMINI_ONLY", "false").lower() == "true":
         try:
-            qwen_raw = call_qwen_openrouter_vision(final_prompt, images)
-            qwen = json_guard(qwen_raw)
-            qc_meta["qwen_ok"] = has_signal(qwen)
-            qc_meta["qwen_out"] = qwen
+            if _use_vertex():
+                txt = await asyncio.to_thread(_vertex_vision, final_prompt, images)
+            else:
+                txt = await acall_gemini_vision(final_prompt, images)
+            return _record_provider(qc_meta, "gemini", txt), qc_meta
         except Exception as e:
-            qc_meta["qwen_error"] = str(e)
+            qc_meta["gemini_error"] = str(e)
+            return {}, qc_meta
 
-    # Select winner: prefer Grok; else Gemini; else Qwen; else empty
-    best = (
-        grok if has_signal(grok) else (
-            gem if has_signal(gem) else (
-                qwen if has_signal(qwen) else {}
-            )
-        )
-    )
+    if os.getenv("OPENAI_ONLY", "false").lower() == "true":
+        use_responses = os.getenv("OPENAI_RESPONSES", "true").lower() == "true"
+        call = acall_openai_responses_vision if use_responses else acall_openai_vision
+        try:
+            chunks = _openai_chunks(used_indices)
+            if chunks:
+                verbose = os.getenv("VERBOSE_VISION", "false").lower() == "true"
 
-    # Basic disagreement flag if both have signal but differ
-    # Disagreement if any two with signal differ
-    candidates = [("grok", grok, grok_raw), ("gemini", gem, gem_raw)]
-    if use_qwen:
-        candidates.append(("qwen", qwen, qwen_raw))
-    with_signal = [(n, d, r) for n, d, r in candidates if has_signal(d)]
-    if len(with_signal) >= 2:
-        for i in range(len(with_signal)):
-            for j in range(i + 1, len(with_signal)):
-                if with_signal[i][1] != with_signal[j][1]:
-                    qc_meta["disagreement"] = True
-                    qc_meta[with_signal[i][0] + "_raw"] = (with_signal[i][2] or "")[:500]
-                    qc_meta[with_signal[j][0] + "_raw"] = (with_signal[j][2] or "")[:500]
-                    break
+                async def _chunk(ch: List[int]) -> Dict[str, Any]:
+                    imgs, ch_labels = await asyncio.to_thread(_chunk_images, pdf_path, ch, dpi, agent_id)
+                    if verbose:
+                        print(f"[vision] {agent_id}: chunk {len(ch)} pages -> {ch}")
+                    return json_guard(await call(final_prompt, imgs, ch_labels))
+
+                best_js: Dict[str, Any] = {}
+                best_score = -1.0
+                chunk_meta: List[Dict[str, Any]] = []
+                for ch, js in zip(chunks, await _gather(*(_chunk(ch) for ch in chunks))):
+                    sc = score_output(agent_id, js)
+                    chunk_meta.append({"pages": ch, "score": sc})
+                    if sc > best_score:
+                        best_score = sc
+                        best_js = js
+                qc_meta["openai_ok"] = has_signal(best_js)
+                qc_meta["openai_out"] = best_js
+                qc_meta["openai_chunks"] = chunk_meta
+                return best_js, qc_meta
+            txt = await call(final_prompt, images, labels)
+            return _record_provider(qc_meta, "openai", txt), qc_meta
+        except Exception as e:
+            qc_meta["openai_error"] = str(e)
+            return {}, qc_meta
+
+    use_gemini = os.getenv("DUAL_VISION_QC", "true").lower() == "true"
+    use_qwen = os.getenv("QWEN_VISION_QC", "true").lower() == "true" and bool(os.getenv("OPENROUTER_API_KEY"))
+    providers = [("grok", acall_grok_vision, True), ("gemini", acall_gemini_vision, use_gemini),
+                 ("qwen", acall_qwen_openrouter_vision, use_qwen)]
 
-    return best, qc_meta
+    async def _query(name, call):
+        try:
+            return name, await call(final_prompt, images), None
+        except Exception as e:
+            return name, None, e
+
+    candidates: List[Tuple[str, Dict[str, Any], str]] = []
+    # Results are applied in preference order, whichever provider answers first
+    for name, raw, error in await _gather(*(_query(name, call) for name, call, enabled in providers if enabled)):
+        if error is not None:
+            qc_meta[f"{name}_error"] = str(error)
+        else:
+            candidates.append((name, _record_provider(qc_meta, name, raw), raw))
+    return _select_best(qc_meta, candidates), qc_meta
+
+
+async def avision_qc_agents(pdf_path: str, prompts: Dict[str, str], page_indices: List[int] | None = None) -> Dict[str, Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """`vision_qc_agents` for coroutines."""
+    if len(prompts) == 1:
+        aid, prompt = next(iter(prompts.items()))
+        return {aid: await avision_qc_agent(pdf_path, aid, prompt, page_indices=page_indices)}
+    _, meta = await avision_qc_agent(pdf_path, "+".join(prompts), multi_agent_prompt(prompts), page_indices=page_indices)
+    return _split_agents(prompts, meta)
@@ -1,33 +1,28 @@
+import contextvars
 import os
 import json
-import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Dict, Any, Tuple
 
-from .vision_qc import _b64_png  # reuse encoding helper
+from .image_encoding import encode_images, image_data_url
+from .render_cache import render_pages, iter_render_pages, pdf_page_count
+from .llm_clients import get_client_for_base_url, provider_base_url
+from .response_cache import cached_chat_completion
 
 
 def render_all_pages(pdf_path: str, dpi: int = 170) -> List[bytes]:
-    import fitz
-    doc = fitz.open(pdf_path)
-    images: List[bytes] = []
-    try:
-        zoom = dpi / 72.0
-        mat = fitz.Matrix(zoom, zoom)
-        for page in doc:
-            pix = page.get_pixmap(matrix=mat, alpha=False)
-            images.append(pix.tobytes("png"))
-    finally:
-        doc.close()
-    return images
+    return render_pages(pdf_path, range(pdf_page_count(pdf_path)), dpi)
 
 
 def _call_openai_compatible_vision(base_url: str, api_key: str, model: str, prompt: str, images: List[bytes]) -> str:
-    from openai import OpenAI
-    client = OpenAI(api_key=api_key, base_url=base_url)
+    client = get_client_for_base_url(base_url, api_key)
     parts: List[Dict[str, Any]] = [{"type": "text", "text": prompt}]
-    for data in images:
-        parts.append({"type": "image_url", "image_url": {"url": f"data:image/png;base64,{_b64_png(data)}"}})
-    resp = client.chat.completions.create(
+    for data in encode_images(images, "sectionizer")[0]:
+        parts.append({"type": "image_url", "image_url": {"url": image_data_url(data)}})
+    return cached_chat_completion(
+        client,
+        namespace="sectionizer",
         model=model,
         messages=[
             {"role": "system", "content": "You are a precise BRF sectionizer. Return strict minified JSON only."},
@@ -35,7 +30,6 @@ def _call_openai_compatible_vision(base_url: str, api_key: str, model: str, prom
         ],
         max_tokens=1200,
     )
-    return resp.choices[0].message.content
 
 
 def _json_guard(text: str, default: Any) -> Any:
@@ -85,25 +79,28 @@ def _choose_sectionizer_provider() -> Tuple[str, str, str]:
     provider = os.getenv("SECTIONIZER_PROVIDER", "openrouter").lower()
     if provider == "xai":
         return (
-            "https://api.x.ai/v1",
+            provider_base_url("xai"),
             os.getenv("XAI_API_KEY", ""),
             os.getenv("SECTIONIZER_MODEL_XAI", os.getenv("XAI_MODEL", "grok-4-fast-reasoning-latest")),
         )
     # default openrouter
     return (
-        "https://openrouter.ai/api/v1",
+        provider_base_url("openrouter"),
         os.getenv("OPENROUTER_API_KEY", ""),
         os.getenv("SECTIONIZER_MODEL_OPENROUTER", os.getenv("OPENROUTER_QWEN_MODEL", "qwen/qwen3-vl-235b-a22b-instruct")),
     )
 
 
 def vision_sectionize(pdf_path: str) -> Dict[str, Any]:
-    """Two-round vision sectionizer. Returns a dict with level_1, level_2, level_3 and pages_by_agent."""
+    """Two-round vision sectionizer. Returns a dict with level_1, level_2, level_3 and pages_by_agent.
+
+    Round 1 batches are pipelined (render -> encode -> request) with at most
+    SECTIONIZER_CONCURRENCY requests in flight; round 2 runs every L1 section
+    concurrently. Both rounds merge in page/section order, so the outline does
+    not depend on which request finishes first.
+    """
     try:
-        import fitz
-        doc = fitz.open(pdf_path)
-        page_count = doc.page_count
-        doc.close()
+        page_count = pdf_page_count(pdf_path)
     except Exception:
         page_count = 0
 
@@ -114,22 +111,17 @@ def vision_sectionize(pdf_path: str) -> Dict[str, Any]:
     # Round 1: identify level 1 sections
     batch_size = int(os.getenv("SECTIONIZER_PAGES_PER_CALL", "8"))
     dpi = int(os.getenv("SECTIONIZER_DPI", "170"))
-    level_1_items: List[Dict[str, Any]] = []
-    pace_ms = int(os.getenv("SECTIONIZER_PACE_MS", "300") or "300")
     verbose = os.getenv("VERBOSE_SECTIONIZER", "false").lower() == "true"
-    for start, end in _batch_indices(page_count, batch_size):
-        # render this slice
-        import fitz
-        doc = fitz.open(pdf_path)
-        imgs: List[bytes] = []
-        try:
-            zoom = dpi / 72.0
-            mat = fitz.Matrix(zoom, zoom)
-            for i in range(start, end):
-                pix = doc.load_page(i).get_pixmap(matrix=mat, alpha=False)
-                imgs.append(pix.tobytes("png"))
-        finally:
-            doc.close()
+    try:
+        max_inflight = max(1, int(os.getenv("SECTIONIZER_CONCURRENCY", "4") or "4"))
+    except Exception:
+        max_inflight = 4
+
+    def _call_model(prompt: str, imgs: List[bytes]) -> str:
+        # 429s, Retry-After and backoff are handled by the provider rate limiter
+        return _call_openai_compatible_vision(base_url, api_key, model, prompt, imgs)
+
+    def _round1_batch(start: int, end: int, imgs: List[bytes]) -> List[Dict[str, Any]]:
         listing = "; ".join([f"page {i+1}" for i in range(start, end)])
         prompt = (
             ROUND1_PROMPT
@@ -137,31 +129,45 @@ def vision_sectionize(pdf_path: str) -> Dict[str, Any]:
         )
         if verbose:
             print(f"[sectionizer] round1 batch pages {start+1}-{end}")
-        # retry with backoff to survive rate limits (429)
-        txt = ""
-        last_err = None
-        for attempt in range(5):
-            try:
-                txt = _call_openai_compatible_vision(base_url, api_key, model, prompt, imgs)
-                break
-            except Exception as e:
-                last_err = e
-                # backoff 0.8s, 1.6s, 2.4s, ...
-                time.sleep(0.8 * (attempt + 1))
-        if not txt and last_err:
-            # skip this batch but continue others
-            continue
-        out = _json_guard(txt, {"level_1": []})
+        out = _json_guard(_call_model(prompt, imgs), {"level_1": []})
         items = out.get("level_1", []) if isinstance(out, dict) else []
         # keep only items within [start+1, end]
+        kept: List[Dict[str, Any]] = []
         for it in items:
             try:
                 sp, ep = int(it.get("start_page", 0)), int(it.get("end_page", 0))
                 title = str(it.get("title", "")).strip()
                 if title and (start + 1) <= sp <= page_count and (start + 1) <= ep <= page_count:
-                    level_1_items.append({"title": title, "start_page": sp, "end_page": ep})
+                    kept.append({"title": title, "start_page": sp, "end_page": ep})
             except Exception:
                 continue
+        return kept
+
+    # Pipeline render -> encode -> request: the raster engine streams pages in
+    # order, each batch is handed to a worker (which encodes and calls the
+    # model) as soon as its pages exist, with at most `max_inflight` batches
+    # outstanding. Results are merged in batch order. Workers run in a copy of
+    # the caller's context so per-document budget and payload scopes apply.
+    batches = _batch_indices(page_count, batch_size)
+    batch_items: List[List[Dict[str, Any]]] = [[] for _ in batches]
+    page_stream = iter_render_pages(pdf_path, range(page_count), dpi) if page_count else iter(())
+    slots = threading.Semaphore(max_inflight)
+    with ThreadPoolExecutor(max_workers=max_inflight) as ex:
+        futs = {}
+        for b, (start, end) in enumerate(batches):
+            imgs: List[bytes] = [data for _, (_, data) in zip(range(start, end), page_stream)]
+            slots.acquire()
+            fut = ex.submit(contextvars.copy_context().run, _round1_batch, start, end, imgs)
+            fut.add_done_callback(lambda _f: slots.release())
+            futs[fut] = b
+        for fut in as_completed(futs):
+            try:
+                batch_items[futs[fut]] = fut.result()
+            except Exception as e:
+                # skip this batch but keep the others
+                if verbose:
+                    print(f"[sectionizer] round1 batch {futs[fut] + 1}/{len(batches)} skipped: {e}")
+    level_1_items: List[Dict[str, Any]] = [it for items in batch_items for it in items]
 
     # Merge overlapping/adjacent level 1 items with same normalized title
     def norm_title(t: str) -> str:
@@ -182,25 +188,11 @@ def vision_sectionize(pdf_path: str) -> Dict[str, Any]:
                 cur_s, cur_e = s, e
         level_1.append({"title": t, "start_page": cur_s, "end_page": cur_e})
 
-    # Round 2: for each L1 region, detect level 2/3
-    level_2: List[Dict[str, Any]] = []
-    level_3: List[Dict[str, Any]] = []
-    for sec in level_1:
+    # Round 2: all L1 regions concurrently, detect level 2/3; merged in L1 order
+    def _round2_section(sec: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
         sp, ep = sec["start_page"], sec["end_page"]
-        if ep < sp:
-            continue
-        # render this range
-        import fitz
-        doc = fitz.open(pdf_path)
-        imgs: List[bytes] = []
-        try:
-            zoom = dpi / 72.0
-            mat = fitz.Matrix(zoom, zoom)
-            for i in range(sp - 1, ep):
-                pix = doc.load_page(i).get_pixmap(matrix=mat, alpha=False)
-                imgs.append(pix.tobytes("png"))
-        finally:
-            doc.close()
+        # render this range (already rasterized in round 1 at the same DPI)
+        imgs: List[bytes] = render_pages(pdf_path, range(sp - 1, ep), dpi)
         listing = "; ".join([f"page {i}" for i in range(sp, ep + 1)])
         prompt = (
             ROUND2_PROMPT
@@ -208,19 +200,9 @@ def vision_sectionize(pdf_path: str) -> Dict[str, Any]:
         )
         if verbose:
             print(f"[sectionizer] round2 L1 '{sec['title']}' {sp}-{ep} ({len(imgs)} pages)")
-        txt = ""
-        last_err = None
-        for attempt in range(5):
-            try:
-                txt = _call_openai_compatible_vision(base_url, api_key, model, prompt, imgs)
-                break
-            except Exception as e:
-                last_err = e
-                time.sleep(0.8 * (attempt + 1))
-        if not txt and last_err:
-            continue
-        out = _json_guard(txt, {"level_2": [], "level_3": []})
-        for lv, store in ("level_2", level_2), ("level_3", level_3):
+        out = _json_guard(_call_model(prompt, imgs), {"level_2": [], "level_3": []})
+        found: Dict[str, List[Dict[str, Any]]] = {"level_2": [], "level_3": []}
+        for lv in ("level_2", "level_3"):
             items = out.get(lv, []) if isinstance(out, dict) else []
             for it in items:
                 try:
@@ -228,9 +210,24 @@ def vision_sectionize(pdf_path: str) -> Dict[str, Any]:
                     p = str(it.get("parent", sec["title"]))
                     s, e = int(it.get("start_page", sp)), int(it.get("end_page", sp))
                     if title:
-                        store.append({"parent": p, "title": title, "start_page": s, "end_page": e})
+                        found[lv].append({"parent": p, "title": title, "start_page": s, "end_page": e})
                 except Exception:
                     continue
+        return found["level_2"], found["level_3"]
+
+    sections = [sec for sec in level_1 if sec["end_page"] >= sec["start_page"]]
+    section_results: List[Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]] = [([], []) for _ in sections]
+    if sections:
+        with ThreadPoolExecutor(max_workers=min(max_inflight, len(sections))) as ex:
+            futs = {ex.submit(contextvars.copy_context().run, _round2_section, sec): k for k, sec in enumerate(sections)}
+            for fut in as_completed(futs):
+                try:
+                    section_results[futs[fut]] = fut.result()
+                except Exception as e:
+                    if verbose:
+                        print(f"[sectionizer] round2 '{sections[futs[fut]]['title']}' skipped: {e}")
+    level_2: List[Dict[str, Any]] = [it for l2, _ in section_results for it in l2]
+    level_3: List[Dict[str, Any]] = [it for _, l3 in section_results for it in l3]
 
     # Heuristic mapping to agents → pages
     pages_by_agent: Dict[str, List[int]] = {}
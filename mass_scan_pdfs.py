@@ -4,33 +4,87 @@ Mass PDF Topology Scanner for Swedish BRF Documents
 Designed to handle 80,000+ PDFs with resume capability and progress tracking.
 
 Features:
-- Resume capability (SQLite checkpointing)
+- Resume capability (SQLite checkpointing, batched commits in WAL mode)
+- Incremental rescans: size/mtime (optionally sha256) fingerprints per file,
+  os.scandir walking with a directory-mtime cache, deleted files purged
 - Batch processing with memory efficiency
 - Progress tracking with ETA
-- Incremental JSON saves
+- Optional process pool (--workers); a single writer keeps results in file order
+- Per-file results streamed to append-only JSONL (bounded memory)
+- Incremental JSON summary saves
 - Support for all document types
 
 Usage:
     python mass_scan_pdfs.py --all                    # Scan all document types
     python mass_scan_pdfs.py --type arsredovisning    # Scan specific type
     python mass_scan_pdfs.py --resume                 # Resume from checkpoint
+    python mass_scan_pdfs.py --all --workers 8        # Analyze in 8 processes
+    python mass_scan_pdfs.py --all --incremental      # Re-analyze new/changed files, purge deleted ones
+    python mass_scan_pdfs.py --all --fast-topology    # Skip text extraction on pages without fonts
 """
 
 import os
 import sys
 import argparse
 import json
-import sqlite3
 import time
 from pathlib import Path
-from typing import Dict, List, Tuple, Any
+from typing import Dict, Iterator, List, Optional, Tuple, Any
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
-import fitz  # PyMuPDF
+from functools import partial
 
 # Add parent to path
 sys.path.insert(0, str(Path(__file__).parent))
 
+from gracian_pipeline.core.corpus_walk import file_digest, walk_pdfs
+from gracian_pipeline.core.pdf_topology import classify_pdf
+from gracian_pipeline.core.result_sink import JsonlSink
+from gracian_pipeline.core.scan_checkpoint import CheckpointStore, Fingerprint
+
+
+def analyze_pdf_file(pdf_path: str, fast: bool = False) -> Dict[str, Any]:
+    """Analyze a single PDF (shared core.pdf_topology classifier); module-level so pool workers can run it"""
+    result = {
+        'path': pdf_path,
+        'filename': os.path.basename(pdf_path),
+        'size_mb': 0,
+        'pages': 0,
+        'text_chars': 0,
+        'avg_chars_per_page': 0,
+        'is_encrypted': False,
+        'is_locked': False,
+        'category': 'unknown',
+        'error': None
+    }
+
+    try:
+        result['size_mb'] = round(os.path.getsize(pdf_path) / (1024 * 1024), 2)
+    except OSError as e:
+        result['error'] = str(e)
+        result['category'] = 'corrupted'
+        return result
+
+    # Sampled text (extrapolated to the full document); the fast path skips pages without fonts
+    topology = classify_pdf(pdf_path, fast)
+    for key in ('is_encrypted', 'is_locked', 'pages', 'text_chars', 'avg_chars_per_page', 'category', 'error'):
+        result[key] = topology[key]
+    if fast and 'classified_by' in topology:
+        result['classified_by'] = topology['classified_by']
+        result['signals'] = topology['signals']
+
+    return result
+
+
+def scan_pdf_file(pdf_path: str, known_hash: Optional[str] = None, content_hash: bool = False,
+                  fast: bool = False) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """(result, sha256) for one file; result is None when the content still matches known_hash"""
+    digest = file_digest(pdf_path) if content_hash else None
+    if digest is not None and digest == known_hash:
+        return None, digest
+    return analyze_pdf_file(pdf_path, fast), digest
+
 
 class MassPDFScanner:
     """Resume-capable mass PDF scanner with checkpoint system"""
@@ -41,10 +95,16 @@ class MassPDFScanner:
         'ekonomisk_plan': 'Ekonomisk plan',
         'energideklaration': 'Energideklaration',
     }
+    SAMPLE_LIMIT = 5  # results kept in memory per category; the full set goes to the JSONL sink
 
-    def __init__(self, base_dir: str, checkpoint_db: str = "scan_progress.db"):
+    def __init__(self, base_dir: str, checkpoint_db: str = "scan_progress.db", workers: int = 1,
+                 incremental: bool = False, content_hash: bool = False, fast_topology: bool = False):
         self.base_dir = Path(base_dir).expanduser()
         self.checkpoint_db = checkpoint_db
+        self.workers = workers if workers > 0 else (os.cpu_count() or 1)
+        self.incremental = incremental
+        self.content_hash = content_hash
+        self.fast_topology = fast_topology
         self.results = {
             'machine_readable': [],
             'scanned': [],
@@ -56,129 +116,53 @@ class MassPDFScanner:
         self.total_processed = 0
         self.start_time = time.time()
 
-        # Initialize checkpoint database
-        self._init_checkpoint_db()
-
-    def _init_checkpoint_db(self):
-        """Initialize SQLite checkpoint database"""
-        conn = sqlite3.connect(self.checkpoint_db)
-        cursor = conn.cursor()
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS scanned_files (
-                filepath TEXT PRIMARY KEY,
-                category TEXT,
-                size_mb REAL,
-                pages INTEGER,
-                avg_chars_per_page REAL,
-                scanned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS scan_sessions (
-                session_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                completed_at TIMESTAMP,
-                total_files INTEGER,
-                document_type TEXT
-            )
-        """)
-        conn.commit()
-        conn.close()
+        # Checkpoint database: scanned paths in memory, results written in batches
+        self.checkpoint = CheckpointStore(checkpoint_db)
 
     def _is_already_scanned(self, filepath: str) -> bool:
         """Check if file was already scanned"""
-        conn = sqlite3.connect(self.checkpoint_db)
-        cursor = conn.cursor()
-        cursor.execute("SELECT 1 FROM scanned_files WHERE filepath = ?", (filepath,))
-        result = cursor.fetchone() is not None
-        conn.close()
-        return result
-
-    def _save_checkpoint(self, filepath: str, result: Dict[str, Any]):
-        """Save file analysis to checkpoint database"""
-        conn = sqlite3.connect(self.checkpoint_db)
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT OR REPLACE INTO scanned_files
-            (filepath, category, size_mb, pages, avg_chars_per_page)
-            VALUES (?, ?, ?, ?, ?)
-        """, (
-            filepath,
-            result['category'],
-            result['size_mb'],
-            result['pages'],
-            result['avg_chars_per_page']
-        ))
-        conn.commit()
-        conn.close()
-
-    def analyze_pdf(self, pdf_path: str) -> Dict[str, Any]:
-        """Analyze a single PDF (same logic as analyze_pdf_topology.py)"""
-        result = {
-            'path': pdf_path,
-            'filename': os.path.basename(pdf_path),
-            'size_mb': 0,
-            'pages': 0,
-            'text_chars': 0,
-            'avg_chars_per_page': 0,
-            'is_encrypted': False,
-            'is_locked': False,
-            'category': 'unknown',
-            'error': None
-        }
-
+        return filepath in self.checkpoint
+
+    def _known_hash(self, filepath: str) -> Optional[str]:
+        fingerprint = self.checkpoint.fingerprint(filepath)
+        return fingerprint.content_hash if fingerprint is not None else None
+
+    def _iter_results(self, pending: List[Tuple[int, str]]) -> Iterator[Tuple[int, str, Optional[Dict[str, Any]], Optional[str]]]:
+        """Yield (index, path, result, sha256) in file order, analyzed here or by the worker pool"""
+        scan = partial(scan_pdf_file, content_hash=self.content_hash, fast=self.fast_topology)
+        if self.workers <= 1 or len(pending) < 2:
+            for idx, pdf_str in pending:
+                yield (idx, pdf_str) + scan(pdf_str, self._known_hash(pdf_str))
+            return
+        # Small chunks keep workers busy without holding many results back behind a slow file
+        chunksize = max(1, min(32, len(pending) // (self.workers * 8)))
+        pool = ProcessPoolExecutor(max_workers=self.workers)
         try:
-            result['size_mb'] = round(os.path.getsize(pdf_path) / (1024 * 1024), 2)
-            doc = fitz.open(pdf_path)
-
-            result['is_encrypted'] = doc.is_encrypted
-            result['is_locked'] = doc.needs_pass
-
-            if result['is_locked']:
-                result['category'] = 'locked'
-                self.results['locked'].append(result)
-                doc.close()
-                return result
-
-            result['pages'] = doc.page_count
-            total_chars = 0
-
-            # Sample pages for efficiency
-            if doc.page_count > 20:
-                sample_pages = list(range(0, doc.page_count, 5))[:10]
-            else:
-                sample_pages = range(doc.page_count)
-
-            for page_num in sample_pages:
-                page = doc.load_page(page_num)
-                text = page.get_text("text")
-                total_chars += len(text)
-
-            # Extrapolate to full document
-            if len(sample_pages) < doc.page_count:
-                total_chars = int(total_chars * (doc.page_count / len(sample_pages)))
-
-            result['text_chars'] = total_chars
-            result['avg_chars_per_page'] = total_chars / doc.page_count if doc.page_count > 0 else 0
-
-            # Categorize
-            if result['avg_chars_per_page'] > 800:
-                result['category'] = 'machine_readable'
-                self.results['machine_readable'].append(result)
-            elif result['avg_chars_per_page'] < 200:
-                result['category'] = 'scanned'
-                self.results['scanned'].append(result)
-            else:
-                result['category'] = 'hybrid'
-                self.results['hybrid'].append(result)
-
-            doc.close()
-
-        except Exception as e:
-            result['error'] = str(e)
-            result['category'] = 'corrupted'
-            self.results['corrupted'].append(result)
+            paths = [p for _, p in pending]
+            results = pool.map(scan, paths, [self._known_hash(p) for p in paths], chunksize=chunksize)
+            for (idx, pdf_str), (result, digest) in zip(pending, results):
+                yield idx, pdf_str, result, digest
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _save_checkpoint(self, filepath: str, result: Dict[str, Any], fingerprint: Optional[Fingerprint] = None):
+        """Save file analysis to checkpoint database (committed with the next batch)"""
+        self.checkpoint.add(filepath, result, fingerprint)
+
+    def _forget(self, category: Optional[str]):
+        """Take a superseded or deleted file out of the running category counts"""
+        if self.stats.get(category, 0) > 0:
+            self.stats[category] -= 1
+
+    def _keep_sample(self, result: Dict[str, Any]):
+        samples = self.results[result['category']]
+        if len(samples) < self.SAMPLE_LIMIT:
+            samples.append(result)
 
+    def analyze_pdf(self, pdf_path: str) -> Dict[str, Any]:
+        """Analyze a single PDF (shared core.pdf_topology classifier)"""
+        result = analyze_pdf_file(pdf_path, self.fast_topology)
+        self._keep_sample(result)
         return result
 
     def _format_eta(self, seconds: float) -> str:
@@ -201,97 +185,147 @@ class MassPDFScanner:
             print(f"❌ Directory not found: {doc_dir}")
             return
 
-        # Find all PDFs
+        # Find all PDFs (incremental scans reuse the listing of unchanged directories)
         print(f"\n📂 Scanning directory: {doc_dir}")
         print("   Finding all PDF files...")
-        pdf_files = list(doc_dir.rglob("*.pdf"))
+        walk_start = time.time()
+        root = str(doc_dir)
+        walk = walk_pdfs(root, self.checkpoint.dir_cache(root) if self.incremental else None)
+        self.checkpoint.save_dir_cache(root, walk.dirs)
+        pdf_files = walk.files
         total_files = len(pdf_files)
+        print(f"   Walked {len(walk.dirs):,} directories in {time.time() - walk_start:.1f}s "
+              f"({walk.listed:,} listed, {walk.cached:,} unchanged)")
+
+        # Files gone from disk leave the checkpoint and, at compaction, the results file
+        deleted = set()
+        if self.incremental:
+            present = set(walk.paths())
+            deleted = {p for p in self.checkpoint.paths_under(root) if p not in present}
+            for path in deleted:
+                self._forget(self.checkpoint.files[path].category)
+                self.total_processed = max(0, self.total_processed - 1)
+            if deleted:
+                self.checkpoint.purge(deleted)
+                print(f"   🗑️  {len(deleted):,} deleted files purged from the checkpoint")
 
         if total_files == 0:
             print(f"⚠️  No PDF files found in {doc_dir}")
+            if deleted:
+                with JsonlSink(f"mass_scan_{doc_type_key}_results.jsonl") as sink:
+                    sink.compact(drop_keys=deleted)
             return
 
         print(f"   Found {total_files:,} PDF files")
 
-        # Check how many already scanned
-        already_scanned = sum(1 for f in pdf_files if self._is_already_scanned(str(f)))
-        remaining = total_files - already_scanned
+        # Check how many already scanned; incremental mode also re-queues files whose size/mtime changed
+        stat_of = {path: (size, mtime_ns) for path, size, mtime_ns in pdf_files}
+        pending = []
+        changed = adopted = 0
+        for idx, (pdf_str, size, mtime_ns) in enumerate(pdf_files, 1):
+            if not self._is_already_scanned(pdf_str):
+                pending.append((idx, pdf_str))
+            elif self.incremental:
+                fingerprint = self.checkpoint.fingerprint(pdf_str)
+                if fingerprint.size is None:
+                    # Scanned before fingerprints were stored: trust the row, record the current stat
+                    self.checkpoint.touch(pdf_str, Fingerprint(size, mtime_ns))
+                    adopted += 1
+                elif not fingerprint.same_stat(size, mtime_ns):
+                    pending.append((idx, pdf_str))
+                    changed += 1
+        already_scanned = total_files - len(pending)
+        remaining = len(pending)
 
         if already_scanned > 0:
             print(f"   ✅ {already_scanned:,} already scanned (resuming)")
+            if changed:
+                print(f"   🔁 {changed:,} changed since they were scanned")
+            if adopted:
+                print(f"   🏷️  {adopted:,} fingerprints recorded for files scanned before fingerprinting")
             print(f"   ⏳ {remaining:,} remaining")
 
         # Start session
-        conn = sqlite3.connect(self.checkpoint_db)
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO scan_sessions (total_files, document_type) VALUES (?, ?)",
-            (total_files, doc_type_key)
-        )
-        session_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        session_id = self.checkpoint.start_session(total_files, doc_type_key)
 
         print(f"\n🚀 Starting scan (Session #{session_id})")
+        if self.workers > 1:
+            print(f"   {self.workers} worker processes")
         print("=" * 100)
 
-        # Process files
+        results_file = f"mass_scan_{doc_type_key}_results.jsonl"
+        sink = JsonlSink(results_file)
+        print(f"   Streaming per-file results to {results_file}")
+
+        # Process files. Workers (if any) only analyze; this process is the single
+        # writer for the JSONL sink and the checkpoint DB, in file order.
         processed_this_run = 0
-        last_save = time.time()
+        unchanged = 0
         last_checkpoint = 0
+        # Checkpoint rows are committed only after their JSONL lines are on disk
+        self.checkpoint.before_commit = sink.flush
 
-        for idx, pdf_path in enumerate(pdf_files, 1):
-            pdf_str = str(pdf_path)
-
-            # Skip if already scanned
-            if self._is_already_scanned(pdf_str):
-                continue
-
-            # Analyze PDF
-            result = self.analyze_pdf(pdf_str)
-            self.stats[result['category']] += 1
-            self.total_processed += 1
-            processed_this_run += 1
-
-            # Save checkpoint
-            self._save_checkpoint(pdf_str, result)
-
-            # Progress update every 100 files
-            if processed_this_run % 100 == 0 or processed_this_run == 1:
-                elapsed = time.time() - self.start_time
-                rate = processed_this_run / elapsed if elapsed > 0 else 0
-                eta_seconds = (remaining - processed_this_run) / rate if rate > 0 else 0
-
-                print(f"Progress: {idx:,}/{total_files:,} ({idx*100//total_files}%) | "
-                      f"Processed this run: {processed_this_run:,} | "
-                      f"Rate: {rate:.1f} PDF/s | "
-                      f"ETA: {self._format_eta(eta_seconds)}")
-                print(f"  Categories: MR={self.stats['machine_readable']:,} | "
-                      f"Scan={self.stats['scanned']:,} | "
-                      f"Hybrid={self.stats['hybrid']:,} | "
-                      f"Locked={self.stats['locked']:,} | "
-                      f"Corrupt={self.stats['corrupted']:,}")
-
-            # Save intermediate JSON every 1000 files
-            if processed_this_run - last_checkpoint >= 1000:
-                self._save_intermediate_json(doc_type_key, session_id)
-                last_checkpoint = processed_this_run
-
-        # Final save
+        try:
+            for idx, pdf_str, result, digest in self._iter_results(pending):
+                processed_this_run += 1
+                fingerprint = Fingerprint(*stat_of[pdf_str], digest)
+                if result is None:
+                    # Touched but identical content (--content-hash): keep the stored result
+                    self.checkpoint.touch(pdf_str, fingerprint)
+                    unchanged += 1
+                else:
+                    previous = self.checkpoint.files.get(pdf_str)
+                    if previous is not None:
+                        self._forget(previous.category)
+                    else:
+                        self.total_processed += 1
+                    self._keep_sample(result)
+                    self.stats[result['category']] += 1
+
+                    # Save checkpoint (a crash re-scans at most the last uncommitted batch)
+                    sink.write(pdf_str, result)
+                    self._save_checkpoint(pdf_str, result, fingerprint)
+
+                # Progress update every 100 files
+                if processed_this_run % 100 == 0 or processed_this_run == 1:
+                    elapsed = time.time() - self.start_time
+                    rate = processed_this_run / elapsed if elapsed > 0 else 0
+                    eta_seconds = (remaining - processed_this_run) / rate if rate > 0 else 0
+
+                    print(f"Progress: {idx:,}/{total_files:,} ({idx*100//total_files}%) | "
+                          f"Processed this run: {processed_this_run:,} | "
+                          f"Rate: {rate:.1f} PDF/s | "
+                          f"ETA: {self._format_eta(eta_seconds)}")
+                    print(f"  Categories: MR={self.stats['machine_readable']:,} | "
+                          f"Scan={self.stats['scanned']:,} | "
+                          f"Hybrid={self.stats['hybrid']:,} | "
+                          f"Locked={self.stats['locked']:,} | "
+                          f"Corrupt={self.stats['corrupted']:,}")
+
+                # Save intermediate JSON every 1000 files
+                if processed_this_run - last_checkpoint >= 1000:
+                    sink.flush()
+                    self._save_intermediate_json(doc_type_key, session_id)
+                    last_checkpoint = processed_this_run
+        finally:
+            self.checkpoint.flush()
+            self.checkpoint.before_commit = None
+
+        # Final save (compaction drops records re-written by an interrupted run or a changed file,
+        # and the records of deleted files)
+        sink.close()
+        compacted = sink.compact(drop_keys=deleted)
+        print(f"   Results file: {results_file} ({compacted['kept']:,} files, {compacted['dropped']:,} superseded records dropped"
+              f"{', %d deleted files removed' % compacted['removed'] if deleted else ''})")
         self._save_intermediate_json(doc_type_key, session_id, final=True)
 
         # Update session
-        conn = sqlite3.connect(self.checkpoint_db)
-        cursor = conn.cursor()
-        cursor.execute(
-            "UPDATE scan_sessions SET completed_at = CURRENT_TIMESTAMP WHERE session_id = ?",
-            (session_id,)
-        )
-        conn.commit()
-        conn.close()
+        self.checkpoint.finish_session(session_id)
 
         print(f"\n✅ Scan complete for {doc_type_name}")
-        print(f"   Processed: {processed_this_run:,} new files")
+        print(f"   Processed: {processed_this_run - unchanged:,} new or changed files")
+        if unchanged:
+            print(f"   Content unchanged: {unchanged:,} files (fingerprint updated only)")
         print(f"   Total in database: {self.total_processed:,}")
 
     def _save_intermediate_json(self, doc_type_key: str, session_id: int, final: bool = False):
@@ -306,6 +340,7 @@ class MassPDFScanner:
             'timestamp': timestamp,
             'total_processed': self.total_processed,
             'summary': dict(self.stats),
+            'results_file': f"mass_scan_{doc_type_key}_results.jsonl",
             'sample_results': {
                 cat: self.results[cat][:5] for cat in self.results.keys()
             }
@@ -321,19 +356,8 @@ class MassPDFScanner:
 
     def load_from_checkpoint(self) -> Dict[str, int]:
         """Load stats from checkpoint database"""
-        conn = sqlite3.connect(self.checkpoint_db)
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT category, COUNT(*)
-            FROM scanned_files
-            GROUP BY category
-        """)
-        stats = {row[0]: row[1] for row in cursor.fetchall()}
-
-        cursor.execute("SELECT COUNT(*) FROM scanned_files")
-        total = cursor.fetchone()[0]
-
-        conn.close()
+        stats = self.checkpoint.category_counts()
+        total = sum(stats.values())
 
         self.stats = defaultdict(int, stats)
         self.total_processed = total
@@ -378,6 +402,14 @@ def main():
     parser.add_argument('--resume', action='store_true', help='Resume from checkpoint')
     parser.add_argument('--checkpoint-db', type=str, default='scan_progress.db',
                        help='Checkpoint database file')
+    parser.add_argument('--workers', type=int, default=1,
+                       help='Analysis processes (1 = serial, 0 = one per CPU); results are written by this process')
+    parser.add_argument('--incremental', action='store_true',
+                       help='Re-analyze files whose size/mtime changed, purge deleted files, reuse unchanged directory listings')
+    parser.add_argument('--content-hash', action='store_true',
+                       help='Store a sha256 per file; in --incremental mode a touched file with the same hash is not re-analyzed')
+    parser.add_argument('--fast-topology', action='store_true',
+                       help='Classify from page font/image resources; extract text only from pages that have fonts')
     parser.add_argument('--base-dir', type=str,
                        default='~/Dropbox/zeldadb/zeldabot/pdf_docs',
                        help='Base directory containing PDF folders')
@@ -385,7 +417,9 @@ def main():
     args = parser.parse_args()
 
     # Initialize scanner
-    scanner = MassPDFScanner(args.base_dir, args.checkpoint_db)
+    scanner = MassPDFScanner(args.base_dir, args.checkpoint_db, workers=args.workers,
+                             incremental=args.incremental, content_hash=args.content_hash,
+                             fast_topology=args.fast_topology)
 
     # Load checkpoint if resuming
     if args.resume or os.path.exists(args.checkpoint_db):
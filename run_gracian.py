@@ -4,11 +4,13 @@ Gracian Pipeline CLI - Grok-Centric BRF Extraction
 """
 
 import argparse
+import contextvars
 import os
 import sys
 import glob
 import json
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # Add gracian_pipeline to path
@@ -16,14 +18,21 @@ sys.path.insert(0, 'gracian_pipeline')
 
 from prompts.agent_prompts import AGENT_PROMPTS
 from core.schema import schema_prompt_block, get_types
-from core.vision_qc import vision_qc_agent, json_guard, render_pdf_pages_subset, call_qwen_openrouter_vision
-from core.sectionizer import sectionize_pdf, select_pages_for_agent
+from core.vision_qc import vision_qc_agent, vision_page_plan, json_guard, render_pdf_pages_subset, call_qwen_openrouter_vision
+from core.sectionizer import sectionize_pdf, select_pages_for_agent, get_page_index
+from core.pdf_topology import default_store, get_topology
+from core.render_cache import pdf_page_count
 from core.vision_sectionizer import vision_sectionize
 from core.enforce import enforce
 from core.qc import numeric_qc
 from core.bench import score_output, call_gemini_text, call_qwen_openrouter_text, jury_rank, call_openai_text
 from core.oneshot import oneshot_extract
 from core.orchestrator import orchestrate_pdf
+from core.llm_clients import get_client
+from core.rate_limiter import call_with_limits, estimate_tokens, limiter_stats
+from core.scheduler import BatchScheduler, load_topology, plan_jobs
+from core.run_manifest import RunManifest, write_json_object_stream
+from core.result_sink import open_result_sink
 
 # Best-effort: load .env if present (non-fatal if missing)
 try:
@@ -34,39 +43,28 @@ except Exception:
 
 def call_grok(prompt, content):
     """Call Grok API with prompt and content"""
-    from openai import OpenAI
-    
-    client = OpenAI(
-        api_key=os.getenv("XAI_API_KEY"),
-        base_url="https://api.x.ai/v1"
-    )
+    client = get_client("xai")
     # Use OpenAI-compatible Chat Completions against xAI Grok endpoint
     model = os.getenv("XAI_MODEL", "grok-4-fast-reasoning-latest")
-    response = client.chat.completions.create(
-        model=model,
-        messages=[
-            {"role": "system", "content": prompt},
-            {"role": "user", "content": content}
-        ],
-        max_tokens=1000
-    )
-    return response.choices[0].message.content
+
+    def _once():
+        response = client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": prompt},
+                {"role": "user", "content": content}
+            ],
+            max_tokens=1000
+        )
+        return response.choices[0].message.content
+
+    return call_with_limits("xai", _once, tokens=estimate_tokens(prompt, content, max_output=1000), label="Grok text")
 
 def extract_pdf_text(pdf_path):
-    """Extract text from entire document using PyMuPDF; fallback to pdfplumber."""
-    try:
-        import fitz  # PyMuPDF
-        text_parts = []
-        doc = fitz.open(str(pdf_path))
-        try:
-            for i, page in enumerate(doc):
-                text_parts.append(page.get_text("text"))
-        finally:
-            doc.close()
-        if text_parts:
-            return "\n\n".join(text_parts)
-    except Exception:
-        pass
+    """Extract text from entire document using PyMuPDF (shared page index); fallback to pdfplumber."""
+    index = get_page_index(str(pdf_path))
+    if index.page_count:
+        return index.full_text()
     # Fallback: pdfplumber
     try:
         import pdfplumber
@@ -83,130 +81,179 @@ def extract_pdf_text(pdf_path):
 TABLE_AGENTS = {"financial_agent", "loans_agent", "reserves_agent", "cashflow_agent"}
 
 
+def _second_pass_pages(agent_pages, page_count):
+    """Candidate pages for the numeric second pass: section pages ±2 (max 6), else first/middle/last."""
+    if agent_pages:
+        expanded = []
+        for p in agent_pages:
+            expanded.extend([p-2, p-1, p, p+1, p+2])
+        return sorted({i for i in expanded if i >= 0})[:6]
+    n = page_count
+    mids = [n//2-1, n//2, max(0, n-1)]
+    return sorted({0, 1, *mids})
+
+
+def _vision_agent(pdf_path, agent_id, prompt, agent_pages, page_count):
+    """Vision-only extraction for one agent: first pass, numeric second pass, enforcement.
+    Returns (enforced result, qc meta).
+    """
+    full_prompt = f"{prompt}\n\n{schema_prompt_block(agent_id)}"
+    print(f"  [vision] {agent_id} -> images")
+    # First pass
+    best, meta = vision_qc_agent(str(pdf_path), agent_id, full_prompt, page_indices=agent_pages)
+    qcnum1 = numeric_qc(agent_id, best)
+    meta["numeric_qc_first"] = qcnum1
+
+    # Numeric second pass if needed (tables often need more pages)
+    need_second = agent_id in TABLE_AGENTS and not qcnum1.get("passed", False)
+    if need_second:
+        try:
+            expanded = _second_pass_pages(agent_pages, page_count)
+            best2, meta2 = vision_qc_agent(str(pdf_path), agent_id, full_prompt, page_indices=expanded,
+                                           max_pages=max(3, len(expanded)))
+            qcnum2 = numeric_qc(agent_id, best2)
+            meta["numeric_qc_second"] = qcnum2
+            s1 = score_output(agent_id, best)
+            s2 = score_output(agent_id, best2)
+            # Prefer second if QC passes or score improves
+            if qcnum2.get("passed", False) or s2 > s1:
+                meta["second_pass_used"] = True
+                meta["second_pass_pages"] = expanded
+                best = best2
+            else:
+                meta["second_pass_used"] = False
+        except Exception as _e:
+            meta["second_pass_error"] = str(_e)
+
+    # collect schema_extension from vision result
+    try:
+        if isinstance(best, dict) and best.get("schema_extension"):
+            outdir = Path("data")/"raw_pdfs"/"outputs"/"schema_proposals"
+            os.makedirs(str(outdir), exist_ok=True)
+            fname = f"{Path(str(pdf_path)).stem}__{agent_id}.schema_proposal.json"
+            with open(str(outdir/fname), "w") as f:
+                json.dump({"agent": agent_id, "pdf": str(pdf_path), "schema_extension": best["schema_extension"]}, f, indent=2, ensure_ascii=False)
+    except Exception:
+        pass
+
+    # enforcement
+    best_enforced, verified, dropped = enforce(agent_id, best)
+    if verified:
+        meta["verified_fields"] = verified
+    if dropped:
+        meta["dropped_fields"] = dropped
+    return best_enforced, meta
+
+
+def vision_only_extract(pdf_path, agents, pages_map, page_index=None):
+    """Vision-only extraction for all agents: plan pages, render their union once, then run agents concurrently.
+
+    Without `page_index` the text index is only built if an agent has no pages
+    from `pages_map` and falls back to anchor selection.
+
+    Agents share many pages; rendering the union up front in one batch lets the
+    raster pool work on it in parallel, and every agent call then hits the
+    render cache. Agent calls run in VISION_AGENT_CONCURRENCY threads (0 = all);
+    the provider limiters in core/rate_limiter.py bound the actual requests.
+    """
+    plan = {}
+    for agent_id in agents:
+        try:
+            plan[agent_id] = pages_map.get(agent_id) or select_pages_for_agent(str(pdf_path), agent_id, index=page_index)
+        except Exception as e:
+            print(f"  [vision] page selection failed for {agent_id}: {e}")
+            plan[agent_id] = []
+    page_count = page_index.page_count if page_index is not None else pdf_page_count(str(pdf_path))
+    union = sorted({p for pages in plan.values() for p in vision_page_plan(pages)})
+    dpi = int(os.getenv("QC_PAGE_RENDER_DPI", "220"))
+    t0 = time.time()
+    try:
+        rendered = len(render_pdf_pages_subset(str(pdf_path), union, dpi=dpi))
+    except Exception as e:
+        print(f"  [vision] page prefetch failed ({e}); agents render their own pages")
+        rendered = 0
+    print(f"  [vision] plan: {len(plan)} agents, {len(union)} distinct pages rendered once ({time.time() - t0:.1f}s)")
+
+    # optional fixed pacing between vision call starts (provider limits live in core/rate_limiter.py)
+    try:
+        pace_ms = int(os.getenv("GEMINI_PACING_MS", "0"))
+    except Exception:
+        pace_ms = 0
+    try:
+        workers = int(os.getenv("VISION_AGENT_CONCURRENCY", "0"))
+    except Exception:
+        workers = 0
+    workers = min(workers, len(plan)) if workers > 0 else len(plan)
+
+    vis_results = {}
+    vis_meta = {}
+    futures = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="vision-agent") as ex:
+        for agent_id, prompt in agents.items():
+            if pace_ms > 0 and futures:
+                time.sleep(pace_ms / 1000.0)
+            ctx = contextvars.copy_context()
+            futures[agent_id] = ex.submit(ctx.run, _vision_agent, pdf_path, agent_id, prompt, plan[agent_id], page_count)
+        for agent_id, fut in futures.items():
+            try:
+                vis_results[agent_id], vis_meta[agent_id] = fut.result()
+            except Exception as e:
+                print(f"  [vision] error {agent_id}: {e}")
+                vis_results[agent_id] = {}
+    if vis_meta:
+        vis_meta["_vision_plan"] = {"pages_by_agent": plan, "distinct_pages": len(union), "rendered": rendered,
+                                    "concurrency": workers}
+        vis_results["_qc"] = vis_meta
+    return vis_results
+
+
+def _auto_vision(pdf_path, agents, reason, page_index=None):
+    """Vision-only extraction for a document routed away from the text path."""
+    use_vision_sectionizer = os.getenv("VISION_SECTIONIZER", "true").lower() == "true"
+    print(f"[auto-vision] {reason}. Using vision-only for {pdf_path}.")
+    # Use vision sectionizer to pick pages per agent
+    vis_sec = vision_sectionize(str(pdf_path)) if use_vision_sectionizer else {"pages_by_agent": {}}
+    pages_map = vis_sec.get("pages_by_agent", {})
+    # Persist section map for auditability
+    try:
+        import json as _json
+        import os as _os
+        sec_out_dir = str(Path(os.getenv("SECTIONS_OUT_DIR", "data/raw_pdfs/outputs/sections")).resolve())
+        _os.makedirs(sec_out_dir, exist_ok=True)
+        base = Path(str(pdf_path)).stem + ".sections.json"
+        with open(str(Path(sec_out_dir) / base), "w") as f:
+            _json.dump(vis_sec, f, indent=2, ensure_ascii=False)
+    except Exception:
+        pass
+    return vision_only_extract(pdf_path, agents, pages_map, page_index=page_index)
+
+
 def process_pdf(pdf_path, agents):
     """Process a single PDF with all agents"""
     # Auto-switch to vision-only if low text layer and flag enabled
     auto_vision = os.getenv("AUTO_VISION_IF_LOW_TEXT", "true").lower() == "true"
-    use_vision_sectionizer = os.getenv("VISION_SECTIONIZER", "true").lower() == "true"
     if auto_vision:
         try:
-            import fitz
-            doc = fitz.open(str(pdf_path))
-            low = 0
-            total = max(doc.page_count, 1)
-            for p in doc:
-                txt = p.get_text("text") or ""
-                if len(txt) < 500:
-                    low += 1
-            doc.close()
+            # Topology from the mass-scan DB / topology store; classified (and stored) on first sight
+            topology = get_topology(str(pdf_path), store=default_store())
+            vision_categories = {c.strip() for c in os.getenv("AUTO_VISION_CATEGORIES", "scanned").split(",") if c.strip()}
+            if topology["category"] in vision_categories:
+                return _auto_vision(pdf_path, agents, f"{topology['category']} document "
+                                    f"({topology.get('avg_chars_per_page') or 0:.0f} chars/page, topology from {topology['source']})")
+        except Exception:
+            pass
+    page_index = get_page_index(str(pdf_path))
+    if auto_vision:
+        # Per-page rule on the text the text path reads anyway: mostly low-text pages go to vision too
+        try:
+            low = sum(1 for t in page_index.page_texts if len(t or "") < 500)
+            total = max(page_index.page_count, 1)
             if (low / total) >= 0.6:
-                print(f"[auto-vision] Low text detected ({low}/{total} low pages). Using vision-only for {pdf_path}.")
-                vis_results = {}
-                vis_meta = {}
-                # Use vision sectionizer to pick pages per agent
-                vis_sec = vision_sectionize(str(pdf_path)) if use_vision_sectionizer else {"pages_by_agent": {}}
-                pages_map = vis_sec.get("pages_by_agent", {})
-                # Persist section map for auditability
-                try:
-                    import json as _json
-                    import os as _os
-                    sec_out_dir = str((Path("data") / "raw_pdfs" / "outputs" / "sections").resolve())
-                    _os.makedirs(sec_out_dir, exist_ok=True)
-                    base = Path(str(pdf_path)).stem + ".sections.json"
-                    with open(str(Path(sec_out_dir) / base), "w") as f:
-                        _json.dump(vis_sec, f, indent=2, ensure_ascii=False)
-                except Exception:
-                    pass
-                # pacing between vision calls
-                try:
-                    pace_ms = int(os.getenv("GEMINI_PACING_MS", "400"))
-                except Exception:
-                    pace_ms = 400
-                for agent_id, prompt in agents.items():
-                    full_prompt = f"{prompt}\n\n{schema_prompt_block(agent_id)}"
-                    agent_pages = pages_map.get(agent_id) or select_pages_for_agent(str(pdf_path), agent_id)
-                    print(f"  [vision] {agent_id} -> images")
-                    try:
-                        if pace_ms > 0:
-                            time.sleep(pace_ms / 1000.0)
-                        # First pass
-                        best, meta = vision_qc_agent(str(pdf_path), agent_id, full_prompt, page_indices=agent_pages)
-                        qcnum1 = numeric_qc(agent_id, best)
-                        meta["numeric_qc_first"] = qcnum1
-
-                        # Numeric second pass if needed (tables often need more pages)
-                        need_second = agent_id in TABLE_AGENTS and not qcnum1.get("passed", False)
-                        if need_second:
-                            try:
-                                # Expand candidate pages within section by ±2 and cap to 6
-                                expanded = []
-                                if agent_pages:
-                                    for p in agent_pages:
-                                        expanded.extend([p-2, p-1, p, p+1, p+2])
-                                    expanded = sorted({i for i in expanded if i >= 0})[:6]
-                                else:
-                                    # Fallback: first, middle, last
-                                    import fitz
-                                    doc = fitz.open(str(pdf_path))
-                                    n = doc.page_count
-                                    doc.close()
-                                    mids = [n//2-1, n//2, max(0, n-1)]
-                                    expanded = sorted({0,1,*mids})
-                                prev = os.environ.get("VISION_MAX_PAGES")
-                                os.environ["VISION_MAX_PAGES"] = str(max(3, len(expanded)))
-                                try:
-                                    best2, meta2 = vision_qc_agent(str(pdf_path), agent_id, full_prompt, page_indices=expanded)
-                                finally:
-                                    if prev is not None:
-                                        os.environ["VISION_MAX_PAGES"] = prev
-                                    else:
-                                        del os.environ["VISION_MAX_PAGES"]
-                                qcnum2 = numeric_qc(agent_id, best2)
-                                meta["numeric_qc_second"] = qcnum2
-                                from core.bench import score_output as _score
-                                s1 = _score(agent_id, best)
-                                s2 = _score(agent_id, best2)
-                                # Prefer second if QC passes or score improves
-                                if qcnum2.get("passed", False) or s2 > s1:
-                                    meta["second_pass_used"] = True
-                                    meta["second_pass_pages"] = expanded
-                                    best = best2
-                                else:
-                                    meta["second_pass_used"] = False
-                            except Exception as _e:
-                                meta["second_pass_error"] = str(_e)
-
-                        # collect schema_extension from vision result
-                        try:
-                            if isinstance(best, dict) and best.get("schema_extension"):
-                                import os as _os
-                                from pathlib import Path as _Path
-                                outdir = _Path("data")/"raw_pdfs"/"outputs"/"schema_proposals"
-                                _os.makedirs(str(outdir), exist_ok=True)
-                                fname = f"{_Path(str(pdf_path)).stem}__{agent_id}.schema_proposal.json"
-                                with open(str(outdir/fname), "w") as f:
-                                    json.dump({"agent": agent_id, "pdf": str(pdf_path), "schema_extension": best["schema_extension"]}, f, indent=2, ensure_ascii=False)
-                        except Exception:
-                            pass
-
-                        # enforcement
-                        best_enforced, verified, dropped = enforce(agent_id, best)
-                        if verified:
-                            meta["verified_fields"] = verified
-                        if dropped:
-                            meta["dropped_fields"] = dropped
-                        vis_results[agent_id] = best_enforced
-                        vis_meta[agent_id] = meta
-                    except Exception as e:
-                        print(f"  [vision] error {agent_id}: {e}")
-                        vis_results[agent_id] = {}
-                if vis_meta:
-                    vis_results["_qc"] = vis_meta
-                return vis_results
+                return _auto_vision(pdf_path, agents, f"Low text detected ({low}/{total} low pages)", page_index=page_index)
         except Exception:
             pass
     # Sectionize to focus each agent on relevant pages
-    section_map = sectionize_pdf(str(pdf_path))
+    section_map = sectionize_pdf(str(pdf_path), index=page_index)
     text = extract_pdf_text(pdf_path)
     results = {}
     
@@ -232,17 +279,7 @@ def process_pdf(pdf_path, agents):
             # Gemini-only: produce Gemini baseline (clip text to section pages if available)
             agent_pages = section_map.get(agent_id, [])
             if agent_pages:
-                try:
-                    import fitz
-                    doc = fitz.open(str(pdf_path))
-                    parts = []
-                    for i in agent_pages:
-                        if 0 <= i < doc.page_count:
-                            parts.append(doc.load_page(i).get_text("text") or "")
-                    doc.close()
-                    clipped_text = "\n\n".join(parts) or text
-                except Exception:
-                    clipped_text = text
+                clipped_text = page_index.text_for_pages(agent_pages) or text
             else:
                 clipped_text = text
 
@@ -269,11 +306,11 @@ def process_pdf(pdf_path, agents):
             # OpenAI-only path for text
             if os.getenv("OPENAI_ONLY", "false").lower() == "true":
                 try:
-                    # pacing
+                    # optional fixed pacing (provider limits live in core/rate_limiter.py)
                     try:
-                        pace_ms = int(os.getenv("OPENAI_PACING_MS", "1500"))
+                        pace_ms = int(os.getenv("OPENAI_PACING_MS", "0"))
                     except Exception:
-                        pace_ms = 1500
+                        pace_ms = 0
                     if pace_ms > 0:
                         time.sleep(pace_ms / 1000.0)
                     oa_txt = call_openai_text(full_prompt, clipped_text)
@@ -380,17 +417,10 @@ def process_pdf(pdf_path, agents):
                 if suspect:
                     print(f"  [verify] Qwen vision on candidate pages for {agent_id}")
                     try:
-                        import fitz
-                        doc = fitz.open(str(pdf_path))
-                        page_idxs = []
                         terms = [
                             "resultaträkning", "balansräkning", "not", "lån", "fond", "tillgångar", "skulder", "eget kapital",
                         ]
-                        for i, page in enumerate(doc):
-                            txt = page.get_text("text").lower()
-                            if any(t in txt for t in terms):
-                                page_idxs.append(i)
-                        doc.close()
+                        page_idxs = page_index.pages_containing(terms)
                     except Exception:
                         page_idxs = list(range(0, 3))
                     if not page_idxs:
@@ -424,168 +454,216 @@ def process_pdf(pdf_path, agents):
         results["_bench"] = bench_meta
     return results
 
+def extract_document(pdf, args, simulate_scanned=False):
+    """Run the configured extraction mode (hybrid / one-shot / orchestrated / vision-only / default) for one PDF."""
+    # Hybrid mode: one-shot first, then orchestrate only under-performing agents
+    if os.getenv("HYBRID_MODE", "false").lower() == "true":
+        print(f"[hybrid] One-shot first for {pdf}")
+        oneshot = oneshot_extract(str(pdf), AGENT_PROMPTS)
+        # Decide which agents need orchestration (score < target)
+        try:
+            target = float(os.getenv("ORCHESTRATOR_TARGET_SCORE", "95"))
+        except Exception:
+            target = 95.0
+        needs: dict[str, str] = {}
+        for aid, prompt in AGENT_PROMPTS.items():
+            if aid.startswith("_"):
+                continue
+            data = oneshot.get(aid, {})
+            sc = score_output(aid, data)
+            if sc < target:
+                needs[aid] = prompt
+        print(f"[hybrid] Under target ({target}) agents: {list(needs.keys())}")
+        if needs:
+            print(f"[hybrid] Orchestrating {len(needs)} agent(s) for {pdf}")
+            orch = orchestrate_pdf(str(pdf), needs, max_rounds=int(os.getenv("ORCHESTRATOR_MAX_ROUNDS", str(args.max_rounds))))
+            # Merge: orchestrated agents replace oneshot for those keys
+            for k, v in orch.items():
+                if k == "_qc":
+                    continue
+                oneshot[k] = v
+            # Merge qc
+            if "_qc" in orch:
+                oneshot.setdefault("_qc", {}).update(orch["_qc"])  # type: ignore
+        return oneshot
+
+    # One-shot mode: single GPT-5 pass produces sectionizer + all agents at once
+    if os.getenv("ONESHOT", "false").lower() == "true":
+        print(f"[oneshot] Single-pass extraction for {pdf}")
+        return oneshot_extract(str(pdf), AGENT_PROMPTS)
+
+    # Orchestrated mode: one OpenAI agent coaches sectionizer + agents with iterative loops
+    if os.getenv("ORCHESTRATE", "false").lower() == "true":
+        try:
+            rounds = int(os.getenv("ORCHESTRATOR_MAX_ROUNDS", str(args.max_rounds)))
+        except Exception:
+            rounds = args.max_rounds
+        print(f"[orchestrate] Using orchestrated extraction for {pdf} (rounds={rounds})")
+        return orchestrate_pdf(str(pdf), AGENT_PROMPTS, max_rounds=rounds)
+    if simulate_scanned:
+        os.environ["VISION_MAX_PAGES"] = os.getenv("VISION_MAX_PAGES", "3")
+        print(f"[simulate-scanned] Using vision-only for {pdf}")
+        # Vision-only path: run all agents via vision QC
+        from core.vision_qc import vision_qc_agent
+        vis_results = {}
+        vis_meta = {}
+        for agent_id, prompt in AGENT_PROMPTS.items():
+            print(f"  [vision] {agent_id} -> images")
+            try:
+                full_prompt = f"{prompt}\n\n{schema_prompt_block(agent_id)}"
+                best, meta = vision_qc_agent(str(pdf), agent_id, full_prompt)
+                # numeric QC + enforcement for parity with process_pdf vision path
+                qcnum1 = numeric_qc(agent_id, best)
+                meta["numeric_qc_first"] = qcnum1
+                best_enforced, verified, dropped = enforce(agent_id, best)
+                if verified:
+                    meta["verified_fields"] = verified
+                if dropped:
+                    meta["dropped_fields"] = dropped
+                vis_results[agent_id] = best_enforced
+                vis_meta[agent_id] = meta
+            except Exception as e:
+                print(f"  [vision] error {agent_id}: {e}")
+                vis_results[agent_id] = {}
+        if vis_meta:
+            vis_results["_qc"] = vis_meta
+        return vis_results
+    return process_pdf(pdf, AGENT_PROMPTS)
+
+def _is_nonempty(v: object) -> bool:
+    if v is None:
+        return False
+    if isinstance(v, (int, float)):
+        return True
+    if isinstance(v, str):
+        return v.strip() != ""
+    if isinstance(v, (list, dict)):
+        return len(v) > 0
+    return False
+
+
+def summarize_document(res):
+    """Per-agent coverage / numeric QC and evidence ratio for one document's results."""
+    pdf_sum = {"agents": {}, "evidence_ratio": 0.0}
+    agents = {k: v for k, v in res.items() if not k.startswith("_")}
+    ev_has = 0
+    ev_total = 0
+    for agent_id, data in agents.items():
+        types = get_types(agent_id)
+        keys = [k for k in types.keys() if k != "evidence_pages"]
+        filled = sum(1 for k in keys if _is_nonempty(data.get(k)))
+        coverage = 0.0 if not keys else round(100.0 * filled / len(keys), 1)
+        # evidence presence
+        if "evidence_pages" in types:
+            ev_total += 1
+            if _is_nonempty(data.get("evidence_pages")):
+                ev_has += 1
+        # numeric qc pass if available in _qc
+        qc = res.get("_qc", {}).get(agent_id, {}) if isinstance(res.get("_qc"), dict) else {}
+        num_qc = qc.get("numeric_qc_first", {})
+        pdf_sum["agents"][agent_id] = {
+            "coverage_pct": coverage,
+            "numeric_qc_pass": bool(num_qc.get("passed", False)),
+        }
+    pdf_sum["evidence_ratio"] = (round(100.0 * ev_has / ev_total, 1) if ev_total else 0.0)
+    return pdf_sum
+
+
 def main():
     parser = argparse.ArgumentParser(description="Gracian Pipeline CLI")
     parser.add_argument("--input-dir", required=True, help="Input directory with PDFs")
-    parser.add_argument("--batch-size", type=int, default=5, help="Batch size for processing")
+    parser.add_argument("--max-docs", type=int, default=None, help="Process at most N documents (default: all discovered)")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("RUN_WORKERS", "1") or "1"), help="Documents extracted concurrently")
+    parser.add_argument("--priority", choices=["pages", "topology", "fifo"], default=os.getenv("RUN_PRIORITY", "pages"), help="Scheduling order")
+    parser.add_argument("--topology-file", default="pdf_topology_analysis.json", help="analyze_pdf_topology.py report used by --priority topology")
+    parser.add_argument("--batch-size", type=int, default=None, help=argparse.SUPPRESS)  # deprecated alias of --max-docs
     parser.add_argument("--simulate-scanned-first", action="store_true", help="Treat the first PDF as scanned (vision-only)")
     parser.add_argument("--max-rounds", type=int, default=5, help="Maximum rounds for extraction")
     parser.add_argument("--target-accuracy", type=float, default=0.95, help="Target accuracy")
+    parser.add_argument("--resume", action="store_true", help="Skip documents already done in outputs/run_manifest.db; retry failed or interrupted ones")
+    parser.add_argument("--no-llm-cache", action="store_true", help="Ignore cached LLM responses (fresh answers are still stored)")
     
     args = parser.parse_args()
+    if args.batch_size is not None and args.max_docs is None:
+        print("[warn] --batch-size is deprecated; use --max-docs (and --workers for parallelism)")
+        args.max_docs = args.batch_size
+    if args.no_llm_cache:
+        os.environ["LLM_CACHE_BYPASS"] = "true"
     # Verbose run config
     print("=== Gracian Pipeline Start ===")
-    print(f"Input: {args.input_dir} | batch={args.batch_size} | simulate_scanned_first={args.simulate_scanned_first}")
+    print(f"Input: {args.input_dir} | max_docs={args.max_docs or 'all'} | workers={args.workers} | simulate_scanned_first={args.simulate_scanned_first}")
     print(f"Models: XAI_MODEL={os.getenv('XAI_MODEL','grok-4-fast-reasoning-latest')} | GEMINI_MODEL={os.getenv('GEMINI_MODEL','gemini-2.5-pro')} | OPENROUTER_QWEN_MODEL={os.getenv('OPENROUTER_QWEN_MODEL','(disabled for text)')}")
     print(f"Jury: provider={os.getenv('JURY_PROVIDER','openrouter')} | model={os.getenv('JURY_MODEL_OPENROUTER',os.getenv('JURY_MODEL','openai/gpt-5'))}")
     print(f"Benchmark mode: {os.getenv('BENCHMARK_MODE','true')} | TEXT_QWEN_ENABLED={os.getenv('TEXT_QWEN_ENABLED','false')} | TABLE_QWEN_VERIFY={os.getenv('TABLE_QWEN_VERIFY','true')} | TABLE_VISION_QC={os.getenv('TABLE_VISION_QC','false')}")
+    print(f"LLM cache: {os.getenv('LLM_CACHE','true')} | bypass={os.getenv('LLM_CACHE_BYPASS','false')} | path={os.getenv('LLM_CACHE_PATH','data/cache/llm_responses.db')}")
     
     input_dir = Path(args.input_dir)
     if not input_dir.exists():
         print(f"Input directory {input_dir} does not exist")
         return
     
-    pdfs = [Path(p) for p in glob.glob(str(input_dir / "**/*.pdf"), recursive=True)]
+    pdfs = sorted(Path(p) for p in glob.glob(str(input_dir / "**/*.pdf"), recursive=True))
     print(f"Found {len(pdfs)} PDFs")
     
-    # For simplicity, process all with batch size ignored for now
-    all_results = {}
-    for idx, pdf in enumerate(pdfs[:args.batch_size]):  # Process only batch-size for test
-        # Hybrid mode: one-shot first, then orchestrate only under-performing agents
-        if os.getenv("HYBRID_MODE", "false").lower() == "true":
-            print(f"[hybrid] One-shot first for {pdf}")
-            oneshot = oneshot_extract(str(pdf), AGENT_PROMPTS)
-            # Decide which agents need orchestration (score < target)
-            try:
-                target = float(os.getenv("ORCHESTRATOR_TARGET_SCORE", "95"))
-            except Exception:
-                target = 95.0
-            needs: dict[str, str] = {}
-            for aid, prompt in AGENT_PROMPTS.items():
-                if aid.startswith("_"):
-                    continue
-                data = oneshot.get(aid, {})
-                sc = score_output(aid, data)
-                if sc < target:
-                    needs[aid] = prompt
-            print(f"[hybrid] Under target ({target}) agents: {list(needs.keys())}")
-            if needs:
-                print(f"[hybrid] Orchestrating {len(needs)} agent(s) for {pdf}")
-                orch = orchestrate_pdf(str(pdf), needs, max_rounds=int(os.getenv("ORCHESTRATOR_MAX_ROUNDS", str(args.max_rounds))))
-                # Merge: orchestrated agents replace oneshot for those keys
-                for k, v in orch.items():
-                    if k == "_qc":
-                        continue
-                    oneshot[k] = v
-                # Merge qc
-                if "_qc" in orch:
-                    oneshot.setdefault("_qc", {}).update(orch["_qc"])  # type: ignore
-            all_results[str(pdf)] = oneshot
-            continue
-
-        # One-shot mode: single GPT-5 pass produces sectionizer + all agents at once
-        if os.getenv("ONESHOT", "false").lower() == "true":
-            print(f"[oneshot] Single-pass extraction for {pdf}")
-            results = oneshot_extract(str(pdf), AGENT_PROMPTS)
-            all_results[str(pdf)] = results
-            continue
-
-        # Orchestrated mode: one OpenAI agent coaches sectionizer + agents with iterative loops
-        if os.getenv("ORCHESTRATE", "false").lower() == "true":
-            try:
-                rounds = int(os.getenv("ORCHESTRATOR_MAX_ROUNDS", str(args.max_rounds)))
-            except Exception:
-                rounds = args.max_rounds
-            print(f"[orchestrate] Using orchestrated extraction for {pdf} (rounds={rounds})")
-            results = orchestrate_pdf(str(pdf), AGENT_PROMPTS, max_rounds=rounds)
-            all_results[str(pdf)] = results
-            continue
-        if args.simulate_scanned_first and idx == 0:
-            os.environ["VISION_MAX_PAGES"] = os.getenv("VISION_MAX_PAGES", "3")
-            print(f"[simulate-scanned] Using vision-only for {pdf}")
-            # Vision-only path: run all agents via vision QC
-            from core.vision_qc import vision_qc_agent
-            vis_results = {}
-            vis_meta = {}
-            for agent_id, prompt in AGENT_PROMPTS.items():
-                print(f"  [vision] {agent_id} -> images")
-                try:
-                    full_prompt = f"{prompt}\n\n{schema_prompt_block(agent_id)}"
-                    best, meta = vision_qc_agent(str(pdf), agent_id, full_prompt)
-                    # numeric QC + enforcement for parity with process_pdf vision path
-                    qcnum1 = numeric_qc(agent_id, best)
-                    meta["numeric_qc_first"] = qcnum1
-                    best_enforced, verified, dropped = enforce(agent_id, best)
-                    if verified:
-                        meta["verified_fields"] = verified
-                    if dropped:
-                        meta["dropped_fields"] = dropped
-                    vis_results[agent_id] = best_enforced
-                    vis_meta[agent_id] = meta
-                except Exception as e:
-                    print(f"  [vision] error {agent_id}: {e}")
-                    vis_results[agent_id] = {}
-            if vis_meta:
-                vis_results["_qc"] = vis_meta
-            results = vis_results
-        else:
-            results = process_pdf(pdf, AGENT_PROMPTS)
-        all_results[str(pdf)] = results
-    
-    # Save results
+    pdf_paths = [str(p) for p in pdfs]
+    if args.max_docs is not None:
+        pdf_paths = pdf_paths[:args.max_docs]
+    manifest = RunManifest(str(input_dir / "outputs"))
+    if args.resume:
+        completed = manifest.completed()
+        pdf_paths = [p for p in pdf_paths if p not in completed]
+        print(f"[resume] {len(completed)} document(s) already done; {len(pdf_paths)} to (re)run | manifest={manifest.db_path}")
+    run_id = manifest.start_run(pdf_paths, resume=args.resume)
+    sink = open_result_sink(str(input_dir / "outputs"), reset=not args.resume)
+
+    topology = load_topology(args.topology_file) if args.priority == "topology" else {}
+    jobs = plan_jobs(pdf_paths, priority=args.priority, topology=topology)
+    print(f"[scheduler] {len(jobs)} document(s) | workers={args.workers} | priority={args.priority}")
+
+    def _run_job(job):
+        manifest.mark_running(job.pdf_path)
+        return extract_document(Path(job.pdf_path), args, simulate_scanned=args.simulate_scanned_first and job.seq == 0)
+
+    def _on_result(job, results, error, elapsed):
+        if error is not None:
+            manifest.mark_failed(job.pdf_path, str(error), elapsed)
+            return
+        # Sink first: a crash in between re-runs the document on --resume (deduplicated by compaction)
+        try:
+            sink.write(job.pdf_path, results)
+        except Exception as e:
+            print(f"[sink] could not append result for {job.pdf_path}: {e}")
+        try:
+            manifest.mark_done(job.pdf_path, results, elapsed)
+        except Exception as e:
+            print(f"[manifest] could not save result for {job.pdf_path}: {e}")
+            manifest.mark_failed(job.pdf_path, f"save failed: {e}", elapsed)
+
+    scheduler = BatchScheduler(_run_job, workers=args.workers, on_result=_on_result)
+    try:
+        run_stats = scheduler.run(jobs)
+    finally:
+        sink.close()
+    manifest.finish_run(run_id, run_stats["done"], run_stats["failed"])
+    if args.resume:
+        print(f"[sink] compacted re-run records: {sink.compact()}")
+    print(f"[scheduler] done={run_stats['done']} failed={run_stats['failed']} not started={run_stats['skipped']}")
+    print(f"[manifest] {manifest.status_counts()} | per-document results in {manifest.docs_dir}")
+
+    # Combined outputs are rebuilt from the per-document files, one document in memory at a time
     output_file = input_dir / "extraction_results.json"
-    with open(output_file, 'w') as f:
-        json.dump(all_results, f, indent=2)
-    
+    write_json_object_stream(output_file, manifest.iter_results())
     print(f"Results saved to {output_file}")
 
     # Produce a brief coverage/accuracy summary
     try:
-        def _is_nonempty(v: object) -> bool:
-            if v is None:
-                return False
-            if isinstance(v, (int, float)):
-                return True
-            if isinstance(v, str):
-                return v.strip() != ""
-            if isinstance(v, (list, dict)):
-                return len(v) > 0
-            return False
-
-        summary = {}
-        for pdf_path, res in all_results.items():
-            pdf_sum = {"agents": {}, "evidence_ratio": 0.0}
-            agents = {k: v for k, v in res.items() if not k.startswith("_")}
-            ev_has = 0
-            ev_total = 0
-            for agent_id, data in agents.items():
-                types = get_types(agent_id)
-                keys = [k for k in types.keys() if k != "evidence_pages"]
-                filled = sum(1 for k in keys if _is_nonempty(data.get(k)))
-                coverage = 0.0 if not keys else round(100.0 * filled / len(keys), 1)
-                # evidence presence
-                if "evidence_pages" in types:
-                    ev_total += 1
-                    if _is_nonempty(data.get("evidence_pages")):
-                        ev_has += 1
-                # numeric qc pass if available in _qc
-                qc = res.get("_qc", {}).get(agent_id, {}) if isinstance(res.get("_qc"), dict) else {}
-                num_qc = qc.get("numeric_qc_first", {})
-                pdf_sum["agents"][agent_id] = {
-                    "coverage_pct": coverage,
-                    "numeric_qc_pass": bool(num_qc.get("passed", False)),
-                }
-            pdf_sum["evidence_ratio"] = (round(100.0 * ev_has / ev_total, 1) if ev_total else 0.0)
-            summary[pdf_path] = pdf_sum
-
-        out_dir = input_dir / "outputs"
-        out_dir.mkdir(parents=True, exist_ok=True)
-        summary_file = out_dir / "summary.json"
-        with open(summary_file, "w") as f:
-            json.dump(summary, f, indent=2)
+        summary_file = input_dir / "outputs" / "summary.json"
+        write_json_object_stream(summary_file, ((pdf_path, summarize_document(res)) for pdf_path, res in manifest.iter_results()))
         print(f"Summary saved to {summary_file}")
     except Exception as e:
         print(f"[warn] Could not generate summary: {e}")
+    for provider, stats in limiter_stats().items():
+        print(f"[rate-limit] {provider}: {stats}")
 
 if __name__ == "__main__":
     main()
@@ -29,7 +29,6 @@ export ORCHESTRATOR_CONCURRENCY=${ORCHESTRATOR_CONCURRENCY:-2}
 # Keep requests reliable and focused
 export VISION_PAGES_PER_CALL=${VISION_PAGES_PER_CALL:-10}
 export SECTIONIZER_PAGES_PER_CALL=${SECTIONIZER_PAGES_PER_CALL:-6}
-export SECTIONIZER_PACE_MS=${SECTIONIZER_PACE_MS:-500}
 export PASS_PAGE_LABELS=${PASS_PAGE_LABELS:-true}
 
 # Hard gating for numerics/evidence
@@ -37,5 +36,5 @@ export ENFORCE_VERIFICATION=${ENFORCE_VERIFICATION:-strict}
 export STRICT_NEEDS_EVIDENCE=${STRICT_NEEDS_EVIDENCE:-true}
 
 echo "Running orchestrated pipeline on ${INPUT_DIR} (batch=${BATCH})"
-python run_gracian.py --input-dir "${INPUT_DIR}" --batch-size "${BATCH}"
+python run_gracian.py --input-dir "${INPUT_DIR}" --max-docs "${BATCH}" --workers "${RUN_WORKERS:-1}"
 
@@ -0,0 +1,153 @@
+"""
+Anchor Matcher Test Suite
+
+Tests the Aho–Corasick automaton used by the text sectionizer, on every
+backend available here (str.find scan, pure-Python automaton, pyahocorasick).
+
+Test Coverage:
+1. Every (agent, anchor, offset) occurrence matches a brute-force scan
+2. Overlapping anchors and anchors shared between agents
+3. Agent sets identical to the old nested `in` scan for AGENT_ANCHORS; scan is the fallback without pyahocorasick
+
+Run: python test_anchor_matcher.py
+"""
+
+import random
+import sys
+from pathlib import Path
+
+# Add gracian_pipeline to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from gracian_pipeline.core.anchor_matcher import AnchorAutomaton, AnchorHit
+from gracian_pipeline.core.sectionizer import AGENT_ANCHORS
+
+
+def print_section(title: str):
+    """Print section header."""
+    print("\n" + "=" * 70)
+    print(title)
+    print("=" * 70 + "\n")
+
+
+def _backends():
+    backends = ["scan", "python"]
+    if AnchorAutomaton({"a": ["x"]}, backend="auto").backend == "pyahocorasick":
+        backends.append("auto")
+    return backends
+
+
+def _brute_force(text, anchors_by_agent):
+    hits = set()
+    for agent_id, anchors in anchors_by_agent.items():
+        for a in anchors:
+            j = text.find(a)
+            while j != -1:
+                hits.add(AnchorHit(agent_id, a, j))
+                j = text.find(a, j + 1)
+    return hits
+
+
+def test_all_occurrences():
+    """Test 1: Hits equal a brute-force find-all, offsets included."""
+    print_section("TEST 1: All Occurrences")
+
+    anchors = {"a": ["he", "she", "his", "hers"], "b": ["rs", "s"]}
+    ok = True
+    for backend in _backends():
+        automaton = AnchorAutomaton(anchors, backend=backend)
+        rng = random.Random(3)
+        passed = True
+        for _ in range(200):
+            text = "".join(rng.choice("hersi ") for _ in range(rng.randint(0, 40)))
+            hits = automaton.scan(text)
+            ends = [h.offset + len(h.anchor) for h in hits]
+            if set(hits) != _brute_force(text, anchors) or ends != sorted(ends):
+                passed = False
+                print(f"❌ mismatch on {text!r}")
+                break
+        print(f"{'✅' if passed else '❌'} 200 random texts match brute force ({automaton.backend})")
+        ok = ok and passed
+    return ok
+
+
+def test_overlaps_and_shared_anchors():
+    """Test 2: Overlapping and shared anchors each produce a hit."""
+    print_section("TEST 2: Overlapping and Shared Anchors")
+
+    text = "not 12 underhållsplan och uppskjuten skatt"
+    checks = []
+    for backend in _backends():
+        automaton = AnchorAutomaton(AGENT_ANCHORS, backend=backend)
+        hits = set(automaton.scan(text))
+        checks += [
+            (AnchorHit("notes_maintenance_agent", "underhåll", 7) in hits, f"underhåll at 7 ({automaton.backend})"),
+            (AnchorHit("notes_maintenance_agent", "underhållsplan", 7) in hits, f"underhållsplan (maintenance) at 7 ({automaton.backend})"),
+            (AnchorHit("events_agent", "underhållsplan", 7) in hits, f"underhållsplan (events) at 7 ({automaton.backend})"),
+            (AnchorHit("notes_tax_agent", "uppskjuten skatt", 26) in hits, f"uppskjuten skatt at 26 ({automaton.backend})"),
+            (AnchorHit("notes_tax_agent", "skatt", 37) in hits, f"nested skatt at 37 ({automaton.backend})"),
+            (automaton.scan("") == [], f"empty text ({automaton.backend})"),
+        ]
+    ok = True
+    for passed, label in checks:
+        print(f"{'✅' if passed else '❌'} {label}")
+        ok = ok and passed
+    return ok
+
+
+def test_matches_nested_scan():
+    """Test 3: Per-page agent sets equal the previous nested-loop scan."""
+    print_section("TEST 3: Parity With Nested Scan")
+
+    vocab = [a for anchors in AGENT_ANCHORS.values() for a in anchors] + ["kronor", "summa", "år", "lå", "fon"]
+    ok = True
+    for backend in _backends():
+        automaton = AnchorAutomaton(AGENT_ANCHORS, backend=backend)
+        rng = random.Random(11)
+        passed = True
+        for _ in range(300):
+            text = " ".join(rng.choice(vocab) for _ in range(rng.randint(0, 25)))
+            nested = {agent_id for agent_id, anchors in AGENT_ANCHORS.items() if any(a in text for a in anchors)}
+            if automaton.agents_in(text) != nested:
+                passed = False
+                print(f"❌ mismatch on {text!r}")
+                break
+        print(f"{'✅' if passed else '❌'} 300 random pages agree ({automaton.backend} backend)")
+        ok = ok and passed
+    default = AnchorAutomaton(AGENT_ANCHORS).backend
+    fallback_ok = default in ("pyahocorasick", "scan")
+    print(f"{'✅' if fallback_ok else '❌'} default backend is {default} (never the pure-Python automaton)")
+    return ok and fallback_ok
+
+
+def main():
+    """Run all tests."""
+    print("\n" + "=" * 70)
+    print("ANCHOR MATCHER TEST SUITE")
+    print("=" * 70)
+
+    tests = [
+        ("All Occurrences", test_all_occurrences),
+        ("Overlapping and Shared Anchors", test_overlaps_and_shared_anchors),
+        ("Parity With Nested Scan", test_matches_nested_scan),
+    ]
+
+    results = {}
+    for test_name, test_func in tests:
+        try:
+            results[test_name] = test_func()
+        except Exception as e:
+            print(f"\n❌ {test_name} FAILED with exception: {e}")
+            results[test_name] = False
+
+    print_section("TEST SUMMARY")
+    for test_name, passed in results.items():
+        print(f"{'✅ PASSED' if passed else '❌ FAILED'}: {test_name}")
+
+    passed_tests = sum(1 for passed in results.values() if passed)
+    print(f"\nTOTAL: {passed_tests}/{len(results)} tests passed")
+    return 0 if passed_tests == len(results) else 1
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,227 @@
+"""
+Async Orchestrator Test Suite
+
+Tests the asyncio-native orchestrator engine (orchestrate_pdf_async) and its
+synchronous wrapper.
+
+Test Coverage:
+1. Many documents run on one event loop with all their requests in flight at once
+2. The ORCH_DOC_MAX_SECONDS deadline cancels in-flight requests and keeps the best results
+3. orchestrate_pdf works from plain sync code and from inside a running event loop
+
+Run: python test_async_orchestrator.py
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add gracian_pipeline to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from gracian_pipeline.core.coaching_policy import CoachingPolicy, DocumentBudget
+
+AGENTS = {"governance_agent": "g", "audit_agent": "a", "property_agent": "p"}
+
+
+def print_section(title: str):
+    """Print section header."""
+    print("\n" + "=" * 70)
+    print(title)
+    print("=" * 70 + "\n")
+
+
+def _report(checks):
+    ok = True
+    for passed, label in checks:
+        print(f"{'✅' if passed else '❌'} {label}")
+        ok = ok and passed
+    return ok
+
+
+def _import():
+    from gracian_pipeline.core import orchestrator, vision_qc
+    return orchestrator, vision_qc
+
+
+class _SlowProvider:
+    """Stand-in for avision_qc_agent / coaching: sleeps like a network call and tracks requests in flight."""
+
+    def __init__(self, delay: float = 0.05, hang_after: int = 0):
+        self.delay = delay
+        self.hang_after = hang_after
+        self.calls = 0
+        self.inflight = 0
+        self.peak = 0
+        self.cancelled = 0
+
+    async def _request(self):
+        self.calls += 1
+        self.inflight += 1
+        self.peak = max(self.peak, self.inflight)
+        try:
+            await asyncio.sleep(30 if self.hang_after and self.calls > self.hang_after else self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.inflight -= 1
+
+    async def vision(self, pdf_path, agent_id, prompt, page_indices=None):
+        await self._request()
+        return {"chairman": "A"}, {}
+
+    async def coach(self, pdf_path, agent_id, pages, last_json):
+        await self._request()
+        return {"ok": False, "revised_pages": pages, "hints": ""}
+
+
+async def _no_coaching(pdf, outline):
+    return {}
+
+
+async def _no_pages(*args):
+    return []
+
+
+@contextmanager
+def _patched(orchestrator, vision_qc, provider):
+    saved = {name: getattr(orchestrator, name) for name in (
+        "vision_sectionize", "_coach_sectionizer_once", "get_page_index", "select_pages_for_agent",
+        "_global_pick_pages_for_agent", "render_cache_stats", "_coach_agent_once")}
+    saved_vqc = vision_qc.avision_qc_agent
+    env = {"ORCH_GROUP_AGENTS": "false", "ORCHESTRATOR_CONCURRENCY": "0", "VERBOSE_ORCHESTRATOR": "false"}
+    old = {k: os.environ.get(k) for k in list(env) + ["COACH_HISTORY_PATH", "SECTIONS_OUT_DIR"]}
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update(env, COACH_HISTORY_PATH=os.path.join(tmp, "coach.jsonl"),
+                          SECTIONS_OUT_DIR=os.path.join(tmp, "sections"))
+        orchestrator.vision_sectionize = lambda pdf: {"pages_by_agent": {aid: [i + 1] for i, aid in enumerate(AGENTS)}}
+        orchestrator._coach_sectionizer_once = _no_coaching
+        orchestrator.get_page_index = lambda pdf: SimpleNamespace(page_count=20)
+        orchestrator.select_pages_for_agent = lambda *a, **k: []
+        orchestrator._global_pick_pages_for_agent = _no_pages
+        orchestrator.render_cache_stats = lambda pdf: {}
+        orchestrator._coach_agent_once = provider.coach
+        vision_qc.avision_qc_agent = provider.vision
+        try:
+            yield
+        finally:
+            for name, fn in saved.items():
+                setattr(orchestrator, name, fn)
+            vision_qc.avision_qc_agent = saved_vqc
+            for k, v in old.items():
+                if v is None:
+                    os.environ.pop(k, None)
+                else:
+                    os.environ[k] = v
+
+
+def test_many_documents():
+    """Test 1: 12 documents x 3 agents share one loop; requests overlap across documents."""
+    print_section("TEST 1: Many Documents On One Loop")
+    try:
+        orchestrator, vision_qc = _import()
+    except ImportError as e:
+        print(f"⏭️  Skipped (missing dependency: {e})")
+        return True
+    provider = _SlowProvider(delay=0.05)
+    finished = []
+    docs = [f"doc{i}.pdf" for i in range(12)]
+    with _patched(orchestrator, vision_qc, provider):
+        start = time.monotonic()
+        out = asyncio.run(orchestrator.orchestrate_pdfs_async(
+            docs, AGENTS, max_rounds=2, max_documents=12, on_result=lambda pdf, res, err: finished.append((pdf, err))))
+        elapsed = time.monotonic() - start
+    sequential = provider.calls * provider.delay
+    return _report([
+        (sorted(out) == sorted(docs) and all(out[d]["governance_agent"] == {"chairman": "A"} for d in docs), "every document has results"),
+        (len(finished) == 12 and all(err is None for _, err in finished), "on_result called once per document"),
+        (provider.calls == 12 * 3 * 3, f"{provider.calls} requests (2 rounds + 1 coaching per agent)"),
+        (provider.peak >= 30, f"peak {provider.peak} requests in flight"),
+        (elapsed < sequential / 5, f"{elapsed:.2f}s vs {sequential:.1f}s of sequential request time"),
+    ])
+
+
+def test_deadline():
+    """Test 2: A hanging request is cancelled at the document deadline; round 1 results survive."""
+    print_section("TEST 2: Deadline Cancellation")
+    try:
+        orchestrator, vision_qc = _import()
+    except ImportError as e:
+        print(f"⏭️  Skipped (missing dependency: {e})")
+        return True
+    provider = _SlowProvider(delay=0.01, hang_after=3)
+    policy = CoachingPolicy(max_rounds=5, patience=0, budget=DocumentBudget(max_seconds=0.5))
+    with _patched(orchestrator, vision_qc, provider):
+        start = time.monotonic()
+        out = asyncio.run(orchestrator.orchestrate_pdf_async("doc.pdf", AGENTS, max_rounds=5, policy=policy))
+        elapsed = time.monotonic() - start
+    qc = out["_qc"]
+    return _report([
+        (elapsed < 2.0, f"returned after {elapsed:.2f}s (deadline 0.5s, requests hang 30s)"),
+        (provider.cancelled == 3 and provider.inflight == 0, f"{provider.cancelled} in-flight requests cancelled"),
+        (all(qc[a]["stop_reason"] == "budget_time" for a in AGENTS), "stop reason budget_time for every agent"),
+        (all(out[a] == {"chairman": "A"} for a in AGENTS), "round 1 results kept"),
+        (qc["_orchestrator"]["budget"]["stop_reasons"] == {"budget_time": 3}, "stop reasons summarized"),
+    ])
+
+
+def test_sync_wrapper():
+    """Test 3: orchestrate_pdf runs the async engine from sync code and from a running loop."""
+    print_section("TEST 3: Sync Wrapper")
+    try:
+        orchestrator, vision_qc = _import()
+    except ImportError as e:
+        print(f"⏭️  Skipped (missing dependency: {e})")
+        return True
+    provider = _SlowProvider(delay=0.01)
+
+    async def _inside_loop():
+        return orchestrator.orchestrate_pdf("doc.pdf", AGENTS, max_rounds=1)
+
+    with _patched(orchestrator, vision_qc, provider):
+        plain = orchestrator.orchestrate_pdf("doc.pdf", AGENTS, max_rounds=1)
+        nested = asyncio.run(_inside_loop())
+    return _report([
+        (plain["audit_agent"] == {"chairman": "A"} and plain["_qc"]["audit_agent"]["stop_reason"] == "max_rounds", "sync call"),
+        (nested["audit_agent"] == plain["audit_agent"], "call from inside a running event loop"),
+        (provider.calls == 6, f"{provider.calls} requests (no coaching after the last round)"),
+    ])
+
+
+def main():
+    """Run all tests."""
+    print("\n" + "=" * 70)
+    print("ASYNC ORCHESTRATOR TEST SUITE")
+    print("=" * 70)
+
+    tests = [
+        ("Many Documents On One Loop", test_many_documents),
+        ("Deadline Cancellation", test_deadline),
+        ("Sync Wrapper", test_sync_wrapper),
+    ]
+
+    results = {}
+    for test_name, test_func in tests:
+        try:
+            results[test_name] = test_func()
+        except Exception as e:
+            print(f"\n❌ {test_name} FAILED with exception: {e}")
+            results[test_name] = False
+
+    print_section("TEST SUMMARY")
+    for test_name, passed in results.items():
+        print(f"{'✅ PASSED' if passed else '❌ FAILED'}: {test_name}")
+
+    passed_tests = sum(1 for passed in results.values() if passed)
+    print(f"\nTOTAL: {passed_tests}/{len(results)} tests passed")
+    return 0 if passed_tests == len(results) else 1
+
+
+if __name__ == "__main__":
+    exit(main())
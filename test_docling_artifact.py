@@ -0,0 +1,405 @@
+"""
+Shared Docling Conversion Artifact + Cache Test Suite
+
+Tests that one conversion serves every hierarchical note pass, and that
+conversions persist in the content-addressed on-disk cache.
+
+Test Coverage:
+1. Artifact construction from a DoclingDocument (per-page markdown, table provenance)
+2. In-memory page slicing of markdown and tables
+3. Note extraction reuses the artifact without re-converting; live and cached artifacts give the same tables
+4. Cache round-trip and cache hits skip Docling
+5. Cache keys change with file content, pipeline options and docling/docling-core versions; unset = default converter
+6. Size-bounded LRU eviction
+7. Note pages located from note headings; full-document fallback when the heading is missing
+
+Run: python test_docling_artifact.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add gracian_pipeline to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from gracian_pipeline.core.docling_artifact import (
+    DoclingArtifact,
+    artifact_from_document,
+    table_text,
+)
+from gracian_pipeline.core.docling_cache import DoclingCache, convert_cached, options_fingerprint
+
+
+def print_section(title: str):
+    """Print section header."""
+    print("\n" + "=" * 70)
+    print(title)
+    print("=" * 70 + "\n")
+
+
+class _Prov:
+    def __init__(self, page_no):
+        self.page_no = page_no
+
+
+class _Table:
+    def __init__(self, page_no, cells):
+        self.prov = [_Prov(page_no)]
+        self._cells = cells
+
+    def model_dump(self, **kwargs):
+        return {"data": {"table_cells": self._cells}}
+
+    def export_to_dataframe(self):
+        return type("DataFrame", (), {"to_markdown": lambda df: "| live dataframe |"})()
+
+
+class _Document:
+    """Minimal stand-in for a DoclingDocument (3 pages, 2 tables)."""
+
+    def __init__(self):
+        self.pages = {1: object(), 2: object(), 3: object()}
+        self.tables = [
+            _Table(2, [
+                {"text": "Fastighetsel", "start_row_offset_idx": 0, "start_col_offset_idx": 0},
+                {"text": "120 000", "start_row_offset_idx": 0, "start_col_offset_idx": 1},
+            ]),
+            _Table(3, [
+                {"text": "Skattekonto", "start_row_offset_idx": 0, "start_col_offset_idx": 0},
+            ]),
+        ]
+        self.markdown_calls = 0
+
+    def export_to_dict(self):
+        return {"name": "brf_test", "tables": [t.model_dump() for t in self.tables]}
+
+    def export_to_markdown(self, page_no=None):
+        self.markdown_calls += 1
+        if page_no is None:
+            return "# Förvaltningsberättelse\n\n# Not 4 Driftkostnader\n\n# Not 9 Övriga fordringar"
+        return {1: "# Förvaltningsberättelse", 2: "# Not 4 Driftkostnader", 3: "# Not 9 Övriga fordringar"}[page_no]
+
+
+def test_artifact_construction():
+    """Test 1: Artifact captures per-page markdown and table provenance."""
+    print_section("TEST 1: Artifact Construction")
+
+    doc = _Document()
+    art = artifact_from_document("brf_test.pdf", doc)
+
+    checks = [
+        (art.page_count == 3, "page_count == 3"),
+        (art.page_markdown.get(1) == "# Not 4 Driftkostnader", "page 2 markdown (0-based 1)"),
+        (art.table_pages == [[1], [2]], "table provenance is 0-based"),
+        (len(art.tables) == 2, "two table model_dumps"),
+        (art.document is doc, "live document retained"),
+    ]
+    ok = True
+    for passed, label in checks:
+        print(f"{'✅' if passed else '❌'} {label}")
+        ok = ok and passed
+    return ok
+
+
+def test_page_slicing():
+    """Test 2: Markdown and tables slice by page without touching the PDF."""
+    print_section("TEST 2: In-Memory Page Slicing")
+
+    art = artifact_from_document("brf_test.pdf", _Document())
+
+    md = art.markdown_for_pages([1])
+    tables = art.tables_for_pages([1])
+    empty = DoclingArtifact(pdf_path="x.pdf", markdown="FULL", tables=[], table_pages=[])
+
+    checks = [
+        (md == "# Not 4 Driftkostnader", "note 4 page slice"),
+        (len(tables) == 1 and "Fastighetsel" in table_text(tables[0]), "note 4 table slice"),
+        (art.tables_for_pages([0]) == [], "no tables on page 1"),
+        (empty.markdown_for_pages([5]) == "FULL", "falls back to full markdown without page provenance"),
+    ]
+    ok = True
+    for passed, label in checks:
+        print(f"{'✅' if passed else '❌'} {label}")
+        ok = ok and passed
+    return ok
+
+
+def test_note_extraction_reuses_artifact():
+    """Test 3: HierarchicalFinancialExtractor slices the shared artifact."""
+    print_section("TEST 3: Note Extraction Reuses Artifact")
+
+    try:
+        from gracian_pipeline.core import hierarchical_financial
+    except ImportError as e:
+        print(f"⏭️  Skipped (missing dependency: {e})")
+        return True
+
+    art = artifact_from_document("brf_test.pdf", _Document())
+    calls = {"convert": 0}
+
+    def _no_convert(*args, **kwargs):
+        calls["convert"] += 1
+        raise AssertionError("convert_document must not be called when an artifact is passed")
+
+    original = hierarchical_financial.convert_document
+    hierarchical_financial.convert_document = _no_convert
+    try:
+        extractor = hierarchical_financial.HierarchicalFinancialExtractor.__new__(
+            hierarchical_financial.HierarchicalFinancialExtractor
+        )
+        md4, t4 = extractor.extract_note_section("brf_test.pdf", [1], artifact=art)
+        md9, t9 = extractor.extract_note_section("brf_test.pdf", [2], artifact=art)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = DoclingCache(os.path.join(tmp, "cache"))
+            pdf = _write_pdf(tmp, "a.pdf", b"%PDF-1.4 brf a")
+            live = convert_cached(pdf, _Converter(), cache=cache)
+            cached = convert_cached(pdf, _Converter(), cache=cache)
+        live_text = extractor.format_tables_hierarchical(extractor.extract_note_section(pdf, [1], artifact=live)[1])
+        cached_text = extractor.format_tables_hierarchical(extractor.extract_note_section(pdf, [1], artifact=cached)[1])
+    finally:
+        hierarchical_financial.convert_document = original
+
+    checks = [
+        (calls["convert"] == 0 and "Not 4" in md4 and "Not 9" in md9 and len(t4) == 1 and len(t9) == 1,
+         "notes 4 and 9 sliced from one conversion"),
+        (live.document is not None and cached.document is None, "one live and one cached artifact"),
+        (live_text == cached_text and "Fastighetsel" in cached_text, "tables render the same on a cache hit"),
+    ]
+    ok = True
+    for passed, label in checks:
+        print(f"{'✅' if passed else '❌'} {label}")
+        ok = ok and passed
+    return ok
+
+
+class _Converter:
+    """Counts conversions; stands in for DocumentConverter."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def convert(self, pdf_path):
+        self.calls += 1
+        return type("R", (), {"document": _Document()})()
+
+
+def _write_pdf(dirpath: str, name: str, payload: bytes) -> str:
+    path = os.path.join(dirpath, name)
+    with open(path, "wb") as f:
+        f.write(payload)
+    return path
+
+
+def test_cache_roundtrip():
+    """Test 4: Second conversion of the same file is served from disk."""
+    print_section("TEST 4: Cache Round-Trip")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = DoclingCache(os.path.join(tmp, "cache"))
+        pdf = _write_pdf(tmp, "a.pdf", b"%PDF-1.4 brf a")
+        conv = _Converter()
+
+        first = convert_cached(pdf, conv, cache=cache)
+        second = convert_cached(pdf, conv, cache=cache)
+
+        checks = [
+            (conv.calls == 1, "Docling ran once for two requests"),
+            (second.markdown == first.markdown, "markdown restored"),
+            (second.page_markdown == first.page_markdown, "per-page markdown restored (int keys)"),
+            (second.table_pages == [[1], [2]], "table provenance restored"),
+            (second.document is None and second.export_dict()["name"] == "brf_test", "document dict restored"),
+            (cache.stats()["entries"] == 1, "one index entry"),
+        ]
+    ok = True
+    for passed, label in checks:
+        print(f"{'✅' if passed else '❌'} {label}")
+        ok = ok and passed
+    return ok
+
+
+def test_cache_keys():
+    """Test 5: Keys depend on content and options, not path."""
+    print_section("TEST 5: Cache Keys")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = DoclingCache(os.path.join(tmp, "cache"))
+        a = _write_pdf(tmp, "a.pdf", b"%PDF-1.4 same")
+        b = _write_pdf(tmp, "copy_of_a.pdf", b"%PDF-1.4 same")
+        c = _write_pdf(tmp, "c.pdf", b"%PDF-1.4 other")
+
+        checks = [
+            (cache.key_for(a) == cache.key_for(b), "identical bytes share a key"),
+            (cache.key_for(a) != cache.key_for(c), "different bytes differ"),
+            (cache.key_for(a, "ocr") != cache.key_for(a, "default"), "pipeline options change the key"),
+        ]
+
+        # An unset converter must share keys with an explicit default DocumentConverter()
+        import importlib.metadata
+        import types
+        from gracian_pipeline.core import docling_cache
+
+        class _Options:
+            def __init__(self, ocr=False):
+                self.ocr = ocr
+
+            def model_dump_json(self):
+                return f'{{"do_ocr": {str(self.ocr).lower()}}}'
+
+        class _FakeConverter:
+            def __init__(self, ocr=False):
+                opt = types.SimpleNamespace(pipeline_cls=_Converter, pipeline_options=_Options(ocr))
+                self.format_to_options = {"pdf": opt}
+
+        fake = types.ModuleType("docling.document_converter")
+        fake.DocumentConverter = _FakeConverter
+        saved_modules = {k: sys.modules.get(k) for k in ("docling", "docling.document_converter")}
+        real_version = importlib.metadata.version
+        versions = {"docling": "2.5.0", "docling-core": "2.3.0"}
+        sys.modules.update({"docling": types.ModuleType("docling"), "docling.document_converter": fake})
+        importlib.metadata.version = lambda dist: versions[dist]
+        docling_cache._default_options_fingerprint.cache_clear()
+        docling_cache.docling_version.cache_clear()
+        try:
+            unset, explicit = docling_cache.options_fingerprint(None), docling_cache.options_fingerprint(_FakeConverter())
+            ocr = docling_cache.options_fingerprint(_FakeConverter(ocr=True))
+            before = cache.key_for(a)
+            same_key = before == cache.key_for(a, explicit)
+            versions["docling-core"] = "2.4.0"
+            docling_cache.docling_version.cache_clear()
+            after_core = cache.key_for(a)
+        finally:
+            importlib.metadata.version = real_version
+            for k, v in saved_modules.items():
+                if v is None:
+                    sys.modules.pop(k, None)
+                else:
+                    sys.modules[k] = v
+            docling_cache._default_options_fingerprint.cache_clear()
+            docling_cache.docling_version.cache_clear()
+        checks += [
+            (unset == explicit != "default", "unset converter fingerprints like DocumentConverter()"),
+            (ocr != explicit, "non-default options fingerprint differently"),
+            (same_key, "key_for without options matches the explicit default converter's key"),
+            (before != after_core, "docling-core version changes the key"),
+        ]
+    ok = True
+    for passed, label in checks:
+        print(f"{'✅' if passed else '❌'} {label}")
+        ok = ok and passed
+    return ok
+
+
+def test_cache_lru_eviction():
+    """Test 6: Oldest-accessed entries are evicted past the size bound."""
+    print_section("TEST 6: LRU Eviction")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = DoclingCache(os.path.join(tmp, "cache"), max_bytes=10 ** 9)
+        conv = _Converter()
+        paths = [_write_pdf(tmp, f"{i}.pdf", f"%PDF-1.4 doc {i}".encode()) for i in range(3)]
+        for p in paths:
+            convert_cached(p, conv, cache=cache)
+        # Make doc 0 the most recently used
+        import sqlite3
+        with sqlite3.connect(str(cache.db_path)) as conn:
+            conn.execute("UPDATE entries SET last_access = ?", (int(time.time()) - 100,))
+        options = options_fingerprint(conv)
+        cache.get(cache.key_for(paths[0], options))
+
+        one_entry = cache.total_bytes() // 3 + 1
+        removed = cache.evict(max_bytes=one_entry)
+
+        checks = [
+            (removed == 2, f"two entries evicted (got {removed})"),
+            (cache.get(cache.key_for(paths[0], options)) is not None, "recently used entry kept"),
+            (cache.get(cache.key_for(paths[1], options)) is None, "least recently used entry dropped"),
+        ]
+    ok = True
+    for passed, label in checks:
+        print(f"{'✅' if passed else '❌'} {label}")
+        ok = ok and passed
+    return ok
+
+
+def test_note_pages_from_headings():
+    """Test 7: Note pages come from the note headings, with a full-document fallback."""
+    print_section("TEST 7: Note Pages From Headings")
+
+    try:
+        from gracian_pipeline.core import hierarchical_financial
+    except ImportError as e:
+        print(f"⏭️  Skipped (missing dependency: {e})")
+        return True
+
+    original = hierarchical_financial.get_client
+    hierarchical_financial.get_client = lambda *args, **kwargs: None
+    try:
+        extractor = hierarchical_financial.HierarchicalFinancialExtractor()
+    finally:
+        hierarchical_financial.get_client = original
+
+    art = artifact_from_document("brf_test.pdf", _Document())
+    toc = DoclingArtifact(
+        pdf_path="toc.pdf", markdown="", tables=[], table_pages=[], page_count=12,
+        page_markdown={0: "Innehåll\n\nNot 4 Driftkostnader ..... 9", 8: "## NOT 5 DRIFTKOSTNADER\n\n| El | 120 |"},
+    )
+    seen = {}
+    extractor.extract_note_4_detailed = lambda pdf, pages, artifact=None: seen.setdefault("note_4", pages)
+    extractor.extract_note_8_detailed = lambda pdf, pages, artifact=None: seen.setdefault("note_8", pages)
+    extractor.extract_note_9_detailed = lambda pdf, pages, artifact=None: seen.setdefault("note_9", pages)
+    extractor.extract_all_notes("brf_test.pdf", ["note_4", "note_8", "note_9"], artifact=art)
+    md, tables = extractor.extract_note_section("brf_test.pdf", [0], artifact=art, note_id="note_4")
+
+    checks = [
+        (seen.get("note_4") == [1, 2], f"note 4 from its heading page (got {seen.get('note_4')})"),
+        (seen.get("note_9") == [2], f"note 9 clipped to the last page (got {seen.get('note_9')})"),
+        (seen.get("note_8") == [0, 1, 2], f"note 8 without heading: whole document (got {seen.get('note_8')})"),
+        (extractor.locate_note_pages("note_4", toc) == [8, 9, 10], "heading preferred over table-of-contents entry, note number ignored"),
+        (md == art.markdown and len(tables) == 2, "slice without the heading falls back to full markdown and all tables"),
+    ]
+    ok = True
+    for passed, label in checks:
+        print(f"{'✅' if passed else '❌'} {label}")
+        ok = ok and passed
+    return ok
+
+
+def main():
+    """Run all tests."""
+    print("\n" + "=" * 70)
+    print("SHARED DOCLING ARTIFACT + CACHE TEST SUITE")
+    print("=" * 70)
+
+    tests = [
+        ("Artifact Construction", test_artifact_construction),
+        ("Page Slicing", test_page_slicing),
+        ("Note Extraction Reuses Artifact", test_note_extraction_reuses_artifact),
+        ("Cache Round-Trip", test_cache_roundtrip),
+        ("Cache Keys", test_cache_keys),
+        ("LRU Eviction", test_cache_lru_eviction),
+        ("Note Pages From Headings", test_note_pages_from_headings),
+    ]
+
+    results = {}
+    for test_name, test_func in tests:
+        try:
+            results[test_name] = test_func()
+        except Exception as e:
+            print(f"\n❌ {test_name} FAILED with exception: {e}")
+            results[test_name] = False
+
+    print_section("TEST SUMMARY")
+    for test_name, passed in results.items():
+        print(f"{'✅ PASSED' if passed else '❌ FAILED'}: {test_name}")
+
+    passed_tests = sum(1 for passed in results.values() if passed)
+    print(f"\nTOTAL: {passed_tests}/{len(results)} tests passed")
+    return 0 if passed_tests == len(results) else 1
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,226 @@
+"""
+Image Encoding Test Suite
+
+Tests the per-page encoding stage that shrinks vision payloads.
+
+Test Coverage:
+1. Content-driven choices: text pages go grayscale PNG and are cropped, colour pages stay RGB, blank pages shrink
+2. Bytes-per-page target, DPI/quality floors (stricter for numeric agents) and pass-through cases
+3. Before/after sizes in vision_qc_agent's qc_meta and in a document's payload_scope
+
+Run: python test_image_encoding.py
+"""
+
+import io
+import os
+import random
+import sys
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+from pathlib import Path
+
+# Add gracian_pipeline to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from gracian_pipeline.core.image_encoding import (
+    PayloadStats, encode_image, encode_images, image_data_url, image_mime, payload_scope, profile_for,
+)
+
+A4_220DPI = (1819, 2573)
+
+
+def print_section(title: str):
+    """Print section header."""
+    print("\n" + "=" * 70)
+    print(title)
+    print("=" * 70 + "\n")
+
+
+def _report(checks):
+    ok = True
+    for passed, label in checks:
+        print(f"{'✅' if passed else '❌'} {label}")
+        ok = ok and passed
+    return ok
+
+
+def _png(img) -> bytes:
+    buf = io.BytesIO()
+    img.save(buf, "PNG")
+    return buf.getvalue()
+
+
+def _statement_page(rows: int = 60) -> bytes:
+    """Black table text on white with wide margins, like a Resultaträkning page."""
+    from PIL import Image, ImageDraw
+    img = Image.new("RGB", A4_220DPI, "white")
+    draw = ImageDraw.Draw(img)
+    for i in range(rows):
+        draw.text((220, 320 + i * 34), f"Not {i:>2}  Skulder till kreditinstitut   {1000 * i + 234:>9,}   {i * 0.35:.2f} %", fill="black")
+    return _png(img)
+
+
+def _chart_page() -> bytes:
+    """Coloured bar chart over a quarter of the page."""
+    from PIL import Image, ImageDraw
+    img = Image.new("RGB", A4_220DPI, "white")
+    draw = ImageDraw.Draw(img)
+    for i, colour in enumerate([(200, 40, 40), (40, 120, 200), (60, 170, 60), (230, 160, 20)]):
+        draw.rectangle((300 + i * 250, 1400 - 180 * i, 480 + i * 250, 1600), fill=colour)
+    return _png(img)
+
+
+def _scan_page() -> bytes:
+    """Noisy gray scan: dense content that lossless PNG cannot shrink."""
+    from PIL import Image
+    random.seed(7)
+    return _png(Image.effect_noise(A4_220DPI, 70).convert("RGB"))
+
+
+def _pillow_missing() -> bool:
+    try:
+        import PIL  # noqa: F401
+    except ImportError as e:
+        print(f"⏭️  Skipped (missing dependency: {e})")
+        return True
+    return False
+
+
+def test_content_choices():
+    """Test 1: Format, colour depth and crop follow the page content."""
+    print_section("TEST 1: Content-Driven Encoding")
+    if _pillow_missing():
+        return True
+    from PIL import Image
+    text, text_st = encode_image(_statement_page(), "qc")
+    chart, chart_st = encode_image(_chart_page(), "qc")
+    blank, blank_st = encode_image(_png(Image.new("RGB", A4_220DPI, "white")), "qc")
+    decoded = Image.open(io.BytesIO(text))
+    return _report([
+        (text_st["format"] == "png" and text_st["mode"] == "L", f"text page -> grayscale PNG ({text_st['before']} -> {text_st['after']} bytes)"),
+        (text_st["cropped"] and decoded.width < A4_220DPI[0] and text_st["scale"] == 1.0, f"margins cropped at full DPI ({decoded.size})"),
+        (chart_st["mode"] == "RGB", "colour chart stays RGB"),
+        (blank_st["after"] < blank_st["before"] / 2, f"blank page {blank_st['before']} -> {blank_st['after']} bytes"),
+        (image_mime(text) == "image/png" and image_data_url(text).startswith("data:image/png;base64,"), "data URL carries the mime type"),
+    ])
+
+
+def test_target_and_floors():
+    """Test 2: Dense pages are re-encoded towards the target without crossing the floors."""
+    print_section("TEST 2: Target And Floors")
+    if _pillow_missing():
+        return True
+    from PIL import Image
+    scan = _scan_page()
+    small, st = encode_image(scan, "sectionizer")
+    numeric, num_st = encode_image(scan, "sectionizer", "loans_agent")
+    prose = profile_for("sectionizer", "governance_agent")
+    strict = profile_for("sectionizer", "loans_agent")
+    old = {k: os.environ.get(k) for k in ("IMAGE_ENCODING", "IMAGE_TARGET_KB_QC")}
+    try:
+        os.environ["IMAGE_TARGET_KB_QC"] = "50"
+        override = profile_for("qc").target_kb
+        os.environ["IMAGE_ENCODING"] = "false"
+        off, off_st = encode_image(scan, "sectionizer")
+    finally:
+        for k, v in old.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+    garbage, garbage_st = encode_image(b"not an image", "qc")
+    return _report([
+        (image_mime(small) == "image/jpeg" and st["after"] < st["before"] / 5, f"dense scan -> JPEG ({st['before']} -> {st['after']} bytes)"),
+        (st["scale"] >= 0.6 and Image.open(io.BytesIO(small)).width >= int(A4_220DPI[0] * 0.6) - 1, f"downscaled to {st['scale']} (floor 0.6)"),
+        (strict.min_scale > prose.min_scale and strict.min_quality > prose.min_quality and strict.target_kb > prose.target_kb, "numeric agents get a higher floor and target"),
+        (num_st["scale"] >= 0.85 and num_st["after"] >= st["after"], f"loans_agent page kept at scale {num_st['scale']}"),
+        (override == 50, "IMAGE_TARGET_KB_<PURPOSE> overrides the target"),
+        (off == scan and off_st["after"] == off_st["before"], "IMAGE_ENCODING=false passes through"),
+        (garbage == b"not an image" and garbage_st.get("error"), "undecodable bytes pass through"),
+    ])
+
+
+def test_payload_reporting():
+    """Test 3: Per-call stats in qc_meta and per-document totals in payload_scope."""
+    print_section("TEST 3: Payload Reporting")
+    if _pillow_missing():
+        return True
+    pages = [_statement_page(), _chart_page()]
+    stats = PayloadStats()
+    with payload_scope(stats):
+        _, call = encode_images(pages, "coach", "financial_agent")
+        with ThreadPoolExecutor(max_workers=2) as ex:
+            ex.submit(contextvars.copy_context().run, encode_images, pages[:1], "global_pick").result()
+        encode_images(pages, "coach", record=False)
+    encode_images(pages, "coach")  # outside the scope
+    doc = stats.snapshot()
+    checks = [
+        (call["images"] == 2 and call["after_bytes"] < call["before_bytes"], f"call: {call}"),
+        (doc["images"] == 3 and set(doc["by_purpose"]) == {"coach", "global_pick"}, f"document: {doc['images']} images by purpose {sorted(doc['by_purpose'])}"),
+        (0 < doc["saved_pct"] < 100, f"document saving {doc['saved_pct']}%"),
+    ]
+    try:
+        from gracian_pipeline.core import vision_qc
+    except ImportError as e:
+        print(f"⏭️  vision_qc check skipped (missing dependency: {e})")
+        return _report(checks)
+
+    sent = []
+
+    def _openai(prompt, images, page_labels=None):
+        sent.extend(images)
+        return '{"chairman": "A"}'
+
+    saved = vision_qc.render_pdf_pages_subset, vision_qc.call_openai_responses_vision
+    old = {k: os.environ.get(k) for k in ("OPENAI_ONLY", "OPENAI_RESPONSES")}
+    vision_qc.render_pdf_pages_subset = lambda pdf, idx, dpi=200: [pages[i % 2] for i in idx]
+    vision_qc.call_openai_responses_vision = _openai
+    os.environ.update(OPENAI_ONLY="true", OPENAI_RESPONSES="true")
+    try:
+        result, meta = vision_qc.vision_qc_agent("brf_test.pdf", "governance_agent", "Extract", page_indices=[0, 1])
+    finally:
+        vision_qc.render_pdf_pages_subset, vision_qc.call_openai_responses_vision = saved
+        for k, v in old.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+    payload = meta.get("image_payload") or {}
+    checks += [
+        (result == {"chairman": "A"} and sum(len(b) for b in sent) == payload.get("after_bytes"), f"vision_qc_agent sent {payload.get('after_bytes')} bytes"),
+        (payload.get("before_bytes") == sum(len(p) for p in pages), "qc_meta records the bytes before encoding"),
+    ]
+    return _report(checks)
+
+
+def main():
+    """Run all tests."""
+    print("\n" + "=" * 70)
+    print("IMAGE ENCODING TEST SUITE")
+    print("=" * 70)
+
+    tests = [
+        ("Content-Driven Encoding", test_content_choices),
+        ("Target And Floors", test_target_and_floors),
+        ("Payload Reporting", test_payload_reporting),
+    ]
+
+    results = {}
+    for test_name, test_func in tests:
+        try:
+            results[test_name] = test_func()
+        except Exception as e:
+            print(f"\n❌ {test_name} FAILED with exception: {e}")
+            results[test_name] = False
+
+    print_section("TEST SUMMARY")
+    for test_name, passed in results.items():
+        print(f"{'✅ PASSED' if passed else '❌ FAILED'}: {test_name}")
+
+    passed_tests = sum(1 for passed in results.values() if passed)
+    print(f"\nTOTAL: {passed_tests}/{len(results)} tests passed")
+    return 0 if passed_tests == len(results) else 1
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,251 @@
+"""
+LLM Client Registry Test Suite
+
+Tests the shared, pooled OpenAI-compatible clients against a local stub server.
+
+Test Coverage:
+1. One client per (provider, base_url, key); distinct keys get distinct clients; SDK retries off
+2. <PROVIDER>_BASE_URL routes core call sites to the stub server
+3. Sequential and concurrent calls reuse keep-alive connections
+4. Async clients are shared per event loop and reuse connections across coroutines
+
+Run: python test_llm_clients.py
+"""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add gracian_pipeline to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+def print_section(title: str):
+    """Print section header."""
+    print("\n" + "=" * 70)
+    print(title)
+    print("=" * 70 + "\n")
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Minimal OpenAI-compatible /chat/completions endpoint (HTTP/1.1 keep-alive)."""
+
+    protocol_version = "HTTP/1.1"
+    connections = set()
+    requests = []
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", "0"))) or b"{}")
+        with self.lock:
+            self.connections.add(self.client_address)
+            self.requests.append({"path": self.path, "auth": self.headers.get("Authorization"), "model": body.get("model")})
+        payload = json.dumps({
+            "id": "stub", "object": "chat.completion", "created": 0, "model": body.get("model", "stub"),
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "{\"ok\": true}"}}],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def _start_stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def _load():
+    try:
+        import openai  # noqa: F401
+        import httpx  # noqa: F401
+        from gracian_pipeline.core import llm_clients
+    except ImportError as e:
+        print(f"⏭️  Skipped (missing dependency: {e})")
+        return None
+    return llm_clients
+
+
+def _report(checks):
+    ok = True
+    for passed, label in checks:
+        print(f"{'✅' if passed else '❌'} {label}")
+        ok = ok and passed
+    return ok
+
+
+def test_client_reuse():
+    """Test 1: The registry hands out one client per (provider, base_url, key)."""
+    print_section("TEST 1: Client Reuse")
+    llm_clients = _load()
+    if llm_clients is None:
+        return True
+    llm_clients.close_all()
+    a = llm_clients.get_client("openrouter", api_key="k1", base_url="http://127.0.0.1:9/v1")
+    b = llm_clients.get_client("openrouter", api_key="k1", base_url="http://127.0.0.1:9/v1")
+    c = llm_clients.get_client("openrouter", api_key="k2", base_url="http://127.0.0.1:9/v1")
+    ok = _report([
+        (a is b, "same key -> same client"),
+        (a is not c, "different key -> different client"),
+        (llm_clients.client_count() == 2, "two registered clients"),
+        (a.max_retries == 0, "SDK retries disabled (rate limiter retries)"),
+    ])
+    llm_clients.close_all()
+    return ok
+
+
+def test_stub_routing():
+    """Test 2: Core call sites reach the stub via OPENROUTER_BASE_URL."""
+    print_section("TEST 2: Routing Via Base URL Override")
+    llm_clients = _load()
+    if llm_clients is None:
+        return True
+    try:
+        from gracian_pipeline.core.bench import call_qwen_openrouter_text
+    except ImportError as e:
+        print(f"⏭️  Skipped (missing dependency: {e})")
+        return True
+    server, base_url = _start_stub()
+    env = {"OPENROUTER_BASE_URL": base_url, "OPENROUTER_API_KEY": "stub-key", "OPENROUTER_QWEN_MODEL": "stub/qwen"}
+    old = {k: os.environ.get(k) for k in env}
+    os.environ.update(env)
+    llm_clients.close_all()
+    _StubHandler.requests.clear()
+    try:
+        out = call_qwen_openrouter_text("prompt", "content")
+    finally:
+        for k, v in old.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+        llm_clients.close_all()
+        server.shutdown()
+    req = _StubHandler.requests[-1] if _StubHandler.requests else {}
+    return _report([
+        (out == "{\"ok\": true}", "stub response returned"),
+        (req.get("path") == "/v1/chat/completions", f"path {req.get('path')}"),
+        (req.get("auth") == "Bearer stub-key" and req.get("model") == "stub/qwen", "key and model forwarded"),
+    ])
+
+
+def test_keep_alive():
+    """Test 3: Many calls share a small number of pooled connections."""
+    print_section("TEST 3: Keep-Alive Pooling")
+    llm_clients = _load()
+    if llm_clients is None:
+        return True
+    server, base_url = _start_stub()
+    _StubHandler.connections.clear()
+    _StubHandler.requests.clear()
+    llm_clients.close_all()
+
+    def _call(_):
+        c = llm_clients.get_client("openai", api_key="stub-key", base_url=base_url)
+        return c.chat.completions.create(model="stub", messages=[{"role": "user", "content": "hi"}]).choices[0].message.content
+
+    try:
+        for i in range(10):
+            _call(i)
+        sequential_conns = len(_StubHandler.connections)
+        with ThreadPoolExecutor(max_workers=4) as ex:
+            list(ex.map(_call, range(40)))
+    finally:
+        llm_clients.close_all()
+        server.shutdown()
+    return _report([
+        (sequential_conns == 1, f"10 sequential calls on {sequential_conns} connection(s)"),
+        (len(_StubHandler.requests) == 50 and len(_StubHandler.connections) <= 5,
+         f"50 calls on {len(_StubHandler.connections)} connection(s) with 4 threads"),
+        (llm_clients.client_count() == 0, "registry reset after close_all"),
+    ])
+
+
+def test_async_clients():
+    """Test 4: One AsyncOpenAI client per loop serves concurrent coroutines over pooled connections."""
+    print_section("TEST 4: Async Clients")
+    llm_clients = _load()
+    if llm_clients is None:
+        return True
+    server, base_url = _start_stub()
+    _StubHandler.connections.clear()
+    _StubHandler.requests.clear()
+
+    def _client():
+        return llm_clients.get_async_client("openai", api_key="stub-key", base_url=base_url)
+
+    async def _call(_):
+        resp = await _client().chat.completions.create(model="stub", messages=[{"role": "user", "content": "hi"}])
+        return resp.choices[0].message.content
+
+    async def _main():
+        first = _client()
+        outs = await asyncio.gather(*(_call(i) for i in range(20)))
+        concurrent_conns = len(_StubHandler.connections)
+        for i in range(10):
+            outs.append(await _call(i))
+        same = first is _client()
+        await llm_clients.aclose_async_clients()
+        return first, outs, same, concurrent_conns, first is _client()
+
+    async def _other_loop():
+        return _client()
+
+    try:
+        first, outs, same, concurrent_conns, reused_after_close = asyncio.run(_main())
+        other = asyncio.run(_other_loop())
+    finally:
+        server.shutdown()
+    answered = outs.count("{\"ok\": true}")
+    return _report([
+        (answered == 30, f"{answered}/30 async calls answered"),
+        (same and not reused_after_close, "one client per loop until aclose_async_clients"),
+        (other is not first, "another event loop gets its own client"),
+        (first.max_retries == 0, "SDK retries disabled on async clients"),
+        (len(_StubHandler.connections) == concurrent_conns, f"10 sequential calls reused the {concurrent_conns} pooled connection(s)"),
+    ])
+
+
+def main():
+    """Run all tests."""
+    print("\n" + "=" * 70)
+    print("LLM CLIENT REGISTRY TEST SUITE")
+    print("=" * 70)
+
+    tests = [
+        ("Client Reuse", test_client_reuse),
+        ("Routing Via Base URL Override", test_stub_routing),
+        ("Keep-Alive Pooling", test_keep_alive),
+        ("Async Clients", test_async_clients),
+    ]
+
+    results = {}
+    for test_name, test_func in tests:
+        try:
+            results[test_name] = test_func()
+        except Exception as e:
+            print(f"\n❌ {test_name} FAILED with exception: {e}")
+            results[test_name] = False
+
+    print_section("TEST SUMMARY")
+    for test_name, passed in results.items():
+        print(f"{'✅ PASSED' if passed else '❌ FAILED'}: {test_name}")
+
+    passed_tests = sum(1 for passed in results.values() if passed)
+    print(f"\nTOTAL: {passed_tests}/{len(results)} tests passed")
+    return 0 if passed_tests == len(results) else 1
+
+
+if __name__ == "__main__":
+    exit(main())
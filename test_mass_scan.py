@@ -0,0 +1,281 @@
+"""
+Mass Scan Test Suite
+
+Tests the serial and process-pool modes of mass_scan_pdfs.MassPDFScanner.
+
+Test Coverage:
+1. --workers N gives the same JSONL rows, checkpoint rows and category counts as the serial scan
+2. Resume: files already in the checkpoint DB are skipped by both modes
+3. Checkpoint I/O: no per-file SQLite connections, one transaction per batch
+4. Incremental: only new/changed files re-analyzed, deleted files purged, unchanged directories not listed
+
+Run: python test_mass_scan.py
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+from contextlib import contextmanager, redirect_stdout
+from io import StringIO
+from pathlib import Path
+
+# Add repo root to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+def print_section(title: str):
+    """Print section header."""
+    print("\n" + "=" * 70)
+    print(title)
+    print("=" * 70 + "\n")
+
+
+def _report(checks):
+    ok = True
+    for passed, label in checks:
+        print(f"{'✅' if passed else '❌'} {label}")
+        ok = ok and passed
+    return ok
+
+
+def _import_scanner():
+    try:
+        import fitz  # PyMuPDF builds the test corpus
+        import mass_scan_pdfs
+    except ImportError as e:
+        print(f"⏭️  Skipped (missing dependency: {e})")
+        return None
+    return mass_scan_pdfs
+
+
+def _make_corpus(root: Path):
+    """12 PDFs in nested folders: text-rich, sparse, blank, 30-page (sampled) and two broken files."""
+    import fitz  # PyMuPDF
+
+    folder = root / "Årsredovisning"
+    for i in range(12):
+        sub = folder / f"brf_{i % 3}"
+        sub.mkdir(parents=True, exist_ok=True)
+        path = sub / f"arsredovisning_{i:02d}.pdf"
+        if i in (4, 9):
+            path.write_bytes(b"%PDF-1.4 truncated")
+            continue
+        doc = fitz.open()
+        for p in range(30 if i == 7 else 3):
+            page = doc.new_page()
+            lines = {0: 60, 1: 8, 2: 0}.get(i % 3, 20)
+            for ln in range(lines):
+                page.insert_text((50, 60 + ln * 12), f"Rad {ln}: Föreningens resultat och ställning {i}-{p}", fontsize=9)
+        doc.save(str(path))
+        doc.close()
+
+
+@contextmanager
+def _in_dir(path: Path):
+    old = os.getcwd()
+    os.chdir(str(path))
+    try:
+        yield
+    finally:
+        os.chdir(old)
+
+
+def _scan(module, root: Path, workdir: Path, workers: int):
+    """Run one scan of the corpus in `workdir`; returns (jsonl rows, checkpoint rows, stats)."""
+    workdir.mkdir(exist_ok=True)
+    with _in_dir(workdir), redirect_stdout(StringIO()):
+        scanner = module.MassPDFScanner(str(root), "scan_progress.db", workers=workers)
+        scanner.scan_directory("arsredovisning")
+    with open(workdir / "mass_scan_arsredovisning_results.jsonl", encoding="utf-8") as f:
+        rows = [(r["key"], r["data"]) for r in map(json.loads, f)]  # written_at differs per run
+    conn = sqlite3.connect(str(workdir / "scan_progress.db"))
+    checkpoint = conn.execute(
+        "SELECT filepath, category, size_mb, pages, avg_chars_per_page FROM scanned_files ORDER BY filepath").fetchall()
+    conn.close()
+    return rows, checkpoint, dict(scanner.stats)
+
+
+def test_parallel_matches_serial():
+    """Test 1: Same rows, same order, same checkpoint and counts."""
+    print_section("TEST 1: Parallel Matches Serial")
+    module = _import_scanner()
+    if module is None:
+        return True
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "pdf_docs"
+        _make_corpus(root)
+        serial = _scan(module, root, Path(tmp) / "serial", workers=1)
+        parallel = _scan(module, root, Path(tmp) / "parallel", workers=3)
+    rows = serial[0]
+    return _report([
+        (len(rows) == 12 and parallel[0] == rows, f"{len(parallel[0])} JSONL rows identical, in file order"),
+        (parallel[1] == serial[1], "checkpoint rows identical"),
+        (parallel[2] == serial[2], f"category counts identical: {serial[2]}"),
+        (serial[2].get("corrupted") == 2 and serial[2].get("scanned", 0) >= 3, "broken and blank files categorized"),
+    ])
+
+
+def test_resume():
+    """Test 2: Files already in the checkpoint DB are not analyzed again."""
+    print_section("TEST 2: Resume")
+    module = _import_scanner()
+    if module is None:
+        return True
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "pdf_docs"
+        _make_corpus(root)
+        work = Path(tmp) / "work"
+        _scan(module, root, work, workers=1)
+        new_dir = root / "Årsredovisning" / "brf_new"
+        new_dir.mkdir()
+        (new_dir / "late.pdf").write_bytes(b"not a pdf")
+        with _in_dir(work), redirect_stdout(StringIO()):
+            scanner = module.MassPDFScanner(str(root), "scan_progress.db", workers=2)
+            pending = []
+            saved = scanner._iter_results
+            scanner._iter_results = lambda items: (pending.extend(items), saved(items))[1]
+            scanner.scan_directory("arsredovisning")
+        rows = [json.loads(line) for line in open(work / "mass_scan_arsredovisning_results.jsonl", encoding="utf-8")]
+    return _report([
+        ([Path(p).name for _, p in pending] == ["late.pdf"], f"only the new file analyzed: {[Path(p).name for _, p in pending]}"),
+        (len(rows) == 13, f"results file holds every file once ({len(rows)})"),
+    ])
+
+
+def test_checkpoint_io():
+    """Test 3: The scan loop opens no SQLite connections and commits in batches."""
+    print_section("TEST 3: Checkpoint I/O")
+    module = _import_scanner()
+    if module is None:
+        return True
+    connects = []
+    real_connect = sqlite3.connect
+
+    def _connect(*args, **kwargs):
+        connects.append(args[0] if args else kwargs.get("database"))
+        return real_connect(*args, **kwargs)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "pdf_docs"
+        _make_corpus(root)
+        work = Path(tmp) / "work"
+        work.mkdir()
+        with _in_dir(work), redirect_stdout(StringIO()):
+            scanner = module.MassPDFScanner(str(root), "scan_progress.db", workers=1)
+            scanner.checkpoint.batch_files = 5
+            scanner.checkpoint.batch_seconds = 3600
+            sqlite3.connect = _connect
+            try:
+                scanner.scan_directory("arsredovisning")
+            finally:
+                sqlite3.connect = real_connect
+        _, checkpoint, _ = _scan(module, root, work, workers=1)
+    return _report([
+        (connects == [], f"{len(connects)} SQLite connections opened while scanning 12 files"),
+        (scanner.checkpoint.commits == 3, f"{scanner.checkpoint.commits} checkpoint transactions (batches of 5)"),
+        (len(checkpoint) == 12, "every file committed"),
+    ])
+
+
+def test_incremental():
+    """Test 4: --incremental re-analyzes new and changed files, purges deleted ones, reuses directory listings."""
+    print_section("TEST 4: Incremental Rescan")
+    module = _import_scanner()
+    if module is None:
+        return True
+    import fitz  # PyMuPDF
+
+    def _rescan(work, root):
+        walks, pending = [], []
+        real_walk = module.walk_pdfs
+        module.walk_pdfs = lambda *a, **kw: walks.append(real_walk(*a, **kw)) or walks[-1]
+        try:
+            with _in_dir(work), redirect_stdout(StringIO()):
+                scanner = module.MassPDFScanner(str(root), "scan_progress.db", workers=2,
+                                                incremental=True, content_hash=True)
+                scanner.load_from_checkpoint()
+                saved = scanner._iter_results
+                scanner._iter_results = lambda items: (pending.extend(items), saved(items))[1]
+                scanner.scan_directory("arsredovisning")
+        finally:
+            module.walk_pdfs = real_walk
+        return walks[0], sorted(Path(p).name for _, p in pending), scanner
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "pdf_docs"
+        _make_corpus(root)
+        work = Path(tmp) / "work"
+        work.mkdir()
+        with _in_dir(work), redirect_stdout(StringIO()):
+            module.MassPDFScanner(str(root), "scan_progress.db", content_hash=True).scan_directory("arsredovisning")
+
+        folder = root / "Årsredovisning"
+        replaced = folder / "brf_1" / "arsredovisning_01.pdf"   # sparse report replaced by a text-rich one
+        doc = fitz.open()
+        page = doc.new_page()
+        for ln in range(60):
+            page.insert_text((50, 60 + ln * 12), f"Rad {ln}: Förvaltningsberättelse och resultaträkning", fontsize=9)
+        doc.save(str(replaced) + ".tmp")
+        doc.close()
+        os.replace(str(replaced) + ".tmp", str(replaced))
+        touched = folder / "brf_0" / "arsredovisning_00.pdf"     # same bytes, newer mtime
+        os.utime(touched, ns=(touched.stat().st_atime_ns, touched.stat().st_mtime_ns + 10**9))
+        (folder / "brf_2" / "arsredovisning_02.pdf").unlink()
+        (folder / "brf_0" / "arsredovisning_12.pdf").write_bytes(b"not a pdf")
+
+        walk, pending, scanner = _rescan(work, root)
+        rows = {r["key"]: r["data"]["category"] for r in map(json.loads, open(work / "mass_scan_arsredovisning_results.jsonl", encoding="utf-8"))}
+        conn = sqlite3.connect(str(work / "scan_progress.db"))
+        db = dict(conn.execute("SELECT filepath, category FROM scanned_files").fetchall())
+        hashed = conn.execute("SELECT COUNT(*) FROM scanned_files WHERE content_hash IS NOT NULL").fetchone()[0]
+        conn.close()
+        quiet_walk, quiet_pending, _ = _rescan(work, root)
+    names = {Path(k).name: v for k, v in db.items()}
+    return _report([
+        (pending == ["arsredovisning_00.pdf", "arsredovisning_01.pdf", "arsredovisning_12.pdf"],
+         f"new, replaced and touched files queued: {pending}"),
+        (names.get("arsredovisning_01.pdf") == "machine_readable", "replaced file re-analyzed with its new category"),
+        ("arsredovisning_02.pdf" not in names and not any(k.endswith("arsredovisning_02.pdf") for k in rows),
+         "deleted file purged from checkpoint and results file"),
+        (len(rows) == len(db) == 12 and hashed == 12 and rows == db, f"results file and checkpoint agree ({len(rows)} files, {hashed} hashed)"),
+        ({k: v for k, v in scanner.stats.items() if v} == scanner.checkpoint.category_counts(),
+         f"running category counts match the checkpoint: {dict(scanner.stats)}"),
+        (walk.listed == 3 and walk.cached == 1, f"only changed directories listed ({walk.listed} listed, {walk.cached} cached)"),
+        (quiet_pending == [] and quiet_walk.listed == 0, "unchanged corpus: nothing listed, nothing analyzed"),
+    ])
+
+
+def main():
+    """Run all tests."""
+    print("\n" + "=" * 70)
+    print("MASS SCAN TEST SUITE")
+    print("=" * 70)
+
+    tests = [
+        ("Parallel Matches Serial", test_parallel_matches_serial),
+        ("Resume", test_resume),
+        ("Checkpoint I/O", test_checkpoint_io),
+        ("Incremental Rescan", test_incremental),
+    ]
+
+    results = {}
+    for test_name, test_func in tests:
+        try:
+            results[test_name] = test_func()
+        except Exception as e:
+            print(f"\n❌ {test_name} FAILED with exception: {e}")
+            results[test_name] = False
+
+    print_section("TEST SUMMARY")
+    for test_name, passed in results.items():
+        print(f"{'✅ PASSED' if passed else '❌ FAILED'}: {test_name}")
+
+    passed_tests = sum(1 for passed in results.values() if passed)
+    print(f"\nTOTAL: {passed_tests}/{len(results)} tests passed")
+    return 0 if passed_tests == len(results) else 1
+
+
+if __name__ == "__main__":
+    exit(main())
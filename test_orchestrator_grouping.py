@@ -0,0 +1,241 @@
+"""
+Orchestrator Agent Grouping Test Suite
+
+Tests the round-synchronous coaching mode (ORCH_GROUP_AGENTS=true) that sends
+one multi-agent vision request per group of agents with overlapping pages.
+
+Test Coverage:
+1. Agents are grouped by page overlap within the window / group-size limits
+2. Grouped rounds need fewer vision requests and split results back per agent
+3. One coaching request serves every agent in a group
+
+Run: python test_orchestrator_grouping.py
+"""
+
+import asyncio
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add gracian_pipeline to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+def print_section(title: str):
+    """Print section header."""
+    print("\n" + "=" * 70)
+    print(title)
+    print("=" * 70 + "\n")
+
+
+def _report(checks):
+    ok = True
+    for passed, label in checks:
+        print(f"{'✅' if passed else '❌'} {label}")
+        ok = ok and passed
+    return ok
+
+
+def _import():
+    from gracian_pipeline.core import orchestrator, vision_qc
+    return orchestrator, vision_qc
+
+
+FULL = {
+    "financial_agent": {"revenue": 100, "expenses": 80, "assets": 500, "liabilities": 200, "equity": 300, "surplus": 20, "evidence_pages": [9]},
+    "loans_agent": {"outstanding_loans": 1000, "interest_rate": 2.5, "amortization": 100, "evidence_pages": [10]},
+    "governance_agent": {"chairman": "A", "board_members": ["B"], "auditor_name": "C", "audit_firm": "D",
+                         "nomination_committee": ["E"], "evidence_pages": [3]},
+}
+
+
+class _StubVision:
+    """avision_qc_agent stand-in: loans_agent is incomplete until it has been coached once."""
+
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+        self.coached = set()
+
+    def _answer(self, aid):
+        if aid == "loans_agent" and aid not in self.coached:
+            return {"outstanding_loans": 1000}
+        return dict(FULL[aid])
+
+    async def __call__(self, pdf_path, agent_id, prompt, page_indices=None):
+        agents = re.findall(r"### Agent: (\w+)", prompt) or [agent_id]
+        with self.lock:
+            self.calls.append((tuple(agents), list(page_indices or [])))
+        if len(agents) == 1:
+            return self._answer(agents[0]), {"grok_ok": True}
+        combined = {aid: self._answer(aid) for aid in agents}
+        return combined, {"grok_ok": True, "grok_out": combined}
+
+
+class _StubCoach:
+    def __init__(self, vision):
+        self.vision = vision
+        self.calls = []
+
+    async def __call__(self, prompt, images, page_labels=None):
+        agents = re.findall(r"### Agent: (\w+)", prompt)
+        self.calls.append((agents, len(images)))
+        for aid in agents or ["loans_agent"]:
+            self.vision.coached.add(aid)
+        if agents:
+            return json.dumps({aid: {"ok": False, "revised_pages": [9, 10], "hints": "notes"} for aid in agents})
+        return json.dumps({"ok": False, "revised_pages": [9, 10], "hints": "notes"})
+
+
+async def _offline(*args):
+    raise RuntimeError("offline")
+
+
+async def _no_pages(*args):
+    return []
+
+
+def _run(orchestrator, vision_qc, grouped: bool):
+    vision = _StubVision()
+    coach = _StubCoach(vision)
+    saved = {name: getattr(orchestrator, name) for name in (
+        "vision_sectionize", "_coach_sectionizer_once", "get_page_index", "select_pages_for_agent",
+        "_global_pick_pages_for_agent", "render_cache_stats", "render_pdf_pages_subset", "acall_openai_responses_vision")}
+    saved_vqc = vision_qc.avision_qc_agent
+    env = {"ORCH_GROUP_AGENTS": "true" if grouped else "false", "ORCHESTRATOR_CONCURRENCY": "4", "VERBOSE_ORCHESTRATOR": "false"}
+    old_env = {k: os.environ.get(k) for k in list(env) + ["COACH_HISTORY_PATH", "SECTIONS_OUT_DIR"]}
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update(env, COACH_HISTORY_PATH=os.path.join(tmp, "coach.jsonl"),
+                          SECTIONS_OUT_DIR=os.path.join(tmp, "sections"))
+        orchestrator.vision_sectionize = lambda pdf: {"pages_by_agent": {"financial_agent": [8, 9], "loans_agent": [9, 10], "governance_agent": [2]}}
+        orchestrator._coach_sectionizer_once = _offline
+        orchestrator.get_page_index = lambda pdf: SimpleNamespace(page_count=20)
+        orchestrator.select_pages_for_agent = lambda *a, **k: []
+        orchestrator._global_pick_pages_for_agent = _no_pages
+        orchestrator.render_cache_stats = lambda pdf: {}
+        orchestrator.render_pdf_pages_subset = lambda pdf, idx, dpi=200: [b"png"] * len(idx)
+        orchestrator.acall_openai_responses_vision = coach
+        vision_qc.avision_qc_agent = vision
+        try:
+            prompts = {aid: f"Extract {aid}" for aid in FULL}
+            results = orchestrator.orchestrate_pdf("doc.pdf", prompts, max_rounds=3)
+        finally:
+            for name, fn in saved.items():
+                setattr(orchestrator, name, fn)
+            vision_qc.avision_qc_agent = saved_vqc
+            for k, v in old_env.items():
+                if v is None:
+                    os.environ.pop(k, None)
+                else:
+                    os.environ[k] = v
+    return results, vision, coach
+
+
+def test_grouping():
+    """Test 1: Overlapping page lists share a group, bounded by window and size."""
+    print_section("TEST 1: Page-Overlap Grouping")
+    try:
+        orchestrator, _ = _import()
+    except ImportError as e:
+        print(f"⏭️  Skipped (missing dependency: {e})")
+        return True
+    pages = {"financial_agent": [8, 9], "loans_agent": [9, 10], "reserves_agent": [10, 11],
+             "governance_agent": [2, 3], "audit_agent": [17], "fees_agent": []}
+    groups = orchestrator.group_agents_by_pages(pages, max_pages=10, max_agents=4)
+    small = orchestrator.group_agents_by_pages(pages, max_pages=3, max_agents=4)
+    capped = orchestrator.group_agents_by_pages(pages, max_pages=10, max_agents=2)
+    return _report([
+        (["financial_agent", "loans_agent", "reserves_agent"] in groups, f"statement agents grouped {groups}"),
+        (["fees_agent"] in groups and ["audit_agent"] in groups, "disjoint and page-less agents stay alone"),
+        (["financial_agent", "loans_agent"] in small and ["reserves_agent"] in small, f"window limit respected {small}"),
+        (max(len(g) for g in capped) == 2, f"group size limit respected {capped}"),
+    ])
+
+
+def test_grouped_rounds():
+    """Test 2: Grouped mode matches per-agent results with fewer vision requests."""
+    print_section("TEST 2: Grouped Rounds")
+    try:
+        orchestrator, vision_qc = _import()
+    except ImportError as e:
+        print(f"⏭️  Skipped (missing dependency: {e})")
+        return True
+    solo, solo_vision, _ = _run(orchestrator, vision_qc, grouped=False)
+    grouped, grouped_vision, _ = _run(orchestrator, vision_qc, grouped=True)
+    agents = list(FULL)
+    solo_pages = sum(len(p) for _, p in solo_vision.calls)
+    grouped_pages = sum(len(p) for _, p in grouped_vision.calls)
+    loans_rounds = grouped["_qc"]["loans_agent"]["rounds"]
+    return _report([
+        (all(grouped[a] == solo[a] == FULL[a] for a in agents), "same per-agent results in both modes"),
+        (len(grouped_vision.calls) < len(solo_vision.calls), f"vision requests {len(solo_vision.calls)} -> {len(grouped_vision.calls)}"),
+        (grouped_pages < solo_pages, f"page images sent {solo_pages} -> {grouped_pages}"),
+        (("financial_agent", "loans_agent") in [c for c, _ in grouped_vision.calls], "financial + loans share one request"),
+        (loans_rounds[0].get("group") == ["financial_agent", "loans_agent"] and len(loans_rounds) == 2, "round metadata records the group"),
+        (grouped["_qc"]["_orchestrator"]["grouping"]["vision_requests"] == len(grouped_vision.calls), "grouping stats"),
+    ])
+
+
+def test_group_coaching():
+    """Test 3: Two under-target agents in one group are coached by a single request."""
+    print_section("TEST 3: Shared Coaching Request")
+    try:
+        orchestrator, _ = _import()
+    except ImportError as e:
+        print(f"⏭️  Skipped (missing dependency: {e})")
+        return True
+    coach = _StubCoach(_StubVision())
+    saved = (orchestrator.acall_openai_responses_vision, orchestrator.render_pdf_pages_subset)
+    orchestrator.acall_openai_responses_vision = coach
+    orchestrator.render_pdf_pages_subset = lambda pdf, idx, dpi=200: [b"png"] * len(idx)
+    try:
+        advice = asyncio.run(orchestrator._coach_agents_once("doc.pdf", {
+            "financial_agent": ([8, 9], {"revenue": 1}),
+            "loans_agent": ([9, 10], {}),
+        }))
+    finally:
+        orchestrator.acall_openai_responses_vision, orchestrator.render_pdf_pages_subset = saved
+    return _report([
+        (len(coach.calls) == 1, f"{len(coach.calls)} coaching request(s)"),
+        (coach.calls[0][1] == 5, f"shared padded window of {coach.calls[0][1]} pages (7-11)"),
+        (set(advice) == {"financial_agent", "loans_agent"}, "advice split per agent"),
+        (advice["loans_agent"]["revised_pages"] == [9, 10] and advice["loans_agent"]["ok"] is False, "advice normalized"),
+    ])
+
+
+def main():
+    """Run all tests."""
+    print("\n" + "=" * 70)
+    print("ORCHESTRATOR AGENT GROUPING TEST SUITE")
+    print("=" * 70)
+
+    tests = [
+        ("Page-Overlap Grouping", test_grouping),
+        ("Grouped Rounds", test_grouped_rounds),
+        ("Shared Coaching Request", test_group_coaching),
+    ]
+
+    results = {}
+    for test_name, test_func in tests:
+        try:
+            results[test_name] = test_func()
+        except Exception as e:
+            print(f"\n❌ {test_name} FAILED with exception: {e}")
+            results[test_name] = False
+
+    print_section("TEST SUMMARY")
+    for test_name, passed in results.items():
+        print(f"{'✅ PASSED' if passed else '❌ FAILED'}: {test_name}")
+
+    passed_tests = sum(1 for passed in results.values() if passed)
+    print(f"\nTOTAL: {passed_tests}/{len(results)} tests passed")
+    return 0 if passed_tests == len(results) else 1
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,147 @@
+"""
+Page Index Test Suite
+
+Tests the per-PDF text/anchor index shared by every sectionizer call.
+
+Test Coverage:
+1. Per-page agent hits and inverted anchor -> pages index
+2. Sectionization (ToC + anchors, ±1 page expansion) matches the old semantics
+3. Memoized index: one build per PDF across many agent lookups
+
+Run: python test_page_index.py
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add gracian_pipeline to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from gracian_pipeline.core import sectionizer
+from gracian_pipeline.core.sectionizer import PageIndex, sectionize_pdf, select_pages_for_agent
+
+
+def print_section(title: str):
+    """Print section header."""
+    print("\n" + "=" * 70)
+    print(title)
+    print("=" * 70 + "\n")
+
+
+PAGES = [
+    "Årsredovisning\nBRF Test",
+    "Förvaltningsberättelse\nStyrelsen består av ordförande och ledamot",
+    "",
+    "Resultaträkning\nIntäkter 1 000\nKostnader 800",
+    "Not 8 Avskrivningar\nByggnad",
+    "Revisionsberättelse",
+]
+TOC = [(1, "Balansräkning", 4)]
+
+
+def test_anchor_index():
+    """Test 1: Per-page hits and inverted anchor index."""
+    print_section("TEST 1: Anchor Index")
+
+    idx = PageIndex("brf_test.pdf", PAGES, TOC)
+    checks = [
+        (idx.page_count == 6, "page_count == 6"),
+        (idx.page_hits[1] >= {"governance_agent"}, "governance hit on page 2"),
+        ("financial_agent" in idx.page_hits[3], "financial hit on page 4"),
+        (2 not in idx.page_hits, "empty page has no hits"),
+        (idx.pages_for_anchor("avskrivningar") == [4], "inverted index: avskrivningar -> [4]"),
+        (idx.pages_for_anchor("ledamot") == [1], "inverted index: ledamot -> [1]"),
+        (idx.pages_containing(["resultaträkning", "revisionsberättelse"]) == [3, 5], "term scan"),
+        (idx.low_text_pages(500) == 6, "low-text page count"),
+    ]
+    ok = True
+    for passed, label in checks:
+        print(f"{'✅' if passed else '❌'} {label}")
+        ok = ok and passed
+    return ok
+
+
+def test_sectionization():
+    """Test 2: ToC + anchors, expanded ±1 page, clipped to the document."""
+    print_section("TEST 2: Sectionization")
+
+    idx = PageIndex("brf_test.pdf", PAGES, TOC)
+    sec = sectionize_pdf("brf_test.pdf", index=idx)
+    checks = [
+        (sec.get("audit_agent") == [4, 5], "audit pages clipped at last page"),
+        (sec.get("financial_agent") == [2, 3, 4], "financial pages from ToC + anchor"),
+        (sec.get("governance_agent") == [0, 1, 2], "governance pages expanded"),
+        ("loans_agent" not in sec, "agents without hits are omitted"),
+        (select_pages_for_agent("brf_test.pdf", "audit_agent", index=idx) == [4, 5], "single-agent lookup"),
+    ]
+    # Callers may mutate the returned lists without corrupting the index
+    sec["audit_agent"].append(99)
+    checks.append((idx.pages_for_agent("audit_agent") == [4, 5], "returned lists are copies"))
+    ok = True
+    for passed, label in checks:
+        print(f"{'✅' if passed else '❌'} {label}")
+        ok = ok and passed
+    return ok
+
+
+def test_index_memoized():
+    """Test 3: get_page_index builds once per file for all agents."""
+    print_section("TEST 3: Memoized Index")
+
+    builds = {"n": 0}
+    original = PageIndex.build
+
+    def _fake_build(pdf_path):
+        builds["n"] += 1
+        return PageIndex(pdf_path, PAGES, TOC)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf = os.path.join(tmp, "brf.pdf")
+        with open(pdf, "wb") as f:
+            f.write(b"%PDF-1.4 test")
+        PageIndex.build = staticmethod(_fake_build)
+        try:
+            for agent_id in sectionizer.AGENT_ANCHORS:
+                select_pages_for_agent(pdf, agent_id)
+            sectionize_pdf(pdf)
+        finally:
+            PageIndex.build = original
+
+    passed = builds["n"] == 1
+    print(f"{'✅' if passed else '❌'} {len(sectionizer.AGENT_ANCHORS)} agent lookups, {builds['n']} index build(s)")
+    return passed
+
+
+def main():
+    """Run all tests."""
+    print("\n" + "=" * 70)
+    print("PAGE INDEX TEST SUITE")
+    print("=" * 70)
+
+    tests = [
+        ("Anchor Index", test_anchor_index),
+        ("Sectionization", test_sectionization),
+        ("Memoized Index", test_index_memoized),
+    ]
+
+    results = {}
+    for test_name, test_func in tests:
+        try:
+            results[test_name] = test_func()
+        except Exception as e:
+            print(f"\n❌ {test_name} FAILED with exception: {e}")
+            results[test_name] = False
+
+    print_section("TEST SUMMARY")
+    for test_name, passed in results.items():
+        print(f"{'✅ PASSED' if passed else '❌ FAILED'}: {test_name}")
+
+    passed_tests = sum(1 for passed in results.values() if passed)
+    print(f"\nTOTAL: {passed_tests}/{len(results)} tests passed")
+    return 0 if passed_tests == len(results) else 1
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,208 @@
+"""
+Page Relevance Test Suite
+
+Tests the local prefilter that shapes the sectionizer coaching payload.
+
+Test Coverage:
+1. Ranking: every agent's heading pages come first; ToC, outline and dense scans count
+2. Payload stays within COACH_PAYLOAD_MAX_MB for 50 and 300 page documents
+3. _coach_sectionizer_once sends the payload (full pages + thumbnails) instead of every page
+
+Run: python test_page_relevance.py
+"""
+
+import asyncio
+import os
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+
+# Add gracian_pipeline to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from gracian_pipeline.core import page_relevance
+from gracian_pipeline.core.page_relevance import build_coaching_payload, rank_pages
+from gracian_pipeline.core.sectionizer import PageIndex
+
+FILLER = "Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor."
+HEADINGS = {
+    "governance_agent": "Förvaltningsberättelse\nStyrelsen",
+    "financial_agent": "Resultaträkning\n",
+    "loans_agent": "Not 12 Skulder till kreditinstitut\nRänta och amortering",
+    "audit_agent": "Revisionsberättelse\n",
+}
+
+
+def print_section(title: str):
+    """Print section header."""
+    print("\n" + "=" * 70)
+    print(title)
+    print("=" * 70 + "\n")
+
+
+def _report(checks):
+    ok = True
+    for passed, label in checks:
+        print(f"{'✅' if passed else '❌'} {label}")
+        ok = ok and passed
+    return ok
+
+
+def _document(n: int, scanned=()):
+    """n filler pages with one heading page per agent spread over the document; `scanned` pages have no text."""
+    texts = [FILLER] * n
+    heading_pages = {}
+    for i, (agent_id, heading) in enumerate(HEADINGS.items()):
+        p = 1 + i * (n - 2) // len(HEADINGS)
+        texts[p] = heading + FILLER
+        heading_pages[agent_id] = p
+    for p in scanned:
+        texts[p] = ""
+    return texts, heading_pages
+
+
+@contextmanager
+def _fake_renderer(dense=()):
+    """Replace rasterization: image size grows with DPI squared; `dense` pages render 3x larger."""
+    rendered = []
+    saved = page_relevance.iter_render_pages
+
+    def _iter(pdf_path, page_indices, dpi, fmt="png"):
+        pages = sorted(set(page_indices))
+        rendered.append((dpi, len(pages)))
+        for p in pages:
+            size = dpi * dpi * (30 if p in dense else 10)
+            yield p, bytes([p % 256]) * size
+
+    page_relevance.iter_render_pages = _iter
+    try:
+        yield rendered
+    finally:
+        page_relevance.iter_render_pages = saved
+
+
+def test_ranking():
+    """Test 1: Heading pages of every agent first, then ToC/outline pages, dense scans over blank ones."""
+    print_section("TEST 1: Ranking")
+    texts, heading_pages = _document(40, scanned=(15, 16))
+    index = PageIndex("brf_test.pdf", texts, toc=[(1, "Noter till balansräkning", 36)])
+    outline = {"pages_by_agent": {"property_agent": [5]}, "level_1": [{"title": "Noter", "start_page": 33}]}
+    with _fake_renderer(dense=(16,)):
+        thumbs = dict(page_relevance.iter_render_pages("brf_test.pdf", range(40), 36))
+    order = rank_pages(index, outline, thumbs)
+    head = order[:len(HEADINGS) + 2]
+    return _report([
+        (sorted(order) == list(range(40)), "every page ranked once"),
+        (set(heading_pages.values()) <= set(head), f"heading pages first: {head}"),
+        (35 in head and 5 in head, "ToC entry and outline page next"),
+        (order.index(32) < order.index(16) < order.index(15) < order.index(12), "section start, dense scan, blank scan, then filler"),
+    ])
+
+
+def test_byte_budget():
+    """Test 2: The payload fits the budget regardless of page count; every agent keeps its heading page."""
+    print_section("TEST 2: Byte Budget")
+    budget = 3 * 1024 * 1024
+    checks = []
+    old = {k: os.environ.get(k) for k in ("COACH_MAX_FULL_PAGES", "ORCH_MAX_PAGES")}
+    os.environ.update(COACH_MAX_FULL_PAGES="8", ORCH_MAX_PAGES="0")
+    try:
+        for n in (50, 300):
+            texts, heading_pages = _document(n)
+            index = PageIndex("brf_test.pdf", texts)
+            with _fake_renderer() as rendered:
+                payload = build_coaching_payload("brf_test.pdf", index, full_dpi=170, budget_bytes=budget)
+            full_everything = n * 170 * 170 * 10
+            checks += [
+                (payload.total_bytes <= budget, f"{n} pages: {payload.total_bytes} bytes <= {budget} (all pages at full DPI: {full_everything})"),
+                (set(heading_pages.values()) <= set(payload.full_pages), f"{n} pages: heading pages at full DPI {payload.full_pages}"),
+                (len(payload.full_pages) <= 8 and payload.full_pages, f"{n} pages: {len(payload.full_pages)} full pages (cap 8)"),
+                (sorted(payload.pages + payload.omitted_pages) == list(range(n)), f"{n} pages: every page sent or listed as omitted"),
+                (payload.pages == sorted(payload.pages) and len(payload.labels) == len(payload.images), f"{n} pages: images in page order with labels"),
+                (rendered == [(36, n), (170, 8)], f"{n} pages: one thumbnail pass, {rendered[-1][1]} full-DPI renders"),
+            ]
+        checks.append((payload.omitted_pages and payload.thumb_pages, "300 pages: least relevant thumbnails dropped, the rest kept"))
+        os.environ["ORCH_MAX_PAGES"] = "20"
+        with _fake_renderer():
+            capped = build_coaching_payload("brf_test.pdf", index, full_dpi=170, budget_bytes=budget)
+        checks.append((len(capped.images) == 20 and set(heading_pages.values()) <= set(capped.full_pages), f"ORCH_MAX_PAGES caps images ({len(capped.images)})"))
+    finally:
+        for k, v in old.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+    return _report(checks)
+
+
+def test_orchestrator_payload():
+    """Test 3: Sectionizer coaching uploads the prefiltered payload and records its summary."""
+    print_section("TEST 3: Orchestrator Coaching Payload")
+    try:
+        from gracian_pipeline.core import orchestrator
+    except ImportError as e:
+        print(f"⏭️  Skipped (missing dependency: {e})")
+        return True
+    texts, heading_pages = _document(120)
+    index = PageIndex("brf_test.pdf", texts)
+    sent = {}
+
+    async def _responses(prompt, images, page_labels=None):
+        sent.update(prompt=prompt, images=images, labels=page_labels)
+        return '{"pages_by_agent": {"audit_agent": [%d]}, "added_agents": [], "notes": ""}' % heading_pages["audit_agent"]
+
+    saved = orchestrator.get_page_index, orchestrator.acall_openai_responses_vision
+    old = os.environ.get("COACH_PAYLOAD_MAX_MB")
+    os.environ["COACH_PAYLOAD_MAX_MB"] = "1"
+    orchestrator.get_page_index = lambda pdf: index
+    orchestrator.acall_openai_responses_vision = _responses
+    try:
+        with _fake_renderer():
+            coached = asyncio.run(orchestrator._coach_sectionizer_once("brf_test.pdf", {"pages_by_agent": {}}))
+    finally:
+        orchestrator.get_page_index, orchestrator.acall_openai_responses_vision = saved
+        if old is None:
+            os.environ.pop("COACH_PAYLOAD_MAX_MB", None)
+        else:
+            os.environ["COACH_PAYLOAD_MAX_MB"] = old
+    summary = coached.get("payload") or {}
+    return _report([
+        (sum(len(b) for b in sent["images"]) <= 1024 * 1024, f"{len(sent['images'])} images within 1 MB"),
+        (f"Page {heading_pages['audit_agent'] + 1}/120" in sent["labels"], "audit heading page sent at full DPI"),
+        (any(l.endswith("(thumbnail)") for l in sent["labels"]) and "thumbnail" in sent["prompt"], "thumbnails labelled and explained"),
+        (summary.get("page_count") == 120 and summary.get("bytes") <= summary.get("budget_bytes"), "payload summary recorded"),
+        (coached["pages_by_agent"] == {"audit_agent": [heading_pages["audit_agent"]]}, "coached pages parsed"),
+    ])
+
+
+def main():
+    """Run all tests."""
+    print("\n" + "=" * 70)
+    print("PAGE RELEVANCE TEST SUITE")
+    print("=" * 70)
+
+    tests = [
+        ("Ranking", test_ranking),
+        ("Byte Budget", test_byte_budget),
+        ("Orchestrator Coaching Payload", test_orchestrator_payload),
+    ]
+
+    results = {}
+    for test_name, test_func in tests:
+        try:
+            results[test_name] = test_func()
+        except Exception as e:
+            print(f"\n❌ {test_name} FAILED with exception: {e}")
+            results[test_name] = False
+
+    print_section("TEST SUMMARY")
+    for test_name, passed in results.items():
+        print(f"{'✅ PASSED' if passed else '❌ FAILED'}: {test_name}")
+
+    passed_tests = sum(1 for passed in results.values() if passed)
+    print(f"\nTOTAL: {passed_tests}/{len(results)} tests passed")
+    return 0 if passed_tests == len(results) else 1
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,243 @@
+"""
+PDF Topology Test Suite
+
+Tests the resource-based fast path against the text-sampling topology classifier.
+
+Test Coverage:
+1. Agreement: fast_topology gives the text_topology category for text, sparse, scanned, OCR'd, blank and mixed documents
+2. Resources: image-only documents are classified without reading text; full-page images and scanner producers recorded
+3. Early exit: text-rich documents stop reading once machine-readable is certain; the mass scanner's --fast-topology agrees
+4. Store: topology looked up in the mass-scan DB (path + size + mtime, then sha256) before classifying; new results stored by sha256; no store unless TOPOLOGY_DB is set
+
+Run: python test_pdf_topology.py
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add gracian_pipeline to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+def print_section(title: str):
+    """Print section header."""
+    print("\n" + "=" * 70)
+    print(title)
+    print("=" * 70 + "\n")
+
+
+def _report(checks):
+    ok = True
+    for passed, label in checks:
+        print(f"{'✅' if passed else '❌'} {label}")
+        ok = ok and passed
+    return ok
+
+
+def _fitz():
+    try:
+        import fitz  # PyMuPDF
+    except ImportError as e:
+        print(f"⏭️  Skipped (missing dependency: {e})")
+        return None
+    return fitz
+
+
+def _make(fitz, path: str, pages: int, kind: str, producer: str = "Microsoft Word"):
+    """kind: text | sparse | scan | ocr | blank | cover (typed cover page, scanned body)"""
+    pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 1240, 1754), False)
+    pix.clear_with(220)
+    png = pix.tobytes("png")
+    doc = fitz.open()
+    for p in range(pages):
+        page = doc.new_page()
+        if kind in ("scan", "ocr") or (kind == "cover" and p > 0):
+            page.insert_image(page.rect, stream=png)
+        lines = {"text": 55, "ocr": 55, "sparse": 8}.get(kind, 0)
+        if kind == "cover" and p == 0:
+            lines = 2
+        for ln in range(lines):
+            page.insert_text((40, 40 + ln * 13), f"Rad {ln}: Föreningens resultat och ställning {p}",
+                             fontsize=9, render_mode=3 if kind == "ocr" else 0)
+    doc.set_metadata({"producer": producer})
+    doc.save(path)
+    doc.close()
+
+
+def _both(fitz, path: str):
+    from gracian_pipeline.core.pdf_topology import fast_topology, text_topology
+    with fitz.open(path) as doc:
+        ref = text_topology(doc)
+    with fitz.open(path) as doc:
+        fast = fast_topology(doc)
+    return ref, fast
+
+
+def test_agreement():
+    """Test 1: Same category as text sampling on every kind of document."""
+    print_section("TEST 1: Agreement")
+    fitz = _fitz()
+    if fitz is None:
+        return True
+    checks = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for kind in ("text", "sparse", "scan", "ocr", "blank", "cover"):
+            for pages in (3, 30):
+                path = os.path.join(tmp, f"{kind}_{pages}.pdf")
+                _make(fitz, path, pages, kind)
+                ref, fast = _both(fitz, path)
+                checks.append((fast["category"] == ref["category"],
+                               f"{kind:6} {pages:2} pages: text={ref['category']} fast={fast['category']} ({fast['classified_by']})"))
+    return _report(checks)
+
+
+def test_resources():
+    """Test 2: Documents without fonts need no text extraction."""
+    print_section("TEST 2: Resource Signals")
+    fitz = _fitz()
+    if fitz is None:
+        return True
+    with tempfile.TemporaryDirectory() as tmp:
+        scan = os.path.join(tmp, "scan.pdf")
+        cover = os.path.join(tmp, "cover.pdf")
+        _make(fitz, scan, 30, "scan", producer="Canon iR-ADV C5535")
+        _make(fitz, cover, 12, "cover", producer="KONICA MINOLTA bizhub")
+        _, fast_scan = _both(fitz, scan)
+        _, fast_cover = _both(fitz, cover)
+    signals = fast_scan["signals"]
+    return _report([
+        (fast_scan["classified_by"] == "resources" and fast_scan["pages_read"] == 0,
+         f"image-only scan classified from resources ({fast_scan['category']}, 0 pages read)"),
+        (signals["full_page_image_pages"] == 6 and signals["font_pages"] == 0, f"full-page images on all 6 sampled pages: {signals}"),
+        (signals["scanner_producer"] and fast_cover["signals"]["scanner_producer"], "scanner producers recognised"),
+        (fast_cover["pages_read"] == 1 and fast_cover["category"] == "scanned", "typed cover page: only that page's text read"),
+    ])
+
+
+def test_early_exit():
+    """Test 3: Reading stops once the document is certainly machine-readable."""
+    print_section("TEST 3: Early Exit")
+    fitz = _fitz()
+    if fitz is None:
+        return True
+    try:
+        import mass_scan_pdfs
+    except ImportError as e:
+        print(f"⏭️  Skipped (missing dependency: {e})")
+        return True
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "text.pdf")
+        _make(fitz, path, 45, "text")
+        ref, fast = _both(fitz, path)
+        slow_row = mass_scan_pdfs.analyze_pdf_file(path)
+        fast_row = mass_scan_pdfs.analyze_pdf_file(path, fast=True)
+    return _report([
+        (fast["classified_by"] == "text_early_exit" and fast["pages_read"] < ref["pages_read"],
+         f"{fast['pages_read']} of {ref['pages_read']} sampled pages read"),
+        (800 < fast["avg_chars_per_page"] <= ref["avg_chars_per_page"], "avg chars/page is a lower bound above the threshold"),
+        (fast_row["category"] == slow_row["category"] == "machine_readable" and fast_row["classified_by"] == "text_early_exit",
+         "mass scanner fast mode agrees with the default scan"),
+        ("classified_by" not in slow_row, "default scan rows unchanged"),
+    ])
+
+
+def test_store():
+    """Test 4: get_topology answers from the mass-scan DB / store; classifies once otherwise."""
+    print_section("TEST 4: Topology Store")
+    fitz = _fitz()
+    if fitz is None:
+        return True
+    import shutil
+    from contextlib import redirect_stdout
+    from io import StringIO
+    from gracian_pipeline.core import pdf_topology
+    from gracian_pipeline.core.pdf_topology import TopologyStore, get_topology
+    try:
+        import mass_scan_pdfs
+    except ImportError as e:
+        print(f"⏭️  Skipped (missing dependency: {e})")
+        return True
+
+    classified = []
+    real_classify = pdf_topology.classify_pdf
+    pdf_topology.classify_pdf = lambda path, fast=False: classified.append(os.path.basename(path)) or real_classify(path, fast)
+    old_cwd = os.getcwd()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            folder = Path(tmp) / "pdf_docs" / "Årsredovisning"
+            folder.mkdir(parents=True)
+            scanned = str(folder / "scan.pdf")
+            _make(fitz, scanned, 4, "scan")
+            os.chdir(tmp)
+            with redirect_stdout(StringIO()):
+                scanner = mass_scan_pdfs.MassPDFScanner(str(Path(tmp) / "pdf_docs"), "scan_progress.db", content_hash=True)
+                scanner.scan_directory("arsredovisning")
+                scanner.checkpoint.close()
+            store = TopologyStore(os.path.join(tmp, "scan_progress.db"))
+
+            from_scan = get_topology(scanned, store=store)
+            moved = os.path.join(tmp, "inbox", "scan_copy.pdf")
+            os.makedirs(os.path.dirname(moved))
+            shutil.copyfile(scanned, moved)
+            from_hash = get_topology(moved, store=store)
+
+            fresh = os.path.join(tmp, "inbox", "text.pdf")
+            _make(fitz, fresh, 3, "text")
+            first = get_topology(fresh, store=store)
+            second = get_topology(fresh, store=store)
+            unstored = get_topology(fresh)
+            store.close()
+            saved_env = os.environ.pop("TOPOLOGY_DB", None)
+            try:
+                no_default = pdf_topology.default_store() is None
+            finally:
+                if saved_env is not None:
+                    os.environ["TOPOLOGY_DB"] = saved_env
+    finally:
+        os.chdir(old_cwd)
+        pdf_topology.classify_pdf = real_classify
+    return _report([
+        (from_scan["source"] == "scan_db" and from_scan["category"] == "scanned", f"mass-scan row found by path + size + mtime: {from_scan}"),
+        (from_hash["source"] == "store" and from_hash["category"] == "scanned", "copied file found by sha256"),
+        (first["source"] == "computed" and second["source"] == "store" and second["category"] == "machine_readable",
+         "new document classified once, then served from the store"),
+        (classified == ["text.pdf", "text.pdf"] and unstored["source"] == "computed",
+         f"classified only without a stored record: {classified}"),
+        (no_default, "no store unless TOPOLOGY_DB is set"),
+    ])
+
+
+def main():
+    """Run all tests."""
+    print("\n" + "=" * 70)
+    print("PDF TOPOLOGY TEST SUITE")
+    print("=" * 70)
+
+    tests = [
+        ("Agreement", test_agreement),
+        ("Resource Signals", test_resources),
+        ("Early Exit", test_early_exit),
+        ("Topology Store", test_store),
+    ]
+
+    results = {}
+    for test_name, test_func in tests:
+        try:
+            results[test_name] = test_func()
+        except Exception as e:
+            print(f"\n❌ {test_name} FAILED with exception: {e}")
+            results[test_name] = False
+
+    print_section("TEST SUMMARY")
+    for test_name, passed in results.items():
+        print(f"{'✅ PASSED' if passed else '❌ FAILED'}: {test_name}")
+
+    passed_tests = sum(1 for passed in results.values() if passed)
+    print(f"\nTOTAL: {passed_tests}/{len(results)} tests passed")
+    return 0 if passed_tests == len(results) else 1
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,290 @@
+"""
+Provider Rate Limiter Test Suite
+
+Tests the shared per-provider limiter that all vision/text calls go through.
+
+Test Coverage:
+1. Requests/min and tokens/min buckets reserve capacity and report waits
+2. 429 / Retry-After parsing and retry classification (only 408/429/5xx, connection errors, timeouts)
+3. Retries with backoff; Retry-After pauses the provider; other 4xx fail fast with the original error
+4. In-flight limit adapts to a server that throttles above its capacity
+5. Coroutines share the limiter with threads without blocking the event loop
+
+Run: python test_rate_limiter.py
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add gracian_pipeline to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from gracian_pipeline.core import rate_limiter
+from gracian_pipeline.core.rate_limiter import (
+    ProviderLimiter, TokenBucket, acall_with_limits, call_with_limits, is_rate_limited, is_retryable, retry_after_seconds,
+)
+
+
+def print_section(title: str):
+    """Print section header."""
+    print("\n" + "=" * 70)
+    print(title)
+    print("=" * 70 + "\n")
+
+
+class _ApiError(Exception):
+    """Shape of openai.APIStatusError / requests.HTTPError: status + response headers."""
+
+    def __init__(self, status: int, headers=None):
+        super().__init__(f"HTTP {status}")
+        self.status_code = status
+        self.response = SimpleNamespace(status_code=status, headers=headers or {})
+
+
+def _fresh(provider: str, **kwargs) -> ProviderLimiter:
+    limiter = ProviderLimiter(provider, **kwargs)
+    rate_limiter._limiters[provider] = limiter
+    return limiter
+
+
+def _report(checks):
+    ok = True
+    for passed, label in checks:
+        print(f"{'✅' if passed else '❌'} {label}")
+        ok = ok and passed
+    return ok
+
+
+def test_buckets():
+    """Test 1: Buckets allow a burst up to capacity, then ask callers to wait."""
+    print_section("TEST 1: Token Buckets")
+    tpm = TokenBucket(6000)  # 100 tokens/s
+    burst = tpm.reserve(6000)
+    wait = tpm.reserve(50)
+    unlimited = TokenBucket(0)
+    return _report([
+        (burst == 0.0, "full bucket serves a burst"),
+        (0.45 <= wait <= 0.55, f"debt of 50 tokens -> {wait:.2f}s wait"),
+        (unlimited.reserve(10 ** 9) == 0.0, "0 per minute means unlimited"),
+    ])
+
+
+def test_error_parsing():
+    """Test 2: Status codes and Retry-After headers drive the retry decision."""
+    print_section("TEST 2: Error Classification")
+    return _report([
+        (is_rate_limited(_ApiError(429)), "429 is a rate limit"),
+        (retry_after_seconds(_ApiError(429, {"retry-after": "7"})) == 7.0, "Retry-After seconds"),
+        (retry_after_seconds(_ApiError(429, {"retry-after-ms": "250"})) == 0.25, "retry-after-ms"),
+        (retry_after_seconds(_ApiError(429, {"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"})) == 0.0, "past HTTP date clamps to 0"),
+        (is_retryable(_ApiError(503)) and is_retryable(TimeoutError()), "5xx and timeouts retry"),
+        (not is_retryable(_ApiError(400)) and not is_retryable(_ApiError(401)), "400/401 fail fast"),
+        (is_retryable(ConnectionResetError()) and is_retryable(type("APIConnectionError", (Exception,), {})()),
+         "connection errors retry (builtin and SDK types)"),
+        (not any(is_retryable(e) for e in (TypeError(), KeyError("k"), ValueError("bad json"), RuntimeError("no key"))),
+         "bugs, parse and configuration errors fail fast"),
+    ])
+
+
+def test_retry_and_pause():
+    """Test 3: Throttled calls back off and pause the provider for Retry-After."""
+    print_section("TEST 3: Retry, Backoff And Pause")
+    os.environ["LLM_BACKOFF_BASE_S"] = "0.01"
+    try:
+        limiter = _fresh("test-retry", max_concurrency=4)
+        outcomes = [_ApiError(429, {"retry-after": "0.2"}), _ApiError(500), "ok"]
+        calls = []
+
+        def _fn():
+            calls.append(time.monotonic())
+            out = outcomes.pop(0)
+            if isinstance(out, Exception):
+                raise out
+            return out
+
+        start = time.monotonic()
+        result = call_with_limits("test-retry", _fn)
+        waited = calls[1] - start
+
+        _fresh("test-fail")
+        bad = []
+
+        def _bad():
+            bad.append(1)
+            raise _ApiError(400)
+        try:
+            call_with_limits("test-fail", _bad)
+            failed = None
+        except Exception as e:
+            failed = e
+    finally:
+        os.environ.pop("LLM_BACKOFF_BASE_S", None)
+    snap = limiter.snapshot()
+    return _report([
+        (result == "ok" and len(calls) == 3, "succeeded on the third attempt"),
+        (waited >= 0.2, f"second attempt waited out Retry-After ({waited:.2f}s)"),
+        (snap["throttled"] == 1 and snap["retries"] == 2, f"stats {snap}"),
+        (snap["limit"] < 4, "in-flight limit reduced after 429"),
+        (isinstance(failed, _ApiError) and failed.status_code == 400 and len(bad) == 1,
+         "original 400 error raised after one attempt"),
+    ])
+
+
+def test_adaptive_concurrency():
+    """Test 4: A server that 429s above 3 in flight drives the limit down; all calls finish."""
+    print_section("TEST 4: Adaptive Concurrency")
+    os.environ["LLM_BACKOFF_BASE_S"] = "0.01"
+    os.environ["LLM_MAX_ATTEMPTS"] = "20"
+    limiter = _fresh("test-aimd", max_concurrency=12)
+    lock = threading.Lock()
+    state = {"inflight": 0, "peak_after_429": 0, "throttled_once": False}
+
+    def _server():
+        with lock:
+            state["inflight"] += 1
+            over = state["inflight"] > 3
+            if state["throttled_once"]:
+                state["peak_after_429"] = max(state["peak_after_429"], state["inflight"])
+        try:
+            time.sleep(0.02)
+            if over:
+                with lock:
+                    state["throttled_once"] = True
+                raise _ApiError(429)
+            return "ok"
+        finally:
+            with lock:
+                state["inflight"] -= 1
+
+    results = []
+
+    def _worker():
+        results.append(call_with_limits("test-aimd", _server))
+
+    try:
+        threads = [threading.Thread(target=_worker) for _ in range(24)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        os.environ.pop("LLM_BACKOFF_BASE_S", None)
+        os.environ.pop("LLM_MAX_ATTEMPTS", None)
+    snap = limiter.snapshot()
+    return _report([
+        (results.count("ok") == 24, f"{results.count('ok')}/24 calls succeeded"),
+        (snap["throttled"] > 0, f"{snap['throttled']} throttled responses"),
+        (snap["limit"] < 12, f"limit adapted to {snap['limit']} (max 12)"),
+        (snap["inflight"] == 0, "no leaked slots"),
+    ])
+
+
+def test_async_calls():
+    """Test 5: acall_with_limits respects the in-flight limit shared with threads, retries and frees cancelled slots."""
+    print_section("TEST 5: Async Calls")
+    os.environ["LLM_BACKOFF_BASE_S"] = "0.01"
+    limiter = _fresh("test-async", max_concurrency=3)
+    state = {"inflight": 0, "peak": 0, "ticks": 0}
+    lock = threading.Lock()
+    outcomes = [_ApiError(503)]
+
+    async def _server():
+        with lock:
+            state["inflight"] += 1
+            state["peak"] = max(state["peak"], state["inflight"])
+        try:
+            await asyncio.sleep(0.02)
+            if outcomes:
+                raise outcomes.pop(0)
+            return "ok"
+        finally:
+            with lock:
+                state["inflight"] -= 1
+
+    def _thread_server():
+        with lock:
+            state["inflight"] += 1
+            state["peak"] = max(state["peak"], state["inflight"])
+        try:
+            time.sleep(0.02)
+            return "ok"
+        finally:
+            with lock:
+                state["inflight"] -= 1
+
+    async def _ticker(stop):
+        while not stop.is_set():
+            state["ticks"] += 1
+            await asyncio.sleep(0.005)
+
+    async def _main():
+        stop = asyncio.Event()
+        ticker = asyncio.create_task(_ticker(stop))
+        threads = [threading.Thread(target=call_with_limits, args=("test-async", _thread_server)) for _ in range(6)]
+        for t in threads:
+            t.start()
+        results = await asyncio.gather(*(acall_with_limits("test-async", _server) for _ in range(18)))
+        for t in threads:
+            t.join()
+        # a call cancelled while waiting for (or holding) a slot gives it back
+        blocked = [asyncio.create_task(acall_with_limits("test-async", lambda: asyncio.sleep(1))) for _ in range(5)]
+        await asyncio.sleep(0.05)
+        for task in blocked:
+            task.cancel()
+        await asyncio.gather(*blocked, return_exceptions=True)
+        stop.set()
+        await ticker
+        return results
+
+    try:
+        results = asyncio.run(_main())
+    finally:
+        os.environ.pop("LLM_BACKOFF_BASE_S", None)
+    snap = limiter.snapshot()
+    return _report([
+        (results.count("ok") == 18, f"{results.count('ok')}/18 coroutine calls succeeded"),
+        (state["peak"] <= 3, f"peak {state['peak']} in flight across threads and coroutines (limit 3)"),
+        (snap["retries"] == 1, "503 retried"),
+        (state["ticks"] > 10, f"event loop kept running while waiting ({state['ticks']} ticks)"),
+        (snap["inflight"] == 0, "no leaked slots after cancellation"),
+    ])
+
+
+def main():
+    """Run all tests."""
+    print("\n" + "=" * 70)
+    print("PROVIDER RATE LIMITER TEST SUITE")
+    print("=" * 70)
+
+    tests = [
+        ("Token Buckets", test_buckets),
+        ("Error Classification", test_error_parsing),
+        ("Retry, Backoff And Pause", test_retry_and_pause),
+        ("Adaptive Concurrency", test_adaptive_concurrency),
+        ("Async Calls", test_async_calls),
+    ]
+
+    results = {}
+    for test_name, test_func in tests:
+        try:
+            results[test_name] = test_func()
+        except Exception as e:
+            print(f"\n❌ {test_name} FAILED with exception: {e}")
+            results[test_name] = False
+
+    print_section("TEST SUMMARY")
+    for test_name, passed in results.items():
+        print(f"{'✅ PASSED' if passed else '❌ FAILED'}: {test_name}")
+
+    passed_tests = sum(1 for passed in results.values() if passed)
+    print(f"\nTOTAL: {passed_tests}/{len(results)} tests passed")
+    return 0 if passed_tests == len(results) else 1
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,224 @@
+"""
+Render Cache Test Suite
+
+Tests the per-document rendered-page cache shared by the sectionizer,
+coaching and vision QC.
+
+Test Coverage:
+1. A page is rasterized once per (page, DPI, format)
+2. Memory bound spills least-recently-used images to disk and promotes them back
+3. Registry eviction removes spill directories
+4. Concurrent requests for the same pages share one rasterization
+5. Raster engine chunking and in-order streaming
+
+Run: python test_render_cache.py
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+
+# Add gracian_pipeline to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from gracian_pipeline.core import render_cache
+from gracian_pipeline.core.rasterizer import RasterEngine, _chunks
+
+
+def print_section(title: str):
+    """Print section header."""
+    print("\n" + "=" * 70)
+    print(title)
+    print("=" * 70 + "\n")
+
+
+class _FakeRasterizer:
+    """Counts rasterized pages; 10-page document, 1 KB per image."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, pdf_path, page_indices, dpi, fmt="png"):
+        self.calls.extend((i, dpi, fmt) for i in page_indices)
+        return iter([(i, bytes([i % 256]) * 1024) for i in page_indices])
+
+
+def _with_fakes(fn):
+    def run():
+        fake = _FakeRasterizer()
+        orig_raster, orig_count = render_cache._rasterize, render_cache._page_count
+        render_cache._rasterize = fake
+        render_cache._page_count = lambda pdf_path: 10
+        try:
+            with tempfile.TemporaryDirectory() as tmp:
+                pdf = os.path.join(tmp, "brf.pdf")
+                with open(pdf, "wb") as f:
+                    f.write(b"%PDF-1.4 test")
+                return fn(pdf, fake, tmp)
+        finally:
+            render_cache._rasterize, render_cache._page_count = orig_raster, orig_count
+            render_cache._close_all()
+    run.__name__ = fn.__name__
+    run.__doc__ = fn.__doc__
+    return run
+
+
+def _report(checks):
+    ok = True
+    for passed, label in checks:
+        print(f"{'✅' if passed else '❌'} {label}")
+        ok = ok and passed
+    return ok
+
+
+@_with_fakes
+def test_render_once(pdf, fake, tmp):
+    """Test 1: Overlapping requests at the same DPI never re-render."""
+    print_section("TEST 1: Render Once Per DPI")
+
+    all_pages = render_cache.render_pages(pdf, range(10), 170)   # sectionizer round 1
+    render_cache.render_pages(pdf, range(2, 5), 170)             # round 2 range
+    render_cache.render_pages(pdf, range(10), 170)               # coach sectionizer
+    qc = render_cache.render_pages(pdf, [4, 3, 3, 5, 42, -1], 220)  # agent QC (unsorted, dupes, out of range)
+    render_cache.render_pages(pdf, [3, 4, 5, 6], 220)            # coaching window
+
+    stats = render_cache.render_cache_stats(pdf)
+    return _report([
+        (len(all_pages) == 10, "all pages returned"),
+        (len(qc) == 3 and qc[0][0] == 3, "subset sorted, deduplicated, out-of-range ignored"),
+        (len(fake.calls) == len(set(fake.calls)), "no (page, dpi) rasterized twice"),
+        (len(fake.calls) == 14, f"14 rasterizations (got {len(fake.calls)})"),
+        (stats.get("rendered") == 14 and stats.get("hits") == 16, f"stats {stats}"),
+    ])
+
+
+@_with_fakes
+def test_spill_to_disk(pdf, fake, tmp):
+    """Test 2: Memory bound spills to disk; spilled pages are served without re-rendering."""
+    print_section("TEST 2: Spill To Disk")
+
+    cache = render_cache.get_render_cache(pdf)
+    cache.max_bytes = 3 * 1024
+    cache.render(range(10), 170)
+    snap = cache.snapshot()
+    again = cache.render([0, 1], 170)
+
+    return _report([
+        (snap["mem_bytes"] <= 3 * 1024, f"memory within bound ({snap['mem_bytes']} bytes)"),
+        (snap["spilled_entries"] == 7, f"7 pages spilled (got {snap['spilled_entries']})"),
+        (again[0] == bytes([0]) * 1024, "spilled page restored intact"),
+        (cache.snapshot()["disk_hits"] == 2, "served from disk"),
+        (len(fake.calls) == 10, "no re-rendering after spill"),
+    ])
+
+
+@_with_fakes
+def test_registry_eviction(pdf, fake, tmp):
+    """Test 3: Evicted documents release their spill directory."""
+    print_section("TEST 3: Registry Eviction")
+
+    os.environ["RENDER_CACHE_DOCS"] = "1"
+    try:
+        cache = render_cache.get_render_cache(pdf)
+        cache.max_bytes = 1024
+        cache.render(range(3), 170)
+        spill_dir = cache._spill_dir
+        other = os.path.join(tmp, "other.pdf")
+        with open(other, "wb") as f:
+            f.write(b"%PDF-1.4 other")
+        render_cache.get_render_cache(other)
+    finally:
+        os.environ.pop("RENDER_CACHE_DOCS", None)
+
+    return _report([
+        (spill_dir is not None, "spill directory was created"),
+        (spill_dir is not None and not os.path.exists(spill_dir), "spill directory removed on eviction"),
+        (render_cache.render_cache_stats(pdf) == {}, "evicted document unregistered"),
+    ])
+
+
+@_with_fakes
+def test_concurrent_requests(pdf, fake, tmp):
+    """Test 4: Threads asking for overlapping pages never double-render."""
+    print_section("TEST 4: Concurrent Requests")
+
+    def _slow(pdf_path, page_indices, dpi, fmt="png"):
+        for i in page_indices:
+            fake.calls.append((i, dpi, fmt))
+            time.sleep(0.005)
+            yield i, bytes([i]) * 16
+
+    render_cache._rasterize = _slow
+    results = {}
+
+    def _worker(n, pages):
+        results[n] = render_cache.render_pages(pdf, pages, 220)
+
+    threads = [threading.Thread(target=_worker, args=(n, range(n % 3, 10 - n % 2))) for n in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    return _report([
+        (len(fake.calls) == len(set(fake.calls)), f"{len(fake.calls)} rasterizations, no duplicates"),
+        (all(results[n][0] == bytes([n % 3]) * 16 for n in range(6)), "each thread got its pages in order"),
+    ])
+
+
+def test_engine_streaming():
+    """Test 5: Chunks are contiguous and results stream back in page order."""
+    print_section("TEST 5: Engine Chunking And Streaming")
+
+    engine = RasterEngine(workers=2, chunk_pages=3, min_parallel_pages=1)
+    futures = []
+    for chunk in _chunks([0, 1, 2, 3, 4, 7, 8], 3):
+        fut = Future()
+        fut.set_result([(i, bytes([i])) for i in chunk])
+        futures.append((chunk, fut))
+    streamed = [i for i, _ in engine._collect("unused.pdf", futures, 170, "png")]
+
+    return _report([
+        (_chunks([0, 1, 2, 3, 4, 7, 8], 3) == [[0, 1, 2], [3, 4], [7, 8]], "contiguous runs capped at chunk size"),
+        (streamed == [0, 1, 2, 3, 4, 7, 8], "pages streamed in order"),
+        (list(engine.iter_pages("unused.pdf", [], 170)) == [], "empty request"),
+    ])
+
+
+def main():
+    """Run all tests."""
+    print("\n" + "=" * 70)
+    print("RENDER CACHE TEST SUITE")
+    print("=" * 70)
+
+    tests = [
+        ("Render Once Per DPI", test_render_once),
+        ("Spill To Disk", test_spill_to_disk),
+        ("Registry Eviction", test_registry_eviction),
+        ("Concurrent Requests", test_concurrent_requests),
+        ("Engine Chunking And Streaming", test_engine_streaming),
+    ]
+
+    results = {}
+    for test_name, test_func in tests:
+        try:
+            results[test_name] = test_func()
+        except Exception as e:
+            print(f"\n❌ {test_name} FAILED with exception: {e}")
+            results[test_name] = False
+
+    print_section("TEST SUMMARY")
+    for test_name, passed in results.items():
+        print(f"{'✅ PASSED' if passed else '❌ FAILED'}: {test_name}")
+
+    passed_tests = sum(1 for passed in results.values() if passed)
+    print(f"\nTOTAL: {passed_tests}/{len(results)} tests passed")
+    return 0 if passed_tests == len(results) else 1
+
+
+if __name__ == "__main__":
+    exit(main())
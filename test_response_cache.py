@@ -0,0 +1,265 @@
+"""
+LLM Response Cache Test Suite
+
+Tests the persistent SQLite cache in front of the vision/text model calls.
+
+Test Coverage:
+1. Keys change with model, prompt, image bytes and params
+2. Repeats are served from the cache; failures and empty answers are not stored
+3. TTL expiry and the bypass flag
+4. Size-bounded LRU eviction
+5. Chat Completions wrapper keys inline images by digest
+6. Unparseable provider payloads (Gemini safety block) are not stored
+
+Run: python test_response_cache.py
+"""
+
+import base64
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add gracian_pipeline to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from gracian_pipeline.core import response_cache
+from gracian_pipeline.core.response_cache import ResponseCache, cached_chat_completion, cached_completion, response_key
+
+
+def print_section(title: str):
+    """Print section header."""
+    print("\n" + "=" * 70)
+    print(title)
+    print("=" * 70 + "\n")
+
+
+def _with_cache(fn):
+    def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            old = {k: os.environ.get(k) for k in ("LLM_CACHE", "LLM_CACHE_PATH", "LLM_CACHE_BYPASS")}
+            os.environ.update({"LLM_CACHE": "true", "LLM_CACHE_PATH": os.path.join(tmp, "llm.db"), "LLM_CACHE_BYPASS": "false"})
+            response_cache._default_cache = None
+            try:
+                return fn(response_cache.get_response_cache())
+            finally:
+                response_cache._default_cache = None
+                for k, v in old.items():
+                    if v is None:
+                        os.environ.pop(k, None)
+                    else:
+                        os.environ[k] = v
+    run.__name__ = fn.__name__
+    run.__doc__ = fn.__doc__
+    return run
+
+
+class _Counter:
+    def __init__(self, answers):
+        self.answers = list(answers)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        out = self.answers.pop(0)
+        if isinstance(out, Exception):
+            raise out
+        return out
+
+
+def _report(checks):
+    ok = True
+    for passed, label in checks:
+        print(f"{'✅' if passed else '❌'} {label}")
+        ok = ok and passed
+    return ok
+
+
+def test_key_sensitivity():
+    """Test 1: Every output-relevant input is part of the key."""
+    print_section("TEST 1: Key Sensitivity")
+    base = response_key("vision", "gpt-5", "prompt", [b"page1", b"page2"], {"max_output_tokens": 3000})
+    return _report([
+        (base == response_key("vision", "gpt-5", "prompt", [b"page1", b"page2"], {"max_output_tokens": 3000}), "stable for identical requests"),
+        (base != response_key("vision", "gpt-4o", "prompt", [b"page1", b"page2"], {"max_output_tokens": 3000}), "model"),
+        (base != response_key("vision", "gpt-5", "prompt!", [b"page1", b"page2"], {"max_output_tokens": 3000}), "prompt"),
+        (base != response_key("vision", "gpt-5", "prompt", [b"page1", b"page3"], {"max_output_tokens": 3000}), "image bytes"),
+        (base != response_key("vision", "gpt-5", "prompt", [b"page2", b"page1"], {"max_output_tokens": 3000}), "image order"),
+        (base != response_key("vision", "gpt-5", "prompt", [b"page1", b"page2"], {"max_output_tokens": 1200}), "params"),
+    ])
+
+
+@_with_cache
+def test_hit_and_miss(cache):
+    """Test 2: Second identical request is served from SQLite."""
+    print_section("TEST 2: Hit, Miss And Failures")
+    call = _Counter(['{"a": 1}', "unused"])
+    first = cached_completion("vision", "gpt-5", "p", [b"img"], call)
+    second = cached_completion("vision", "gpt-5", "p", [b"img"], call)
+
+    failing = _Counter([RuntimeError("boom"), "", '{"b": 2}'])
+    try:
+        cached_completion("vision", "gpt-5", "q", [], failing)
+        raised = False
+    except RuntimeError:
+        raised = True
+    empty = cached_completion("vision", "gpt-5", "q", [], failing)
+    recovered = cached_completion("vision", "gpt-5", "q", [], failing)
+
+    reopened = ResponseCache(str(cache.db_path))
+    persisted = reopened.get(response_key("vision", "gpt-5", "p", [b"img"])) == '{"a": 1}'
+    return _report([
+        (first == second == '{"a": 1}' and call.calls == 1, "one model call for two identical requests"),
+        (raised and empty == "" and recovered == '{"b": 2}' and failing.calls == 3, "exceptions and empty answers not cached"),
+        (persisted, "answer persisted across cache instances"),
+        (cache.stats()["hits"] == 1 and cache.stats()["entries"] == 2, f"stats {cache.stats()}"),
+    ])
+
+
+@_with_cache
+def test_ttl_and_bypass(cache):
+    """Test 3: Expired entries miss; bypass refreshes instead of reading."""
+    print_section("TEST 3: TTL And Bypass")
+    call = _Counter(["old", "new", "newer"])
+    cached_completion("text", "gpt-5", "p", [], call)
+
+    refreshed = cached_completion("text", "gpt-5", "p", [], call, bypass=True)
+    after_bypass = cached_completion("text", "gpt-5", "p", [], call)
+
+    cache.ttl_s = 60
+    with cache._connect() as conn:
+        conn.execute("UPDATE responses SET created_at = ?", (int(time.time()) - 120,))
+    expired = cached_completion("text", "gpt-5", "p", [], call)
+    return _report([
+        (refreshed == "new" and after_bypass == "new", "bypass calls the model and stores the fresh answer"),
+        (expired == "newer" and call.calls == 3, "expired entry re-requested"),
+        (cache.counters["expired"] == 1, "expiry counted"),
+    ])
+
+
+@_with_cache
+def test_lru_eviction(cache):
+    """Test 4: Least-recently-used answers are dropped over the size bound."""
+    print_section("TEST 4: LRU Eviction")
+    for i in range(4):
+        cache.put(f"k{i}", "x" * 100)
+        with cache._connect() as conn:
+            conn.execute("UPDATE responses SET last_access = ? WHERE cache_key = ?", (1000 + i, f"k{i}"))
+    with cache._connect() as conn:
+        conn.execute("UPDATE responses SET last_access = 2000 WHERE cache_key = 'k0'")
+    removed = cache.evict(max_bytes=250)
+    keys = sorted(k for (k,) in cache._connect().execute("SELECT cache_key FROM responses"))
+    return _report([
+        (removed == 2, f"removed {removed} entries"),
+        (keys == ["k0", "k3"], f"recently used entries kept {keys}"),
+    ])
+
+
+@_with_cache
+def test_chat_wrapper(cache):
+    """Test 5: Inline data-URL images are keyed by digest, options kept."""
+    print_section("TEST 5: Chat Completions Wrapper")
+    calls = []
+
+    def _create(**kwargs):
+        calls.append(kwargs)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content='{"ok": true}'))])
+
+    client = SimpleNamespace(base_url="https://api.x.ai/v1", chat=SimpleNamespace(completions=SimpleNamespace(create=_create)))
+
+    def _ask(img: bytes, detail: str = "high"):
+        url = "data:image/png;base64," + base64.b64encode(img).decode("ascii")
+        return cached_chat_completion(
+            client,
+            namespace="grok_vision",
+            model="grok",
+            messages=[{"role": "user", "content": [{"type": "text", "text": "p"}, {"type": "image_url", "image_url": {"url": url, "detail": detail}}]}],
+            max_tokens=1200,
+        )
+
+    _ask(b"page")
+    _ask(b"page")
+    _ask(b"other")
+    _ask(b"page", detail="low")
+    return _report([
+        (len(calls) == 3, f"3 model calls for 4 requests (got {len(calls)})"),
+        (calls[0]["messages"][0]["content"][1]["image_url"]["detail"] == "high", "request sent unchanged"),
+    ])
+
+
+@_with_cache
+def test_blocked_gemini(cache):
+    """Test 6: A Gemini safety block is returned raw but never cached."""
+    print_section("TEST 6: Blocked Gemini Response")
+    try:
+        from gracian_pipeline.core import vision_qc
+    except ImportError as e:
+        print(f"⏭️  Skipped (missing dependency: {e})")
+        return True
+
+    answers = [
+        {"promptFeedback": {"blockReason": "SAFETY"}},
+        {"candidates": [{"content": {"parts": [{"text": '{"ok": true}'}]}}]},
+    ]
+    posts = []
+
+    def _post(url, json=None, timeout=None):
+        posts.append(url)
+        out = answers.pop(0)
+        return SimpleNamespace(raise_for_status=lambda: None, json=lambda: out)
+
+    old_session, old_key = vision_qc.http_session, os.environ.get("GEMINI_API_KEY")
+    vision_qc.http_session = lambda: SimpleNamespace(post=_post)
+    os.environ["GEMINI_API_KEY"] = "test"
+    try:
+        blocked = vision_qc.call_gemini_vision("p", [b"page"])
+        retried = vision_qc.call_gemini_vision("p", [b"page"])
+    finally:
+        vision_qc.http_session = old_session
+        if old_key is None:
+            os.environ.pop("GEMINI_API_KEY", None)
+        else:
+            os.environ["GEMINI_API_KEY"] = old_key
+    return _report([
+        ("SAFETY" in blocked, "raw payload returned to the caller"),
+        (retried == '{"ok": true}' and len(posts) == 2, "blocked answer not served from the cache"),
+        (cache.stats()["entries"] == 1, f"only the real answer stored {cache.stats()}"),
+    ])
+
+
+def main():
+    """Run all tests."""
+    print("\n" + "=" * 70)
+    print("LLM RESPONSE CACHE TEST SUITE")
+    print("=" * 70)
+
+    tests = [
+        ("Key Sensitivity", test_key_sensitivity),
+        ("Hit, Miss And Failures", test_hit_and_miss),
+        ("TTL And Bypass", test_ttl_and_bypass),
+        ("LRU Eviction", test_lru_eviction),
+        ("Chat Completions Wrapper", test_chat_wrapper),
+        ("Blocked Gemini Response", test_blocked_gemini),
+    ]
+
+    results = {}
+    for test_name, test_func in tests:
+        try:
+            results[test_name] = test_func()
+        except Exception as e:
+            print(f"\n❌ {test_name} FAILED with exception: {e}")
+            results[test_name] = False
+
+    print_section("TEST SUMMARY")
+    for test_name, passed in results.items():
+        print(f"{'✅ PASSED' if passed else '❌ FAILED'}: {test_name}")
+
+    passed_tests = sum(1 for passed in results.values() if passed)
+    print(f"\nTOTAL: {passed_tests}/{len(results)} tests passed")
+    return 0 if passed_tests == len(results) else 1
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,166 @@
+"""
+Result Sink Test Suite
+
+Tests the streaming JSONL / Parquet sinks used by run_gracian.py and mass_scan_pdfs.py.
+
+Test Coverage:
+1. JSONL appends one line per record with periodic fsync
+2. Torn last line is skipped; compaction keeps the latest record per key
+3. Agent outputs flatten to one row per field
+4. Parquet field table: row groups, reopen appends a part, compaction merges (needs pyarrow)
+
+Run: python test_result_sink.py
+"""
+
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+# Add gracian_pipeline to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from gracian_pipeline.core.result_sink import JsonlSink, flatten_fields, iter_jsonl, open_result_sink
+
+
+def print_section(title: str):
+    """Print section header."""
+    print("\n" + "=" * 70)
+    print(title)
+    print("=" * 70 + "\n")
+
+
+def _report(checks):
+    ok = True
+    for passed, label in checks:
+        print(f"{'✅' if passed else '❌'} {label}")
+        ok = ok and passed
+    return ok
+
+
+def test_jsonl_append():
+    """Test 1: Records land on disk as they are written; fsync is batched."""
+    print_section("TEST 1: JSONL Append")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "results.jsonl"
+        sink = JsonlSink(str(path), fsync_every=3, fsync_interval_s=3600)
+        for i in range(7):
+            sink.write(f"doc{i}.pdf", {"agent": {"v": i}})
+        visible = len(path.read_text(encoding="utf-8").splitlines())
+        fsyncs_before_close = sink.fsyncs
+        sink.close()
+        reopened = JsonlSink(str(path))
+        reopened.write("doc7.pdf", {})
+        reopened.close()
+        records = list(iter_jsonl(path))
+        return _report([
+            (visible == 7, "every record readable before close"),
+            (fsyncs_before_close == 2, f"{fsyncs_before_close} fsyncs for 7 records (every 3)"),
+            (len(records) == 8 and records[0]["data"] == {"agent": {"v": 0}}, "reopen appends"),
+        ])
+
+
+def test_compaction():
+    """Test 2: Crash leftovers and re-runs are cleaned up by compaction."""
+    print_section("TEST 2: Torn Lines And Compaction")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "results.jsonl"
+        with JsonlSink(str(path)) as sink:
+            sink.write("a.pdf", {"v": 1})
+            sink.write("b.pdf", {"v": 1})
+        with open(path, "a", encoding="utf-8") as f:
+            f.write('{"key": "c.pdf", "data": {"v"')  # crash mid-line
+        sink = JsonlSink(str(path))
+        sink.write("a.pdf", {"v": 2})
+        readable = [r["key"] for r in iter_jsonl(path)]
+        stats = sink.compact()
+        sink.write("d.pdf", {"v": 1})
+        sink.close()
+        latest = {r["key"]: r["data"]["v"] for r in iter_jsonl(path)}
+        return _report([
+            (readable == ["a.pdf", "b.pdf", "a.pdf"], "torn line skipped by readers"),
+            (stats == {"kept": 2, "dropped": 1}, f"compaction stats {stats}"),
+            (latest == {"a.pdf": 2, "b.pdf": 1, "d.pdf": 1}, "latest record per key kept; writes continue after compaction"),
+        ])
+
+
+def test_flatten():
+    """Test 3: Nested dicts become dotted fields; lists and metadata handled."""
+    print_section("TEST 3: Field Flattening")
+    rows = flatten_fields("x.pdf", {
+        "governance_agent": {"chairman": "Per", "board_members": ["A", "B"]},
+        "financial_agent": {"revenue": 100, "detail": {"interest": 2.5}, "audited": True},
+        "_qc": {"governance_agent": {}},
+    })
+    by_field = {(r["agent"], r["field"]): r for r in rows}
+    return _report([
+        (len(rows) == 5, f"{len(rows)} rows (metadata keys skipped)"),
+        (json.loads(by_field[("governance_agent", "board_members")]["value"]) == ["A", "B"], "lists stored as JSON"),
+        (by_field[("financial_agent", "detail.interest")]["number"] == 2.5, "nested field numeric column"),
+        (by_field[("financial_agent", "audited")]["number"] is None, "booleans are not numbers"),
+    ])
+
+
+def test_parquet():
+    """Test 4: Parquet part files, row groups and merge compaction."""
+    print_section("TEST 4: Parquet Field Table")
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        print("⏭️  Skipped (missing dependency: pyarrow)")
+        return True
+    with tempfile.TemporaryDirectory() as tmp:
+        sink = open_result_sink(tmp, kinds="jsonl,parquet")
+        parquet = sink.sinks[1]
+        parquet.batch_rows = 2
+        for i in range(3):
+            sink.write(f"doc{i}.pdf", {"financial_agent": {"revenue": i, "equity": i * 10}})
+        sink.close()
+        second = open_result_sink(tmp, kinds="jsonl,parquet")
+        second.write("doc1.pdf", {"financial_agent": {"revenue": 99}})
+        second.close()
+        parts_before = len(second.sinks[1].parts())
+        stats = second.compact()
+        parts = second.sinks[1].parts()
+        table = pq.read_table(str(parts[0])).to_pylist()
+        doc1 = {r["field"]: r["number"] for r in table if r["doc"] == "doc1.pdf"}
+        return _report([
+            (parquet.row_groups == 3, f"{parquet.row_groups} row groups for 6 rows at 2 rows/group"),
+            (parts_before == 2 and len(parts) == 1, "second session wrote its own part; compaction merged them"),
+            (doc1 == {"revenue": 99.0}, "re-run document replaced by its newest rows"),
+            (len(table) == 5 and stats["ParquetFieldSink.dropped"] == 2, f"compaction stats {stats}"),
+        ])
+
+
+def main():
+    """Run all tests."""
+    print("\n" + "=" * 70)
+    print("RESULT SINK TEST SUITE")
+    print("=" * 70)
+
+    tests = [
+        ("JSONL Append", test_jsonl_append),
+        ("Torn Lines And Compaction", test_compaction),
+        ("Field Flattening", test_flatten),
+        ("Parquet Field Table", test_parquet),
+    ]
+
+    results = {}
+    for test_name, test_func in tests:
+        try:
+            results[test_name] = test_func()
+        except Exception as e:
+            print(f"\n❌ {test_name} FAILED with exception: {e}")
+            results[test_name] = False
+
+    print_section("TEST SUMMARY")
+    for test_name, passed in results.items():
+        print(f"{'✅ PASSED' if passed else '❌ FAILED'}: {test_name}")
+
+    passed_tests = sum(1 for passed in results.values() if passed)
+    print(f"\nTOTAL: {passed_tests}/{len(results)} tests passed")
+    return 0 if passed_tests == len(results) else 1
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,146 @@
+"""
+Run Manifest Test Suite
+
+Tests the checkpoint manifest behind `run_gracian.py --resume`.
+
+Test Coverage:
+1. Done documents get an atomic per-document result file; failures record the error
+2. Resume skips done documents and retries failed / interrupted ones
+3. Combined JSON output is streamed from the per-document files
+
+Run: python test_run_manifest.py
+"""
+
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add gracian_pipeline to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from gracian_pipeline.core.run_manifest import RunManifest, write_json_object_stream
+
+
+def print_section(title: str):
+    """Print section header."""
+    print("\n" + "=" * 70)
+    print(title)
+    print("=" * 70 + "\n")
+
+
+def _report(checks):
+    ok = True
+    for passed, label in checks:
+        print(f"{'✅' if passed else '❌'} {label}")
+        ok = ok and passed
+    return ok
+
+
+def test_status_and_files():
+    """Test 1: mark_done writes one file per document; mark_failed keeps the error."""
+    print_section("TEST 1: Status And Result Files")
+    with tempfile.TemporaryDirectory() as tmp:
+        manifest = RunManifest(tmp)
+        manifest.start_run(["a/doc.pdf", "b/doc.pdf", "c.pdf"])
+        for p in ("a/doc.pdf", "b/doc.pdf", "c.pdf"):
+            manifest.mark_running(p)
+        out_a = manifest.mark_done("a/doc.pdf", {"governance_agent": {"chairman": "X"}}, 1.5)
+        out_b = manifest.mark_done("b/doc.pdf", {"governance_agent": {}}, 2.0)
+        manifest.mark_failed("c.pdf", "boom", 0.1)
+        saved = json.loads(out_a.read_text(encoding="utf-8"))
+        leftovers = [n for n in os.listdir(manifest.docs_dir) if n.startswith(".")]
+        return _report([
+            (out_a != out_b, "same file name in different folders gets distinct outputs"),
+            (saved["results"]["governance_agent"]["chairman"] == "X", "result file holds the document's results"),
+            (manifest.status_counts() == {"done": 2, "failed": 1}, f"status counts {manifest.status_counts()}"),
+            (not leftovers, "no temp files left behind"),
+        ])
+
+
+def test_resume():
+    """Test 2: A reopened manifest reports done documents; failed and running ones are retried."""
+    print_section("TEST 2: Resume")
+    with tempfile.TemporaryDirectory() as tmp:
+        first = RunManifest(tmp)
+        first.start_run(["d1.pdf", "d2.pdf", "d3.pdf", "d4.pdf"])
+        first.mark_running("d1.pdf")
+        first.mark_done("d1.pdf", {"x": {}}, 1.0)
+        first.mark_running("d2.pdf")
+        first.mark_failed("d2.pdf", "timeout", 1.0)
+        first.mark_running("d3.pdf")  # interrupted mid-document
+
+        reopened = RunManifest(tmp)
+        completed = reopened.completed()
+        todo = [p for p in ["d1.pdf", "d2.pdf", "d3.pdf", "d4.pdf"] if p not in completed]
+        reopened.start_run(todo, resume=True)
+        reopened.mark_running("d2.pdf")
+        with reopened._connect() as conn:
+            attempts = conn.execute("SELECT attempts FROM documents WHERE pdf_path = 'd2.pdf'").fetchone()[0]
+
+        os.remove(reopened.output_path_for("d1.pdf"))
+        missing_file = "d1.pdf" not in reopened.completed()
+
+        fresh = RunManifest(tmp)
+        fresh.start_run(["d4.pdf"])
+        return _report([
+            (completed == {"d1.pdf"}, f"completed {sorted(completed)}"),
+            (todo == ["d2.pdf", "d3.pdf", "d4.pdf"], "failed, interrupted and new documents re-queued"),
+            (attempts == 2, "attempts accumulate across runs"),
+            (missing_file, "done document with a deleted result file is re-run"),
+            (fresh.status_counts() == {"pending": 1}, "non-resume run starts a clean manifest"),
+        ])
+
+
+def test_streamed_output():
+    """Test 3: Combined output is valid JSON including failures."""
+    print_section("TEST 3: Streamed Output")
+    with tempfile.TemporaryDirectory() as tmp:
+        manifest = RunManifest(tmp)
+        manifest.start_run(["a.pdf", "b.pdf"])
+        manifest.mark_done("a.pdf", {"agent": {"v": 1}}, 1.0)
+        manifest.mark_failed("b.pdf", "bad pdf", 1.0)
+        out = Path(tmp) / "combined.json"
+        count = write_json_object_stream(out, manifest.iter_results())
+        combined = json.loads(out.read_text(encoding="utf-8"))
+        empty = Path(tmp) / "empty.json"
+        write_json_object_stream(empty, iter(()))
+        return _report([
+            (count == 2, f"{count} documents written"),
+            (combined == {"a.pdf": {"agent": {"v": 1}}, "b.pdf": {"_error": "bad pdf"}}, "results and errors round-trip"),
+            (json.loads(empty.read_text()) == {}, "empty run writes {}"),
+        ])
+
+
+def main():
+    """Run all tests."""
+    print("\n" + "=" * 70)
+    print("RUN MANIFEST TEST SUITE")
+    print("=" * 70)
+
+    tests = [
+        ("Status And Result Files", test_status_and_files),
+        ("Resume", test_resume),
+        ("Streamed Output", test_streamed_output),
+    ]
+
+    results = {}
+    for test_name, test_func in tests:
+        try:
+            results[test_name] = test_func()
+        except Exception as e:
+            print(f"\n❌ {test_name} FAILED with exception: {e}")
+            results[test_name] = False
+
+    print_section("TEST SUMMARY")
+    for test_name, passed in results.items():
+        print(f"{'✅ PASSED' if passed else '❌ FAILED'}: {test_name}")
+
+    passed_tests = sum(1 for passed in results.values() if passed)
+    print(f"\nTOTAL: {passed_tests}/{len(results)} tests passed")
+    return 0 if passed_tests == len(results) else 1
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,196 @@
+"""
+Scan Checkpoint Test Suite
+
+Tests the batched, single-connection checkpoint store behind mass_scan_pdfs.py.
+
+Test Coverage:
+1. Scanned paths loaded once; WAL mode; one transaction per batch of N files or T seconds
+2. Crash safety: only the uncommitted batch is lost; before_commit runs before each transaction
+3. Sessions and category counts
+4. Fingerprints: legacy databases migrated in place, touch/purge, directory cache round trip
+
+Run: python test_scan_checkpoint.py
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add gracian_pipeline to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from gracian_pipeline.core.corpus_walk import walk_pdfs
+from gracian_pipeline.core.scan_checkpoint import CheckpointStore, Fingerprint
+
+
+def print_section(title: str):
+    """Print section header."""
+    print("\n" + "=" * 70)
+    print(title)
+    print("=" * 70 + "\n")
+
+
+def _report(checks):
+    ok = True
+    for passed, label in checks:
+        print(f"{'✅' if passed else '❌'} {label}")
+        ok = ok and passed
+    return ok
+
+
+def _result(category="machine_readable"):
+    return {"category": category, "size_mb": 1.5, "pages": 12, "avg_chars_per_page": 1234.0}
+
+
+def _rows(db):
+    conn = sqlite3.connect(db)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM scanned_files").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_batching():
+    """Test 1: In-memory lookups, WAL journal, batched transactions."""
+    print_section("TEST 1: Batching")
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, "scan_progress.db")
+        store = CheckpointStore(db, batch_files=100, batch_seconds=3600)
+        mode = store._conn.execute("PRAGMA journal_mode").fetchone()[0]
+        for i in range(250):
+            store.add(f"/pdfs/{i}.pdf", _result())
+        after_250 = (_rows(db), store.commits)
+        lookups = "/pdfs/249.pdf" in store and "/pdfs/999.pdf" not in store
+        store.close()
+
+        reopened = CheckpointStore(db, batch_files=1000, batch_seconds=0.05)
+        loaded = len(reopened.scanned)
+        reopened.add("/pdfs/a.pdf", _result())
+        time.sleep(0.06)
+        reopened.add("/pdfs/b.pdf", _result())
+        timed = _rows(db)
+        reopened.close()
+    return _report([
+        (mode == "wal", f"journal_mode={mode}"),
+        (after_250 == (200, 2), f"250 files -> 2 transactions of 100, 50 pending ({after_250})"),
+        (lookups, "scanned lookups answered from memory, including pending rows"),
+        (loaded == 250, f"close() writes the rest; reopen loads {loaded} paths once"),
+        (timed == 252, "batch_seconds commits a partial batch"),
+    ])
+
+
+def test_crash_safety():
+    """Test 2: A crash loses only the uncommitted batch; before_commit runs first."""
+    print_section("TEST 2: Crash Safety")
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, "scan_progress.db")
+        order = []
+        store = CheckpointStore(db, batch_files=10, batch_seconds=3600,
+                                before_commit=lambda: order.append(("sink_flush", _rows(db))))
+        for i in range(25):
+            store.add(f"/pdfs/{i}.pdf", _result())
+        # Simulated crash: the process dies without close(); the connection is dropped
+        store._conn.close()
+        resumed = CheckpointStore(db)
+        todo = [f"/pdfs/{i}.pdf" for i in range(25) if f"/pdfs/{i}.pdf" not in resumed]
+        resumed.close()
+    return _report([
+        (len(todo) == 5 and todo[0] == "/pdfs/20.pdf", f"resume re-scans the last uncommitted batch only ({len(todo)} files)"),
+        (order == [("sink_flush", 0), ("sink_flush", 10)], f"before_commit runs before each transaction: {order}"),
+    ])
+
+
+def test_sessions():
+    """Test 3: Session rows and committed category counts."""
+    print_section("TEST 3: Sessions And Counts")
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, "scan_progress.db")
+        with CheckpointStore(db, batch_files=1000, batch_seconds=3600) as store:
+            sid = store.start_session(3, "arsredovisning")
+            for i, cat in enumerate(["scanned", "scanned", "hybrid"]):
+                store.add(f"/pdfs/{i}.pdf", _result(cat))
+            store.finish_session(sid)
+            counts = store.category_counts()
+        conn = sqlite3.connect(db)
+        session = conn.execute("SELECT total_files, document_type, completed_at IS NOT NULL FROM scan_sessions").fetchall()
+        conn.close()
+    return _report([
+        (counts == {"scanned": 2, "hybrid": 1}, f"finish_session writes pending rows: {counts}"),
+        (session == [(3, "arsredovisning", 1)], f"session recorded and completed: {session}"),
+    ])
+
+
+def test_fingerprints():
+    """Test 4: Old schema migrated; fingerprints stored, touched and purged; directory listings cached."""
+    print_section("TEST 4: Fingerprints")
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, "scan_progress.db")
+        conn = sqlite3.connect(db)
+        conn.execute("""CREATE TABLE scanned_files (filepath TEXT PRIMARY KEY, category TEXT, size_mb REAL,
+                        pages INTEGER, avg_chars_per_page REAL, scanned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)""")
+        conn.execute("INSERT INTO scanned_files (filepath, category) VALUES ('/pdfs/old.pdf', 'scanned')")
+        conn.commit()
+        conn.close()
+
+        with CheckpointStore(db, batch_files=1000, batch_seconds=3600) as store:
+            legacy = store.fingerprint("/pdfs/old.pdf")
+            store.add("/pdfs/new.pdf", _result(), Fingerprint(1024, 5, "ab12"))
+            store.touch("/pdfs/old.pdf", Fingerprint(2048, 7))
+            store.add("/pdfs/gone.pdf", _result())
+            purged = store.purge(["/pdfs/gone.pdf", "/pdfs/never.pdf"])
+        with CheckpointStore(db) as reopened:
+            stored = (reopened.fingerprint("/pdfs/new.pdf"), reopened.fingerprint("/pdfs/old.pdf"))
+            paths = sorted(reopened.paths_under("/pdfs"))
+
+            corpus = os.path.join(tmp, "corpus")
+            for sub in ("a", "b"):
+                os.makedirs(os.path.join(corpus, sub))
+                open(os.path.join(corpus, sub, "x.pdf"), "wb").close()
+            first = walk_pdfs(corpus, reopened.dir_cache(corpus))
+            reopened.save_dir_cache(corpus, first.dirs)
+            open(os.path.join(corpus, "b", "y.pdf"), "wb").close()
+            second = walk_pdfs(corpus, reopened.dir_cache(corpus))
+    return _report([
+        (legacy == Fingerprint(None, None, None), "pre-fingerprint rows migrated with an empty fingerprint"),
+        (stored == (Fingerprint(1024, 5, "ab12"), Fingerprint(2048, 7, None)), f"fingerprints persisted: {stored}"),
+        (purged == 1 and paths == ["/pdfs/new.pdf", "/pdfs/old.pdf"], f"purge removes deleted files: {paths}"),
+        (first.listed == 3 and (second.listed, second.cached) == (1, 2), f"cached listings reused for unchanged directories ({second.listed} listed, {second.cached} cached)"),
+        ([os.path.basename(p) for p in second.paths()] == ["x.pdf", "x.pdf", "y.pdf"], "new file found in the changed directory"),
+    ])
+
+
+def main():
+    """Run all tests."""
+    print("\n" + "=" * 70)
+    print("SCAN CHECKPOINT TEST SUITE")
+    print("=" * 70)
+
+    tests = [
+        ("Batching", test_batching),
+        ("Crash Safety", test_crash_safety),
+        ("Sessions And Counts", test_sessions),
+        ("Fingerprints", test_fingerprints),
+    ]
+
+    results = {}
+    for test_name, test_func in tests:
+        try:
+            results[test_name] = test_func()
+        except Exception as e:
+            print(f"\n❌ {test_name} FAILED with exception: {e}")
+            results[test_name] = False
+
+    print_section("TEST SUMMARY")
+    for test_name, passed in results.items():
+        print(f"{'✅ PASSED' if passed else '❌ FAILED'}: {test_name}")
+
+    passed_tests = sum(1 for passed in results.values() if passed)
+    print(f"\nTOTAL: {passed_tests}/{len(results)} tests passed")
+    return 0 if passed_tests == len(results) else 1
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,168 @@
+"""
+Document Scheduler Test Suite
+
+Tests the corpus-level work queue behind run_gracian.py.
+
+Test Coverage:
+1. Priority orders: pages (largest first), topology (scanned first), fifo
+2. N documents run concurrently and every job reports a result
+3. Failures are counted without stopping the run
+4. A stop request lets in-flight documents finish and leaves the rest queued
+
+Run: python test_scheduler.py
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Add gracian_pipeline to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from gracian_pipeline.core.scheduler import BatchScheduler, load_topology, plan_jobs
+
+
+def print_section(title: str):
+    """Print section header."""
+    print("\n" + "=" * 70)
+    print(title)
+    print("=" * 70 + "\n")
+
+
+TOPOLOGY = {
+    "results": {
+        "machine_readable": [{"filename": "a.pdf", "pages": 12}, {"filename": "b.pdf", "pages": 40}],
+        "scanned": [{"filename": "c.pdf", "pages": 8}, {"filename": "d.pdf", "pages": 20}],
+        "hybrid": [{"filename": "e.pdf", "pages": 30}],
+    }
+}
+
+
+def _report(checks):
+    ok = True
+    for passed, label in checks:
+        print(f"{'✅' if passed else '❌'} {label}")
+        ok = ok and passed
+    return ok
+
+
+def test_priority():
+    """Test 1: Jobs are ordered by the requested priority."""
+    print_section("TEST 1: Priority Orders")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "topology.json")
+        with open(path, "w") as f:
+            json.dump(TOPOLOGY, f)
+        topo = load_topology(path)
+    pdfs = [f"/corpus/{n}.pdf" for n in "abcde"]
+    names = lambda jobs: "".join(Path(j.pdf_path).stem for j in jobs)
+    by_pages = names(plan_jobs(pdfs, "pages", topo))
+    by_topo = names(plan_jobs(pdfs, "topology", topo))
+    fifo = names(plan_jobs(pdfs, "fifo", topo))
+    return _report([
+        (by_pages == "bedac", f"pages: {by_pages}"),
+        (by_topo == "dceba", f"topology: {by_topo}"),
+        (fifo == "abcde", f"fifo: {fifo}"),
+        (load_topology("/nonexistent.json") == {}, "missing topology file is tolerated"),
+    ])
+
+
+def test_concurrency():
+    """Test 2: Up to N documents are in flight; all complete."""
+    print_section("TEST 2: Document Concurrency")
+    lock = threading.Lock()
+    state = {"inflight": 0, "peak": 0}
+    seen = []
+
+    def _work(job):
+        with lock:
+            state["inflight"] += 1
+            state["peak"] = max(state["peak"], state["inflight"])
+        time.sleep(0.02)
+        with lock:
+            state["inflight"] -= 1
+        return {"pdf": job.pdf_path}
+
+    jobs = plan_jobs([f"/corpus/{i}.pdf" for i in range(20)], "fifo")
+    stats = BatchScheduler(_work, workers=4, on_result=lambda job, res, err, t: seen.append(res["pdf"])).run(jobs)
+    return _report([
+        (state["peak"] == 4, f"peak {state['peak']} documents in flight (workers=4)"),
+        (stats["done"] == 20 and sorted(seen) == sorted(j.pdf_path for j in jobs), f"stats {stats}"),
+    ])
+
+
+def test_failures():
+    """Test 3: A failing document is reported and the run continues."""
+    print_section("TEST 3: Failures")
+    errors = []
+
+    def _work(job):
+        if job.seq % 3 == 0:
+            raise RuntimeError("boom")
+        return {}
+
+    stats = BatchScheduler(_work, workers=2, on_result=lambda job, res, err, t: errors.append(err)).run(
+        plan_jobs([f"/corpus/{i}.pdf" for i in range(9)], "fifo"))
+    return _report([
+        (stats["failed"] == 3 and stats["done"] == 6, f"stats {stats}"),
+        (sum(1 for e in errors if e is not None) == 3, "errors passed to on_result"),
+    ])
+
+
+def test_graceful_stop():
+    """Test 4: Stop drains in-flight documents and skips the queue."""
+    print_section("TEST 4: Graceful Stop")
+    finished = []
+    scheduler = None
+
+    def _work(job):
+        if job.seq == 0:
+            scheduler.request_stop()
+        time.sleep(0.05)
+        finished.append(job.seq)
+        return {}
+
+    scheduler = BatchScheduler(_work, workers=2)
+    stats = scheduler.run(plan_jobs([f"/corpus/{i}.pdf" for i in range(10)], "fifo"))
+    return _report([
+        (stats["done"] == len(finished) and 1 <= len(finished) <= 2, f"{len(finished)} in-flight document(s) finished"),
+        (stats["skipped"] == 10 - len(finished), f"{stats['skipped']} left queued"),
+    ])
+
+
+def main():
+    """Run all tests."""
+    print("\n" + "=" * 70)
+    print("DOCUMENT SCHEDULER TEST SUITE")
+    print("=" * 70)
+
+    tests = [
+        ("Priority Orders", test_priority),
+        ("Document Concurrency", test_concurrency),
+        ("Failures", test_failures),
+        ("Graceful Stop", test_graceful_stop),
+    ]
+
+    results = {}
+    for test_name, test_func in tests:
+        try:
+            results[test_name] = test_func()
+        except Exception as e:
+            print(f"\n❌ {test_name} FAILED with exception: {e}")
+            results[test_name] = False
+
+    print_section("TEST SUMMARY")
+    for test_name, passed in results.items():
+        print(f"{'✅ PASSED' if passed else '❌ FAILED'}: {test_name}")
+
+    passed_tests = sum(1 for passed in results.values() if passed)
+    print(f"\nTOTAL: {passed_tests}/{len(results)} tests passed")
+    return 0 if passed_tests == len(results) else 1
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,215 @@
+"""
+Table Regions Test Suite
+
+Tests the region-of-interest mode of vision extraction (VISION_ROI).
+
+Test Coverage:
+1. Region selection: Docling boxes (bottom-left origin) converted, agent tables preferred, large regions skipped
+2. Regions from a real PDF: PyMuPDF table finder, the cached Docling conversion, clip rendering
+3. vision_qc_agent sends context thumbnail + table crop with labels, prompt note and pixel counts
+
+Run: python test_table_regions.py
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add gracian_pipeline to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from gracian_pipeline.core import table_regions
+from gracian_pipeline.core.table_regions import Region, docling_table_boxes, select_region
+
+A4 = (595.0, 842.0)
+
+
+def print_section(title: str):
+    """Print section header."""
+    print("\n" + "=" * 70)
+    print(title)
+    print("=" * 70 + "\n")
+
+
+def _report(checks):
+    ok = True
+    for passed, label in checks:
+        print(f"{'✅' if passed else '❌'} {label}")
+        ok = ok and passed
+    return ok
+
+
+def _docling_table(page_no, l, t, r, b):
+    return {"prov": [{"page_no": page_no, "bbox": {"l": l, "t": t, "r": r, "b": b, "coord_origin": "BOTTOMLEFT"}}]}
+
+
+def test_region_selection():
+    """Test 1: Boxes, agent preference and the area limit."""
+    print_section("TEST 1: Region Selection")
+    boxes = docling_table_boxes([_docling_table(3, 60, 700, 540, 520), {"prov": [{"page_no": 4}]}])
+    (l, t, r, b, origin), = boxes[2]
+    top_left = table_regions._to_top_left((l, t, r, b, origin), A4[1])
+
+    loans = ((60, 400, 540, 520), "Not 12 Skulder till kreditinstitut\nLån 1 | 2,15 % | 4 500 000")
+    fees = ((60, 600, 540, 700), "Årsavgifter | 1 234 567")
+    region = select_region(7, [loans, fees], A4, ["loans_agent"])
+    unmatched = select_region(7, [loans, fees], A4, ["audit_agent"])
+    whole = select_region(7, [((20, 20, 575, 820), "Resultaträkning")], A4, ["financial_agent"])
+    return _report([
+        (list(boxes) == [2] and origin == "BOTTOMLEFT", "Docling prov boxes per 0-based page; boxes without bbox skipped"),
+        (top_left == (60, 142, 540, 322), f"bottom-left box flipped to top-left origin {top_left}"),
+        (region is not None and region.y0 < 400 - table_regions.HEADING_PT and region.y1 < 600, f"loans table only, with room for its heading: {region and region.box}"),
+        (unmatched is not None and unmatched.y1 > 700, "no matching table: union of all tables"),
+        (whole is None, "region covering most of the page: full page instead"),
+        (select_region(7, [], A4) is None, "no tables: full page"),
+    ])
+
+
+def _statement_pdf(path: str):
+    """Three pages: prose, a ruled loans table under its note heading, prose."""
+    import fitz  # PyMuPDF
+
+    doc = fitz.open()
+    for p in range(3):
+        page = doc.new_page(width=A4[0], height=A4[1])
+        page.insert_text((60, 80), "Förvaltningsberättelse" if p == 0 else "Noter", fontsize=14)
+        if p != 1:
+            for i in range(20):
+                page.insert_text((60, 120 + i * 18), "Föreningen har under året förvaltat fastigheten enligt stadgarna.", fontsize=10)
+            continue
+        page.insert_text((60, 380), "Not 12 Skulder till kreditinstitut", fontsize=12)
+        x = [60, 240, 360, 540]
+        for row in range(6):
+            y = 400 + row * 20
+            page.draw_line((x[0], y), (x[-1], y))
+            if row < 5:
+                for c, text in enumerate(["Långivare", "Ränta", "Belopp"] if row == 0 else [f"Bank {row}", "2,15 %", f"{row} 500 000"]):
+                    page.insert_text((x[c] + 4, y + 14), text, fontsize=9)
+        for xi in x:
+            page.draw_line((xi, 400), (xi, 500))
+    doc.save(path)
+    doc.close()
+
+
+def test_pdf_regions():
+    """Test 2: Regions found in a real PDF, from PyMuPDF and from the Docling cache, and rendered."""
+    print_section("TEST 2: Regions From A PDF")
+    try:
+        import fitz  # noqa: F401
+    except ImportError as e:
+        print(f"⏭️  Skipped (missing dependency: {e})")
+        return True
+    from gracian_pipeline.core.docling_artifact import DoclingArtifact
+    from gracian_pipeline.core.docling_cache import DoclingCache
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf = os.path.join(tmp, "brf_test.pdf")
+        _statement_pdf(pdf)
+        cache = DoclingCache(os.path.join(tmp, "cache"))
+        saved = table_regions.get_docling_cache
+        table_regions.get_docling_cache = lambda: cache
+        try:
+            found = table_regions.table_regions(pdf, [0, 1, 2, 9], "loans_agent")
+            region = found.get(1)
+            crop = table_regions.render_region(pdf, region, 300) if region else b""
+            # A conversion made with other converter options is still found by path
+            cache.put("other-options", DoclingArtifact(pdf_path=pdf, markdown="", page_count=3, table_pages=[[1]],
+                                                        tables=[_docling_table(2, 60, 842 - 395, 540, 842 - 505)]))
+            os.utime(pdf, (1, 1))  # new mtime: fresh lookups
+            docling = table_regions.table_regions(pdf, [1], "loans_agent").get(1)
+        finally:
+            table_regions.get_docling_cache = saved
+
+    width = int(region.x1 - region.x0) * 300 // 72 if region else 0
+    return _report([
+        (list(found) == [1] and region.source == "pymupdf", f"table page found by PyMuPDF, prose and out-of-range pages skipped: {list(found)}"),
+        (region and region.y0 <= 380 - 12 and region.y1 >= 500 and region.area_share < 0.3, f"region {region and region.box} covers the table and its note heading"),
+        (crop[:4] == b"\x89PNG" and abs(int.from_bytes(crop[16:20], "big") - width) <= 3, f"crop rendered at ROI DPI ({len(crop)} bytes)"),
+        (docling is not None and docling.source == "docling", f"cached Docling boxes preferred: {docling and docling.box}"),
+    ])
+
+
+def test_vision_qc_roi():
+    """Test 3: vision_qc_agent swaps table pages for context + crop and records what it saved."""
+    print_section("TEST 3: vision_qc_agent ROI Mode")
+    try:
+        from gracian_pipeline.core import vision_qc
+    except ImportError as e:
+        print(f"⏭️  Skipped (missing dependency: {e})")
+        return True
+    sent = {}
+
+    def _openai(prompt, images, page_labels=None):
+        sent.update(prompt=prompt, images=images, labels=page_labels)
+        return '{"loans": [{"lender": "Bank 1"}]}'
+
+    region = Region(4, 60, 320, 540, 520, A4[0], A4[1], "docling")
+    renders = []
+
+    def _render(pdf, idx, dpi=200):
+        renders.append((tuple(idx), dpi))
+        return [b"page%d@%d" % (i, dpi) for i in idx]
+
+    saved = (vision_qc.render_pdf_pages_subset, vision_qc.call_openai_responses_vision, vision_qc.table_regions,
+             vision_qc.render_region, vision_qc.pdf_page_count)
+    old = {k: os.environ.get(k) for k in ("OPENAI_ONLY", "OPENAI_RESPONSES", "VISION_ROI", "IMAGE_ENCODING")}
+    vision_qc.render_pdf_pages_subset = _render
+    vision_qc.call_openai_responses_vision = _openai
+    vision_qc.table_regions = lambda pdf, pages, agent_id=None: {4: region}
+    vision_qc.render_region = lambda pdf, r, dpi: b"crop%d@%d" % (r.page, dpi)
+    vision_qc.pdf_page_count = lambda pdf: 20
+    os.environ.update(OPENAI_ONLY="true", OPENAI_RESPONSES="true", VISION_ROI="true", IMAGE_ENCODING="false")
+    try:
+        result, meta = vision_qc.vision_qc_agent("brf_test.pdf", "loans_agent", "Extract", page_indices=[4, 5])
+    finally:
+        (vision_qc.render_pdf_pages_subset, vision_qc.call_openai_responses_vision, vision_qc.table_regions,
+         vision_qc.render_region, vision_qc.pdf_page_count) = saved
+        for k, v in old.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+    roi = meta.get("roi") or {}
+    return _report([
+        (result == {"loans": [{"lender": "Bank 1"}]}, "result parsed"),
+        (sent["images"] == [b"page4@50", b"crop4@300", b"page5@220"], f"context + crop for the table page, full render for the other: {sent['images']}"),
+        (sent["labels"] == ["Page 5/20 (context)", "Page 5/20 (table region)", "Page 6/20"], f"labels {sent['labels']}"),
+        ("high-resolution crop" in sent["prompt"], "prompt explains the image pairs"),
+        (roi.get("pages") == [{"page": 4, "box": [60, 320, 540, 520], "source": "docling"}], "qc_meta records the region"),
+        (0 < roi.get("pixels_after", 0) < roi.get("pixels_before", 0), f"pixels {roi.get('pixels_before')} -> {roi.get('pixels_after')}"),
+        (meta["image_payload"]["images"] == 3, "image payload counts every image sent"),
+    ])
+
+
+def main():
+    """Run all tests."""
+    print("\n" + "=" * 70)
+    print("TABLE REGIONS TEST SUITE")
+    print("=" * 70)
+
+    tests = [
+        ("Region Selection", test_region_selection),
+        ("Regions From A PDF", test_pdf_regions),
+        ("vision_qc_agent ROI Mode", test_vision_qc_roi),
+    ]
+
+    results = {}
+    for test_name, test_func in tests:
+        try:
+            results[test_name] = test_func()
+        except Exception as e:
+            print(f"\n❌ {test_name} FAILED with exception: {e}")
+            results[test_name] = False
+
+    print_section("TEST SUMMARY")
+    for test_name, passed in results.items():
+        print(f"{'✅ PASSED' if passed else '❌ FAILED'}: {test_name}")
+
+    passed_tests = sum(1 for passed in results.values() if passed)
+    print(f"\nTOTAL: {passed_tests}/{len(results)} tests passed")
+    return 0 if passed_tests == len(results) else 1
+
+
+if __name__ == "__main__":
+    exit(main())
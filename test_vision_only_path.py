@@ -0,0 +1,264 @@
+"""
+Vision-Only Path Test Suite
+
+Tests the plan-then-execute vision branch of run_gracian.process_pdf (low text layer documents).
+
+Test Coverage:
+1. Plan: the union of every agent's pages is rendered once, in one batch, before any agent call
+2. Dispatch: agents run concurrently (VISION_AGENT_CONCURRENCY), pacing staggers starts, one failure stays local
+3. Numeric second pass: expanded pages passed as max_pages, VISION_MAX_PAGES left untouched
+4. Routing: scanned documents take the vision path from the stored topology without building the page text index;
+   others still go to vision when ≥60% of their pages have <500 chars
+
+Run: python test_vision_only_path.py
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+# run_gracian imports the pipeline as top-level `core` / `prompts` packages
+sys.path.insert(0, str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).parent / "gracian_pipeline"))
+
+
+def print_section(title: str):
+    """Print section header."""
+    print("\n" + "=" * 70)
+    print(title)
+    print("=" * 70 + "\n")
+
+
+def _report(checks):
+    ok = True
+    for passed, label in checks:
+        print(f"{'✅' if passed else '❌'} {label}")
+        ok = ok and passed
+    return ok
+
+
+def _import_cli():
+    try:
+        import run_gracian
+    except ImportError as e:
+        print(f"⏭️  Skipped (missing dependency: {e})")
+        return None
+    return run_gracian
+
+
+class _Index:
+    page_count = 40
+
+
+@contextmanager
+def _patched(cli, vision, env=None):
+    """Replace rendering, page selection and the vision call; restore env afterwards."""
+    events = []
+
+    def _render(pdf, idx, dpi=200):
+        events.append(("render", sorted(set(idx)), dpi))
+        return [b"png"] * len(set(idx))
+
+    saved = cli.render_pdf_pages_subset, cli.vision_qc_agent, cli.select_pages_for_agent
+    old = {k: os.environ.get(k) for k in ("VISION_AGENT_CONCURRENCY", "GEMINI_PACING_MS", "VISION_MAX_PAGES", "EXACT_PAGE_LIST")}
+    cli.render_pdf_pages_subset = _render
+    cli.vision_qc_agent = lambda *a, **kw: vision(events, *a, **kw)
+    cli.select_pages_for_agent = lambda pdf, agent_id, index=None: [30, 31]
+    os.environ.update(EXACT_PAGE_LIST="true", **(env or {}))
+    try:
+        yield events
+    finally:
+        cli.render_pdf_pages_subset, cli.vision_qc_agent, cli.select_pages_for_agent = saved
+        for k, v in old.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+
+def test_plan():
+    """Test 1: One batch render of the union of all agents' pages, before any agent call."""
+    print_section("TEST 1: Plan And Render Once")
+    cli = _import_cli()
+    if cli is None:
+        return True
+
+    def _vision(events, pdf, agent_id, prompt, page_indices=None, max_pages=None):
+        events.append(("call", agent_id, list(page_indices or [])))
+        return {"chairman": "A"}, {}
+
+    pages_map = {"governance_agent": [2, 3], "audit_agent": [3, 4], "property_agent": [2]}
+    agents = {a: "Extract" for a in list(pages_map) + ["notes_agent"]}
+    with _patched(cli, _vision) as events:
+        out = cli.vision_only_extract("brf_test.pdf", agents, pages_map, _Index())
+    renders = [e for e in events if e[0] == "render"]
+    plan = out["_qc"]["_vision_plan"]
+    return _report([
+        (renders == [("render", [2, 3, 4, 30, 31], 220)], f"union rendered once: {renders}"),
+        (events[0][0] == "render", "rendered before the first agent call"),
+        (sorted(e[1] for e in events if e[0] == "call") == sorted(agents), "every agent called once"),
+        (plan["pages_by_agent"]["notes_agent"] == [30, 31] and plan["distinct_pages"] == 5, "plan recorded in _qc._vision_plan"),
+        (list(out)[:len(agents)] == list(agents), "results keep the agent order"),
+    ])
+
+
+def test_dispatch():
+    """Test 2: Agent calls overlap; pacing staggers their starts; one failing agent leaves the others."""
+    print_section("TEST 2: Concurrent Dispatch")
+    cli = _import_cli()
+    if cli is None:
+        return True
+    agents = {a: "Extract" for a in ("governance_agent", "audit_agent", "property_agent", "fees_agent")}
+    active = {"now": 0, "max": 0}
+    lock = threading.Lock()
+    starts = []
+
+    def _vision(events, pdf, agent_id, prompt, page_indices=None, max_pages=None):
+        with lock:
+            starts.append(time.monotonic())
+            active["now"] += 1
+            active["max"] = max(active["max"], active["now"])
+        time.sleep(0.2)
+        with lock:
+            active["now"] -= 1
+        if agent_id == "fees_agent":
+            raise RuntimeError("provider down")
+        return {"chairman": "A"}, {}
+
+    t0 = time.monotonic()
+    with _patched(cli, _vision, {"VISION_AGENT_CONCURRENCY": "0"}):
+        out = cli.vision_only_extract("brf_test.pdf", agents, {}, _Index())
+    elapsed = time.monotonic() - t0
+    all_max = active["max"]
+    active["max"] = 0
+    starts.clear()
+    with _patched(cli, _vision, {"VISION_AGENT_CONCURRENCY": "2", "GEMINI_PACING_MS": "50"}):
+        cli.vision_only_extract("brf_test.pdf", agents, {}, _Index())
+    gaps = [b - a for a, b in zip(starts, starts[1:])]
+    return _report([
+        (all_max == 4 and elapsed < 0.6, f"4 agents in flight, {elapsed:.2f}s for 4 x 0.2s calls"),
+        (active["max"] == 2, "VISION_AGENT_CONCURRENCY=2 caps agents in flight"),
+        (gaps and min(gaps) >= 0.04, f"GEMINI_PACING_MS staggers call starts (min gap {min(gaps or [0]):.3f}s)"),
+        (out["fees_agent"] == {} and "fees_agent" not in out["_qc"] and out["audit_agent"], "failing agent isolated"),
+    ])
+
+
+def test_second_pass():
+    """Test 3: Table agents failing numeric QC re-run on expanded pages without touching the environment."""
+    print_section("TEST 3: Numeric Second Pass")
+    cli = _import_cli()
+    if cli is None:
+        return True
+    calls = []
+
+    def _vision(events, pdf, agent_id, prompt, page_indices=None, max_pages=None):
+        calls.append((list(page_indices), max_pages, os.environ.get("VISION_MAX_PAGES")))
+        return {}, {}
+
+    with _patched(cli, _vision, {"VISION_MAX_PAGES": "2"}):
+        out = cli.vision_only_extract("brf_test.pdf", {"loans_agent": "Extract"}, {"loans_agent": [10]}, _Index())
+    meta = out["_qc"]["loans_agent"]
+    return _report([
+        (calls[0] == ([10], None, "2"), f"first pass on the planned pages: {calls[0]}"),
+        (len(calls) == 2 and calls[1] == ([8, 9, 10, 11, 12], 5, "2"), f"second pass ±2 pages with max_pages, env untouched: {calls[-1]}"),
+        ("numeric_qc_second" in meta and meta.get("second_pass_used") is False, "second pass recorded"),
+    ])
+
+
+def test_routing():
+    """Test 4: Topology decides scanned documents; the per-page low-text rule still applies to the rest."""
+    print_section("TEST 4: Topology Routing")
+    cli = _import_cli()
+    if cli is None:
+        return True
+    from types import SimpleNamespace
+
+    class _Stop(Exception):
+        pass
+
+    calls = []
+
+    def _route(category, env=None, page_chars=(2000, 2000, 2000, 2000, 2000)):
+        calls.clear()
+
+        def _index(pdf):
+            calls.append(("index", pdf))
+            return SimpleNamespace(page_texts=["x" * n for n in page_chars], page_count=len(page_chars))
+
+        def _text_path(pdf, index=None):
+            calls.append(("text", pdf))
+            raise _Stop()
+
+        saved = cli.get_topology, cli.get_page_index, cli.vision_sectionize, cli.vision_only_extract, cli.sectionize_pdf
+        old = {k: os.environ.get(k) for k in ("AUTO_VISION_CATEGORIES", "VISION_SECTIONIZER", "TOPOLOGY_DB", "SECTIONS_OUT_DIR")}
+        cli.get_topology = lambda pdf, store=None: {"category": category, "avg_chars_per_page": 120.0, "source": "scan_db"}
+        cli.get_page_index = _index
+        cli.vision_sectionize = lambda pdf: {"pages_by_agent": {"governance_agent": [1]}}
+        cli.vision_only_extract = lambda pdf, agents, pages_map, page_index=None: calls.append(("vision", pages_map, page_index)) or {}
+        cli.sectionize_pdf = _text_path
+        tmp = tempfile.TemporaryDirectory()
+        os.environ.update(VISION_SECTIONIZER="false", TOPOLOGY_DB="", SECTIONS_OUT_DIR=tmp.name, **(env or {}))
+        try:
+            cli.process_pdf("brf_test.pdf", {"governance_agent": "Extract"})
+        except _Stop:
+            pass
+        finally:
+            tmp.cleanup()
+            cli.get_topology, cli.get_page_index, cli.vision_sectionize, cli.vision_only_extract, cli.sectionize_pdf = saved
+            for k, v in old.items():
+                if v is None:
+                    os.environ.pop(k, None)
+                else:
+                    os.environ[k] = v
+        return [c[0] for c in calls], list(calls)
+
+    scanned, scanned_calls = _route("scanned")
+    hybrid, _ = _route("hybrid")
+    hybrid_low, hybrid_low_calls = _route("hybrid", page_chars=(1500, 300, 200, 450, 100))
+    hybrid_opt_in, _ = _route("hybrid", {"AUTO_VISION_CATEGORIES": "scanned,hybrid"})
+    machine, _ = _route("machine_readable")
+    return _report([
+        (scanned == ["vision"] and scanned_calls[0][2] is None, f"scanned: vision path, no page text index built ({scanned})"),
+        (hybrid == ["index", "text"] and machine == ["index", "text"], "hybrid and machine-readable with text on most pages: text path"),
+        (hybrid_low == ["index", "vision"] and hybrid_low_calls[1][2] is not None,
+         f"4/5 pages under 500 chars: vision path, reusing the page index ({hybrid_low})"),
+        (hybrid_opt_in == ["vision"], "AUTO_VISION_CATEGORIES=scanned,hybrid routes hybrid documents to vision"),
+    ])
+
+
+def main():
+    """Run all tests."""
+    print("\n" + "=" * 70)
+    print("VISION-ONLY PATH TEST SUITE")
+    print("=" * 70)
+
+    tests = [
+        ("Plan And Render Once", test_plan),
+        ("Concurrent Dispatch", test_dispatch),
+        ("Numeric Second Pass", test_second_pass),
+        ("Topology Routing", test_routing),
+    ]
+
+    results = {}
+    for test_name, test_func in tests:
+        try:
+            results[test_name] = test_func()
+        except Exception as e:
+            print(f"\n❌ {test_name} FAILED with exception: {e}")
+            results[test_name] = False
+
+    print_section("TEST SUMMARY")
+    for test_name, passed in results.items():
+        print(f"{'✅ PASSED' if passed else '❌ FAILED'}: {test_name}")
+
+    passed_tests = sum(1 for passed in results.values() if passed)
+    print(f"\nTOTAL: {passed_tests}/{len(results)} tests passed")
+    return 0 if passed_tests == len(results) else 1
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,159 @@
+"""
+Pipelined Vision Sectionizer Test Suite
+
+Tests that vision_sectionize overlaps model calls and merges deterministically.
+
+Test Coverage:
+1. Round 1 batches run concurrently, bounded by SECTIONIZER_CONCURRENCY
+2. Round 2 runs all L1 sections concurrently
+3. Output is identical regardless of completion order
+
+Run: python test_vision_sectionizer_pipeline.py
+"""
+
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add gracian_pipeline to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+def print_section(title: str):
+    """Print section header."""
+    print("\n" + "=" * 70)
+    print(title)
+    print("=" * 70 + "\n")
+
+
+PAGES = 40
+
+
+class _StubModel:
+    """Answers round 1/2 prompts from the page listing, with random latency."""
+
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.inflight = 0
+        self.peak = 0
+        self.round2_peak = 0
+
+    def __call__(self, base_url, api_key, model, prompt, images):
+        with self.lock:
+            self.inflight += 1
+            self.peak = max(self.peak, self.inflight)
+            delay = self.rng.uniform(0.01, 0.05)
+        try:
+            time.sleep(delay)
+            if "Level 1 section:" in prompt:
+                with self.lock:
+                    self.round2_peak = max(self.round2_peak, self.inflight)
+                m = re.search(r"Level 1 section: (.+?) \((\d+)–(\d+)\)", prompt)
+                title, sp = m.group(1), int(m.group(2))
+                return json.dumps({"level_2": [{"parent": title, "title": f"{title} del 1", "start_page": sp, "end_page": sp}], "level_3": []})
+            pages = [int(p) for p in re.findall(r"page (\d+)", prompt)]
+            first, last = pages[0], pages[-1]
+            title = "Noter" if first > 16 else "Förvaltningsberättelse"
+            return json.dumps({"level_1": [{"title": title, "start_page": first, "end_page": last}]})
+        finally:
+            with self.lock:
+                self.inflight -= 1
+
+
+def _run(vs, seed):
+    stub = _StubModel(seed)
+    vs._call_openai_compatible_vision = stub
+    return vs.vision_sectionize("brf_test.pdf"), stub
+
+
+def _load():
+    try:
+        from gracian_pipeline.core import vision_sectionizer as vs
+    except ImportError as e:
+        print(f"⏭️  Skipped (missing dependency: {e})")
+        return None
+    vs.pdf_page_count = lambda pdf_path: PAGES
+    vs.iter_render_pages = lambda pdf_path, pages, dpi, fmt="png": ((i, b"png") for i in pages)
+    vs.render_pages = lambda pdf_path, pages, dpi, fmt="png": [b"png" for _ in pages]
+    os.environ.setdefault("OPENROUTER_API_KEY", "test")
+    os.environ["SECTIONIZER_PAGES_PER_CALL"] = "4"
+    os.environ["SECTIONIZER_CONCURRENCY"] = "3"
+    return vs
+
+
+def test_round1_concurrency():
+    """Test 1: Round 1 overlaps calls up to the in-flight limit."""
+    print_section("TEST 1: Round 1 Concurrency")
+    vs = _load()
+    if vs is None:
+        return True
+    out, stub = _run(vs, 1)
+    passed = 1 < stub.peak <= 3
+    print(f"{'✅' if passed else '❌'} peak in-flight {stub.peak} (limit 3)")
+    titles = [s["title"] for s in out["level_1"]]
+    ok_titles = titles == ["förvaltningsberättelse", "noter"]
+    print(f"{'✅' if ok_titles else '❌'} merged L1 sections {titles}")
+    return passed and ok_titles
+
+
+def test_round2_concurrency():
+    """Test 2: Round 2 sections are requested concurrently."""
+    print_section("TEST 2: Round 2 Concurrency")
+    vs = _load()
+    if vs is None:
+        return True
+    out, stub = _run(vs, 2)
+    passed = stub.round2_peak >= 2 and len(out["level_2"]) == 2
+    print(f"{'✅' if passed else '❌'} round 2 peak in-flight {stub.round2_peak}, {len(out['level_2'])} L2 items")
+    return passed
+
+
+def test_deterministic_merge():
+    """Test 3: Different completion orders give the same outline."""
+    print_section("TEST 3: Deterministic Merge")
+    vs = _load()
+    if vs is None:
+        return True
+    outs = [json.dumps(_run(vs, seed)[0], sort_keys=True) for seed in (3, 4, 5)]
+    passed = len(set(outs)) == 1
+    print(f"{'✅' if passed else '❌'} 3 runs with shuffled latencies agree")
+    return passed
+
+
+def main():
+    """Run all tests."""
+    print("\n" + "=" * 70)
+    print("PIPELINED VISION SECTIONIZER TEST SUITE")
+    print("=" * 70)
+
+    tests = [
+        ("Round 1 Concurrency", test_round1_concurrency),
+        ("Round 2 Concurrency", test_round2_concurrency),
+        ("Deterministic Merge", test_deterministic_merge),
+    ]
+
+    results = {}
+    for test_name, test_func in tests:
+        try:
+            results[test_name] = test_func()
+        except Exception as e:
+            print(f"\n❌ {test_name} FAILED with exception: {e}")
+            results[test_name] = False
+
+    print_section("TEST SUMMARY")
+    for test_name, passed in results.items():
+        print(f"{'✅ PASSED' if passed else '❌ FAILED'}: {test_name}")
+
+    passed_tests = sum(1 for passed in results.values() if passed)
+    print(f"\nTOTAL: {passed_tests}/{len(results)} tests passed")
+    return 0 if passed_tests == len(results) else 1
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: nested `in` anchor scan vs. the Aho–Corasick automaton.
+
+- Loads page text from the Hjorthagen/ and SRS/ sample PDFs (PyMuPDF), normalizes it
+  the same way the sectionizer does, and times both matchers over every page.
+- Verifies both produce identical per-page agent sets.
+- The automaton uses pyahocorasick when installed and the `str.find` scan
+  otherwise; ANCHOR_MATCHER_BACKEND=python benchmarks the pure-Python automaton.
+- --with-router-keywords adds the NoteSemanticRouter keyword sets so the
+  comparison reflects the larger anchor tables we are moving towards.
+
+Usage:
+  python tools/bench_anchor_matcher.py
+  python tools/bench_anchor_matcher.py --pdf-dir SRS --limit 10 --with-router-keywords
+  python tools/bench_anchor_matcher.py --synthetic 2000   # no PDFs available
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from pathlib import Path
+from typing import Dict, List, Set
+
+import sys
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]/"gracian_pipeline"))
+
+from core.sectionizer import AGENT_ANCHORS, PageIndex, _normalize_text
+from core.anchor_matcher import AnchorAutomaton
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+ROUTER_KEYWORDS = REPO_ROOT/"experiments"/"docling_advanced"/"config"/"note_keywords.yaml"
+
+
+def _router_anchors() -> Dict[str, List[str]]:
+    import yaml
+    with open(ROUTER_KEYWORDS) as f:
+        cfg = yaml.safe_load(f) or {}
+    out: Dict[str, List[str]] = {}
+    for agent_id, agent_cfg in (cfg.get("agents") or {}).items():
+        kws = agent_cfg.get("keywords") or {}
+        words: List[str] = []
+        for kind in ("primary", "secondary", "related", "ocr_errors"):
+            words.extend(_normalize_text(str(k)) for k in kws.get(kind, []) or [])
+        out[f"router:{agent_id}"] = [w for w in words if w]
+    return out
+
+
+def _naive(pages: List[str], anchors: Dict[str, List[str]]) -> List[Set[str]]:
+    result = []
+    for txt in pages:
+        hits: Set[str] = set()
+        for agent_id, words in anchors.items():
+            for a in words:
+                if a in txt:
+                    hits.add(agent_id)
+                    break
+        result.append(hits)
+    return result
+
+
+def _automaton(pages: List[str], automaton: AnchorAutomaton) -> List[Set[str]]:
+    return [automaton.agents_in(txt) for txt in pages]
+
+
+def _synthetic_pages(n: int, anchors: Dict[str, List[str]], seed: int = 7) -> List[str]:
+    rng = random.Random(seed)
+    vocab = [a for words in anchors.values() for a in words]
+    filler = "summa kronor belopp enligt styrelsens förslag året som gick och föregående år".split()
+    pages = []
+    for _ in range(n):
+        words = [rng.choice(filler) for _ in range(400)]
+        for _ in range(rng.randint(0, 6)):
+            words.insert(rng.randrange(len(words)), rng.choice(vocab))
+        pages.append(" ".join(words))
+    return pages
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Benchmark sectionizer anchor matching")
+    ap.add_argument("--pdf-dir", action="append", help="PDF directory (repeatable); default Hjorthagen + SRS samples")
+    ap.add_argument("--limit", type=int, default=0, help="Max PDFs per directory (0 = all)")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--with-router-keywords", action="store_true")
+    ap.add_argument("--synthetic", type=int, default=0, help="Use N synthetic pages instead of PDFs")
+    args = ap.parse_args()
+
+    anchors: Dict[str, List[str]] = {k: list(v) for k, v in AGENT_ANCHORS.items()}
+    if args.with_router_keywords:
+        anchors.update(_router_anchors())
+    n_anchors = sum(len(v) for v in anchors.values())
+
+    pages: List[str] = []
+    if not args.synthetic:
+        dirs = args.pdf_dir or [str(REPO_ROOT/"Hjorthagen"), str(REPO_ROOT/"SRS")]
+        for d in dirs:
+            pdfs = sorted(Path(d).glob("*.pdf"))
+            if args.limit:
+                pdfs = pdfs[:args.limit]
+            for pdf in pdfs:
+                try:
+                    pages.extend(PageIndex.build(str(pdf)).normalized)
+                except Exception as e:
+                    print(f"[bench] skip {pdf.name}: {e}")
+        if not pages:
+            print(f"[bench] no PDF pages found under {dirs}; use --synthetic N")
+            return 1
+    else:
+        pages = _synthetic_pages(args.synthetic, anchors)
+
+    t = time.perf_counter()
+    automaton = AnchorAutomaton(anchors)
+    build_ms = (time.perf_counter() - t) * 1000
+    chars = sum(len(p) for p in pages)
+    print(f"[bench] {len(pages)} pages, {chars / 1e6:.2f}M chars, {len(anchors)} agents, {n_anchors} anchors")
+    print(f"[bench] automaton: {automaton.size} states, backend={automaton.backend}, built in {build_ms:.1f} ms")
+
+    naive_out = _naive(pages, anchors)
+    ac_out = _automaton(pages, automaton)
+    mismatches = sum(1 for a, b in zip(naive_out, ac_out) if a != b)
+
+    def _time(fn) -> float:
+        best = float("inf")
+        for _ in range(max(1, args.repeat)):
+            t0 = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - t0)
+        return best
+
+    naive_s = _time(lambda: _naive(pages, anchors))
+    ac_s = _time(lambda: _automaton(pages, automaton))
+    print(f"[bench] nested-in : {naive_s * 1000:8.1f} ms  ({naive_s / len(pages) * 1e6:.0f} µs/page)")
+    print(f"[bench] automaton : {ac_s * 1000:8.1f} ms  ({ac_s / len(pages) * 1e6:.0f} µs/page)")
+    print(f"[bench] ratio nested/automaton = {naive_s / ac_s:.2f}x; agent-set mismatches: {mismatches}")
+    return 0 if mismatches == 0 else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark: text-sampling topology vs. the resource-based fast path.
+
+- Takes the PDFs recorded in the mass-scan checkpoint DB (scanned_files), or
+  every PDF under --pdf-dir, and classifies each one with both
+  `text_topology` (what mass_scan_pdfs.py has always done) and
+  `fast_topology` (font/image resources first, text only where fonts exist).
+- Reports the agreement rate between the two, and against the category
+  stored in the DB, plus the time per document for each method and how many
+  documents the fast path settled without reading any text.
+- Each method gets its own fitz.Document; the order alternates per file so
+  neither benefits from the other warming the OS page cache.
+
+Usage:
+  python tools/bench_topology.py --db scan_progress.db --limit 2000
+  python tools/bench_topology.py --db scan_progress.db --category scanned --limit 500
+  python tools/bench_topology.py --pdf-dir SRS
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sqlite3
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import sys
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]/"gracian_pipeline"))
+
+from core.pdf_topology import fast_topology, text_topology
+
+
+def _from_db(db: str, category: Optional[str]) -> List[Tuple[str, Optional[str]]]:
+    conn = sqlite3.connect(db)
+    try:
+        sql = "SELECT filepath, category FROM scanned_files WHERE category NOT IN ('locked', 'corrupted')"
+        args: Tuple[str, ...] = ()
+        if category:
+            sql += " AND category = ?"
+            args = (category,)
+        return [(p, c) for p, c in conn.execute(sql, args) if os.path.exists(p)]
+    finally:
+        conn.close()
+
+
+def _timed(fn, path: str) -> Tuple[Dict, float]:
+    import fitz  # PyMuPDF
+    t0 = time.perf_counter()
+    doc = fitz.open(path)
+    try:
+        out = fn(doc)
+    finally:
+        doc.close()
+    return out, time.perf_counter() - t0
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Benchmark topology classification")
+    ap.add_argument("--db", default="scan_progress.db", help="Mass-scan checkpoint DB")
+    ap.add_argument("--pdf-dir", help="Benchmark every PDF under this directory instead of the DB")
+    ap.add_argument("--category", help="Only DB rows with this stored category")
+    ap.add_argument("--limit", type=int, default=0, help="Random sample of N documents (0 = all)")
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    if args.pdf_dir:
+        docs: List[Tuple[str, Optional[str]]] = [(str(p), None) for p in sorted(Path(args.pdf_dir).rglob("*.pdf"))]
+    else:
+        docs = _from_db(args.db, args.category)
+    if args.limit and len(docs) > args.limit:
+        docs = random.Random(args.seed).sample(docs, args.limit)
+    if not docs:
+        print(f"[bench] no readable PDFs (db={args.db}, pdf-dir={args.pdf_dir})")
+        return 1
+
+    text_s = fast_s = 0.0
+    agree = agree_db = with_db = errors = 0
+    settled_by = Counter()
+    mismatches: List[str] = []
+    for i, (path, stored) in enumerate(docs):
+        try:
+            if i % 2:
+                fast, f_s = _timed(fast_topology, path)
+                ref, t_s = _timed(text_topology, path)
+            else:
+                ref, t_s = _timed(text_topology, path)
+                fast, f_s = _timed(fast_topology, path)
+        except Exception as e:
+            errors += 1
+            print(f"[bench] skip {Path(path).name}: {e}")
+            continue
+        text_s += t_s
+        fast_s += f_s
+        settled_by[fast["classified_by"]] += 1
+        if fast["category"] == ref["category"]:
+            agree += 1
+        else:
+            mismatches.append(f"{path}: text={ref['category']} fast={fast['category']}")
+        if stored:
+            with_db += 1
+            agree_db += fast["category"] == stored
+
+    n = len(docs) - errors
+    print(f"[bench] {n} documents ({errors} unreadable)")
+    print(f"[bench] text sampling : {text_s:8.2f} s  ({text_s / n * 1000:.1f} ms/doc)")
+    print(f"[bench] fast path     : {fast_s:8.2f} s  ({fast_s / n * 1000:.1f} ms/doc)")
+    print(f"[bench] speedup text/fast = {text_s / fast_s:.2f}x" if fast_s else "[bench] speedup n/a")
+    print(f"[bench] agreement with text sampling: {agree}/{n} ({agree * 100 / n:.2f}%)")
+    if with_db:
+        print(f"[bench] agreement with stored DB category: {agree_db}/{with_db} ({agree_db * 100 / with_db:.2f}%)")
+    print(f"[bench] fast path settled by: {dict(settled_by)}")
+    for line in mismatches[:20]:
+        print(f"[bench] mismatch {line}")
+    return 0 if not mismatches else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -15,6 +15,7 @@ Optional:
   --pages 1,2,3   (1-based explicit pages)
   --no-responses  (use Chat Completions vision fallback)
   --out-dir data/raw_pdfs/outputs/agent_debug
+  --no-llm-cache  (ignore cached model answers; see LLM_CACHE_* in .env.example)
 
 Requires OPENAI_API_KEY and the repo deps. Respects .env if present.
 """
@@ -91,7 +92,10 @@ def main() -> None:
     ap.add_argument("--no-responses", action="store_true")
     ap.add_argument("--out-dir", default=str(Path("data")/"raw_pdfs"/"outputs"/"agent_debug"))
     ap.add_argument("--no-fallback", action="store_true", help="Do NOT call any sectionizer; require --pages or precomputed sections")
+    ap.add_argument("--no-llm-cache", action="store_true", help="Ignore cached LLM responses (fresh answers are still stored)")
     args = ap.parse_args()
+    if args.no_llm_cache:
+        os.environ["LLM_CACHE_BYPASS"] = "true"
 
     pdf_path = args.pdf
     agent_id = args.agent
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Warm the on-disk Docling conversion cache for a directory of PDFs.
+
+- Converts every PDF not already cached (keyed by file SHA-256 + Docling
+  version + pipeline options) with the same default converter the adapters use.
+- Later extraction runs (prompt tweaks, reruns of the 42-PDF harness) then load
+  markdown/tables from the cache instead of re-running Docling.
+
+Usage:
+  python tools/warm_docling_cache.py --input-dir data/raw_pdfs/SRS
+  python tools/warm_docling_cache.py --input-dir ~/pdf_docs/Årsredovisning --limit 500 --max-mb 20000
+
+Optional:
+  --cache-dir data/cache/docling   (defaults to DOCLING_CACHE_DIR)
+  --stats                          print cache size and exit
+  --evict                          apply the size bound now and exit
+"""
+
+from __future__ import annotations
+
+import os
+import argparse
+import time
+from pathlib import Path
+
+import sys
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]/"gracian_pipeline"))
+
+from core.docling_cache import DoclingCache, convert_cached, options_fingerprint
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Warm the Docling conversion cache")
+    ap.add_argument("--input-dir", help="Directory scanned recursively for *.pdf")
+    ap.add_argument("--cache-dir", default=os.getenv("DOCLING_CACHE_DIR", "data/cache/docling"))
+    ap.add_argument("--max-mb", type=int, default=int(os.getenv("DOCLING_CACHE_MAX_MB", "4096") or "4096"))
+    ap.add_argument("--limit", type=int, default=0, help="Convert at most N uncached PDFs (0 = all)")
+    ap.add_argument("--stats", action="store_true")
+    ap.add_argument("--evict", action="store_true")
+    args = ap.parse_args()
+
+    cache = DoclingCache(args.cache_dir, max_bytes=args.max_mb * 1024 * 1024)
+    if args.stats or args.evict:
+        if args.evict:
+            print(f"[warm] evicted {cache.evict()} entries")
+        st = cache.stats()
+        print(f"[warm] {st['entries']} entries, {st['bytes'] / 1e6:.1f} MB / {st['max_bytes'] / 1e6:.0f} MB in {st['dir']}")
+        return 0
+    if not args.input_dir:
+        ap.error("--input-dir is required unless --stats/--evict")
+
+    pdfs = sorted(Path(args.input_dir).expanduser().rglob("*.pdf"))
+    print(f"[warm] {len(pdfs)} PDFs under {args.input_dir}")
+
+    from docling.document_converter import DocumentConverter
+    converter = DocumentConverter()
+    options = options_fingerprint(converter)
+
+    converted = cached = failed = 0
+    t0 = time.time()
+    for i, pdf in enumerate(pdfs, 1):
+        if args.limit and converted >= args.limit:
+            break
+        try:
+            if cache.get(cache.key_for(str(pdf), options)) is not None:
+                cached += 1
+                continue
+            t = time.time()
+            art = convert_cached(str(pdf), converter, cache=cache)
+            converted += 1
+            print(f"[warm] {i}/{len(pdfs)} {pdf.name}: {art.page_count} pages, {len(art.tables)} tables ({time.time() - t:.1f}s)")
+        except Exception as e:
+            failed += 1
+            print(f"[warm] {i}/{len(pdfs)} {pdf.name}: error {e}")
+
+    st = cache.stats()
+    print(f"[warm] done in {time.time() - t0:.0f}s: converted={converted} already_cached={cached} failed={failed}")
+    print(f"[warm] cache: {st['entries']} entries, {st['bytes'] / 1e6:.1f} MB")
+    return 0 if failed == 0 else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())